@@ -8,10 +8,10 @@
 #
 
 from __future__ import annotations
-from typing import Optional, Callable, Sequence
+from typing import Any, Optional, Callable, Sequence, Tuple
 from abc import ABC, abstractmethod
 
-from ..etc.Types import JSON, ResourceTypes
+from ..etc.Types import JSON, ResourceTypes, FilterCriteria, FilterOperation
 
 
 class DBBinding(ABC):
@@ -49,6 +49,17 @@ class DBBinding(ABC):
 		...
 
 
+	def getRuntimeStatistics(self) -> JSON:
+		"""	Return runtime statistics of the database binding, e.g. about connection handling.
+
+			Bindings that don't have runtime statistics don't need to override this method.
+
+			Return:
+				Dictionary with statistics values, or an empty dictionary.
+		"""
+		return {}
+
+
 	#
 	#	Resource operations
 	#
@@ -87,6 +98,20 @@ class DBBinding(ABC):
 				The updated resource dirctionary.
 		"""
 		...
+
+
+	def updateResources(self, resources:list[Tuple[str, JSON]]) -> None:
+		"""	Update multiple resources in the database. Only the fields that are not None will be updated.
+
+			The default implementation updates the resources one by one. Database bindings may 
+			override this method to update the resources in a single transaction.
+
+			Args:
+				resources: List of tuples of the resource ID of a resource and the resource to update.
+		"""
+		for ri, resource in resources:
+			self.updateResource(resource, ri)
+
 	
 	@abstractmethod
 	def deleteResource(self, ri:str) -> None:
@@ -96,6 +121,24 @@ class DBBinding(ABC):
 				ri: The resource ID of the resource.
 		"""
 		...
+
+
+	def deleteResources(self, resources:list[Tuple[str, str]], pi:str) -> None:
+		"""	Delete multiple child resources of the same parent resource from the database, together with
+			their identifiers, child resource and instance index entries.
+
+			The default implementation deletes the resources one by one. Database bindings may 
+			override this method to delete the resources with batched operations.
+
+			Args:
+				resources: List of tuples of the resource ID and the structured resource name of a resource.
+				pi: The resource ID of the parent resource.
+		"""
+		for ri, srn in resources:
+			self.deleteResource(ri)
+			self.deleteIdentifier(ri, srn)
+			self.removeChildResource(ri, pi)
+			self.removeInstance(ri, pi)
 	
 
 	@abstractmethod
@@ -123,7 +166,20 @@ class DBBinding(ABC):
 				A list of found resource documents, or an empty list.
 		"""
 		...
-	
+
+
+	@abstractmethod
+	def retrieveResources(self, ris:Sequence[str]) -> list[JSON]:
+		"""	Retrieve the resources for a list of resource IDs with a single database operation.
+
+			Args:
+				ris: The resource IDs.
+
+			Return:
+				The found resource documents in the order of *ris*. Resource IDs of resources that don't exist are skipped.
+		"""
+		...
+
 
 	@abstractmethod
 	def discoverResourcesByFilter(self, func:Callable[[JSON], bool]) -> list[JSON]:
@@ -140,6 +196,42 @@ class DBBinding(ABC):
 		...
 
 
+	def discoverResourcesByCriteria(self, ri:str,
+										  filterCriteria:FilterCriteria,
+										  level:int,
+										  fo:FilterOperation,
+										  allLen:int,
+										  after:Optional[Any] = None,
+										  limit:Optional[int] = None) -> Optional[Tuple[list[Tuple[JSON, Any]], bool]]:
+		"""	Discover the resources below a resource that match a filter criteria.
+
+			The resource tree is walked depth-first, starting with the direct child resources of the resource *ri*,
+			and down to *level* levels. Virtual resources and their child resources are not included. The result
+			must be in the order of the walk.
+
+			Each document is returned together with its position in the walk. The position is opaque for the caller.
+			It can be passed as *after* to continue the walk after that document, e.g. to retrieve the next batch.
+
+			Bindings that cannot evaluate the filter criteria in the database don't need to override this method.
+			The resource tree is then walked and filtered by the caller.
+
+			Args:
+				ri: The resource ID of the resource to start the discovery from.
+				filterCriteria: The filter criteria.
+				level: The number of levels to walk down.
+				fo: The filter operation.
+				allLen: The number of conditions that must match for the *AND* filter operation.
+				after: The position of a previously returned document. If given then the walk continues after this document.
+				limit: The maximum number of documents to return, or *None* for all documents.
+
+			Return:
+				None if discovery is not supported by the binding. Otherwise a tuple with the found resource documents
+				together with their positions, and a boolean that indicates whether the filter criteria were fully applied.
+				If this is False then the documents are candidates that still need to be matched against the filter criteria.
+		"""
+		return None
+
+
 	@abstractmethod
 	def hasResource(self, ri:Optional[str] = None, 
 						  srn:Optional[str] = None,
@@ -170,6 +262,20 @@ class DBBinding(ABC):
 		...
 
 
+	@abstractmethod
+	def countChildResources(self, pi:str, ty:Optional[int] = None) -> int:
+		"""	Return the number of direct child resources of a resource.
+
+			Args:
+				pi: The parent resource's resource ID.
+				ty: Optional resource type to filter the result.
+
+			Return:
+				The number of child resources.
+		"""
+		...
+
+
 	@abstractmethod
 	def searchByFragment(self, dct:dict) -> list[JSON]:
 		""" Search and return all resources that match the given dictionary/document. 
@@ -266,6 +372,72 @@ class DBBinding(ABC):
 		...
 
 
+	#
+	#	Instance index operations
+	#
+
+	@abstractmethod
+	def insertInstance(self, instance:JSON) -> None:
+		"""	Add an instance resource (e.g. *<contentInstance>*) to the creation-time ordered
+			instance index of its parent resource.
+
+			Args:
+				instance: The index entry to add. It contains the *ri*, *pi*, *ty*, *ct*, and *cs* of the instance resource.
+		"""
+		...
+
+
+	@abstractmethod
+	def removeInstance(self, ri:str, pi:str) -> None:
+		"""	Remove an instance resource from the instance index of its parent resource.
+
+			Args:
+				ri: The resource ID of the instance resource.
+				pi: The resource ID of the parent resource.
+		"""
+		...
+
+
+	@abstractmethod
+	def countInstances(self, pi:str) -> Tuple[int, int]:
+		"""	Return the number of instance resources of a parent resource and the sum of their content sizes.
+
+			Args:
+				pi: The resource ID of the parent resource.
+
+			Return:
+				Tuple (number of instances, sum of content sizes).
+		"""
+		...
+
+
+	@abstractmethod
+	def searchOldestInstances(self, pi:str, count:int) -> list[JSON]:
+		"""	Return the oldest entries from the instance index of a parent resource.
+
+			Args:
+				pi: The resource ID of the parent resource.
+				count: The maximum number of entries to return.
+
+			Return:
+				A list of index entries (see `insertInstance`), ordered by creation time, oldest first.
+		"""
+		...
+
+
+	@abstractmethod
+	def searchLatestInstance(self, pi:str) -> Optional[JSON]:
+		"""	Return the latest entry from the instance index of a parent resource.
+
+			Args:
+				pi: The resource ID of the parent resource.
+
+			Return:
+				The index entry (see `insertInstance`) of the latest instance, or None if the parent has no instances.
+		"""
+		...
+
+
 	#
 	#	Subscription operations
 	#
@@ -508,6 +680,24 @@ class DBBinding(ABC):
 		...
 	
 	
+	def insertRequests(self, reqs:list[Tuple[float, JSON]]) -> bool:
+		"""	Add multiple requests to the *requests* database.
+
+			The default implementation adds the requests one by one. Database bindings may 
+			override this method to add the requests in a single operation.
+
+			Args:
+				reqs: List of tuples of the timestamp of a request and the request to store.
+
+			Return:
+				Boolean value to indicate success or failure.
+		"""
+		result = True
+		for ts, req in reqs:
+			result = self.insertRequest(req, ts) and result
+		return result
+
+
 	@abstractmethod
 	def removeOldRequests(self, maxRequests:int) -> None:
 		"""	Remove old requests from the database.
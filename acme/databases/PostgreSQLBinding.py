@@ -15,18 +15,27 @@
 from __future__ import annotations
 from typing import Optional, Callable, Sequence, Any, Tuple
 
-from psycopg2 import connect, Error
-from psycopg2.extras import Json as PsyJson
+import re
+
+from psycopg2 import connect, Error, OperationalError, InterfaceError
+from psycopg2.extras import Json as PsyJson, execute_batch
 from psycopg2.extensions import cursor as PsyCursor, connection as PsyConnection
 
 from .DBBinding import DBBinding
-from ..etc.Types import JSON, ResourceTypes
+from .PostgreSQLConnectionPool import PostgreSQLConnectionPool
+from ..etc.Types import JSON, ResourceTypes, FilterCriteria, FilterOperation
 from ..etc.ResponseStatusCodes import INTERNAL_SERVER_ERROR
 from ..runtime.Logging import Logging as L
 
 
 # TODO Add error handling ansd exceptions to fetch methods?
 
+_simpleAttributeName = re.compile(r'\w+')
+""" Regular expression for attribute names that are not paths. """
+
+_readOnlyStatements = ('get', 'count', 'select')
+""" Name prefixes of the prepared statements that only read from the database and can safely be executed again. """
+
 class PostgreSQLBinding(DBBinding):
 	"""	PostgreSQLBinding class.
 	"""
@@ -35,6 +44,7 @@ class PostgreSQLBinding(DBBinding):
 	tableBatchNotifications = 'batchNotifications'
 	tableChildResources = 'childResources'
 	tableIdentidiers = 'identifiers'
+	tableInstances = 'instances'
 	tableRequests = 'requests'
 	tableResources = 'resources'
 	tableSchedules = 'schedules'
@@ -47,7 +57,9 @@ class PostgreSQLBinding(DBBinding):
 						dbUser:str,
 						dbPassword:str,
 						dbDatabase:str,
-						dbSchema:str) -> None:
+						dbSchema:str,
+						poolSize:int,
+						poolTimeout:float) -> None:
 		"""	Initialize the PostgreSQLBinding object.
 
 			Args:
@@ -57,6 +69,8 @@ class PostgreSQLBinding(DBBinding):
 				dbPassword: The password to connect to the database.
 				dbDatabase: The name of the database to connect to.
 				dbSchema: The schema to use in the database.
+				poolSize: The maximum number of database connections.
+				poolTimeout: The maximum time in seconds to wait for a free database connection.
 		"""
 		super().__init__()
 	
@@ -79,32 +93,37 @@ class PostgreSQLBinding(DBBinding):
 		self.dbSchema = dbSchema
 		"""	The schema to use in the database. """
 
-		self.dbConnection:Optional[PsyConnection] = None
-		"""	The database connection object. """
-
-		# Connect to the database
-		self._checkOpenConnection()
-
-		# Create and upgrade the tables if necessary
-		self.createTables()
-		self.upgradeTables()
+		# Create and upgrade the tables if necessary. This is done with a separate connection
+		# before the pool is created, because preparing the statements for the pooled
+		# connections requires that the referenced tables exist.
+		connection = self._connect()
+		try:
+			self.createTables(connection)
+			self.upgradeTables(connection)
+		finally:
+			connection.close()
+
+		self.connectionPool = PostgreSQLConnectionPool(self._connect, 
+													   self.prepareStatements, 
+													   poolSize, 
+													   poolTimeout)
+		"""	The pool of database connections. Each connection has its own prepared statements. """
 	
 
 	def closeDB(self) -> None:
-		if self.dbConnection is not None:
-			L.isDebug and L.logDebug('Closing database connection')
-			self.dbConnection.close()
-			self.dbConnection = None
+		L.isDebug and L.logDebug('Closing database connections')
+		self.connectionPool.close()
 
 
 	def purgeDB(self) -> None:
 		L.isDebug and L.logDebug('Purging database')
-		with self.dbConnection.cursor() as cursor:
+		with self.connectionPool.connection() as connection, connection.cursor() as cursor:
 			cursor.execute(f'''
 				TRUNCATE TABLE {self.tableActions};
 				TRUNCATE TABLE {self.tableBatchNotifications};
 				TRUNCATE TABLE {self.tableChildResources};
 				TRUNCATE TABLE {self.tableIdentidiers};
+				TRUNCATE TABLE {self.tableInstances};
 				TRUNCATE TABLE {self.tableRequests};
 				TRUNCATE TABLE {self.tableResources};
 				TRUNCATE TABLE {self.tableSchedules};
@@ -118,16 +137,23 @@ class PostgreSQLBinding(DBBinding):
 		return True
 
 
+	def getRuntimeStatistics(self) -> JSON:
+		return self.connectionPool.getStatistics()
+
+
 	###########################################################################
 
 
-	def createTables(self) -> None:
+	def createTables(self, connection:PsyConnection) -> None:
 		"""	Create the necessary schema and tables if they do not exist.
+
+			Args:
+				connection: The database connection to use.
 		"""
 
 		L.isDebug and L.logDebug('Creating database tables')
 		
-		with self.dbConnection.cursor() as cursor:
+		with connection.cursor() as cursor:
 
 			# Create the schema
 			cursor.execute(f'''
@@ -139,7 +165,10 @@ class PostgreSQLBinding(DBBinding):
 				CREATE TABLE IF NOT EXISTS {self.tableResources} (
 					ri TEXT PRIMARY KEY,
 					resource JSONB NOT NULL
-				)
+				);
+				CREATE INDEX IF NOT EXISTS {self.tableResources}_pi ON {self.tableResources} ((resource->>'pi'));
+				CREATE INDEX IF NOT EXISTS {self.tableResources}_ty ON {self.tableResources} ((resource->>'ty'));
+				CREATE INDEX IF NOT EXISTS {self.tableResources}_lbl ON {self.tableResources} USING GIN ((resource->'lbl'));
 			''')
 
 			# Create the identifier table
@@ -160,6 +189,20 @@ class PostgreSQLBinding(DBBinding):
 					childRi TEXT NOT NULL UNIQUE,	-- automatic index
 					childTy INTEGER NOT NULL
 				);
+				CREATE INDEX IF NOT EXISTS {self.tableChildResources}_pi ON {self.tableChildResources} (pi, id);
+			''')
+
+			# Create the instances table. This is the creation-time ordered index of
+			# the instance resources (cin, tsi, fci) of a parent resource
+			cursor.execute(f'''
+				CREATE TABLE IF NOT EXISTS {self.tableInstances} (
+					ri TEXT PRIMARY KEY,
+					pi TEXT NOT NULL,
+					ty INTEGER NOT NULL,
+					ct TEXT NOT NULL,
+					cs INTEGER NOT NULL
+				);
+				CREATE INDEX IF NOT EXISTS {self.tableInstances}_pi_ct ON {self.tableInstances} (pi, ct, ri);
 			''')
 
    			# Create the statistics table
@@ -211,13 +254,29 @@ class PostgreSQLBinding(DBBinding):
 			''')
 
 	
-	def upgradeTables(self) -> None:
+	def upgradeTables(self, connection:PsyConnection) -> None:
 		"""	Upgrade the tables if necessary.
+
+			Args:
+				connection: The database connection to use.
 		"""
-		pass
+		L.isDebug and L.logDebug('Upgrading database tables')
+
+		with connection.cursor() as cursor:
+
+			# Fill the instances index from existing instance resources if it is empty
+			cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {self.tableInstances})')
+			if not cursor.fetchone()[0]:
+				cursor.execute(f'''
+					INSERT INTO {self.tableInstances} (ri, pi, ty, ct, cs)
+						SELECT ri, resource->>'pi', (resource->>'ty')::INTEGER, resource->>'ct', COALESCE((resource->>'cs')::INTEGER, 0)
+						FROM {self.tableResources}
+						WHERE (resource->>'ty')::INTEGER = ANY(%s)
+					ON CONFLICT (ri) DO NOTHING;
+				''', ([ int(ty) for ty in ResourceTypes.instanceResourceTypes() ],))
 
 
-	def prepareStatements(self) -> None:
+	def prepareStatements(self, connection:PsyConnection) -> None:
 		"""	Prepare the PreparedStatements for various SQL operations. 
 		
 			This method is called after the database connection is established and
@@ -227,10 +286,13 @@ class PostgreSQLBinding(DBBinding):
 			subscriptions.
 
 			Note that prepared statements are only usable within the same connection.
-			Therefore, this method should be called after the connection is established.
+			Therefore, this method is called by the connection pool for every new connection.
+
+			Args:
+				connection: The database connection to prepare the statements for.
 		"""
 		L.isDebug and L.logDebug('Preparing SQL statements')
-		with self.dbConnection.cursor() as cur:
+		with connection.cursor() as cur:
 
 			# Prepare resource operations
    
@@ -251,6 +313,9 @@ class PostgreSQLBinding(DBBinding):
 				PREPARE getResourceByRI AS
 					SELECT resource FROM {self.tableResources} 
 					WHERE ri = $1;
+				PREPARE getResourcesByRIs AS
+					SELECT resource FROM {self.tableResources} 
+					WHERE ri = ANY($1);
 				PREPARE getResourceByAEI AS
 					SELECT resource FROM {self.tableResources} 
 					WHERE resource->>'aei' = $1;
@@ -275,9 +340,17 @@ class PostgreSQLBinding(DBBinding):
 				PREPARE countResourcesByTY AS
 					SELECT COUNT(*) FROM {self.tableResources} 
 					WHERE resource->>'ty' = $1;
+				PREPARE countResourcesByPI AS
+					SELECT COUNT(*) FROM {self.tableResources} 
+					WHERE resource->>'pi' = $1;
+				PREPARE countResourcesByPIandTY AS
+					SELECT COUNT(*) FROM {self.tableResources} 
+					WHERE resource->>'pi' = $1 AND resource->>'ty' = $2;
 
 				PREPARE deleteResourceByRI AS
 					DELETE FROM {self.tableResources} WHERE ri = $1;
+				PREPARE deleteResourcesByRIs AS
+					DELETE FROM {self.tableResources} WHERE ri = ANY($1);
 			''')
 
 			# Prepare identifier and childResource operations
@@ -294,15 +367,50 @@ class PostgreSQLBinding(DBBinding):
 				PREPARE deleteIdentifier AS
 					DELETE FROM {self.tableIdentidiers} 
 					WHERE ri = $1;
+				PREPARE deleteIdentifiers AS
+					DELETE FROM {self.tableIdentidiers} 
+					WHERE ri = ANY($1);
 
 				PREPARE insertChildResource AS
 					INSERT into {self.tableChildResources} (pi, childRi, childTy) VALUES ($1, $2, $3);
 				PREPARE getChildResourcesByPI AS
 					SELECT childRi, childTy FROM {self.tableChildResources} 
-					WHERE pi = $1;
+					WHERE pi = $1
+					ORDER BY id;
 				PREPARE deleteChildResource AS
 					DELETE FROM {self.tableChildResources} 
 					WHERE pi = $1 AND childRi = $2;
+				PREPARE deleteChildResources AS
+					DELETE FROM {self.tableChildResources} 
+					WHERE pi = $1 AND childRi = ANY($2);
+			''')
+
+			# Prepare instance index operations
+
+			cur.execute(f'''
+				PREPARE insertInstance AS
+					INSERT INTO {self.tableInstances} (ri, pi, ty, ct, cs) VALUES ($1, $2, $3, $4, $5)
+					ON CONFLICT (ri) DO
+					UPDATE SET pi = $2, ty = $3, ct = $4, cs = $5;
+				PREPARE deleteInstance AS
+					DELETE FROM {self.tableInstances}
+					WHERE ri = $1;
+				PREPARE deleteInstances AS
+					DELETE FROM {self.tableInstances}
+					WHERE ri = ANY($1);
+				PREPARE countInstances AS
+					SELECT COUNT(*), COALESCE(SUM(cs), 0) FROM {self.tableInstances}
+					WHERE pi = $1;
+				PREPARE getOldestInstances AS
+					SELECT ri, pi, ty, ct, cs FROM {self.tableInstances}
+					WHERE pi = $1
+					ORDER BY ct, ri
+					LIMIT $2;
+				PREPARE getLatestInstance AS
+					SELECT ri, pi, ty, ct, cs FROM {self.tableInstances}
+					WHERE pi = $1
+					ORDER BY ct DESC, ri DESC
+					LIMIT 1;
 			''')
 
 			# Prepare subscription operations
@@ -427,31 +535,28 @@ class PostgreSQLBinding(DBBinding):
 			''')
 
 	
-	def _checkOpenConnection(self) -> None:
-		"""	Check if the database connection is open.
-
-			Try to reconnect if the connection is closed.
+	def _connect(self) -> PsyConnection:
+		"""	Open a new connection to the database.
 
+			Return:
+				The new database connection. It is in autocommit mode.
 		"""
-		if not self.dbConnection or self.dbConnection.closed:
-			try:
-				L.isDebug and L.logDebug('Reconnecting to database')
-				self.dbConnection = connect(
-					database = self.dbDatabase,
-					user = self.dbUser,
-					password = self.dbPassword,
-					host = self.dbHost,
-					port = self.dbPort,
-					options = f'-c search_path={self.dbSchema}'	# schema path
-				)
-				self.dbConnection.autocommit = True
-				L.isDebug and L.logDebug(f'Reconnected to database: {self.dbConnection}')
-			except Error:
-				L.logErr(f'Error reconnecting to postgreSQL database at {self.dbHost}:{self.dbPort} as "{self.dbUser}" with database "{self.dbDatabase}"')
-				raise
-
-			# Prepare the statements (again)
-			self.prepareStatements()
+		try:
+			L.isDebug and L.logDebug('Connecting to database')
+			connection = connect(
+				database = self.dbDatabase,
+				user = self.dbUser,
+				password = self.dbPassword,
+				host = self.dbHost,
+				port = self.dbPort,
+				options = f'-c search_path={self.dbSchema}'	# schema path
+			)
+			connection.autocommit = True
+			L.isDebug and L.logDebug(f'Connected to database: {connection}')
+			return connection
+		except Error:
+			L.logErr(f'Error connecting to postgreSQL database at {self.dbHost}:{self.dbPort} as "{self.dbUser}" with database "{self.dbDatabase}"')
+			raise
 
 
 	def _executePrepared(self, statement:str, args:Tuple, closure:Optional[Callable] = None) -> Any:
@@ -462,6 +567,11 @@ class PostgreSQLBinding(DBBinding):
 
 			Almost all database operations are done through this method.
 
+			Each call borrows a connection from the connection pool. If the connection turns out to be
+			broken, e.g. because the database server was restarted, then the statement is executed with
+			a new connection. A statement that changes the database is only executed again if it was not
+			sent yet, because the server might have executed it before the connection was lost. Statements
+			that only read from the database are always executed again.
 
 			Args:
 				statement: The name of the prepared statement to execute and its parameters.
@@ -472,16 +582,97 @@ class PostgreSQLBinding(DBBinding):
 			Return:
 				The result of the closure, if one is provided, or True if no closure is provided.
 		"""
-		try:
-			self._checkOpenConnection()
+		readOnly = statement.startswith(_readOnlyStatements)
+		for retry in (True, False):
+			sent = False
+			try:
+				with self.connectionPool.connection() as connection, connection.cursor() as cursor:
+					sent = True
+					cursor.execute(f'EXECUTE {statement}', args)
+					if closure:
+						return closure(cursor)
+					return True
+			except (OperationalError, InterfaceError) as e:
+				# The broken connection is discarded by the pool. Try again with a new connection, but only
+				# if the statement was not sent yet or only reads from the database
+				if retry and (not sent or readOnly):
+					L.isWarn and L.logWarn(f'Database connection lost. Retrying with a new connection: {e}')
+					continue
+				raise INTERNAL_SERVER_ERROR(dbg = L.logErr(f'Error executing prepared statement: {e}'))
+			except Exception as e:
+				raise INTERNAL_SERVER_ERROR(dbg = L.logErr(f'Error executing prepared statement: {e}'))
+
+
+	def _executePreparedMany(self, statement:str, argsList:list[Tuple]) -> bool:
+		"""	Execute a prepared statement for each set of arguments, using a single connection and transaction.
 
-			with self.dbConnection.cursor() as cursor:
-				cursor.execute(f'EXECUTE {statement}', args)
-				if closure:
-					return closure(cursor)
-				return True
-		except Exception as e:
-			raise INTERNAL_SERVER_ERROR(dbg = L.logErr(f'Error executing prepared statement: {e}'))
+			Args:
+				statement: The name of the prepared statement to execute and its parameters.
+				argsList: List of the arguments to pass to the prepared statement. Each element must be a tuple.
+
+			Return:
+				True if the statements were executed.
+		"""
+		for retry in (True, False):
+			sent = False
+			try:
+				with self.connectionPool.connection() as connection, connection.cursor() as cursor:
+					sent = True
+					try:
+						cursor.execute('BEGIN')
+						execute_batch(cursor, f'EXECUTE {statement}', argsList)
+						cursor.execute('COMMIT')
+					except Exception:
+						if not connection.closed:
+							cursor.execute('ROLLBACK')
+						raise
+					return True
+			except (OperationalError, InterfaceError) as e:
+				# The broken connection is discarded by the pool. Try again with a new connection, but only
+				# if the statement was not sent yet
+				if retry and not sent:
+					L.isWarn and L.logWarn(f'Database connection lost. Retrying with a new connection: {e}')
+					continue
+				raise INTERNAL_SERVER_ERROR(dbg = L.logErr(f'Error executing prepared statement: {e}'))
+			except Exception as e:
+				raise INTERNAL_SERVER_ERROR(dbg = L.logErr(f'Error executing prepared statement: {e}'))
+		return False
+
+
+	def _executePreparedTransaction(self, statements:list[Tuple[str, Tuple]]) -> bool:
+		"""	Execute different prepared statements in order, using a single connection and transaction.
+
+			Args:
+				statements: List of tuples of the name of a prepared statement with its parameters, and the arguments to pass to it.
+
+			Return:
+				True if the statements were executed.
+		"""
+		for retry in (True, False):
+			sent = False
+			try:
+				with self.connectionPool.connection() as connection, connection.cursor() as cursor:
+					sent = True
+					try:
+						cursor.execute('BEGIN')
+						for statement, args in statements:
+							cursor.execute(f'EXECUTE {statement}', args)
+						cursor.execute('COMMIT')
+					except Exception:
+						if not connection.closed:
+							cursor.execute('ROLLBACK')
+						raise
+					return True
+			except (OperationalError, InterfaceError) as e:
+				# The broken connection is discarded by the pool. Try again with a new connection, but only
+				# if the statement was not sent yet
+				if retry and not sent:
+					L.isWarn and L.logWarn(f'Database connection lost. Retrying with a new connection: {e}')
+					continue
+				raise INTERNAL_SERVER_ERROR(dbg = L.logErr(f'Error executing prepared statements: {e}'))
+			except Exception as e:
+				raise INTERNAL_SERVER_ERROR(dbg = L.logErr(f'Error executing prepared statements: {e}'))
+		return False
 
 
 	def _fetchSingleRow(self, cursor:PsyCursor, asList:bool = True) -> Any|list[Any]:
@@ -547,11 +738,25 @@ class PostgreSQLBinding(DBBinding):
 		# Get the updated resource
 		return self._executePrepared('getResourceByRI (%s)', (ri,), 
 									 lambda c: self._fetchSingleRow(c, False))
+
+
+	def updateResources(self, resources:list[Tuple[str, JSON]]) -> None:
+		# L.isDebug and L.logDebug(f'Updating {len(resources)} resources in database')
+		self._executePreparedMany('updateResource (%s, %s)', [ (PsyJson(resource), ri) for ri, resource in resources ])
 	
 
 	def deleteResource(self, ri:str) -> None:
 		# L.isDebug and L.logDebug(f'Deleting resource {ri} from database')
 		self._executePrepared('deleteResourceByRI (%s)',(ri,))
+
+
+	def deleteResources(self, resources:list[Tuple[str, str]], pi:str) -> None:
+		# L.isDebug and L.logDebug(f'Deleting {len(resources)} resources of parent resource {pi} from database')
+		ris = [ ri for ri, _ in resources ]
+		self._executePreparedTransaction([ ('deleteResourcesByRIs (%s)', (ris,)),
+										   ('deleteIdentifiers (%s)', (ris,)),
+										   ('deleteChildResources (%s, %s)', (pi, ris)),
+										   ('deleteInstances (%s)', (ris,)) ])
 	
 
 	def searchResources(self, ri:Optional[str] = None, 
@@ -587,13 +792,145 @@ class PostgreSQLBinding(DBBinding):
 				return self.searchResources(ri = identifiers[0]['ri'])
 
 		return []
-	
+
+
+	def retrieveResources(self, ris:Sequence[str]) -> list[JSON]:
+		# L.isDebug and L.logDebug(f'Retrieving {len(ris)} resources')
+		if not ris:
+			return []
+		docs = { doc['ri']: doc for doc in self._executePrepared('getResourcesByRIs (%s)', (list(ris),),
+																lambda c: self._fetchAllRows(c)) }
+		return [ doc for ri in ris if (doc := docs.get(ri)) is not None ]	# in the order of ris
+
 
 	def discoverResourcesByFilter(self, func:Callable[[JSON], bool]) -> list[JSON]:
 		# L.isDebug and L.logDebug(f'Discovering resources by filter')
 		return self._executePrepared('getResources', (), 
 									 lambda c: [ r[0] for r in c if func(r[0]) ])
-			
+
+
+	def discoverResourcesByCriteria(self, ri:str,
+										  filterCriteria:FilterCriteria,
+										  level:int,
+										  fo:FilterOperation,
+										  allLen:int,
+										  after:Optional[Any] = None,
+										  limit:Optional[int] = None) -> Optional[Tuple[list[Tuple[JSON, Any]], bool]]:
+		# L.isDebug and L.logDebug(f'Discovering resources by criteria: ri={ri}, fc={filterCriteria}')
+		condition, conditionArgs, matched = self._discoveryCondition(filterCriteria, fo, allLen)
+		virtualTypes = [ int(ty) for ty in ResourceTypes.virtualResourceTypes() ]
+
+		# Walk the tree via the childResources table, starting with the direct child resources. 
+		# The path of child IDs orders the result depth-first in the same order as the child resources 
+		# are returned. It is also the position of a resource to continue the walk after it.
+		query = f'''
+			WITH RECURSIVE tree (ri, ty, depth, path) AS (
+				SELECT childRi, childTy, 1, ARRAY[id]
+				FROM {self.tableChildResources}
+				WHERE pi = %s AND %s >= 1
+			UNION ALL
+				SELECT c.childRi, c.childTy, t.depth + 1, t.path || c.id
+				FROM {self.tableChildResources} c JOIN tree t ON c.pi = t.ri
+				WHERE t.depth < %s AND NOT t.ty = ANY(%s)
+			)
+			SELECT r.resource, t.path
+			FROM tree t JOIN {self.tableResources} r ON r.ri = t.ri
+			WHERE NOT t.ty = ANY(%s) AND {condition} {'AND t.path > %s::INTEGER[]' if after is not None else ''}
+			ORDER BY t.path
+			{'LIMIT %s' if limit is not None else ''}
+		'''
+		args = [ ri, level, level, virtualTypes, virtualTypes ] + conditionArgs
+		if after is not None:
+			args.append(list(after))
+		if limit is not None:
+			args.append(limit)
+		try:
+			with self.connectionPool.connection() as connection, connection.cursor() as cursor:
+				cursor.execute(query, args)	# Cannot be a prepared statement. It is constructued dynamically
+				return [ (row[0], row[1]) for row in cursor ], matched
+		except Exception as e:
+			raise INTERNAL_SERVER_ERROR(dbg = L.logErr(f'Error discovering resources: {e}'))
+
+
+	def _discoveryCondition(self, filterCriteria:FilterCriteria, fo:FilterOperation, allLen:int) -> Tuple[str, list[Any], bool]:
+		"""	Build the SQL condition for a filter criteria.
+
+			The condition counts the matching conditions in the same way as *Dispatcher._matchResource()* does.
+			The advanced query, geo-query and the attribute filters are not evaluated in SQL. If one of them is
+			present then only a pre-selection is done for the *AND* filter operation, and no filtering at all for
+			the *OR* filter operation.
+
+			Args:
+				filterCriteria: The filter criteria.
+				fo: The filter operation.
+				allLen: The number of conditions that must match for the *AND* filter operation.
+
+			Return:
+				Tuple with the SQL condition, its arguments, and a boolean that indicates whether the condition fully
+				applies the filter criteria.
+		"""
+		terms:list[str] = []
+		args:list[Any] = []
+
+		def _term(condition:str, weight:int, *conditionArgs:Any) -> None:
+			terms.append(f'CASE WHEN {condition} THEN {int(weight)} ELSE 0 END')
+			args.extend(conditionArgs)
+
+		# Types. Multiple types are OR'ed and count as all types
+		if (tys := filterCriteria.ty):
+			_term('t.ty = ANY(%s)', len(tys), [ int(ty) for ty in tys ])
+
+		# Timestamps are compared as strings
+		for attribute, value, op in (('ct', filterCriteria.crb, '<'),
+									 ('ct', filterCriteria.cra, '>'),
+									 ('lt', filterCriteria.ms, '>'),
+									 ('lt', filterCriteria.us, '<'),
+									 ('et', filterCriteria.exb, '<'),
+									 ('et', filterCriteria.exa, '>')):
+			if value:
+				_term(f'r.resource->>\'{attribute}\' {op} %s COLLATE "C"', 1, value)
+		
+		# State tag
+		for st, op in ((filterCriteria.sts, '>'), 
+					   (filterCriteria.stb, '<')):
+			if st is not None:
+				_term(f"jsonb_typeof(r.resource->'st') = 'number' AND (r.resource->>'st')::NUMERIC {op} %s", 1, st)
+
+		# Labels. Multiple labels are OR'ed and count as all labels
+		if (lbls := filterCriteria.lbl):
+			_term("jsonb_typeof(r.resource->'lbl') = 'array' AND r.resource->'lbl' ?| %s", len(lbls), [ str(l) for l in lbls ])
+
+		# Content sizes of instance resources
+		for sz, op in ((filterCriteria.sza, '>='), 
+					   (filterCriteria.szb, '<')):
+			if sz is not None:
+				_term(f"t.ty = ANY(%s) AND jsonb_typeof(r.resource->'cs') = 'number' AND (r.resource->>'cs')::NUMERIC {op} %s", 1,
+					  [ int(ty) for ty in ResourceTypes.instanceResourceTypes() ], sz)
+
+		# Content types of <contentInstance> resources. Multiple content types are OR'ed and count as all content types
+		if (ctys := filterCriteria.cty):
+			_term("t.ty = %s AND r.resource->>'cnf' = ANY(%s)", len(ctys), int(ResourceTypes.CIN), [ str(c) for c in ctys ])
+
+		found = ' + '.join(terms) if terms else '0'
+
+		# The advanced query, geo-query and attribute filters must be evaluated by the caller
+		if not (filterCriteria.aq or filterCriteria.geom or filterCriteria.attributes):
+			if fo == FilterOperation.OR:
+				return f'({found}) > 0', args, True
+			return f'({found}) = %s', args + [ allLen ], True
+
+		if fo == FilterOperation.OR:
+			return 'TRUE', [], False
+
+		# For AND all conditions must match. So all conditions that can be evaluated here must match, too,
+		# and resources must have the filtered attributes.
+		condition = f'({found}) = %s'
+		args.append(allLen - len(filterCriteria.attributes) - (1 if filterCriteria.aq else 0))
+		for name in filterCriteria.attributes:
+			if _simpleAttributeName.fullmatch(name):
+				condition += ' AND r.resource ? %s'
+				args.append(name)
+		return condition, args, False
 
 	def hasResource(self, ri:Optional[str] = None, 
 						  srn:Optional[str] = None,
@@ -622,6 +959,15 @@ class PostgreSQLBinding(DBBinding):
 									 lambda c: self._fetchNumber(c))
 
 
+	def countChildResources(self, pi:str, ty:Optional[int] = None) -> int:
+		# L.isDebug and L.logDebug(f'Counting child resources: pi={pi}, ty={ty}')
+		if ty is not None:	# ty is an int
+			return self._executePrepared('countResourcesByPIandTY (%s, %s)', (pi, str(ty)), 
+										 lambda c: self._fetchNumber(c))
+		return self._executePrepared('countResourcesByPI (%s)', (pi,), 
+									 lambda c: self._fetchNumber(c))
+
+
 	def searchByFragment(self, dct:dict) -> list[JSON]:
 		# L.isDebug and L.logDebug(f'Searching by fragment: {dct}')
 		where:list[str] = []
@@ -631,7 +977,7 @@ class PostgreSQLBinding(DBBinding):
 			args += (str(v),)
 
 		try:
-			with self.dbConnection.cursor() as cursor:
+			with self.connectionPool.connection() as connection, connection.cursor() as cursor:
 				cursor.execute(f'SELECT resource FROM {self.tableResources} WHERE {" AND ".join(where)}',
 							   args)	# Cannot be a prepared statement. It is constructued dynamically
 				return self._fetchAllRows(cursor)
@@ -700,6 +1046,53 @@ class PostgreSQLBinding(DBBinding):
 		return self._executePrepared('getChildResourcesByPI (%s)', (pi,), 
 									 _cl)
 
+	#
+	#	Instance index operations
+	#
+
+	def insertInstance(self, instance:JSON) -> None:
+		# L.isDebug and L.logDebug(f'Inserting instance {instance}')
+		self._executePrepared('insertInstance (%s, %s, %s, %s, %s)', (instance['ri'], instance['pi'], instance['ty'], instance['ct'], instance['cs']))
+
+
+	def removeInstance(self, ri:str, pi:str) -> None:
+		# L.isDebug and L.logDebug(f'Removing instance {ri} of parent resource {pi}')
+		self._executePrepared('deleteInstance (%s)', (ri,))
+
+
+	def countInstances(self, pi:str) -> Tuple[int, int]:
+		# L.isDebug and L.logDebug(f'Counting instances of parent resource {pi}')
+		def _cl(cursor:PsyCursor) -> Tuple[int, int]:
+			_row = cursor.fetchone()
+			return (int(_row[0]), int(_row[1]))
+
+		return self._executePrepared('countInstances (%s)', (pi,), 
+									 _cl)
+
+
+	def searchOldestInstances(self, pi:str, count:int) -> list[JSON]:
+		# L.isDebug and L.logDebug(f'Searching oldest {count} instances of parent resource {pi}')
+		return self._executePrepared('getOldestInstances (%s, %s)', (pi, count),
+									 lambda c: self._fetchInstanceRows(c))
+
+
+	def searchLatestInstance(self, pi:str) -> Optional[JSON]:
+		# L.isDebug and L.logDebug(f'Searching latest instance of parent resource {pi}')
+		return self._executePrepared('getLatestInstance (%s)', (pi,),
+									 lambda c: _r[0] if (_r := self._fetchInstanceRows(c)) else None)
+
+
+	def _fetchInstanceRows(self, cursor:PsyCursor) -> list[JSON]:
+		"""	Fetch all rows of an instance index query from the database cursor.
+
+			Args:
+				cursor: The database cursor to fetch the rows from.
+
+			Return:
+				The fetched instance index entries, or an empty list if no rows were fetched.
+		"""
+		return [ { 'ri': r[0], 'pi': r[1], 'ty': r[2], 'ct': r[3], 'cs': r[4] } for r in cursor ]
+
 	#
 	#	Subscription operations
 	#
@@ -822,6 +1215,11 @@ class PostgreSQLBinding(DBBinding):
 		# L.isDebug and L.logDebug(f'Inserting request/response for ts: {ts}')
 		return self._executePrepared('insertRequest (%s, %s)', (ts, PsyJson(req)))
 
+
+	def insertRequests(self, reqs:list[Tuple[float, JSON]]) -> bool:
+		# L.isDebug and L.logDebug(f'Inserting {len(reqs)} requests/responses')
+		return self._executePreparedMany('insertRequest (%s, %s)', [ (ts, PsyJson(req)) for ts, req in reqs ])
+
 	
 	def removeOldRequests(self, maxRequests:int) -> None:
 		# L.isDebug and L.logDebug(f'Removing old requests from the database')
@@ -0,0 +1,282 @@
+#
+#	PostgreSQLConnectionPool.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+#	Connection pool for the PostgreSQL database binding
+#
+"""	This module provides a bounded, thread-safe connection pool for the PostgreSQL database binding.
+"""
+
+from __future__ import annotations
+from typing import Callable, Iterator, Optional, Tuple
+
+import time
+from contextlib import contextmanager
+from threading import Condition
+
+from psycopg2 import Error, OperationalError, InterfaceError
+from psycopg2.extensions import connection as PsyConnection
+
+from ..runtime.Logging import Logging as L
+
+
+class PostgreSQLConnectionPool(object):
+	"""	Bounded pool of PostgreSQL connections.
+
+		Connections are created on demand up to *maxSize*. A thread that requests a connection while
+		all connections are in use waits until a connection is returned to the pool, or until *timeout*
+		seconds have passed.
+
+		Each new connection is initialized with the *prepare* callback, e.g. to prepare the SQL statements,
+		because prepared statements are only valid within the connection they were prepared in.
+
+		Connections are checked before they are handed out: closed connections are discarded, and connections
+		that were idle for more than *healthCheckInterval* seconds are validated with a simple query first.
+		After a connection turned out to be broken, e.g. because the database server was restarted, all
+		connections that were idle at that time are validated as well. Broken connections are replaced by
+		new connections.
+	"""
+
+	__slots__ = (
+		'connect',
+		'prepare',
+		'maxSize',
+		'timeout',
+		'healthCheckInterval',
+
+		'_condition',
+		'_idle',
+		'_size',
+		'_closed',
+		'_validateIdleSince',
+
+		'checkouts',
+		'waits',
+		'waitTime',
+		'maxWaitTime',
+		'reconnects',
+	)
+	""" Define slots for instance variables. """
+
+
+	def __init__(self, connect:Callable[[], PsyConnection],
+			  		   prepare:Callable[[PsyConnection], None],
+					   maxSize:int,
+					   timeout:float,
+					   healthCheckInterval:Optional[float] = 30.0) -> None:
+		"""	Initialize the connection pool. No connection is opened yet.
+
+			Args:
+				connect: Callback to open a new database connection.
+				prepare: Callback to initialize a new database connection.
+				maxSize: Maximum number of open connections.
+				timeout: Maximum time in seconds to wait for a free connection.
+				healthCheckInterval: Idle time in seconds after which a connection is validated before it is handed out.
+		"""
+		self.connect = connect
+		""" Callback to open a new database connection. """
+		self.prepare = prepare
+		""" Callback to initialize a new database connection. """
+		self.maxSize = maxSize
+		""" Maximum number of open connections. """
+		self.timeout = timeout
+		""" Maximum time in seconds to wait for a free connection. """
+		self.healthCheckInterval = healthCheckInterval
+		""" Idle time in seconds after which a connection is validated before it is handed out. """
+
+		self._condition = Condition()
+		""" Condition to protect the pool and to wait for free connections. """
+		self._idle:list[Tuple[PsyConnection, float]] = []
+		""" Stack of idle connections and the time they were returned to the pool. """
+		self._size = 0
+		""" Number of open connections, idle or in use. """
+		self._closed = False
+		""" Indicator that the pool is closed. """
+		self._validateIdleSince = 0.0
+		""" Time of the last broken connection. Connections that were idle before are validated before they are handed out. """
+
+		self.checkouts = 0
+		""" Number of connection checkouts. """
+		self.waits = 0
+		""" Number of checkouts that had to wait for a free connection. """
+		self.waitTime = 0.0
+		""" Accumulated time in seconds that checkouts waited for a free connection. """
+		self.maxWaitTime = 0.0
+		""" Longest time in seconds a checkout waited for a free connection. """
+		self.reconnects = 0
+		""" Number of broken connections that were discarded. """
+
+
+	@contextmanager
+	def connection(self) -> Iterator[PsyConnection]:
+		"""	Context manager to borrow a connection from the pool.
+
+			The connection is returned to the pool when the context is left. If a database
+			connection error occured the connection is discarded instead.
+
+			Return:
+				A database connection.
+		"""
+		conn = self.getConnection()
+		discard = False
+		try:
+			yield conn
+		except (OperationalError, InterfaceError):
+			discard = True
+			raise
+		finally:
+			self.putConnection(conn, discard)
+
+
+	def getConnection(self) -> PsyConnection:
+		"""	Get a connection from the pool.
+
+			If no idle connection is available and the pool is full, then wait for a connection to
+			become available.
+
+			Return:
+				A database connection.
+
+			Raises:
+				`TimeoutError`: If no connection became available within the timeout.
+		"""
+		start = time.perf_counter()
+		conn:Optional[PsyConnection] = None
+		with self._condition:
+			waited = False
+			while True:
+				if self._closed:
+					raise Error('Connection pool is closed')
+				if self._idle:
+					conn, idleSince = self._idle.pop()
+					break
+				if self._size < self.maxSize:
+					self._size += 1		# reserve a slot for a new connection
+					break
+				waited = True
+				if (remaining := self.timeout - (time.perf_counter() - start)) <= 0:
+					raise TimeoutError(f'No database connection available after {self.timeout} seconds (pool size: {self.maxSize})')
+				self._condition.wait(remaining)
+
+			self.checkouts += 1
+			if waited:
+				_wt = time.perf_counter() - start
+				self.waits += 1
+				self.waitTime += _wt
+				self.maxWaitTime = max(self.maxWaitTime, _wt)
+
+		# Check an idle connection outside of the lock
+		if conn is not None and not self._isHealthy(conn, idleSince):
+			L.isDebug and L.logDebug('Replacing broken database connection')
+			self._close(conn)
+			conn = None
+			with self._condition:
+				self.reconnects += 1
+				self._validateIdleSince = time.monotonic()
+
+		# Create a new connection if necessary. The slot is already reserved.
+		if conn is None:
+			try:
+				conn = self.connect()
+				self.prepare(conn)
+			except Exception:
+				if conn is not None:
+					self._close(conn)
+				with self._condition:
+					self._size -= 1
+					self._condition.notify()
+				raise
+		return conn
+
+
+	def putConnection(self, conn:PsyConnection, discard:Optional[bool] = False) -> None:
+		"""	Return a connection to the pool.
+
+			Args:
+				conn: The connection to return.
+				discard: If True then the connection is closed and removed from the pool.
+		"""
+		with self._condition:
+			if discard or conn.closed or self._closed:
+				self._size -= 1
+				if discard:
+					self.reconnects += 1
+					self._validateIdleSince = time.monotonic()	# other idle connections might be broken as well
+			else:
+				self._idle.append((conn, time.monotonic()))
+				conn = None
+			self._condition.notify()
+		if conn is not None:
+			self._close(conn)
+
+
+	def close(self) -> None:
+		"""	Close all idle connections and the pool. Connections that are in use are closed when
+			they are returned.
+		"""
+		with self._condition:
+			self._closed = True
+			idle = [ c for c, _ in self._idle ]
+			self._size -= len(idle)
+			self._idle.clear()
+			self._condition.notify_all()
+		for conn in idle:
+			self._close(conn)
+
+
+	def getStatistics(self) -> dict[str, int|float]:
+		"""	Return the pool statistics.
+
+			Return:
+				Dictionary with the pool size, the number of connections in use, and the checkout and wait counters.
+		"""
+		with self._condition:
+			return {
+				'size':			self._size,
+				'maxSize':		self.maxSize,
+				'inUse':		self._size - len(self._idle),
+				'checkouts':	self.checkouts,
+				'waits':		self.waits,
+				'waitTime':		self.waitTime,
+				'maxWaitTime':	self.maxWaitTime,
+				'reconnects':	self.reconnects,
+			}
+
+
+	def _isHealthy(self, conn:PsyConnection, idleSince:float) -> bool:
+		"""	Check whether a connection is usable.
+
+			A connection is validated with a simple query if it was idle for more than *healthCheckInterval*
+			seconds, or if it was already idle when another connection turned out to be broken.
+
+			Args:
+				conn: The connection to check.
+				idleSince: Time when the connection was returned to the pool.
+
+			Return:
+				True if the connection is usable.
+		"""
+		if conn.closed:
+			return False
+		if idleSince <= self._validateIdleSince or \
+		   (self.healthCheckInterval is not None and time.monotonic() - idleSince > self.healthCheckInterval):
+			try:
+				with conn.cursor() as cursor:
+					cursor.execute('SELECT 1')
+			except Error:
+				return False
+		return True
+
+
+	def _close(self, conn:PsyConnection) -> None:
+		"""	Close a connection and ignore errors.
+
+			Args:
+				conn: The connection to close.
+		"""
+		try:
+			conn.close()
+		except Error:
+			pass
@@ -10,7 +10,7 @@
 """
 
 from __future__ import annotations
-from typing import Optional, Callable, Sequence, cast
+from typing import Optional, Callable, Sequence, Tuple, cast
 
 import shutil, os
 from threading import Lock
@@ -28,6 +28,8 @@ from tinydb.operations import delete
 
 from ..helpers.TinyDBBufferedStorage import TinyDBBufferedStorage
 from ..helpers.TinyDBBetterTable import TinyDBBetterTable
+from ..helpers.InstanceIndex import InstanceIndex
+from ..helpers.TinyDBFieldIndex import TinyDBFieldIndex
 
 
 # Constants for database and table names
@@ -58,6 +60,9 @@ _requests = 'requests'
 _schedules = 'schedules'
 """ Name of the schedules table. """
 
+_resourceIndexFields = ( 'pi', 'ty', 'csi', 'aei', ('pi', 'ty') )
+""" Attributes of the resources table that are indexed in memory. """
+
 
 class TinyDBBinding(DBBinding):
 	"""	This class implements the TinyDB binding to the database. It is used by the Storage class.
@@ -67,6 +72,8 @@ class TinyDBBinding(DBBinding):
 		'path',
 		'cacheSize',
 		'writeDelay',
+		'journal',
+		'journalSize',
 		
 		'lockResources',
 		'lockIdentifiers',
@@ -78,6 +85,7 @@ class TinyDBBinding(DBBinding):
 		'lockActions',
 		'lockRequests',
 		'lockSchedules',
+		'lockInstances',
 
 		'fileResources',
 		'fileIdentifiers',
@@ -115,13 +123,18 @@ class TinyDBBinding(DBBinding):
 		'actionsQuery',
 		'requestsQuery',
 		'schedulesQuery',
+
+		'instanceIndexes',
+		'resourceIndex',
 	)
 	""" Define slots for instance variables. """
 
 	def __init__(self, path:str, 
 			  		   postfix:str, 
 					   cacheSize:int,
-					   writeDelay:int) -> None:
+					   writeDelay:int,
+					   journal:Optional[bool] = False,
+					   journalSize:Optional[int] = 10000) -> None:
 		"""	Initialize the TinyDB binding.
 		
 			Args:
@@ -129,6 +142,8 @@ class TinyDBBinding(DBBinding):
 				postfix: Postfix for the database file names.
 				cacheSize: Size of the cache for the TinyDB tables.
 				writeDelay: Delay for writing to the database (in full seconds).
+				journal: Append changed documents to journal files instead of rewriting the whole database files.
+				journalSize: Number of document changes in a journal after which the database file is compacted.
 		"""
 		
 		self.path = path
@@ -140,6 +155,12 @@ class TinyDBBinding(DBBinding):
 		self.writeDelay = writeDelay
 		""" Delay for writing to the database. """
 
+		self.journal = journal
+		""" Append changed documents to journal files instead of rewriting the whole database files. """
+
+		self.journalSize = journalSize
+		""" Number of document changes in a journal after which the database file is compacted. """
+
 		L.isInfo and L.log(f'Cache Size: {self.cacheSize:d}')
 
 		#
@@ -176,6 +197,12 @@ class TinyDBBinding(DBBinding):
 		self.lockSchedules = Lock()
 		""" Lock for the schedules table."""
 
+		self.lockInstances = Lock()
+		""" Lock for the instance indexes."""
+
+		self.instanceIndexes:dict[str, InstanceIndex] = {}
+		""" Creation-time ordered instance indexes, one for each parent resource. They are built on first access. """
+
 
 		# All databases/tables will use the smart query cache
 		if not self.path:
@@ -208,6 +235,7 @@ class TinyDBBinding(DBBinding):
 		else:	# path is set
 
 			L.isInfo and L.log('DB in file system. Data directory: ' + self.path)
+			self.journal and L.isInfo and L.log(f'DB journal enabled. Journal size: {self.journalSize:d}')
 			os.makedirs(self.path, exist_ok = True)
 			
 			#
@@ -242,28 +270,28 @@ class TinyDBBinding(DBBinding):
 			#	Open/Create databases
 			#
 
-			self.dbResources = TinyDB(self.fileResources, storage = TinyDBBufferedStorage, write_delay = self.writeDelay)
+			self.dbResources = TinyDB(self.fileResources, storage = TinyDBBufferedStorage, write_delay = self.writeDelay, journal = self.journal, journal_size = self.journalSize)
 			""" The TinyDB database for the resources table."""
 
-			self.dbIdentifiers = TinyDB(self.fileIdentifiers, storage = TinyDBBufferedStorage, write_delay = self.writeDelay)
+			self.dbIdentifiers = TinyDB(self.fileIdentifiers, storage = TinyDBBufferedStorage, write_delay = self.writeDelay, journal = self.journal, journal_size = self.journalSize)
 			""" The TinyDB database for the identifiers table."""
 
-			self.dbSubscriptions = TinyDB(self.fileSubscriptions, storage = TinyDBBufferedStorage, write_delay = self.writeDelay)
+			self.dbSubscriptions = TinyDB(self.fileSubscriptions, storage = TinyDBBufferedStorage, write_delay = self.writeDelay, journal = self.journal, journal_size = self.journalSize)
 			""" The TinyDB database for the subscriptions table."""
 
-			self.dbBatchNotifications = TinyDB(self.fileBatchNotifications, storage = TinyDBBufferedStorage, write_delay = self.writeDelay)
+			self.dbBatchNotifications = TinyDB(self.fileBatchNotifications, storage = TinyDBBufferedStorage, write_delay = self.writeDelay, journal = self.journal, journal_size = self.journalSize)
 			""" The TinyDB database for the batchNotifications table."""
 
-			self.dbStatistics = TinyDB(self.fileStatistics, storage = TinyDBBufferedStorage, write_delay = self.writeDelay)
+			self.dbStatistics = TinyDB(self.fileStatistics, storage = TinyDBBufferedStorage, write_delay = self.writeDelay, journal = self.journal, journal_size = self.journalSize)
 			""" The TinyDB database for the statistics table."""
 
-			self.dbActions = TinyDB(self.fileActions, storage = TinyDBBufferedStorage, write_delay = self.writeDelay)
+			self.dbActions = TinyDB(self.fileActions, storage = TinyDBBufferedStorage, write_delay = self.writeDelay, journal = self.journal, journal_size = self.journalSize)
 			""" The TinyDB database for the actions table."""
 
-			self.dbRequests = TinyDB(self.fileRequests, storage = TinyDBBufferedStorage, write_delay = self.writeDelay)
+			self.dbRequests = TinyDB(self.fileRequests, storage = TinyDBBufferedStorage, write_delay = self.writeDelay, journal = self.journal, journal_size = self.journalSize)
 			""" The TinyDB database for the requests table."""
 
-			self.dbSchedules = TinyDB(self.fileSchedules, storage = TinyDBBufferedStorage, write_delay = self.writeDelay)
+			self.dbSchedules = TinyDB(self.fileSchedules, storage = TinyDBBufferedStorage, write_delay = self.writeDelay, journal = self.journal, journal_size = self.journalSize)
 			""" The TinyDB database for the schedules table."""
 
 		
@@ -273,6 +301,11 @@ class TinyDBBinding(DBBinding):
 		self.tabResources = self.dbResources.table(_resources, cache_size = self.cacheSize)
 		""" The TinyDB table for the resources table."""
 		TinyDBBetterTable.assign(self.tabResources)
+
+		self.resourceIndex = TinyDBFieldIndex(_resourceIndexFields)
+		""" In-memory hash indexes for the *pi*, *ty*, *csi*, *aei* and *pi+ty* attributes of the resources table. """
+		for _doc in self.tabResources.all():
+			self.resourceIndex.add(str(_doc.doc_id), _doc)	# The document IDs are already strings, but typed as int
 		
 		self.tabIdentifiers = self.dbIdentifiers.table(_identifiers, cache_size = self.cacheSize)
 		""" The TinyDB table for the identifiers table."""
@@ -358,7 +391,9 @@ class TinyDBBinding(DBBinding):
 
 	def purgeDB(self) -> None:
 		L.isInfo and L.log('Purging DBs')
-		self.tabResources.truncate()
+		with self.lockResources:
+			self.tabResources.truncate()
+			self.resourceIndex.clear()
 		self.tabIdentifiers.truncate()
 		self.tabChildResources.truncate()
 		self.tabStructuredIDs.truncate()
@@ -368,6 +403,8 @@ class TinyDBBinding(DBBinding):
 		self.tabActions.truncate()
 		self.tabRequests.truncate()
 		self.tabSchedules.truncate()
+		with self.lockInstances:
+			self.instanceIndexes.clear()
 	
 
 	def backupDB(self, dir:str) -> bool:
@@ -390,6 +427,8 @@ class TinyDBBinding(DBBinding):
 				  ]:
 			if Path(fn).is_file():
 				shutil.copy2(fn, dir)
+			if Path(fnJournal := f'{os.path.splitext(fn)[0]}.journal').is_file():
+				shutil.copy2(fnJournal, dir)
 		L.isDebug and L.logDebug('DB backup done')
 		return True
 
@@ -401,6 +440,7 @@ class TinyDBBinding(DBBinding):
 	def insertResource(self, resource:JSON, ri:str) -> None:
 		with self.lockResources:
 			self.tabResources.insert(Document(resource, ri))	# type:ignore[arg-type]
+			self.resourceIndex.add(ri, resource)
 	
 
 	def upsertResource(self, resource:JSON, ri:str) -> None:
@@ -408,28 +448,84 @@ class TinyDBBinding(DBBinding):
 		with self.lockResources:
 			# Update existing or insert new when overwriting
 			self.tabResources.upsert(Document(resource, doc_id = ri))	# type:ignore[arg-type]
+			# Index the merged document
+			self.resourceIndex.add(ri, self.tabResources.get(doc_id = ri))	# type:ignore[arg-type]
 	
 
 	def updateResource(self, resource:JSON, ri:str) -> JSON:
 		#L.logDebug(resource)
 		with self.lockResources:
+			return self._updateResource(resource, ri)
+
+
+	def updateResources(self, resources:list[Tuple[str, JSON]]) -> None:
+		with self.lockResources:
+			for ri, resource in resources:
+				if self.tabResources.contains(doc_id = ri):	# type:ignore[arg-type]	# might have been removed by another thread
+					self._updateResource(resource, ri)
+
+
+	def _updateResource(self, resource:JSON, ri:str) -> JSON:
+		"""	Update a resource. The caller must hold the *lockResources* lock.
+
+			Args:
+				resource: The resource to update.
+				ri: The resource ID of the resource.
+
+			Return:
+				The updated resource dictionary.
+		"""
+		# TinyDB update() updates the record, but does not remove fields that are None. It also
+		# updates the fields and doesnot update the whole document.
+		self.tabResources.update(resource, doc_ids = [ri])	# type:ignore[call-arg, list-item]
 
-			# TinyDB update() updates the record, but does not remove fields that are None. It also
-			# updates the fields and doesnot update the whole document.
-			self.tabResources.update(resource, doc_ids = [ri])	# type:ignore[call-arg, list-item]
+		# remove nullified fields from db and resource
+		for k in list(resource):
+			if resource[k] is None:	# only remove the real None attributes, not those with 0 or zero length
+				# The delete() method removes a field from the document
+				self.tabResources.update(delete(k), doc_ids = [ri])	# type: ignore[no-untyped-call, call-arg, list-item]
+				del resource[k]
 
-			# remove nullified fields from db and resource
-			for k in list(resource):
-				if resource[k] is None:	# only remove the real None attributes, not those with 0 or zero length
-					# The delete() method removes a field from the document
-					self.tabResources.update(delete(k), doc_ids = [ri])	# type: ignore[no-untyped-call, call-arg, list-item]
-					del resource[k]
-			return resource
+		# Re-index the updated document. This is a no-op if none of the indexed attributes changed
+		if isinstance(_r := self.tabResources.get(doc_id = ri), Document):	# type:ignore[arg-type]
+			self.resourceIndex.add(ri, _r)
+		return resource
 
 
 	def deleteResource(self, ri:str) -> None:
 		with self.lockResources:
 			self.tabResources.remove(doc_ids = [ri])	# type:ignore[arg-type, list-item]
+			self.resourceIndex.remove(ri)
+
+
+	def deleteResources(self, resources:list[Tuple[str, str]], pi:str) -> None:
+		ris = [ ri for ri, _ in resources ]
+		with self.lockResources:
+			# Resources might have been removed by another thread in the meantime
+			if (_ris := [ ri for ri in ris if self.tabResources.contains(doc_id = ri) ]):	# type:ignore[arg-type]
+				self.tabResources.remove(doc_ids = _ris)	# type:ignore[arg-type]
+				for ri in _ris:
+					self.resourceIndex.remove(ri)
+		with self.lockIdentifiers:
+			if (_ris := [ ri for ri in ris if self.tabIdentifiers.contains(doc_id = ri) ]):	# type:ignore[arg-type]
+				self.tabIdentifiers.remove(doc_ids = _ris)	# type:ignore[arg-type]
+		with self.lockStructuredIDs:
+			if (_srns := [ srn for _, srn in resources if self.tabStructuredIDs.contains(doc_id = srn) ]):	# type:ignore[arg-type]
+				self.tabStructuredIDs.remove(doc_ids = _srns)	# type:ignore[arg-type]
+		with self.lockChildResources:
+			if (_ris := [ ri for ri in ris if self.tabChildResources.contains(doc_id = ri) ]):	# type:ignore[arg-type]
+				self.tabChildResources.remove(doc_ids = _ris)	# type:ignore[arg-type]
+			# Remove the (ri, ty) tuples from the parent record with a single update
+			if (_r := self.tabChildResources.get(doc_id = pi)) is not None:	# type:ignore[arg-type]
+				_removed = set(ris)
+				_r['ch'] = [ _slist for _slist in _r['ch'] if _slist[0] not in _removed ]	# type:ignore[call-overload, index]
+				self.tabChildResources.update(_r, doc_ids = [pi])	# type:ignore[arg-type, list-item]
+		with self.lockInstances:
+			if (_index := self.instanceIndexes.get(pi)) is not None:
+				for ri in ris:
+					_index.remove(ri)
+				if not len(_index):
+					del self.instanceIndexes[pi]
 	
 
 	def searchResources(self, ri:Optional[str] = None, 
@@ -445,15 +541,19 @@ class TinyDBBinding(DBBinding):
 					_r = self.tabResources.get(doc_id = ri)	# type:ignore[arg-type]
 					return [_r] if _r else [] 	# type:ignore[list-item]
 				elif csi:
-					return cast(list[JSON], self.tabResources.search(self.resourceQuery.csi == csi))
+					_ris = self.resourceIndex.get('csi', csi)
 				elif pi:
 					if ty is not None:	# ty is an int
-						return cast(list[JSON], self.tabResources.search((self.resourceQuery.pi == pi) & (self.resourceQuery.ty == ty)))
-					return cast(list[JSON], self.tabResources.search(self.resourceQuery.pi == pi))
+						_ris = self.resourceIndex.get(('pi', 'ty'), (pi, ty))
+					else:
+						_ris = self.resourceIndex.get('pi', pi)
 				elif ty is not None:	# ty is an int
-					return cast(list[JSON], self.tabResources.search(self.resourceQuery.ty == ty))
+					_ris = self.resourceIndex.get('ty', ty)
 				elif aei:
-					return cast(list[JSON], self.tabResources.search(self.resourceQuery.aei == aei))
+					_ris = self.resourceIndex.get('aei', aei)
+				else:
+					return []
+				return cast(list[JSON], self.tabResources.getDocuments(_ris))	# type:ignore[attr-defined]
 		
 		else:
 			# for SRN find the ri first and then try again recursively (outside the lock!!)
@@ -463,6 +563,11 @@ class TinyDBBinding(DBBinding):
 		return []
 
 
+	def retrieveResources(self, ris:Sequence[str]) -> list[JSON]:
+		with self.lockResources:
+			return cast(list[JSON], self.tabResources.getDocuments(ris))	# type:ignore[attr-defined]
+
+
 	def discoverResourcesByFilter(self, func:Callable[[JSON], bool]) -> list[JSON]:
 		with self.lockResources:
 			return cast(list[JSON], self.tabResources.search(func))	# type: ignore [arg-type]
@@ -476,7 +581,7 @@ class TinyDBBinding(DBBinding):
 				if ri:
 					return self.tabResources.contains(doc_id = ri)	# type: ignore [arg-type]
 				elif ty is not None:	# ty is an int
-					return self.tabResources.contains(self.resourceQuery.ty == ty)
+					return self.resourceIndex.count('ty', ty) > 0
 		else:
 			# find the ri first and then try again recursively
 			if len((identifiers := self.searchIdentifiers(srn = srn))) == 1:
@@ -489,6 +594,13 @@ class TinyDBBinding(DBBinding):
 			return len(self.tabResources)
 
 
+	def countChildResources(self, pi:str, ty:Optional[int] = None) -> int:
+		with self.lockResources:
+			if ty is not None:	# ty is an int
+				return self.resourceIndex.count(('pi', 'ty'), (pi, ty))
+			return self.resourceIndex.count('pi', pi)
+
+
 	def searchByFragment(self, dct:dict) -> list[JSON]:
 		with self.lockResources:
 			return cast(list[JSON], self.tabResources.search(self.resourceQuery.fragment(dct)))
@@ -579,6 +691,67 @@ class TinyDBBinding(DBBinding):
 			return [ c[0] for c in _r['ch'] if c[1] in ty]	# c is a tuple (ri, ty)
 		return []
 
+	#
+	#	Instance index
+	#
+
+	def insertInstance(self, instance:JSON) -> None:
+		with self.lockInstances:
+			# Only maintain indexes that have already been built. Others are built
+			# on first access, and then include the new instance anyway.
+			if (_index := self.instanceIndexes.get(instance['pi'])) is not None:
+				_index.add(instance['ri'], instance['ct'], instance['cs'])
+
+
+	def removeInstance(self, ri:str, pi:str) -> None:
+		with self.lockInstances:
+			if (_index := self.instanceIndexes.get(pi)) is not None:
+				_index.remove(ri)
+				if not len(_index):
+					del self.instanceIndexes[pi]
+
+
+	def countInstances(self, pi:str) -> Tuple[int, int]:
+		with self.lockInstances:
+			_index = self._getInstanceIndex(pi)
+			return (_index.cni, _index.cbs)
+
+
+	def searchOldestInstances(self, pi:str, count:int) -> list[JSON]:
+		with self.lockInstances:
+			return [ { 'ri': ri, 'pi': pi, 'ct': ct, 'cs': cs } 
+					 for ri, ct, cs in self._getInstanceIndex(pi).oldest(count) ]
+
+
+	def searchLatestInstance(self, pi:str) -> Optional[JSON]:
+		with self.lockInstances:
+			if (_e := self._getInstanceIndex(pi).latest()) is None:
+				return None
+			return { 'ri': _e[0], 'pi': pi, 'ct': _e[1], 'cs': _e[2] }
+
+
+	def _getInstanceIndex(self, pi:str) -> InstanceIndex:
+		"""	Return the instance index for a parent resource. Build the index from
+			the child resources if it doesn't exist yet.
+
+			This method must be called while holding the *lockInstances* lock.
+
+			Args:
+				pi: The resource ID of the parent resource.
+			
+			Return:
+				The instance index for the parent resource.
+		"""
+		if (_index := self.instanceIndexes.get(pi)) is None:
+			_index = InstanceIndex()
+			for ri in self.searchChildResourceIDsByParentRIAndType(pi, ResourceTypes.instanceResourceTypes()):
+				if isinstance(_r := self.tabResources.get(doc_id = ri), Document):	# type:ignore[arg-type]
+					_index.add(ri, _r['ct'], _r.get('cs', 0))
+			if len(_index):	# Don't keep empty indexes for resources that never get instances
+				self.instanceIndexes[pi] = _index
+		return _index
+
+
 	#
 	#	Subscriptions
 	#
@@ -706,15 +879,23 @@ class TinyDBBinding(DBBinding):
 		return True
 	
 
+	def insertRequests(self, reqs:list[Tuple[float, JSON]]) -> bool:
+		with self.lockRequests:
+			try:
+				# Insert the requests, using the timestamps as the document ids
+				self.tabRequests.insert_multiple([ Document(req, self.tabRequests.document_id_class(ts)) 	# type:ignore[arg-type]
+												   for ts, req in reqs ])
+			except Exception as e:
+				L.logErr(f'Exception inserting {len(reqs)} requests/responses', exc = e)
+				return False
+		return True
+
+
 	def removeOldRequests(self, maxRequests:int) -> None:
 		with self.lockRequests:
 			# Remove the oldest requests if we have more than maxRequests
-			# We could use the len() function instead of retrieving all requests, but 
-			# this would actually create a small overhead because most of the time we have 
-			# to retrieve all requests anyway.
-			if (_a := self.tabRequests.all()):
-				if len(_a) >= maxRequests:
-					self.tabRequests.remove(doc_ids = [_a[0].doc_id])
+			if (excess := len(self.tabRequests) - maxRequests) > 0:
+				self.tabRequests.remove(doc_ids = sorted(doc.doc_id for doc in self.tabRequests.all())[:excess])
 	
 
 	def getRequests(self, ri:Optional[str] = None) -> list[JSON]:
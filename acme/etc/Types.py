@@ -340,6 +340,16 @@ class ResourceTypes(ACMEIntEnum):
 		return name in _ResourceTypesVirtualResourcesNames
 
 
+	@classmethod
+	def virtualResourceTypes(cls) -> list[ResourceTypes]:
+		"""	Return the virtual resource types.
+
+			Return:
+				List of virtual `ResourceTypes`.
+		"""
+		return _ResourceTypesVirtualResourcesSet
+
+
 	@classmethod
 	def supportedResourceTypes(self) -> list[ResourceTypes]:
 		"""	Return the supported resource types, including the 
@@ -363,6 +373,16 @@ class ResourceTypes(ACMEIntEnum):
 		return ty in _ResourceTypesInstanceResourcesSet
 
 
+	@classmethod
+	def instanceResourceTypes(cls) -> list[ResourceTypes]:
+		"""	Return the instance data resource types.
+
+			Return:
+				List of instance `ResourceTypes`.
+		"""
+		return _ResourceTypesInstanceResourcesSet
+
+
 	@classmethod
 	def isContainerResource(cls, ty:int) -> bool:
 		"""	Test whether a resource type is a container resource type.
@@ -2173,6 +2193,9 @@ class FilterCriteria:
 	aq:str = None	# EXPERIMENTAL
 	""" Advanced query. Default is *None*. """
 
+	_aq:Any = None
+	""" Internal attribute to hold a compiled advanced query. Default is *None*."""
+
 
 	# Other filter attributes
 	attributes:Parameters = field(default_factory = dict)
@@ -2200,7 +2223,7 @@ class FilterCriteria:
 		"""
 		return { k:v 
 				 for k, v in self.__dict__.items() 
-				 if k is not None and k not in ( 'fu', 'fo', 'lim', 'ofst', 'lvl', 'arp', 'attributes', 'gmty', 'geom', '_geom', 'gsf' ) and v is not None
+				 if k is not None and k not in ( 'fu', 'fo', 'lim', 'ofst', 'lvl', 'arp', 'attributes', 'gmty', 'geom', '_geom', 'gsf', '_aq' ) and v is not None
 			   }
 
 
@@ -2255,6 +2278,8 @@ class FilterCriteria:
 		for k, v in self.__dict__.items():
 			if k in [ 'attributes']:	# Handle "attributes" below
 				continue
+			if k.startswith('_'):	# internal attributes
+				continue
 			if v is None:
 				continue
 
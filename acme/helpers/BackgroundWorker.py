@@ -13,9 +13,11 @@ from __future__ import annotations
 
 from typing import Callable, List, Dict, Any, Tuple, Optional
 from .TextTools import simpleMatch
+from .ACMEIntEnum import ACMEIntEnum
 import random, sys, heapq, traceback, time, inspect
+from collections import deque
 from datetime import datetime, timezone
-from threading import Thread, Timer, Event, RLock, Lock, enumerate as threadsEnumerate
+from threading import Thread, Event, RLock, Lock, Condition, current_thread, enumerate as threadsEnumerate
 import logging
 
 
@@ -60,6 +62,7 @@ class BackgroundWorker(object):
 		'id',
 		'data',
 		'args',
+		'category',
 	)
 	"""	Slots for the class. """
 
@@ -82,7 +85,8 @@ class BackgroundWorker(object):
 						runPastEvents:Optional[bool] = False, 
 						finished:Optional[Callable] = None,
 						ignoreException:Optional[bool] = False,
-						data:Optional[Any] = None) -> None:
+						data:Optional[Any] = None,
+						category:Optional[str] = None) -> None:
 		"""	Initialize a background worker.
 		
 			Args:
@@ -98,6 +102,7 @@ class BackgroundWorker(object):
 				finished: Callable that is executed after the worker finished.
 				ignoreException: Restart the actor in case an exception is encountered.
 				data: Any data structure that is stored in the worker and accessible by the *data* attribute, and which is passed as the first argument in the *_data* argument of the *workerCallback* if not *None*.
+				category: Optional job category. If a `JobExecutor` is configured for it then the worker callback is executed by that executor.
 		"""
 		self.interval 				= interval
 		""" Interval in seconds to run the worker callback. """
@@ -133,6 +138,8 @@ class BackgroundWorker(object):
 		""" Any data structure that is stored in the worker and accessible by the *data* attribute, and which is passed as the first argument in the *_data* argument of the *workerCallback* if not *None*. """
 		self.args:Dict[str, Any]	= {}				# Arguments for the callback
 		""" Arguments for the callback. """
+		self.category				= category			# Job category
+		""" Optional job category. If a `JobExecutor` is configured for it then the worker callback is executed by that executor. """
 
 
 
@@ -507,7 +514,7 @@ class Job(Thread):
 			return
 		Job._balanceCount += 1
 		if Job._balanceCount >= Job._balanceLatency:		# check after balancyLatency runs
-			if float(lp := len(Job.pausedJobs)) / float(len(Job.runningJobs)) > Job._balanceTarget:				# out of balance?
+			if float(lp := len(Job.pausedJobs)) / float(max(len(Job.runningJobs), 1)) > Job._balanceTarget:				# out of balance?
 				for _ in range((int(lp / Job._balanceReduceFactor))):
 					Job.pausedJobs.pop(0).stop()
 			Job._balanceCount = 0
@@ -529,8 +536,214 @@ class Job(Thread):
 		cls._balanceReduceFactor = balanceReduceFactor
 
 
+class JobOverflowPolicy(ACMEIntEnum):
+	"""	Policies how to handle a new job when the queue of a `JobExecutor` is full.
+	"""
+	block		= 1
+	""" Block the caller until there is space in the queue. """
+	callerRuns	= 2
+	""" Run the job in the caller's thread. """
+	reject		= 3
+	""" Reject the job. """
+
+
+class JobExecutor(object):
+	"""	Executor for the jobs of a job category with a bounded number of threads and a bounded queue.
+
+		The threads are started when needed, up to *workers* threads, and are kept afterwards.
+		When the queue is full, a new job is handled according to the *overflowPolicy*. A job
+		that is submitted by one of the executor's own threads is never blocked, but run in the
+		caller's thread instead, because the executor would otherwise wait for itself.
+	"""
+
+	__slots__ = (
+		'category',
+		'workers',
+		'maxQueueSize',
+		'overflowPolicy',
+
+		'_lock',
+		'_notEmpty',
+		'_notFull',
+		'_queue',
+		'_threads',
+		'_idle',
+		'_active',
+		'_executed',
+		'_callerRuns',
+		'_rejected',
+		'_running',
+	)
+	""" Slots for the class. """
+
+
+	def __init__(self, category:str, workers:int, maxQueueSize:int, overflowPolicy:JobOverflowPolicy) -> None:
+		"""	Initialize the executor. Threads are only started when jobs are submitted.
+
+			Args:
+				category: The job category. It is used for the names of the threads.
+				workers: Maximum number of threads.
+				maxQueueSize: Maximum number of queued jobs.
+				overflowPolicy: How to handle a new job when the queue is full.
+		"""
+		self.category = category
+		""" The job category. """
+		self.workers = workers
+		""" Maximum number of threads. """
+		self.maxQueueSize = maxQueueSize
+		""" Maximum number of queued jobs. """
+		self.overflowPolicy = overflowPolicy
+		""" How to handle a new job when the queue is full. """
+
+		self._lock = Lock()
+		""" Lock to protect the queue and the counters. """
+		self._notEmpty = Condition(self._lock)
+		""" Condition to wake up an idle thread when a job is queued. """
+		self._notFull = Condition(self._lock)
+		""" Condition to wake up blocked callers when there is space in the queue. """
+		self._queue:deque[Tuple[Callable, Optional[str]]] = deque()
+		""" Queue of the jobs and their names. """
+		self._threads:list[Thread] = []
+		""" The threads of the executor. """
+		self._idle = 0
+		""" Number of threads that wait for a job. """
+		self._active = 0
+		""" Number of jobs that are currently executed. """
+		self._executed = 0
+		""" Number of executed jobs. """
+		self._callerRuns = 0
+		""" Number of jobs that were executed in the caller's thread because the queue was full. """
+		self._rejected = 0
+		""" Number of rejected jobs. """
+		self._running = True
+		""" Indicator that the executor accepts jobs. """
+
+
+	def submit(self, task:Callable, name:Optional[str] = None, wait:Optional[bool] = True) -> bool:
+		"""	Queue a job for execution.
+
+			Args:
+				task: A Callable that is run as a job. This must include arguments, so a lambda can be used here.
+				name: Optional name of the job. It is assigned to the executing thread while the job is running.
+				wait: If False then the caller is never blocked and the job is never run in the caller's thread. When the queue is full, the job is run in a separate `Job` for the *callerRuns* policy, and rejected for the *block* and *reject* policies.
+
+			Return:
+				True if the job was queued or executed, or False if it was rejected.
+		"""
+		with self._lock:
+			if not self._running:
+				self._rejected += 1
+				return False
+
+			if len(self._queue) >= self.maxQueueSize:
+				policy = self.overflowPolicy
+				if policy == JobOverflowPolicy.block and current_thread() in self._threads:
+					policy = JobOverflowPolicy.callerRuns	# Don't let the executor wait for itself
+				if policy == JobOverflowPolicy.block and not wait:
+					policy = JobOverflowPolicy.reject
+				match policy:
+					case JobOverflowPolicy.reject:
+						self._rejected += 1
+						return False
+					case JobOverflowPolicy.block:
+						self._notFull.wait_for(lambda: not self._running or len(self._queue) < self.maxQueueSize)
+						if not self._running:
+							self._rejected += 1
+							return False
+					case JobOverflowPolicy.callerRuns:
+						self._callerRuns += 1
+
+			if len(self._queue) < self.maxQueueSize:
+				self._queue.append((task, name))
+				# Start another thread if all idle threads are already busy with queued jobs
+				if self._idle < len(self._queue) and len(self._threads) < self.workers:
+					thread = Thread(target = self._worker, name = f'{self.category}_{len(self._threads)}', daemon = True)
+					self._threads.append(thread)
+					thread.start()
+				else:
+					self._notEmpty.notify()
+				return True
+
+		# The queue is full: run the job in the caller's thread, or in a separate Job if the caller must not wait
+		if not wait:
+			Job.getJob(lambda: self._runTask(task, name), name = name).resume()
+		else:
+			self._runTask(task, name)
+		return True
+
+
+	def shutdown(self) -> None:
+		"""	Stop accepting new jobs. The threads terminate after all queued jobs have been executed.
+		"""
+		with self._lock:
+			self._running = False
+			self._notEmpty.notify_all()
+			self._notFull.notify_all()
+
+
+	def getStatistics(self) -> dict[str, int]:
+		"""	Return the statistics of the executor.
+
+			Return:
+				Dictionary with the number of threads, queued, active, executed, caller-run and rejected jobs.
+		"""
+		with self._lock:
+			return {
+				'threads':		len(self._threads),
+				'queued':		len(self._queue),
+				'active':		self._active,
+				'executed':		self._executed,
+				'callerRuns':	self._callerRuns,
+				'rejected':		self._rejected,
+			}
+
+
+	def _worker(self) -> None:
+		"""	Thread loop. Execute the queued jobs until the executor is shut down and the queue is empty.
+		"""
+		thread = current_thread()
+		threadName = thread.name
+		while True:
+			with self._lock:
+				self._idle += 1
+				self._notEmpty.wait_for(lambda: not self._running or self._queue)
+				self._idle -= 1
+				if not self._queue:		# shut down
+					self._threads.remove(thread)
+					return
+				task, name = self._queue.popleft()
+				self._active += 1
+				self._notFull.notify()
+
+			if name:
+				thread.name = name
+			self._runTask(task, name)
+			thread.name = threadName
+
+			with self._lock:
+				self._active -= 1
+				self._executed += 1
+
+
+	def _runTask(self, task:Callable, name:Optional[str]) -> None:
+		"""	Execute a job and log an exception.
+
+			Args:
+				task: The job's Callable.
+				name: Optional name of the job.
+		"""
+		try:
+			task()
+		except Exception as e:
+			if BackgroundWorker._logger:
+				BackgroundWorker._logger(logging.ERROR, f'Job "{name}" ({self.category}) exception: {str(e)}\n{"".join(traceback.format_exception(type(e), value = e, tb = e.__traceback__))}')
+
+
 class WorkerEntry(object):
 	"""	Internal class for a worker entry in the priority queue.
+
+		An entry is only valid as long as it is the worker's current entry in the queue index.
+		Entries of unqueued or requeued workers are left in the priority queue and are skipped when they are reached.
 	"""
 
 	__slots__ = (
@@ -594,13 +807,21 @@ class BackgroundWorkerPool(object):
 	"""	All background workers. """
 	workerQueue:list[WorkerEntry] 					= []
 	""" Priority queue. Contains tuples (next execution timestamp, worker ID, worker name). """
-	workerTimer:Timer								= None
-	"""	A single timer to run the next task in the *workerQueue*. """
+	workerEntries:Dict[int, WorkerEntry]			= {}
+	"""	Index of the valid entries in the *workerQueue*, mapped by worker ID. """
+	staleEntries:int								= 0
+	"""	Number of entries in the *workerQueue* that are not valid anymore. """
+	schedulerThread:Thread							= None
+	"""	A single long-lived thread that runs the next task in the *workerQueue* when it is due. """
+	jobExecutors:Dict[str, JobExecutor]				= {}
+	"""	Bounded executors for job categories, mapped by category. """
 
 	queueLock:Lock					 				= Lock()
-	"""	Lock for the *workerQueue*. """
-	timerLock:Lock					 				= Lock()
-	"""	Lock for the *workerTimer*. """
+	"""	Lock for the *workerQueue* and the *workerEntries*. """
+	queueCondition:Condition						= Condition(queueLock)
+	"""	Condition to wake up the *schedulerThread* when an earlier task is queued. """
+	rejectedRetryDelay:float						= 0.1
+	"""	Delay in seconds after which a worker is queued again when its job executor rejected it. """
 
 
 	def __new__(cls, *args:str, **kwargs:str) -> BackgroundWorkerPool:
@@ -635,6 +856,25 @@ class BackgroundWorkerPool(object):
 		Job.setJobBalance(balanceTarget, balanceLatency, balanceReduceFactor)
 
 
+	@classmethod
+	def setJobExecutor(cls, category:str, 
+							workers:int, 
+							maxQueueSize:Optional[int] = 1000, 
+							overflowPolicy:Optional[JobOverflowPolicy] = JobOverflowPolicy.callerRuns) -> None:
+		"""	Set a bounded executor for the jobs of a category. A previous executor for the category is shut down.
+
+			Args:
+				category: The job category.
+				workers: Maximum number of threads. If this is 0 then jobs of the category are run in their own threads.
+				maxQueueSize: Maximum number of queued jobs.
+				overflowPolicy: How to handle a new job when the queue is full.
+		"""
+		if (executor := cls.jobExecutors.pop(category, None)):
+			executor.shutdown()
+		if workers > 0:
+			cls.jobExecutors[category] = JobExecutor(category, workers, maxQueueSize, overflowPolicy)
+
+
 	@classmethod
 	def newWorker(cls,	interval:float, 
 						workerCallback:Callable,
@@ -646,7 +886,8 @@ class BackgroundWorkerPool(object):
 						runPastEvents:Optional[bool] = False, 
 						finished:Optional[Callable] = None, 
 						ignoreException:Optional[bool] = False,
-						data:Optional[Any] = None) -> BackgroundWorker:	# type:ignore[type-arg]
+						data:Optional[Any] = None,
+						category:Optional[str] = None) -> BackgroundWorker:	# type:ignore[type-arg]
 		"""	Create a new background worker that periodically executes the callback.
 
 			Args:
@@ -661,6 +902,7 @@ class BackgroundWorkerPool(object):
 				finished: Callable that is executed after the worker finished.
 				ignoreException: Restart the actor in case an exception is encountered.
 				data: Any data structure that is stored in the worker and accessible by the *data* attribute, and which is passed as the first argument in the *_data* argument of the *workerCallback* if not *None*.
+				category: Optional job category. If a `JobExecutor` is configured for it then the worker callback is executed by that executor.
 
 			Return:
 				BackgroundWorker
@@ -680,7 +922,8 @@ class BackgroundWorkerPool(object):
 								  runOnTime = runOnTime, 
 								  runPastEvents = runPastEvents, 
 								  ignoreException = ignoreException,
-								  data = data)
+								  data = data,
+								  category = category)
 		cls.backgroundWorkers[id] = worker
 		return worker
 
@@ -693,7 +936,8 @@ class BackgroundWorkerPool(object):
 						dispose:Optional[bool] = True, 
 						finished:Optional[Callable] = None, 
 						ignoreException:Optional[bool] = False,
-						data:Optional[Any] = None) -> BackgroundWorker:
+						data:Optional[Any] = None,
+						category:Optional[str] = None) -> BackgroundWorker:
 		"""	Create a new background worker that runs only once after a *delay*
 			(it may be 0.0s, though), or *at* a specific time (UTC timestamp).
 
@@ -711,6 +955,7 @@ class BackgroundWorkerPool(object):
 					It will	receive the same arguments as the *workerCallback* callback.
 				ignoreException: Restart the actor in case an exception is encountered.
 				data: Any data structure that is stored in the worker and accessible by the *data* attribute, and which is passed in the *_data* argument of the *workerCallback* if not *None*.
+				category: Optional job category. If a `JobExecutor` is configured for it then the actor callback is executed by that executor.
 			Return:
 				`BackgroundWorker` object. It is only an initialized object and needs to be started manually with its `start()` method.
 		"""
@@ -726,7 +971,8 @@ class BackgroundWorkerPool(object):
 							 dispose = dispose, 
 							 finished = finished, 
 							 ignoreException = ignoreException,
-							 data = data)
+							 data = data,
+							 category = category)
 
 
 	@classmethod
@@ -783,16 +1029,24 @@ class BackgroundWorkerPool(object):
 	#
 
 	@classmethod
-	def runJob(cls, task:Callable, name:Optional[str] = None) -> Job:
+	def runJob(cls, task:Callable, name:Optional[str] = None, category:Optional[str] = None, wait:Optional[bool] = True) -> bool:
 		"""	Run a task as a Thread. Reuse finished threads if possible.
 
+			If a `JobExecutor` is configured for the *category* then the task is submitted to that executor instead.
+			Long-running tasks should not be run in a category, because they would occupy one of the executor's threads.
+
 			Args:
 				task: A Callable that is run as a job. This must include arguments, so a lambda can be used here.
 				name: Optional name of the job.
+				category: Optional job category.
+				wait: If False then the caller is never blocked by, and never runs, a job of a full executor. See `JobExecutor.submit()`.
 			Return:
-				`Job` instance.
+				True if the job was started or queued, or False if it was rejected by the category's executor.
 		"""
-		return Job.getJob(task, name = name).resume()
+		if category and (executor := cls.jobExecutors.get(category)):
+			return executor.submit(task, name, wait)
+		Job.getJob(task, name = name).resume()
+		return True
 
 
 	@classmethod
@@ -805,10 +1059,23 @@ class BackgroundWorkerPool(object):
 		return (len(Job.runningJobs), len(Job.pausedJobs))
 
 
+	@classmethod
+	def getJobStatistics(cls) -> Dict[str, Dict[str, int]]:
+		"""	Return the statistics of the job executors.
+
+			Return:
+				Dictionary, mapped by job category, with the statistics of each `JobExecutor`.
+		"""
+		return { category: executor.getStatistics() for category, executor in list(cls.jobExecutors.items()) }
+
+
 	@classmethod
 	def killJobs(cls) -> None:
-		"""	Stop and remove all Jobs.
+		"""	Stop and remove all Jobs. The job executors are shut down.
 		"""
+		for executor in cls.jobExecutors.values():
+			executor.shutdown()
+		cls.jobExecutors.clear()
 		while Job.runningJobs:
 			# Job.runningJobs.pop(0).stop()
 			Job.runningJobs[0].stop()	# will remove itself
@@ -837,72 +1104,88 @@ class BackgroundWorkerPool(object):
 	def _queueWorker(cls, ts:float, worker:BackgroundWorker) -> None:
 		"""	Queue a `BackgroundWorker` object for execution at the *ts* timestamp.
 
+			A previously queued execution of the worker is replaced.
+
 			Args:
 				ts: Timestamp at which the worker shall be executed.
 				worker: Backgroundworker object to queue.
 		"""
-		top = cls.workerQueue[0] if cls.workerQueue else None
-		with cls.queueLock:
-			cls._stopTimer()
-			heapq.heappush(cls.workerQueue, WorkerEntry(ts, worker.id, worker.name))
-			cls._startTimer()
+		with cls.queueCondition:
+			entry = WorkerEntry(ts, worker.id, worker.name)
+			if cls.workerEntries.get(worker.id) is not None:
+				cls.staleEntries += 1
+			cls.workerEntries[worker.id] = entry
+			heapq.heappush(cls.workerQueue, entry)
+			if cls.workerQueue[0] is entry:		# Wake up the scheduler only if the next execution is earlier
+				cls.queueCondition.notify()
+			cls._startScheduler()
 
 
 	@classmethod
 	def _unqueueWorker(cls, worker:BackgroundWorker) -> None:
 		"""	Remove the Backgroundworker for `id` from the queue.
 
+			The worker's entry is only removed from the queue index. It is skipped when it is reached in the priority queue.
+
 			Args:
 				worker: Backgroundworker to unqueue
 		"""
-		with cls.queueLock:
-			cls._stopTimer()
-			for each in cls.workerQueue:
-				if each.workerID == worker.id:
-					cls.workerQueue.remove(each)
+		with cls.queueCondition:
+			if cls.workerEntries.pop(worker.id, None) is not None:
+				cls.staleEntries += 1
+				# Rebuild the priority queue when it mostly contains stale entries
+				if cls.staleEntries > 1000 and cls.staleEntries > len(cls.workerQueue) // 2:
+					cls.workerQueue = list(cls.workerEntries.values())
 					heapq.heapify(cls.workerQueue)
-					break	# Only 1 worker
-			cls._startTimer()
+					cls.staleEntries = 0
 
 
 	@classmethod
-	def _startTimer(cls) -> None:
-		""" Start the workers queue timer.
-		"""
-		if not sys.is_finalizing() and cls.workerQueue:
-			with cls.timerLock:
-				if cls.workerTimer is not None:	# don't start another timer!
-					return
-				try:
-					cls.workerTimer = Timer(cls.workerQueue[0].timestamp - _utcTime(), cls._execQueue)
-					cls.workerTimer.setDaemon(True)	# Make the Timer thread a daemon of the main thread
-					cls.workerTimer.start()
-				except RuntimeError:
-					# not allowed to start a new thread when the interpreter is shutting down.
-					# We ignore this error, because there is nothing we can do about it now.
-					pass
-
-	
+	def _startScheduler(cls) -> None:
+		""" Start the scheduler thread if it is not running yet.
 
-	@classmethod
-	def _stopTimer(cls) -> None:
-		"""	Cancel/interrupt the workers queue timer.
+			This method must be called while holding the *queueLock* lock.
 		"""
-		with cls.timerLock:
-			if cls.workerTimer is not None:
-				cls.workerTimer.cancel()
-				cls.workerTimer = None
+		if cls.schedulerThread is None and not sys.is_finalizing():
+			try:
+				cls.schedulerThread = Thread(target = cls._runScheduler, name = 'workerScheduler', daemon = True)	# Make the thread a daemon of the main thread
+				cls.schedulerThread.start()
+			except RuntimeError:
+				# not allowed to start a new thread when the interpreter is shutting down.
+				# We ignore this error, because there is nothing we can do about it now.
+				cls.schedulerThread = None
 
 
 	@classmethod
-	def _execQueue(cls) -> None:
-		"""	Execute the actual BackgroundWorker's callback in a thread.
+	def _runScheduler(cls) -> None:
+		"""	Wait for the next due task in the *workerQueue* and execute the BackgroundWorker's callback in a thread.
 		"""
-		with cls.queueLock:
-			cls._stopTimer()
-			if cls.workerQueue:
-				w = heapq.heappop(cls.workerQueue)
-				if worker := cls.backgroundWorkers.get(w.workerID):
-					cls.runJob(worker._work, w.workerName)
-			cls._startTimer()	# start timer again
+		while not sys.is_finalizing():
+			with cls.queueCondition:
+
+				# Skip stale entries
+				while cls.workerQueue and cls.workerEntries.get((top := cls.workerQueue[0]).workerID) is not top:
+					heapq.heappop(cls.workerQueue)
+					cls.staleEntries -= 1
+				if not cls.workerQueue:
+					cls.queueCondition.wait()
+					continue
+
+				# Wait until the next task is due, or an earlier task is queued
+				if (delay := cls.workerQueue[0].timestamp - _utcTime()) > 0:
+					cls.queueCondition.wait(delay)
+					continue
 
+				w = heapq.heappop(cls.workerQueue)
+				del cls.workerEntries[w.workerID]
+				if not (worker := cls.backgroundWorkers.get(w.workerID)):
+					continue
+
+			# Run the worker outside of the lock. The scheduler must never block or run the worker itself,
+			# so a worker that is rejected by a full job executor is queued again after a short delay
+			try:
+				if not cls.runJob(worker._work, w.workerName, worker.category, wait = False):
+					cls._queueWorker(_utcTime() + cls.rejectedRetryDelay, worker)
+			except Exception as e:	# Don't let the scheduler thread die
+				if BackgroundWorker._logger:
+					BackgroundWorker._logger(logging.ERROR, f'Cannot run worker "{w.workerName}": {str(e)}')
@@ -0,0 +1,382 @@
+#
+#	DeliveryPool.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+#	Bounded worker pool with per-target FIFO queues
+#
+"""	This module provides a bounded worker pool that delivers tasks to targets, e.g. notifications
+	to notification targets, via per-target FIFO queues.
+"""
+
+from __future__ import annotations
+from typing import Callable, Optional
+
+import time, logging
+from collections import deque
+from threading import Condition, Thread, current_thread
+
+from .ACMEIntEnum import ACMEIntEnum
+from .BackgroundWorker import BackgroundWorker, BackgroundWorkerPool
+
+
+class OverflowPolicy(ACMEIntEnum):
+	"""	Policies how to handle a new task when the queue of its target is full.
+	"""
+	block		= 1
+	""" Block the caller until there is space in the queue, or drop the new task after a timeout. """
+	dropOldest	= 2
+	""" Drop the oldest queued task of the target. """
+	dropNewest	= 3
+	""" Drop the new task. """
+
+
+class DeliveryTarget(object):
+	"""	Queue and statistics for a single delivery target.
+	"""
+
+	__slots__ = (
+		'target',
+		'queue',
+		'inFlight',
+		'isReady',
+		'delivered',
+		'failed',
+		'dropped',
+		'latency',
+		'maxLatency',
+		'idleSince',
+	)
+	""" Define slots for instance variables. """
+
+	def __init__(self, target:str) -> None:
+		"""	Initialize the target.
+
+			Args:
+				target: The target identifier, e.g. a notification URI.
+		"""
+		self.target = target
+		""" The target identifier. """
+		self.queue:deque[Callable[[], bool]] = deque()
+		""" FIFO queue of the tasks for this target. """
+		self.inFlight = 0
+		""" Number of tasks for this target that are currently executed. """
+		self.isReady = False
+		""" Indicator that this target is in the ready queue of the pool. """
+		self.delivered = 0
+		""" Number of successfully executed tasks. """
+		self.failed = 0
+		""" Number of failed tasks. """
+		self.dropped = 0
+		""" Number of dropped tasks. """
+		self.latency = 0.0
+		""" Accumulated execution time of all tasks, in seconds. """
+		self.maxLatency = 0.0
+		""" Longest execution time of a task, in seconds. """
+		self.idleSince = time.monotonic()
+		""" Time when the last task of this target was finished. """
+
+
+	def isIdle(self, now:float, idleTimeout:float) -> bool:
+		"""	Check whether the target has no queued or executing tasks for at least *idleTimeout* seconds.
+
+			Args:
+				now: The current monotonic time.
+				idleTimeout: Time in seconds.
+
+			Return:
+				True if the target is idle.
+		"""
+		return not self.queue and self.inFlight == 0 and now - self.idleSince >= idleTimeout
+
+
+class DeliveryPool(object):
+	"""	Bounded worker pool that executes tasks for targets.
+
+		A fixed number of workers executes the tasks. Each target has its own FIFO queue, and at most
+		*maxInFlight* tasks of the same target are executed at the same time. With the default of 1 the tasks
+		for a target are executed strictly in the order they were submitted, and a slow or unreachable target
+		only occupies a single worker.
+
+		Each target queue holds at most *maxQueueSize* tasks. When a queue is full, a new task is handled
+		according to the *overflowPolicy*.
+
+		For each target the pool records the number of delivered, failed and dropped tasks and the task latency.
+		Targets that have no queued or executing tasks for *idleTimeout* seconds are removed. Their statistics
+		are still included in the totals of the pool.
+	"""
+
+	__slots__ = (
+		'name',
+		'workers',
+		'maxInFlight',
+		'maxQueueSize',
+		'overflowPolicy',
+		'overflowTimeout',
+		'idleTimeout',
+
+		'_condition',
+		'_targets',
+		'_retired',
+		'_nextIdleCheck',
+		'_ready',
+		'_queued',
+		'_running',
+		'_workers',
+		'_workerThreads',
+	)
+	""" Define slots for instance variables. """
+
+
+	def __init__(self, name:str,
+					   workers:int,
+					   maxInFlight:int,
+					   maxQueueSize:int,
+					   overflowPolicy:OverflowPolicy,
+					   overflowTimeout:float,
+					   idleTimeout:Optional[float] = 60.0) -> None:
+		"""	Initialize the pool. The workers are not started yet.
+
+			Args:
+				name: Name of the pool. It is used for the names of the workers.
+				workers: Number of workers.
+				maxInFlight: Maximum number of tasks for the same target that are executed at the same time.
+				maxQueueSize: Maximum number of queued tasks for each target.
+				overflowPolicy: How to handle a new task when the queue of its target is full.
+				overflowTimeout: Time in seconds to wait for space in a full queue with the *block* policy.
+				idleTimeout: Time in seconds after which a target without queued or executing tasks is removed.
+		"""
+		self.name = name
+		""" Name of the pool. """
+		self.workers = workers
+		""" Number of workers. """
+		self.maxInFlight = maxInFlight
+		""" Maximum number of tasks for the same target that are executed at the same time. """
+		self.maxQueueSize = maxQueueSize
+		""" Maximum number of queued tasks for each target. """
+		self.overflowPolicy = overflowPolicy
+		""" How to handle a new task when the queue of its target is full. """
+		self.overflowTimeout = overflowTimeout
+		""" Time in seconds to wait for space in a full queue with the *block* policy. """
+		self.idleTimeout = idleTimeout
+		""" Time in seconds after which a target without queued or executing tasks is removed. """
+
+		self._condition = Condition()
+		""" Condition to protect the queues and to notify the workers and blocked callers. """
+		self._targets:dict[str, DeliveryTarget] = {}
+		""" Delivery targets, indexed by the target identifier. """
+		self._retired = DeliveryTarget('')
+		""" Accumulated statistics of the removed targets. """
+		self._nextIdleCheck = time.monotonic() + idleTimeout
+		""" Time of the next check for idle targets. """
+		self._ready:deque[DeliveryTarget] = deque()
+		""" Targets that have queued tasks and can execute another task. """
+		self._queued = 0
+		""" Number of queued tasks for all targets. """
+		self._running = False
+		""" Indicator that the pool is running. """
+		self._workers:list[BackgroundWorker] = []
+		""" The worker actors. """
+		self._workerThreads:set[Thread] = set()
+		""" The threads that currently run the worker loop. """
+
+
+	def start(self) -> None:
+		"""	Start the workers.
+		"""
+		with self._condition:
+			if self._running:
+				return
+			self._running = True
+		self._workers = [ BackgroundWorkerPool.newActor(self._worker, name = f'{self.name}_{i}').start()
+						  for i in range(self.workers) ]
+
+
+	def stop(self, timeout:Optional[float] = 5.0) -> None:
+		"""	Stop the workers. Queued tasks are discarded. Tasks that are currently executed are finished.
+
+			Args:
+				timeout: Maximum time in seconds to wait for the workers to finish their current tasks.
+		"""
+		with self._condition:
+			self._running = False
+			for target in self._targets.values():
+				target.queue.clear()
+				target.isReady = False
+			self._ready.clear()
+			self._queued = 0
+			self._condition.notify_all()
+
+			# Wait for the workers, but not for the calling thread in case a task stops the pool
+			thread = current_thread()
+			if not self._condition.wait_for(lambda: not (self._workerThreads - { thread }), timeout):
+				if BackgroundWorker._logger:
+					BackgroundWorker._logger(logging.WARNING, f'{self.name}: {len(self._workerThreads)} worker(s) still running after {timeout} seconds')
+		self._workers.clear()
+
+
+	def submit(self, target:str, task:Callable[[], bool]) -> bool:
+		"""	Queue a task for a target.
+
+			Args:
+				target: The target identifier, e.g. a notification URI.
+				task: The task to execute. It returns True if the delivery was successful.
+
+			Return:
+				True if the task was queued, or False if it was dropped.
+		"""
+		with self._condition:
+			if not self._running:
+				return False
+			if (now := time.monotonic()) >= self._nextIdleCheck:
+				self._removeIdleTargets(now)
+			if (deliveryTarget := self._targets.get(target)) is None:
+				deliveryTarget = self._targets[target] = DeliveryTarget(target)
+
+			if len(deliveryTarget.queue) >= self.maxQueueSize:
+				match self.overflowPolicy:
+					case OverflowPolicy.dropNewest:
+						deliveryTarget.dropped += 1
+						return False
+					case OverflowPolicy.dropOldest:
+						deliveryTarget.queue.popleft()
+						deliveryTarget.dropped += 1
+						self._queued -= 1
+					case OverflowPolicy.block:
+						if not self._condition.wait_for(lambda: not self._running or len(deliveryTarget.queue) < self.maxQueueSize,
+														self.overflowTimeout) or not self._running:
+							deliveryTarget.dropped += 1
+							return False
+
+			deliveryTarget.queue.append(task)
+			self._queued += 1
+			self._makeReady(deliveryTarget)
+			return True
+
+
+	def getStatistics(self) -> dict[str, int|float]:
+		"""	Return the statistics for all targets.
+
+			Return:
+				Dictionary with the number of targets, queued, executing, delivered, failed and dropped tasks, and the average and maximum latency in seconds.
+		"""
+		with self._condition:
+			targets = [ *self._targets.values(), self._retired ]
+			delivered = sum(t.delivered for t in targets)
+			failed = sum(t.failed for t in targets)
+			latency = sum(t.latency for t in targets)
+			return {
+				'targets':		len(self._targets),
+				'queued':		self._queued,
+				'inFlight':		sum(t.inFlight for t in targets),
+				'delivered':	delivered,
+				'failed':		failed,
+				'dropped':		sum(t.dropped for t in targets),
+				'avgLatency':	latency / (delivered + failed) if delivered + failed else 0.0,
+				'maxLatency':	max(t.maxLatency for t in targets),
+			}
+
+
+	def getTargetStatistics(self) -> dict[str, dict[str, int|float]]:
+		"""	Return the statistics for each target.
+
+			Return:
+				Dictionary, indexed by the target identifiers, with the number of queued, executing, delivered, failed and dropped tasks, and the average and maximum latency in seconds.
+		"""
+		with self._condition:
+			return { t.target: {
+						'queued':		len(t.queue),
+						'inFlight':		t.inFlight,
+						'delivered':	t.delivered,
+						'failed':		t.failed,
+						'dropped':		t.dropped,
+						'avgLatency':	t.latency / (t.delivered + t.failed) if t.delivered + t.failed else 0.0,
+						'maxLatency':	t.maxLatency,
+					 }
+					 for t in self._targets.values() }
+
+
+	def _makeReady(self, deliveryTarget:DeliveryTarget) -> None:
+		"""	Add a target to the ready queue if it has queued tasks and may execute another task.
+
+			The caller must hold the lock.
+
+			Args:
+				deliveryTarget: The target.
+		"""
+		if not deliveryTarget.isReady and deliveryTarget.queue and deliveryTarget.inFlight < self.maxInFlight:
+			deliveryTarget.isReady = True
+			self._ready.append(deliveryTarget)
+			self._condition.notify_all()
+
+
+	def _removeIdleTargets(self, now:float) -> None:
+		"""	Remove the targets that have no queued or executing tasks for at least *idleTimeout* seconds.
+			Their statistics are added to the statistics of the removed targets.
+
+			The caller must hold the lock.
+
+			Args:
+				now: The current monotonic time.
+		"""
+		retired = self._retired
+		for target in [ t for t in self._targets.values() if t.isIdle(now, self.idleTimeout) ]:
+			del self._targets[target.target]
+			retired.delivered += target.delivered
+			retired.failed += target.failed
+			retired.dropped += target.dropped
+			retired.latency += target.latency
+			retired.maxLatency = max(retired.maxLatency, target.maxLatency)
+		self._nextIdleCheck = now + self.idleTimeout / 2
+
+
+	def _worker(self) -> None:
+		"""	Worker loop. Execute the next task of the next ready target until the pool is stopped.
+		"""
+		thread = current_thread()
+		with self._condition:
+			self._workerThreads.add(thread)
+		try:
+			self._executeTasks()
+		finally:
+			with self._condition:
+				self._workerThreads.discard(thread)
+				self._condition.notify_all()		# Wake up a waiting stop()
+
+
+	def _executeTasks(self) -> None:
+		"""	Execute the next task of the next ready target until the pool is stopped.
+		"""
+		while True:
+			with self._condition:
+				self._condition.wait_for(lambda: not self._running or self._ready)
+				if not self._running:
+					return
+				deliveryTarget = self._ready.popleft()
+				deliveryTarget.isReady = False
+				task = deliveryTarget.queue.popleft()
+				self._queued -= 1
+				deliveryTarget.inFlight += 1
+				self._makeReady(deliveryTarget)		# Other workers may execute further tasks for this target
+				self._condition.notify_all()		# Wake up callers that wait for space in the queue
+
+			start = time.perf_counter()
+			try:
+				result = task()
+			except Exception as e:
+				result = False
+				if BackgroundWorker._logger:
+					BackgroundWorker._logger(logging.ERROR, f'{self.name}: exception during delivery to {deliveryTarget.target}: {str(e)}')
+			latency = time.perf_counter() - start
+
+			with self._condition:
+				deliveryTarget.inFlight -= 1
+				if result:
+					deliveryTarget.delivered += 1
+				else:
+					deliveryTarget.failed += 1
+				deliveryTarget.latency += latency
+				deliveryTarget.maxLatency = max(deliveryTarget.maxLatency, latency)
+				deliveryTarget.idleSince = time.monotonic()
+				self._makeReady(deliveryTarget)
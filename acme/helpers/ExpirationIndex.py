@@ -0,0 +1,167 @@
+#
+#	ExpirationIndex.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+#	Index of expiration timestamps, ordered by due time
+#
+"""	This module provides an index of expiration timestamps, ordered by their due time.
+"""
+
+from __future__ import annotations
+from typing import Optional
+
+import heapq
+from threading import Condition
+
+
+class ExpirationIndex(object):
+	"""	Index of expiration timestamps for keys, e.g. resource IDs, ordered by their due time.
+
+		The index is a min-heap of (timestamp, key) tuples. Entries that are replaced or removed stay in
+		the heap until they are popped, and are then ignored. The heap is rebuilt when it contains too
+		many of these stale entries.
+
+		Callers can wait for the next due entry. Waiting callers are woken up when an entry is added that
+		is due earlier than all other entries.
+	"""
+
+	__slots__ = (
+		'_condition',
+		'_heap',
+		'_timestamps',
+	)
+	""" Define slots for instance variables. """
+
+
+	def __init__(self) -> None:
+		"""	Initialize the empty index.
+		"""
+		self._condition = Condition()
+		""" Condition to protect the index and to notify waiting callers. """
+		self._heap:list[tuple[float, str]] = []
+		""" Min-heap of (timestamp, key) tuples. It may contain stale entries. """
+		self._timestamps:dict[str, float] = {}
+		""" The current timestamp for each key. """
+
+
+	def set(self, key:str, timestamp:Optional[float]) -> None:
+		"""	Add, replace or remove the timestamp for a key.
+
+			Args:
+				key: The key, e.g. a resource ID.
+				timestamp: UTC-based POSIX timestamp when the key is due, or *None* to remove the key.
+		"""
+		with self._condition:
+			if timestamp is None:
+				self._timestamps.pop(key, None)
+				return
+			if self._timestamps.get(key) == timestamp:
+				return
+			self._timestamps[key] = timestamp
+			heapq.heappush(self._heap, (timestamp, key))
+			if len(self._heap) > 2 * len(self._timestamps) + 1000:
+				self._rebuild()
+			if self._heap[0][1] == key:	# new earliest entry
+				self._condition.notify_all()
+
+
+	def remove(self, key:str) -> None:
+		"""	Remove a key from the index.
+
+			Args:
+				key: The key, e.g. a resource ID.
+		"""
+		self.set(key, None)
+
+
+	def clear(self) -> None:
+		"""	Remove all keys from the index.
+		"""
+		with self._condition:
+			self._heap.clear()
+			self._timestamps.clear()
+
+
+	def popDue(self, now:float) -> list[str]:
+		"""	Remove and return all keys that are due.
+
+			Args:
+				now: UTC-based POSIX timestamp. All keys with a timestamp before this timestamp are due.
+			Return:
+				List of the due keys, ordered by their timestamp.
+		"""
+		result:list[str] = []
+		with self._condition:
+			while self._heap and self._heap[0][0] < now:
+				timestamp, key = heapq.heappop(self._heap)
+				if self._timestamps.get(key) == timestamp:	# ignore stale entries
+					del self._timestamps[key]
+					result.append(key)
+		return result
+
+
+	def next(self) -> Optional[float]:
+		"""	Return the timestamp of the next due key.
+
+			Return:
+				UTC-based POSIX timestamp, or *None* if the index is empty.
+		"""
+		with self._condition:
+			return self._next()
+
+
+	def waitForNext(self, now:float, maxWait:float) -> None:
+		"""	Wait until the next key is due, or until a key is added that is due earlier.
+
+			Args:
+				now: Current UTC-based POSIX timestamp.
+				maxWait: Maximum time to wait, in seconds.
+		"""
+		with self._condition:
+			if (timestamp := self._next()) is not None:
+				maxWait = min(maxWait, timestamp - now)
+			if maxWait > 0.0:
+				self._condition.wait(maxWait)
+
+
+	def wakeUp(self) -> None:
+		"""	Wake up all waiting callers.
+		"""
+		with self._condition:
+			self._condition.notify_all()
+
+
+	def __len__(self) -> int:
+		"""	Return the number of keys in the index.
+
+			Return:
+				The number of keys.
+		"""
+		return len(self._timestamps)
+
+
+	def _next(self) -> Optional[float]:
+		"""	Return the timestamp of the next due key and remove stale entries from the top of the heap.
+
+			The caller must hold the lock.
+
+			Return:
+				UTC-based POSIX timestamp, or *None* if the index is empty.
+		"""
+		while self._heap:
+			timestamp, key = self._heap[0]
+			if self._timestamps.get(key) == timestamp:
+				return timestamp
+			heapq.heappop(self._heap)
+		return None
+
+
+	def _rebuild(self) -> None:
+		"""	Rebuild the heap from the current timestamps and remove all stale entries.
+
+			The caller must hold the lock.
+		"""
+		self._heap = [ (timestamp, key) for key, timestamp in self._timestamps.items() ]
+		heapq.heapify(self._heap)
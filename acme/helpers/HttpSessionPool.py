@@ -0,0 +1,215 @@
+#
+#	HttpSessionPool.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+#	Pool of keep-alive HTTP sessions for outgoing requests
+#
+"""	This module provides a pool of keep-alive HTTP client sessions, one for each target host.
+"""
+
+from __future__ import annotations
+from typing import Any, Optional, Tuple
+
+import time
+from dataclasses import dataclass
+from http.cookiejar import DefaultCookiePolicy
+from threading import Lock
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+@dataclass
+class HttpHostSession:
+	"""	Structure that represents the session for a single target host.
+	"""
+	session:requests.Session
+	""" The session with its connection pool. """
+	inUse:int = 0
+	""" Number of requests that are currently sent via this session. """
+	lastUsed:float = 0.0
+	""" Monotonic time when the session was used last. """
+
+
+class HttpSessionPool(object):
+	"""	Pool of keep-alive HTTP client sessions for outgoing requests.
+
+		There is one session for each target host, identified by its scheme, host and port.
+		Each session keeps up to *poolSize* open connections to its host, so that subsequent
+		requests to the same host reuse an already established TCP and TLS connection instead
+		of creating a new one.
+
+		Sessions that were not used for more than *idleTimeout* seconds are closed together
+		with their connections.
+
+		Cookies are not stored by the sessions, so that requests remain independent of each other.
+	"""
+
+	__slots__ = (
+		'poolSize',
+		'idleTimeout',
+
+		'_lock',
+		'_sessions',
+		'_lastEviction',
+		'_evictedRequests',
+		'_evictedConnections',
+		'evictions',
+	)
+	""" Define slots for instance variables. """
+
+
+	def __init__(self, poolSize:int, idleTimeout:float) -> None:
+		"""	Initialize the session pool. No session is created yet.
+
+			Args:
+				poolSize: Maximum number of open connections for each target host.
+				idleTimeout: Time in seconds after which an unused session and its connections are closed.
+		"""
+		self.poolSize = poolSize
+		""" Maximum number of open connections for each target host. """
+		self.idleTimeout = idleTimeout
+		""" Time in seconds after which an unused session and its connections are closed. """
+
+		self._lock = Lock()
+		""" Lock to protect the sessions. """
+		self._sessions:dict[Tuple[str, str], HttpHostSession] = {}
+		""" Sessions, indexed by the scheme and network location of their target host. """
+		self._lastEviction = time.monotonic()
+		""" Monotonic time of the last check for idle sessions. """
+		self._evictedRequests = 0
+		""" Number of requests that were sent by already closed sessions. """
+		self._evictedConnections = 0
+		""" Number of connections that were opened by already closed sessions. """
+		self.evictions = 0
+		""" Number of idle sessions that were closed. """
+
+
+	def request(self, method:str, url:str, **kwargs:Any) -> requests.Response:
+		"""	Send a request via the session for the target host of the URL.
+
+			Args:
+				method: The HTTP method, e.g. *POST*.
+				url: The target URL.
+				kwargs: Further arguments that are passed to *requests.Session.request()*.
+
+			Return:
+				The response.
+		"""
+		_url = urlsplit(url)
+		key = (_url.scheme.lower(), _url.netloc.lower())
+		now = time.monotonic()
+		with self._lock:
+			if now - self._lastEviction > self.idleTimeout:
+				self._evictIdleSessions(now)
+			if (hostSession := self._sessions.get(key)) is None:
+				hostSession = self._sessions[key] = HttpHostSession(self._newSession())
+			hostSession.inUse += 1
+		try:
+			return hostSession.session.request(method, url, **kwargs)
+		finally:
+			with self._lock:
+				hostSession.inUse -= 1
+				hostSession.lastUsed = time.monotonic()
+
+
+	def close(self) -> None:
+		"""	Close all sessions and their connections.
+		"""
+		with self._lock:
+			for hostSession in self._sessions.values():
+				self._closeSession(hostSession)
+			self._sessions.clear()
+
+
+	def getStatistics(self) -> dict[str, int]:
+		"""	Return the pool statistics.
+
+			A request that reused an open connection counts as a *hit*, and a request that had to
+			open a new connection counts as a *miss*.
+
+			Return:
+				Dictionary with the number of sessions, requests, hits, misses and evicted sessions.
+		"""
+		with self._lock:
+			requestCount = self._evictedRequests
+			connectionCount = self._evictedConnections
+			for hostSession in self._sessions.values():
+				_requests, _connections = self._sessionCounters(hostSession.session)
+				requestCount += _requests
+				connectionCount += _connections
+			return {
+				'sessions':		len(self._sessions),
+				'requests':		requestCount,
+				'hits':			max(requestCount - connectionCount, 0),
+				'misses':		connectionCount,
+				'evictions':	self.evictions,
+			}
+
+
+	def _newSession(self) -> requests.Session:
+		"""	Create a new session with a connection pool for a single host.
+
+			Return:
+				The new session.
+		"""
+		session = requests.Session()
+		session.cookies.set_policy(DefaultCookiePolicy(allowed_domains = []))	# don't store any cookies
+		adapter = HTTPAdapter(pool_connections = 1, pool_maxsize = self.poolSize)
+		session.mount('http://', adapter)
+		session.mount('https://', adapter)
+		return session
+
+
+	def _evictIdleSessions(self, now:float) -> None:
+		"""	Close the sessions that were not used for more than *idleTimeout* seconds.
+
+			The caller must hold the lock.
+
+			Args:
+				now: The current monotonic time.
+		"""
+		self._lastEviction = now
+		for key in [ k for k, s in self._sessions.items()
+					 if not s.inUse and now - s.lastUsed > self.idleTimeout ]:
+			self._closeSession(self._sessions.pop(key))
+			self.evictions += 1
+
+
+	def _closeSession(self, hostSession:HttpHostSession) -> None:
+		"""	Close a session and keep its counters.
+
+			The caller must hold the lock.
+
+			Args:
+				hostSession: The session to close.
+		"""
+		_requests, _connections = self._sessionCounters(hostSession.session)
+		self._evictedRequests += _requests
+		self._evictedConnections += _connections
+		hostSession.session.close()
+
+
+	def _sessionCounters(self, session:requests.Session) -> Tuple[int, int]:
+		"""	Return the number of requests and the number of opened connections of a session.
+
+			Args:
+				session: The session.
+
+			Return:
+				Tuple of the number of requests and the number of opened connections.
+		"""
+		requestCount = 0
+		connectionCount = 0
+		for adapter in set(session.adapters.values()):
+			if not isinstance(adapter, HTTPAdapter):
+				continue
+			pools = adapter.poolmanager.pools
+			for poolKey in pools.keys():
+				if (pool := pools.get(poolKey)) is not None:
+					requestCount += pool.num_requests
+					connectionCount += pool.num_connections
+		return requestCount, connectionCount
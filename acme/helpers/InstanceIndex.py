@@ -0,0 +1,136 @@
+#
+#	InstanceIndex.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+"""	This module provides an ordered index of the instance resources (e.g. *<contentInstance>*)
+	of a single parent resource.
+"""
+
+from __future__ import annotations
+from typing import Optional, Tuple
+from bisect import bisect_left, insort
+
+
+class InstanceIndex(object):
+	"""	Creation-time ordered index of the instance resources of a single parent resource.
+
+		The index keeps the entries sorted by their creation time (and resource ID to break ties),
+		and it maintains the running totals of the number of instances (*cni*) and the
+		sum of their content sizes (*cbs*).
+
+		Adding an instance that is newer than all other instances, as well as removing the
+		oldest instances, are (amortized) constant time operations.
+	"""
+
+	__slots__ = (
+		'_entries',
+		'_head',
+		'_sizes',
+		'cni',
+		'cbs',
+	)
+	""" Define slots for instance variables. """
+
+
+	def __init__(self) -> None:
+		"""	Initialization of an empty index.
+		"""
+		self._entries:list[Tuple[str, str]] = []
+		""" Sorted list of (ct, ri) tuples. Entries before *_head* are already removed. """
+		self._head = 0
+		""" Position of the oldest valid entry in *_entries*. """
+		self._sizes:dict[str, Tuple[str, int]] = {}
+		""" Mapping of resource ID to (ct, cs) for each indexed instance. """
+		self.cni = 0
+		""" Number of indexed instances. """
+		self.cbs = 0
+		""" Sum of the content sizes of all indexed instances. """
+
+
+	def __len__(self) -> int:
+		return self.cni
+
+
+	def __contains__(self, ri:object) -> bool:
+		return ri in self._sizes
+
+
+	def add(self, ri:str, ct:str, cs:int) -> None:
+		"""	Add an instance to the index.
+
+			Args:
+				ri: Resource ID of the instance.
+				ct: Creation time of the instance.
+				cs: Content size of the instance.
+		"""
+		if ri in self._sizes:
+			self.remove(ri)
+		entry = (ct, ri)
+		if not self.cni or entry >= self._entries[-1]:
+			self._entries.append(entry)		# Usual case: the new instance is the latest one
+		else:
+			insort(self._entries, entry, lo = self._head)
+		self._sizes[ri] = (ct, cs)
+		self.cni += 1
+		self.cbs += cs
+
+
+	def remove(self, ri:str) -> Optional[int]:
+		"""	Remove an instance from the index.
+
+			Args:
+				ri: Resource ID of the instance.
+
+			Return:
+				The content size of the removed instance, or None if the instance is not indexed.
+		"""
+		if (_s := self._sizes.pop(ri, None)) is None:
+			return None
+		ct, cs = _s
+		self.cni -= 1
+		self.cbs -= cs
+
+		if self._entries[self._head][1] == ri:	# Usual case: the oldest instance is removed
+			self._head += 1
+			self._compact()
+		else:
+			del self._entries[bisect_left(self._entries, (ct, ri), lo = self._head)]
+		return cs
+
+
+	def oldest(self, count:int = 1) -> list[Tuple[str, str, int]]:
+		"""	Return the oldest entries of the index.
+
+			Args:
+				count: Maximum number of entries to return.
+
+			Return:
+				List of (ri, ct, cs) tuples, oldest first.
+		"""
+		return [ (ri, ct, self._sizes[ri][1]) for ct, ri in self._entries[self._head:self._head + count] ]
+
+
+	def latest(self) -> Optional[Tuple[str, str, int]]:
+		"""	Return the latest entry of the index.
+
+			Return:
+				A (ri, ct, cs) tuple, or None if the index is empty.
+		"""
+		if not self.cni:
+			return None
+		ct, ri = self._entries[-1]
+		return (ri, ct, self._sizes[ri][1])
+
+
+	def _compact(self) -> None:
+		"""	Physically remove the already removed entries from the head of the list when they
+			make up more than half of the list.
+		"""
+		if self._head > 32 and self._head * 2 > len(self._entries):
+			del self._entries[:self._head]
+			self._head = 0
+		elif self._head == len(self._entries):
+			self._entries.clear()
+			self._head = 0
@@ -1380,6 +1380,24 @@ class PContext():
 			raise PInvalidArgumentError(self.setError(PError.invalid, f'wrong length for expression: {symbol}'))
 
 
+	def executeExpressions(self) -> PContext:
+		"""	Execute the top-level S-expressions of the parsed script in the current context.
+
+			In contrast to `run()` the context is not validated or reset, and the pre-, post- and error
+			functions are not called. This can be used to evaluate the same script repeatedly, for example
+			with different values that are provided by a fallback function.
+
+			Return:
+				The `PContext` object with the result of the last expression.
+
+			Raises:
+				`PException`: In case of an error.
+		"""
+		for symbol in self.ast:
+			self._executeExpression(symbol, None)
+		return self
+
+
 	def run(self,
 			arguments:List[str] = [], 
 			isSubCall:Optional[bool] = False) -> PContext:
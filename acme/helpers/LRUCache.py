@@ -0,0 +1,127 @@
+#
+#	LRUCache.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+#	Bounded, thread-safe least-recently-used cache
+#
+"""	This module provides a bounded and thread-safe cache that evicts the least recently used entries.
+"""
+
+from __future__ import annotations
+from typing import Any, Hashable, Optional
+
+from collections import OrderedDict
+from threading import Lock
+
+
+class LRUCache(object):
+	"""	Bounded and thread-safe cache that evicts the least recently used entries.
+
+		When the cache holds *maxSize* entries, adding another entry removes the entry that was not
+		accessed for the longest time. A *maxSize* of 0 disables the cache.
+	"""
+
+	__slots__ = (
+		'maxSize',
+		'hits',
+		'misses',
+
+		'_lock',
+		'_entries',
+	)
+	""" Define slots for instance variables. """
+
+
+	def __init__(self, maxSize:int) -> None:
+		"""	Initialize the cache.
+
+			Args:
+				maxSize: Maximum number of entries. 0 disables the cache.
+		"""
+		self.maxSize = maxSize
+		""" Maximum number of entries. """
+		self.hits = 0
+		""" Number of successful lookups. """
+		self.misses = 0
+		""" Number of unsuccessful lookups. """
+
+		self._lock = Lock()
+		""" Lock to protect the entries. """
+		self._entries:OrderedDict[Hashable, Any] = OrderedDict()
+		""" The cached entries, from the least to the most recently used entry. """
+
+
+	def get(self, key:Hashable, default:Optional[Any] = None) -> Any:
+		"""	Return an entry and mark it as the most recently used entry.
+
+			Args:
+				key: The key of the entry.
+				default: The value that is returned when there is no entry for the key.
+
+			Return:
+				The cached value, or *default*.
+		"""
+		with self._lock:
+			try:
+				self._entries.move_to_end(key)
+			except KeyError:
+				self.misses += 1
+				return default
+			self.hits += 1
+			return self._entries[key]
+
+
+	def put(self, key:Hashable, value:Any) -> None:
+		"""	Add or replace an entry. The least recently used entry is removed when the cache is full.
+
+			Args:
+				key: The key of the entry.
+				value: The value to cache.
+		"""
+		if self.maxSize <= 0:
+			return
+		with self._lock:
+			self._entries[key] = value
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.maxSize:
+				self._entries.popitem(last = False)
+
+
+	def remove(self, key:Hashable) -> None:
+		"""	Remove an entry, if present.
+
+			Args:
+				key: The key of the entry.
+		"""
+		with self._lock:
+			self._entries.pop(key, None)
+
+
+	def clear(self) -> None:
+		"""	Remove all entries.
+		"""
+		with self._lock:
+			self._entries.clear()
+
+
+	def resize(self, maxSize:int) -> None:
+		"""	Change the maximum number of entries. The least recently used entries are removed if necessary.
+
+			Args:
+				maxSize: The new maximum number of entries. 0 disables the cache.
+		"""
+		with self._lock:
+			self.maxSize = maxSize
+			while len(self._entries) > max(maxSize, 0):
+				self._entries.popitem(last = False)
+
+
+	def __len__(self) -> int:
+		"""	Return the number of entries.
+
+			Return:
+				The number of cached entries.
+		"""
+		return len(self._entries)
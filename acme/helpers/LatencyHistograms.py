@@ -0,0 +1,197 @@
+#
+#	LatencyHistograms.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+#	Latency histograms with per-thread aggregation
+#
+"""	This module provides latency histograms with fixed buckets. Observations are recorded per thread
+	without locking and are merged when the histograms are read.
+"""
+
+from __future__ import annotations
+from typing import Sequence, Tuple
+
+from bisect import bisect_left
+from threading import Lock, Thread, current_thread, local
+
+
+defaultBuckets = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+""" Default upper bounds of the histogram buckets, in seconds. """
+
+HistogramKey = Tuple[str, Tuple[str, ...]]
+""" Key of a histogram: the metric name and the label values. """
+
+
+class Histogram(object):
+	"""	The merged counts of a histogram.
+	"""
+
+	__slots__ = (
+		'buckets',
+		'counts',
+		'sum',
+	)
+	""" Define slots for instance variables. """
+
+
+	def __init__(self, buckets:Sequence[float], counts:list[int], sum:float) -> None:
+		"""	Initialize the histogram.
+
+			Args:
+				buckets: The upper bounds of the buckets.
+				counts: The number of observations in each bucket. The last element is the number of observations that are larger than the largest bound.
+				sum: The sum of all observations.
+		"""
+		self.buckets = buckets
+		""" The upper bounds of the buckets. """
+		self.counts = counts
+		""" The number of observations in each bucket, and of larger observations. """
+		self.sum = sum
+		""" The sum of all observations. """
+
+
+	@property
+	def count(self) -> int:
+		"""	The number of observations.
+		"""
+		return sum(self.counts)
+
+
+	def quantile(self, q:float) -> float:
+		"""	Estimate a quantile by interpolating linearly within the bucket that contains it.
+
+			Args:
+				q: The quantile, between 0.0 and 1.0.
+
+			Return:
+				The estimated quantile. Observations that are larger than the largest bound are estimated with the largest bound.
+		"""
+		if not (count := self.count):
+			return 0.0
+		rank = q * count
+		cumulative = 0
+		for i, c in enumerate(self.counts):
+			if c and cumulative + c >= rank:
+				if i == len(self.buckets):
+					break
+				lower = self.buckets[i - 1] if i else 0.0
+				return lower + (self.buckets[i] - lower) * (rank - cumulative) / c
+			cumulative += c
+		return self.buckets[-1]
+
+
+class LatencyHistograms(object):
+	"""	Latency histograms, identified by a metric name and label values.
+
+		Each thread records its observations in its own histograms, so recording doesn't need a lock.
+		The histograms of all threads are merged when they are read. The histograms of terminated threads
+		are merged into a common set of histograms when a new thread records its first observation.
+	"""
+
+	__slots__ = (
+		'buckets',
+
+		'_local',
+		'_shards',
+		'_retired',
+		'_lock',
+	)
+	""" Define slots for instance variables. """
+
+
+	def __init__(self, buckets:Sequence[float] = defaultBuckets) -> None:
+		"""	Initialize the histograms.
+
+			Args:
+				buckets: The ascending upper bounds of the buckets, in seconds.
+		"""
+		self.buckets = tuple(buckets)
+		""" The upper bounds of the buckets. """
+
+		self._local = local()
+		""" Thread-local storage for the histograms of the current thread. """
+		self._shards:list[Tuple[Thread, dict[HistogramKey, list]]] = []
+		""" The threads and their histograms. """
+		self._retired:dict[HistogramKey, list] = {}
+		""" The merged histograms of terminated threads. """
+		self._lock = Lock()
+		""" Lock to protect the list of threads and the histograms of terminated threads. """
+
+
+	def observe(self, name:str, labels:Tuple[str, ...], value:float) -> None:
+		"""	Record an observation.
+
+			Args:
+				name: The metric name.
+				labels: The label values.
+				value: The observed latency, in seconds.
+		"""
+		try:
+			shard = self._local.shard
+		except AttributeError:
+			shard = self._addShard()
+		if (counts := shard.get(key := (name, labels))) is None:
+			counts = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]	# bucket counts, overflow count, sum
+		counts[bisect_left(self.buckets, value)] += 1
+		counts[-1] += value
+
+
+	def getHistograms(self) -> dict[HistogramKey, Histogram]:
+		"""	Return the merged histograms of all threads.
+
+			Return:
+				Dictionary of the histograms, mapped by the metric name and the label values.
+		"""
+		with self._lock:
+			merged:dict[HistogramKey, list] = {}
+			self._merge(merged, self._retired)
+			for _, shard in self._shards:
+				self._merge(merged, shard)
+		return { key: Histogram(self.buckets, counts[:-1], counts[-1]) for key, counts in merged.items() }
+
+
+	def clear(self) -> None:
+		"""	Remove all observations.
+		"""
+		with self._lock:
+			self._retired.clear()
+			for _, shard in self._shards:
+				shard.clear()
+
+
+	def _addShard(self) -> dict[HistogramKey, list]:
+		"""	Add the histograms for the current thread. The histograms of terminated threads are merged.
+
+			Return:
+				The histograms of the current thread.
+		"""
+		shard:dict[HistogramKey, list] = {}
+		with self._lock:
+			shards = []
+			for thread, s in self._shards:
+				if thread.is_alive():
+					shards.append((thread, s))
+				else:
+					self._merge(self._retired, s)
+			shards.append((current_thread(), shard))
+			self._shards = shards
+		self._local.shard = shard
+		return shard
+
+
+	@staticmethod
+	def _merge(target:dict[HistogramKey, list], source:dict[HistogramKey, list]) -> None:
+		"""	Add the counts of histograms to other histograms.
+
+			Args:
+				target: The histograms to add to.
+				source: The histograms to add.
+		"""
+		for key, counts in list(source.items()):
+			if (t := target.get(key)) is None:
+				target[key] = list(counts)
+			else:
+				for i, v in enumerate(counts):
+					t[i] += v
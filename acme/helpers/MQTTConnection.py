@@ -11,9 +11,10 @@
 from __future__ import annotations
 from typing import Callable, Any, Tuple, Optional, TypeAlias, cast
 
-import ssl, time
+import ssl
 from dataclasses import dataclass
 import logging
+from threading import Condition
 
 from ..helpers.BackgroundWorker import BackgroundWorkerPool, BackgroundWorker
 from ..helpers.TextTools import simpleMatch
@@ -41,6 +42,8 @@ class MQTTTopic:
 	""" The callback function for the topic. """
 	callbackArgs:Optional[dict] = None
 	""" The callback arguments for the topic. """
+	category:Optional[str] = None
+	""" The job category in which the callback is run. """
 
 
 class MQTTHandler(object):
@@ -170,6 +173,7 @@ class MQTTConnection(object):
 		'messageHandler',
 		'actor',
 		'subscribedTopics',
+		'_stateCondition',
 	)
 	"""	Slots of the class. """
 
@@ -254,6 +258,8 @@ class MQTTConnection(object):
 		""" The actor for the MQTT client. """
 		self.subscribedTopics:dict[str, MQTTTopic]	= {}
 		""" The list of subscribed-to topics. """
+		self._stateCondition						= Condition()
+		""" Condition to notify waiting callers about connection and subscription changes. """
 
 	
 	def shutdown(self) -> bool:
@@ -270,8 +276,7 @@ class MQTTConnection(object):
 			for t in list(self.subscribedTopics.values()):
 				self.unsubscribeTopic(t)
 			# wait a moment for all unsubscribe ACKs to arrive
-			while len(self.subscribedTopics) > 0:
-				time.sleep(0.1)
+			self.waitForState(lambda: len(self.subscribedTopics) == 0)
 			# Then disconnect. The actor is stoped implicitly
 			self.mqttClient.disconnect()
 			self.actor = None
@@ -361,6 +366,7 @@ class MQTTConnection(object):
 			if self.messageHandler:
 				self.messageHandler.logging(self, logging.ERROR, f'MQTT: Cannot connect to broker. Reason code: {reason_code} ({str(reason_code)})')
 				self.messageHandler.onError(self, reason_code.value)
+		self._notifyStateChange()
 
 
 	def _onDisconnect(self, client:MQTTClient, userdata:Any, disconnect_flags:mqtt.DisconnectFlags ,reason_code:mqtt_rc.ReasonCode, properties:mqtt_pr.Properties) -> None:
@@ -390,6 +396,7 @@ class MQTTConnection(object):
 					self.messageHandler.logging(self, logging.ERROR, f'MQTT: Cannot disconnect from broker. Reason code: {reason_code} ({str(reason_code)})')
 					self.messageHandler.onDisconnect(self)
 					self.messageHandler.onError(self, reason_code.value)
+		self._notifyStateChange()
 
 
 	def _onLog(self, client:MQTTClient, userdata:Any, level:int, buf:str) -> None:
@@ -422,6 +429,7 @@ class MQTTConnection(object):
 				t.isSubscribed = True
 				self.messageHandler and self.messageHandler.onSubscribed(self, t.topic)
 				break
+		self._notifyStateChange()
 	
 
 	def _onUnsubscribe(self, client:MQTTClient, userdata:Any, mid:int, reason_codes:list[mqtt_rc.ReasonCode], properties:mqtt_pr.Properties) -> None:
@@ -444,6 +452,7 @@ class MQTTConnection(object):
 				del self.subscribedTopics[t.topic]
 				self.messageHandler and self.messageHandler.onUnsubscribed(self, t.topic)
 				break
+		self._notifyStateChange()
 
 
 	def _onMessage(self, client:MQTTClient, userdata:Any, message:mqtt.MQTTMessage) -> None:
@@ -461,7 +470,7 @@ class MQTTConnection(object):
 				if (topic := self.subscribedTopics[t]).callback:
 					# Run actual request handling in a thread
 					# For some reasons mid is not initialized in the on on_message callback, so we use the timestamp for the actor name
-					BackgroundWorkerPool.newActor(topic.callback, name=f'mid_{message.timestamp}').start(	connection=self,
+					BackgroundWorkerPool.newActor(topic.callback, name=f'mid_{message.timestamp}', category=topic.category).start(	connection=self,
 																											topic=message.topic,
 																											data=message.payload, 
 																											**topic.callbackArgs)
@@ -472,13 +481,14 @@ class MQTTConnection(object):
 	#	MQTT messaging methods
 	#
 
-	def subscribeTopic(self, topic:str|list[str], callback:Optional[MQTTCallback] = None, **kwargs:Any) -> None:
+	def subscribeTopic(self, topic:str|list[str], callback:Optional[MQTTCallback] = None, category:Optional[str] = None, **kwargs:Any) -> None:
 		"""	Add one or more MQTT topics to subscribe to. Add the topic(s) afterwards
 			to the list of subscribed-to topics.
 
 			Args:
 				topic: The topic(s) to subscribe to. Either a single topic or a list of topics.
 				callback: The callback function to call when a message is received for the topic.
+				category: Optional job category in which the callback is run. Otherwise the callback is run in its own thread.
 				kwargs: Additional arguments for the callback function.
 		"""
 		def _subscribe(topic:str) -> None:
@@ -488,7 +498,7 @@ class MQTTConnection(object):
 				self.messageHandler and self.messageHandler.logging(self, logging.WARNING, f'MQTT: topic already subscribed: {topic}')
 				return
 			if (r := self.mqttClient.subscribe(topic))[0] == 0:
-				t = MQTTTopic(topic = topic, mid=r[1], callback=callback, callbackArgs=kwargs)
+				t = MQTTTopic(topic = topic, mid=r[1], callback=callback, callbackArgs=kwargs, category=category)
 				self.subscribedTopics[topic] = t
 			else:
 				self.messageHandler and self.messageHandler.logging(self, logging.ERROR, f'MQTT: cannot subscribe: {r[0]}')
@@ -546,6 +556,29 @@ class MQTTConnection(object):
 		return self.subscribedCount == len(self.subscribedTopics)
 
 
+	def waitForState(self, predicate:Callable[[], bool], timeout:Optional[float] = None) -> bool:
+		"""	Wait until a condition about the connection or subscription state is met, e.g. that the
+			client is connected. The caller is woken up when the client connects, disconnects,
+			subscribes or unsubscribes, and the condition is checked again.
+
+			Args:
+				predicate: Function that returns True when the condition is met.
+				timeout: Maximum time to wait, in seconds. Wait without timeout if *None*.
+
+			Return:
+				The result of the last call to *predicate*.
+		"""
+		with self._stateCondition:
+			return self._stateCondition.wait_for(predicate, timeout)
+
+
+	def _notifyStateChange(self) -> None:
+		"""	Wake up all callers that wait for a change of the connection or subscription state.
+		"""
+		with self._stateCondition:
+			self._stateCondition.notify_all()
+
+
 	def publish(self, topic:str, data:bytes) -> None:
 		"""	Publish the message *data* with the topic *topic* with the MQTT broker.
 		
@@ -0,0 +1,133 @@
+#
+#	ResponseCorrelator.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+#	Registry that correlates responses with waiting requesters
+#
+"""	This module provides a registry that correlates asynchronously received responses with the
+	requesters that wait for them.
+"""
+
+from __future__ import annotations
+from typing import Any, Tuple
+
+from threading import Event, Lock
+
+
+class _Correlation(object):
+	"""	A single expected response.
+	"""
+
+	__slots__ = (
+		'event',
+		'value',
+	)
+	""" Define slots for instance variables. """
+
+
+	def __init__(self) -> None:
+		"""	Initialize the correlation.
+		"""
+		self.event = Event()
+		""" Event that is set when the response is received. """
+		self.value:Any = None
+		""" The received response. """
+
+
+class ResponseCorrelator(object):
+	"""	Registry of expected responses, identified by a key, e.g. a request identifier.
+
+		A requester registers the key before it sends the request, and then waits for the response.
+		The receiver of a response completes the registered key, which wakes up the waiting requester
+		immediately. Waiting does not poll.
+
+		Responses for keys that are not registered, e.g. late responses after a requester has timed
+		out, are discarded.
+	"""
+
+	__slots__ = (
+		'_lock',
+		'_correlations',
+	)
+	""" Define slots for instance variables. """
+
+
+	def __init__(self) -> None:
+		"""	Initialize the empty registry.
+		"""
+		self._lock = Lock()
+		""" Lock to protect the registry. """
+		self._correlations:dict[str, _Correlation] = {}
+		""" The expected responses, mapped by their keys. """
+
+
+	def register(self, key:str) -> None:
+		"""	Register a key for an expected response.
+
+			Registering a key that is already registered has no effect.
+
+			Args:
+				key: The key, e.g. a request identifier.
+		"""
+		with self._lock:
+			if key not in self._correlations:
+				self._correlations[key] = _Correlation()
+
+
+	def complete(self, key:str, value:Any) -> bool:
+		"""	Complete a registered key with a response and wake up the waiting requester.
+
+			Args:
+				key: The key, e.g. a request identifier.
+				value: The response.
+			Return:
+				True if the key was registered, False if the response was discarded.
+		"""
+		with self._lock:
+			if not (correlation := self._correlations.get(key)) or correlation.event.is_set():
+				return False
+			correlation.value = value
+		correlation.event.set()
+		return True
+
+
+	def wait(self, key:str, timeout:float) -> Tuple[bool, Any]:
+		"""	Wait for the response of a key. The key is registered if it is not registered yet,
+			and it is always unregistered afterwards.
+
+			Args:
+				key: The key, e.g. a request identifier.
+				timeout: Maximum time to wait, in seconds.
+			Return:
+				Tuple (received, response). *received* is False if the timeout has passed.
+		"""
+		self.register(key)
+		with self._lock:
+			correlation = self._correlations[key]
+		try:
+			if correlation.event.wait(timeout):
+				return True, correlation.value
+			return False, None
+		finally:
+			self.cancel(key)
+
+
+	def cancel(self, key:str) -> None:
+		"""	Unregister a key. A response that is received later for this key is discarded.
+
+			Args:
+				key: The key, e.g. a request identifier.
+		"""
+		with self._lock:
+			self._correlations.pop(key, None)
+
+
+	def __len__(self) -> int:
+		"""	Return the number of registered keys.
+
+			Return:
+				The number of expected responses.
+		"""
+		return len(self._correlations)
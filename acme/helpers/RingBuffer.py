@@ -0,0 +1,114 @@
+#
+#	RingBuffer.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+#	Bounded, thread-safe FIFO buffer that drops the oldest entries when full
+#
+"""	This module provides a bounded and thread-safe FIFO buffer that drops the oldest entries when it is full.
+"""
+
+from __future__ import annotations
+from typing import Any
+
+from collections import deque
+from threading import Condition
+
+
+class RingBuffer(object):
+	"""	Bounded and thread-safe FIFO buffer with a fixed capacity.
+
+		When the buffer is full, adding another entry drops the oldest entry. The number of dropped
+		entries is counted.
+
+		A consumer can wait until the buffer holds a minimum number of entries, and then remove all
+		entries at once.
+	"""
+
+	__slots__ = (
+		'capacity',
+		'dropped',
+
+		'_condition',
+		'_entries',
+		'_threshold',
+	)
+	""" Define slots for instance variables. """
+
+
+	def __init__(self, capacity:int) -> None:
+		"""	Initialize the empty buffer.
+
+			Args:
+				capacity: Maximum number of entries.
+		"""
+		self.capacity = capacity
+		""" Maximum number of entries. """
+		self.dropped = 0
+		""" Number of entries that were dropped because the buffer was full. """
+
+		self._condition = Condition()
+		""" Condition to protect the entries and to notify a waiting consumer. """
+		self._entries:deque[Any] = deque(maxlen = capacity)
+		""" The entries, from the oldest to the newest entry. """
+		self._threshold = max(1, capacity // 2)
+		""" Number of entries at which a waiting consumer is notified. At least one entry, also for very small buffers. """
+
+
+	def append(self, entry:Any) -> bool:
+		"""	Add an entry. The oldest entry is dropped if the buffer is full.
+
+			A waiting consumer is notified when the buffer becomes half full.
+
+			Args:
+				entry: The entry to add.
+			Return:
+				False if the oldest entry was dropped, True otherwise.
+		"""
+		with self._condition:
+			if (full := len(self._entries) >= self.capacity):
+				self.dropped += 1
+			self._entries.append(entry)
+			if len(self._entries) >= self._threshold:
+				self._condition.notify_all()
+			return not full
+
+
+	def drain(self) -> list[Any]:
+		"""	Remove and return all entries.
+
+			Return:
+				List of the entries, from the oldest to the newest entry.
+		"""
+		with self._condition:
+			result = list(self._entries)
+			self._entries.clear()
+			return result
+
+
+	def wait(self, timeout:float) -> None:
+		"""	Wait until the buffer is half full, or until the timeout has passed.
+
+			Args:
+				timeout: Maximum time to wait, in seconds.
+		"""
+		with self._condition:
+			if len(self._entries) < self._threshold:
+				self._condition.wait(timeout)
+
+
+	def wakeUp(self) -> None:
+		"""	Wake up all waiting consumers.
+		"""
+		with self._condition:
+			self._condition.notify_all()
+
+
+	def __len__(self) -> int:
+		"""	Return the number of entries.
+
+			Return:
+				The number of buffered entries.
+		"""
+		return len(self._entries)
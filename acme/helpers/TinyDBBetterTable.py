@@ -7,8 +7,150 @@
 """	This module provides an optimizde Table class for TinyDB that optimizes the document index handling.
 """
 
-from typing import Dict, Callable, Mapping
-from tinydb.table import Table
+from __future__ import annotations
+from typing import Any, Dict, Callable, Iterator, Mapping, MutableMapping, Iterable, Tuple
+from tinydb.table import Table, Document
+
+from .TinyDBBufferedStorage import TinyDBBufferedStorage
+
+
+class _TrackedDocument(MutableMapping):
+	"""	Wrapper for a raw document that records in the change tracker when the document is written to.
+	"""
+
+	__slots__ = (
+		'doc',
+		'docID',
+		'tracker',
+	)
+	""" Define slots for instance variables. """
+
+
+	def __init__(self, doc:Dict[str, Any], docID:str, tracker:_ChangeTracker) -> None:
+		"""	Initialize the wrapper.
+
+			Args:
+				doc: The raw document.
+				docID: The ID of the document.
+				tracker: The change tracker that records the write access.
+		"""
+		self.doc = doc
+		""" The raw document. """
+		self.docID = docID
+		""" The ID of the document. """
+		self.tracker = tracker
+		""" The change tracker that records the write access. """
+
+
+	def __getitem__(self, key:str) -> Any:
+		return self.doc[key]
+
+
+	def __setitem__(self, key:str, value:Any) -> None:
+		self.doc[key] = value
+		self.tracker.modified[self.docID] = None
+
+
+	def __delitem__(self, key:str) -> None:
+		del self.doc[key]
+		self.tracker.modified[self.docID] = None
+
+
+	def __contains__(self, key:object) -> bool:
+		return key in self.doc
+
+
+	def __iter__(self) -> Iterator[str]:
+		return iter(self.doc)
+
+
+	def __len__(self) -> int:
+		return len(self.doc)
+
+
+class _ChangeTracker(MutableMapping):
+	"""	Wrapper for the raw data of a table that records which documents are changed by an update operation.
+
+		Documents that are assigned or removed are recorded directly. Documents that are accessed, e.g.
+		to update them or to evaluate a condition, are wrapped, and recorded when they are written to.
+		Documents are not compared with their original content, because callers may already have changed
+		nested values, e.g. the list of child resources, in place before they update a document.
+	"""
+
+	__slots__ = (
+		'table',
+		'upserted',
+		'removed',
+		'modified',
+		'cleared',
+	)
+	""" Define slots for instance variables. """
+
+
+	def __init__(self, table:Dict[str, Any]) -> None:
+		"""	Initialize the tracker.
+
+			Args:
+				table: The raw table data.
+		"""
+		self.table = table
+		""" The raw table data. """
+		self.upserted:Dict[str, None] = {}
+		""" IDs of assigned documents. """
+		self.removed:Dict[str, None] = {}
+		""" IDs of removed documents. """
+		self.modified:Dict[str, None] = {}
+		""" IDs of documents that were written to. """
+		self.cleared = False
+		""" Indicator that the table was cleared. """
+
+
+	def __getitem__(self, docID:str) -> Any:
+		return _TrackedDocument(self.table[docID], docID, self)
+
+
+	def __setitem__(self, docID:str, doc:Any) -> None:
+		self.table[docID] = doc
+		self.upserted[docID] = None
+		self.removed.pop(docID, None)
+		self.modified.pop(docID, None)
+
+
+	def __delitem__(self, docID:str) -> None:
+		del self.table[docID]
+		self.removed[docID] = None
+		self.upserted.pop(docID, None)
+		self.modified.pop(docID, None)
+
+
+	def __contains__(self, docID:object) -> bool:
+		return docID in self.table
+
+
+	def __iter__(self) -> Iterator[str]:
+		return iter(self.table)
+
+
+	def __len__(self) -> int:
+		return len(self.table)
+
+
+	def clear(self) -> None:
+		self.table.clear()
+		self.cleared = True
+		self.upserted.clear()
+		self.removed.clear()
+		self.modified.clear()
+
+
+	def changes(self) -> Tuple[list[str], list[str]]:
+		"""	Return the changed documents.
+
+			Return:
+				Tuple of the IDs of the inserted or updated documents, and the IDs of the removed documents.
+		"""
+		return list(self.upserted) + [ docID for docID in self.modified if docID not in self.upserted ], list(self.removed)
+
 
 class TinyDBBetterTable(Table):
 	"""	This class is an add-on to TinyDB's *Table* class. It removes some computations that are not
@@ -31,6 +173,24 @@ class TinyDBBetterTable(Table):
 		table.document_id_class = str				# type:ignore[assignment]
 
 
+	def getDocuments(self, docIDs:Iterable[str]) -> list[Document]:
+		"""	Return the documents for a list of document IDs.
+
+			In contrast to *get(doc_ids=...)*, this method does not iterate over the whole table,
+			but looks up each document ID directly. 
+
+			Args:
+				docIDs: The IDs of the documents to return.
+
+			Returns:
+				List of documents in the order of *docIDs*. Unknown document IDs are skipped.
+		"""
+		table = self._read_table()
+		return [ self.document_class(doc, docID)	# type:ignore[arg-type]	# document IDs are strings
+				 for docID in docIDs 
+				 if (doc := table.get(docID)) is not None ]
+
+
 	# Overload
 	def _get_next_id(self) -> str:
 		"""	Return the ID for a newly inserted document. This method overloads the original method
@@ -55,7 +215,20 @@ class TinyDBBetterTable(Table):
 
 		As a further optimization, we don't convert the documents into the
 		document class, as the table data will *not* be returned to the user.
+
+		If the storage is a `TinyDBBufferedStorage` in journal mode, then the
+		changed documents are recorded and only those are passed to the storage.
 		"""
+		if isinstance(self._storage, TinyDBBufferedStorage) and self._storage.journal:
+			with self._storage.lock:
+				tables = self._storage.read()
+				table = tables.setdefault(self.name, {})
+				tracker = _ChangeTracker(table)
+				updater(tracker) # type:ignore[arg-type]
+				upserted, removed = tracker.changes()
+				self._storage.writeChanges(tables, self.name, upserted, removed, tracker.cleared)
+			self.clear_cache()
+			return
 
 		tables = self._storage.read()
 
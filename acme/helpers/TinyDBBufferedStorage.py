@@ -8,14 +8,27 @@
 """
 
 import _thread as Thread
-from threading import Event
+import json, os
+from threading import Event, Lock
 from time import sleep
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable
 from tinydb.storages import JSONStorage
 
 
 class TinyDBBufferedStorage(JSONStorage):
 	"""	Storage driver class for TinyDB that implements a buffered disk write.
+
+		In the default mode the whole database is written to the database file after each burst of changes.
+
+		In *journal* mode only the changed documents are appended to a journal file next to the database file.
+		Each line in the journal is a JSON record that either upserts documents (*u*), deletes documents (*d*),
+		or clears a table (*c*). When the journal contains more than *journal_size* document changes, the database
+		is compacted: The complete database is written to a new database file, which atomically replaces the old one,
+		and the journal is truncated. At startup the journal is replayed on top of the database file. An incomplete
+		last journal record, e.g. after a crash, is discarded.
+
+		In journal mode the tables must report their changes via `writeChanges()` while holding the `lock`.
+		See `TinyDBBetterTable`.
 	"""
 
 	__slots__ = (
@@ -26,14 +39,32 @@ class TinyDBBufferedStorage(JSONStorage):
 		'_shutting_down',
 		'_changed',
 		'_data',
+		'_path',
+		'_encoding',
+		'journal',
+		'lock',
+		'_journalSize',
+		'_journalPath',
+		'_journalHandle',
+		'_journalRecords',
+		'_pendingChanges',
+		'_pendingClears',
+		'_fullWrite',
 	)
 	""" Define slots for instance variables. """
 	
 
-	def __init__(self, path:str, create_dirs:bool = False, encoding:str = None, access_mode:str = 'r+', write_delay:int = 1, **kwargs:Any) -> None:
+	def __init__(self, path:str, 
+			  		   create_dirs:bool = False, 
+					   encoding:str = None, 
+					   access_mode:str = 'r+', 
+					   write_delay:int = 1, 
+					   journal:bool = False, 
+					   journal_size:int = 10000, 
+					   **kwargs:Any) -> None:
 		"""	Initialization of the storage driver.
 
-			This initializer adds a new parameter *write_delay* to the initialization of TinyDB's *JSONStorage* base class.
+			This initializer adds new parameters *write_delay*, *journal* and *journal_size* to the initialization of TinyDB's *JSONStorage* base class.
 
 			Args:
 				path: Where to store the JSON data.
@@ -41,6 +72,8 @@ class TinyDBBufferedStorage(JSONStorage):
 				encoding: The encoding character set for the database file
 				create_dirs: Whether the directory structure to the database file should be created or not.
 				write_delay: Time to wait before writing a changed database buffer, in seconds.
+				journal: Append changed documents to a journal file instead of rewriting the whole database file.
+				journal_size: Number of document changes in the journal after which the database is compacted.
 				kwargs: Any other argument.
 		"""
 		super().__init__(path, create_dirs, encoding, access_mode, **kwargs)
@@ -59,12 +92,43 @@ class TinyDBBufferedStorage(JSONStorage):
 		""" Time to wait before writing a changed database buffer, in seconds. """
 		self._data:Dict[str, Dict[str, Any]] = {}
 		""" The actual database data, which is also strored in memory as a buffer. """
+		self._path = path
+		""" Path of the database file. """
+		self._encoding = encoding
+		""" The encoding character set for the database file. """
+		self.journal = journal
+		""" Indicator that changes are appended to the journal file instead of rewriting the database file. """
+		self.lock = Lock()
+		""" Lock to protect the in-memory data and the pending changes in journal mode. """
+		self._journalSize = journal_size
+		""" Number of document changes in the journal after which the database is compacted. """
+		self._journalPath = f'{os.path.splitext(path)[0]}.journal'
+		""" Path of the journal file. """
+		self._journalHandle = None
+		""" File handle of the journal file, opened for appending. """
+		self._journalRecords = 0
+		""" Number of document changes in the journal file. """
+		self._pendingChanges:Dict[str, Dict[str, bool]] = {}
+		""" Changed document IDs per table that are not yet written to the journal. *True* for upserts, *False* for deletions. """
+		self._pendingClears:set[str] = set()
+		""" Tables that were cleared since the last journal write. """
+		self._fullWrite = False
+		""" Indicator that the whole database must be written, because a change could not be tracked. """
 
-		# finishing init. Read the data for the first time
-		self._data = super().read()
+		# finishing init. Read the data for the first time and apply the journal, if any
+		self._data = super().read() or {}
+		replayed = self._replayJournal()
 
 		# only start the file write thread at all if the access mode is not read only
 		if self._mode == 'r+':
+			if self.journal:
+				self._journalHandle = open(self._journalPath, 'ab')
+				self._journalRecords = replayed
+			elif os.path.isfile(self._journalPath):
+				# The journal mode was switched off. Write the complete database and remove the journal
+				if replayed:
+					super().write(self._data)
+				os.remove(self._journalPath)
 			Thread.start_new_thread(self._fileWriter, ())
 
 
@@ -73,6 +137,9 @@ class TinyDBBufferedStorage(JSONStorage):
 
 			This is not done directly, but it is indicated that the data has changed and should be written during
 			the next phase of the buffered write.
+
+			In journal mode this method is only called for changes that are not reported via `writeChanges()`, e.g.
+			when a table is dropped. The whole database is then written during the next write phase.
 		
 			Args:
 				data: The current state of the database.
@@ -80,6 +147,39 @@ class TinyDBBufferedStorage(JSONStorage):
 		if not self._mode == "r+":
 			raise PermissionError('DB Storage is openend as read-only')
 		self._data = data
+		self._fullWrite = self.journal
+		self._changed = True
+		self._writeEvent.set()
+
+
+	def writeChanges(self, data:Dict[str, Dict[str, Any]], 
+						   table:str, 
+						   upserted:Iterable[str], 
+						   removed:Iterable[str], 
+						   cleared:bool) -> None:
+		"""	Record the changed documents of a table to be written to the journal during the next
+			phase of the buffered write.
+		
+			The caller must hold the `lock`.
+
+			Args:
+				data: The current state of the database.
+				table: The name of the changed table.
+				upserted: IDs of inserted or updated documents.
+				removed: IDs of removed documents.
+				cleared: Indicator that the table was cleared before the other changes were applied.
+		"""
+		if not self._mode == "r+":
+			raise PermissionError('DB Storage is openend as read-only')
+		self._data = data
+		if cleared:
+			self._pendingClears.add(table)
+			self._pendingChanges[table] = {}
+		changes = self._pendingChanges.setdefault(table, {})
+		for docID in upserted:
+			changes[docID] = True
+		for docID in removed:
+			changes[docID] = False
 		self._changed = True
 		self._writeEvent.set()
 
@@ -88,7 +188,7 @@ class TinyDBBufferedStorage(JSONStorage):
 		"""	Worker for the file writer thread.
 		"""
 		self._shutdownLock.acquire()
-		self._writeEvent.clear()
+		# Don't clear the write event here. A write that happened before this thread started would be lost otherwise
 		while self._running:
 
 			if self._writeEvent.wait() and self._changed:
@@ -101,13 +201,117 @@ class TinyDBBufferedStorage(JSONStorage):
 						break
 					sleep(1)
 						
-				self._changed = False
-				super().write(self._data)
+				# Clear the event before writing, so that changes during the write are not lost
 				self._writeEvent.clear()
+				self._changed = False
+				if self.journal:
+					self._writeJournal()
+				else:
+					super().write(self._data)
 
 		self._shutdownLock.release()
 
 
+	def _writeJournal(self) -> None:
+		"""	Append the pending changes to the journal file, or compact the database if the journal
+			is full or the whole database must be written.
+		"""
+		with self.lock:
+			if self._fullWrite or self._journalRecords >= self._journalSize:
+				self._compact()
+				return
+			
+			# Serialize the changed documents while holding the lock. The documents may be changed by other threads otherwise
+			lines:list[str] = []
+			records = 0
+			for table in self._pendingClears:
+				lines.append(json.dumps({ 't': table, 'c': True }))
+			for table, changes in self._pendingChanges.items():
+				tableData = self._data.get(table, {})
+				upserts = { docID: doc 
+							for docID, isUpsert in changes.items() 
+							if isUpsert and (doc := tableData.get(docID)) is not None }
+				deletes = [ docID for docID in changes if docID not in upserts ]
+				if upserts:
+					lines.append(json.dumps({ 't': table, 'u': upserts }))
+				if deletes:
+					lines.append(json.dumps({ 't': table, 'd': deletes }))
+				records += len(changes)
+			self._pendingClears.clear()
+			self._pendingChanges.clear()
+
+		if lines:
+			self._journalHandle.write(''.join(f'{line}\n' for line in lines).encode(self._encoding or 'utf-8'))
+			self._journalHandle.flush()
+			os.fsync(self._journalHandle.fileno())
+			self._journalRecords += records
+
+
+	def _compact(self) -> None:
+		"""	Write the whole database to a new database file and truncate the journal.
+
+			The new database file replaces the old file atomically. If the CSE stops before the
+			journal is truncated, then replaying the journal on top of the new database file
+			results in the same state.
+
+			The caller must hold the `lock`.
+		"""
+		self._fullWrite = False
+		self._pendingClears.clear()
+		self._pendingChanges.clear()
+
+		tmpPath = f'{self._path}.tmp'
+		with open(tmpPath, 'w', encoding = self._encoding) as tmpFile:
+			tmpFile.write(json.dumps(self._data, **self.kwargs))
+			tmpFile.flush()
+			os.fsync(tmpFile.fileno())
+		self._handle.close()
+		os.replace(tmpPath, self._path)
+		self._handle = open(self._path, mode = self._mode, encoding = self._encoding)
+
+		self._journalHandle.truncate(0)
+		self._journalHandle.flush()
+		os.fsync(self._journalHandle.fileno())
+		self._journalRecords = 0
+
+
+	def _replayJournal(self) -> int:
+		"""	Apply the records of an existing journal file to the in-memory data.
+
+			An incomplete or unreadable record stops the replay. It and all following data are
+			removed from the journal file.
+
+			Return:
+				Number of replayed document changes.
+		"""
+		if not os.path.isfile(self._journalPath):
+			return 0
+		
+		records = 0
+		validSize = 0
+		with open(self._journalPath, 'rb') as journalFile:
+			for line in journalFile:
+				if not line.endswith(b'\n'):
+					break	# incomplete last record
+				try:
+					record = json.loads(line.decode(self._encoding or 'utf-8'))
+				except ValueError:
+					break
+				table = self._data.setdefault(record['t'], {})
+				if record.get('c'):
+					table.clear()
+				for docID, doc in record.get('u', {}).items():
+					table[docID] = doc
+				for docID in record.get('d', []):
+					table.pop(docID, None)
+				records += len(record.get('u', {})) + len(record.get('d', []))
+				validSize += len(line)
+		
+		if self._mode == 'r+' and os.path.getsize(self._journalPath) > validSize:
+			os.truncate(self._journalPath, validSize)
+		return records
+
+
 	def read(self) -> Optional[Dict[str, Dict[str, Any]]]:
 		"""	Read the current state.
 
@@ -133,4 +337,6 @@ class TinyDBBufferedStorage(JSONStorage):
 		if self._handle != None:
 			self._handle.flush()
 			self._handle.close()
+		if self._journalHandle != None:
+			self._journalHandle.close()
 
@@ -0,0 +1,150 @@
+#
+#	TinyDBFieldIndex.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+"""	This module provides in-memory hash indexes for attributes of the documents of a TinyDB table.
+"""
+
+from __future__ import annotations
+from typing import Any, Hashable, Mapping, Optional, Sequence, Tuple
+
+
+class TinyDBFieldIndex(object):
+	"""	In-memory hash indexes for one or more fields of the documents of a TinyDB table.
+
+		Each indexed field is either a single attribute name (e.g. *pi*) or a tuple of attribute
+		names for a compound index (e.g. *(pi, ty)*). For each field the index maps the field's
+		value to the document IDs of the documents that have this value. Documents that don't have
+		an indexed attribute are not added to that field's index.
+
+		The document IDs per value are kept in insertion order, so that lookups return the documents
+		in the same order as a table scan would.
+
+		The index is not thread-safe. It must be protected by the same lock as the table it indexes.
+	"""
+
+	__slots__ = (
+		'fields',
+		'_indexes',
+		'_keys',
+	)
+	""" Define slots for instance variables. """
+
+
+	def __init__(self, fields:Sequence[str|Tuple[str, ...]]) -> None:
+		"""	Initialization of an empty index.
+
+			Args:
+				fields: The attribute names, or tuples of attribute names for compound indexes, to index.
+		"""
+		self.fields = tuple(fields)
+		""" The indexed fields. """
+		self._indexes:dict[str|Tuple[str, ...], dict[Hashable, dict[str, None]]] = { f: {} for f in self.fields }
+		""" Mapping of field -> value -> ordered set (dict) of document IDs. """
+		self._keys:dict[str, Tuple[Optional[Hashable], ...]] = {}
+		""" Mapping of document ID to the indexed values of that document, in the order of *fields*. """
+
+
+	def __len__(self) -> int:
+		return len(self._keys)
+
+
+	def add(self, docID:str, doc:Mapping[str, Any]) -> None:
+		"""	Add a document to the index, or update the index entries of an already indexed document.
+
+			Args:
+				docID: The document ID.
+				doc: The document.
+		"""
+		keys = tuple(self._value(doc, f) for f in self.fields)
+		if (oldKeys := self._keys.get(docID)) == keys:
+			return	# Nothing changed. Keep the position in the index
+		for field, oldKey, key in zip(self.fields, oldKeys or (None,) * len(self.fields), keys):
+			if oldKey == key:
+				continue
+			if oldKey is not None:
+				self._discard(field, oldKey, docID)
+			if key is not None:
+				self._indexes[field].setdefault(key, {})[docID] = None
+		self._keys[docID] = keys
+
+
+	def remove(self, docID:str) -> None:
+		"""	Remove a document from the index.
+
+			Args:
+				docID: The document ID. Unknown document IDs are ignored.
+		"""
+		if (keys := self._keys.pop(docID, None)) is None:
+			return
+		for field, key in zip(self.fields, keys):
+			if key is not None:
+				self._discard(field, key, docID)
+
+
+	def get(self, field:str|Tuple[str, ...], value:Hashable) -> list[str]:
+		"""	Return the IDs of the documents with the given value for an indexed field.
+
+			Args:
+				field: An indexed field.
+				value: The value to look up. For compound fields this is a tuple of values.
+
+			Return:
+				List of document IDs, in insertion order.
+		"""
+		return list(self._indexes[field].get(value, ()))
+
+
+	def count(self, field:str|Tuple[str, ...], value:Hashable) -> int:
+		"""	Return the number of documents with the given value for an indexed field.
+
+			Args:
+				field: An indexed field.
+				value: The value to look up. For compound fields this is a tuple of values.
+
+			Return:
+				Number of documents.
+		"""
+		return len(self._indexes[field].get(value, ()))
+
+
+	def clear(self) -> None:
+		"""	Remove all documents from the index.
+		"""
+		for index in self._indexes.values():
+			index.clear()
+		self._keys.clear()
+
+
+	def _value(self, doc:Mapping[str, Any], field:str|Tuple[str, ...]) -> Optional[Hashable]:
+		"""	Return the value of a field in a document.
+
+			Args:
+				doc: The document.
+				field: The field.
+
+			Return:
+				The hashable value, or None if the document doesn't have the attribute(s) or the value is not hashable.
+		"""
+		if isinstance(field, tuple):
+			values = tuple(doc.get(f) for f in field)
+			return None if None in values or not all(isinstance(v, Hashable) for v in values) else values
+		value = doc.get(field)
+		return value if isinstance(value, Hashable) else None
+
+
+	def _discard(self, field:str|Tuple[str, ...], key:Hashable, docID:str) -> None:
+		"""	Remove a document ID from a field's index entry. Empty entries are removed.
+
+			Args:
+				field: The field.
+				key: The field value.
+				docID: The document ID.
+		"""
+		index = self._indexes[field]
+		if (ids := index.get(key)) is not None:
+			ids.pop(docID, None)
+			if not ids:
+				del index[key]
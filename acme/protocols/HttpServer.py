@@ -10,7 +10,7 @@
 from __future__ import annotations
 from typing import Any, Callable, cast, Optional
 
-import logging, sys, urllib3, re
+import logging, sys, urllib3, re, time
 from copy import deepcopy
 
 import flask
@@ -35,10 +35,11 @@ from ..etc.DateUtils import timeUntilAbsRelTimestamp, getResourceDate, rfc1123Da
 from ..etc.RequestUtils import toHttpUrl, serializeData, deserializeData, requestFromResult, createPositiveResponseResult
 from ..helpers.NetworkTools import isTCPPortAvailable
 from ..runtime.Configuration import Configuration
-from ..runtime import CSE
+from ..runtime import CSE, Statistics
 from ..webui.webUI import WebUI
 from ..helpers import TextTools as TextTools
 from ..helpers.BackgroundWorker import BackgroundWorker, BackgroundWorkerPool
+from ..helpers.HttpSessionPool import HttpSessionPool
 from ..helpers.Interpreter import SType
 from ..runtime.Logging import Logging as L, LogLevel
 
@@ -77,6 +78,9 @@ class HttpServer(object):
 		'wsgiEnable',
 		'wsgiThreadPoolSize',
 		'wsgiConnectionLimit',
+		'clientPoolSize',
+		'clientIdleTimeout',
+		'sessionPool',
 		'backgroundActor',
 		'serverID',
 		'_responseHeaders',
@@ -106,6 +110,9 @@ class HttpServer(object):
 		self.isStopped					 = False
 		self.backgroundActor:BackgroundWorker = None
 
+		# Keep-alive sessions for outgoing requests, one for each target host
+		self.sessionPool = HttpSessionPool(self.clientPoolSize, self.clientIdleTimeout)
+
 		self.serverID			= f'ACME {Constants.version}' 	# The server's ID for http response headers
 		self._responseHeaders	= {'Server' : self.serverID}	# Additional headers for other requests
 
@@ -143,6 +150,12 @@ class HttpServer(object):
 			self.addEndpoint(structureEndpoint, handler = self.handleStructure, methods  =['GET'], strictSlashes = False)
 			self.addEndpoint(f'{structureEndpoint}/<path:path>', handler = self.handleStructure, methods = ['GET', 'PUT'])
 
+		# Enable the metrics endpoint
+		if Configuration.get('http.enableMetricsEndpoint'):
+			metricsEndpoint = f'{self.rootPath}/__metrics__'
+			L.isInfo and L.log(f'Registering metrics endpoint at: {metricsEndpoint}')
+			self.addEndpoint(metricsEndpoint, handler = self.handleMetrics, methods = ['GET'], strictSlashes = False)
+
 		# Enable the upper tester endpoint
 		if Configuration.get('http.enableUpperTesterEndpoint'):
 			upperTesterEndpoint = f'{self.rootPath}/__ut__'
@@ -187,6 +200,8 @@ class HttpServer(object):
 		self.wsgiEnable			= Configuration.get('http.wsgi.enable')
 		self.wsgiThreadPoolSize	= Configuration.get('http.wsgi.threadPoolSize')
 		self.wsgiConnectionLimit= Configuration.get('http.wsgi.connectionLimit')
+		self.clientPoolSize		= Configuration.get('http.client.poolSize')
+		self.clientIdleTimeout	= Configuration.get('http.client.idleTimeout')
 
 
 	def configUpdate(self, name:str, 
@@ -234,6 +249,7 @@ class HttpServer(object):
 		"""
 		L.isInfo and L.log('HttpServer shut down')
 		self.isStopped = True
+		self.sessionPool.close()
 		return True
 	
 
@@ -306,6 +322,7 @@ class HttpServer(object):
 			build the internal strutures. Then, depending on the operation,
 			call the associated request handler.
 		"""
+		start = time.perf_counter()
 		L.isDebug and L.logDebug(f'==> HTTP Request: {path}') 	# path = request.path  w/o the root
 		L.isDebug and L.logDebug(f'Operation: {operation.name}')
 		L.isDebug and L.logDebug(f'Headers: \n{str(request.headers).rstrip()}')
@@ -341,7 +358,9 @@ class HttpServer(object):
 		except Exception as e:
 			responseResult = Result.exceptionToResult(e)
 		# L.inspect(responseResult)
-		return self._prepareResponse(responseResult, dissectResult.request)
+		response = self._prepareResponse(responseResult, dissectResult.request)
+		CSE.statistics.recordLatency(Statistics.latencyBinding, ('http', operation.name), start)
+		return response
 
 
 	def handleGET(self, path:Optional[str] = None) -> Response:
@@ -422,6 +441,22 @@ class HttpServer(object):
 		return Response(response = 'unsupported', status = 422, headers = self._responseHeaders)
 
 
+	def handleMetrics(self, path:Optional[str] = None) -> Response:
+		"""	Handle a metrics request. Return the CSE's latency histograms and statistics
+			in the OpenMetrics text format.
+		"""
+		if self.isStopped:
+			return Response('Service not available', status = 503)
+
+		# Check, when authentication is enabled, the user is authorized, else return status 401
+		if not self.handleAuthentication():
+			return Response(status = 401)
+
+		return Response(response = CSE.statistics.getOpenMetrics(), 
+						headers = self._responseHeaders,
+						content_type = 'application/openmetrics-text; version=1.0.0; charset=utf-8')
+
+
 	def handleUpperTester(self, path:Optional[str] = None) -> Response:
 		"""	Handle a Upper Tester request. See TS-0019 for details.
 		"""
@@ -475,11 +510,11 @@ class HttpServer(object):
 	#
 
 	operation2method = {
-		Operation.CREATE	: requests.post,
-		Operation.RETRIEVE	: requests.get,
-		Operation.UPDATE 	: requests.put,
-		Operation.DELETE 	: requests.delete,
-		Operation.NOTIFY 	: requests.post
+		Operation.CREATE	: 'POST',
+		Operation.RETRIEVE	: 'GET',
+		Operation.UPDATE 	: 'PUT',
+		Operation.DELETE 	: 'DELETE',
+		Operation.NOTIFY 	: 'POST'
 	}
 
 	def _prepContent(self, content:bytes|str|Any, ct:ContentSerializationType) -> str:
@@ -497,7 +532,7 @@ class HttpServer(object):
 		timeout:float = None
 
 		# Set the request method
-		method:Callable = self.operation2method[request.op] 	# type: ignore[assignment]
+		method = self.operation2method[request.op]
 
 		# Add the to to the base url
 		if request.to:
@@ -582,18 +617,19 @@ class HttpServer(object):
 		# ! Don't forget: requests are done through the request library, not flask.
 		# ! The attribute names are different
 		try:
-			L.isDebug and L.logDebug(f'Sending request: {method.__name__.upper()} {url}')
+			L.isDebug and L.logDebug(f'Sending request: {method} {url}')
 			if ct == ContentSerializationType.CBOR:
 				L.isDebug and L.logDebug(f'HTTP Request ==>:\nHeaders: {hds}\nBody: \n{self._prepContent(data, ct)}\n=>\n{str(data) if data else ""}\n')
 			else:
 				L.isDebug and L.logDebug(f'HTTP Request ==>:\nHeaders: {hds}\nBody: \n{self._prepContent(data, ct)}\n')
 			
-			# Actual sending the request
-			r = method(url, 
-					   data = data,
-					   headers = hds,
-					   verify = CSE.security.verifyCertificateHttp,
-					   timeout = timeout)
+			# Actual sending the request. The session pool reuses open connections to the target host
+			r = self.sessionPool.request(method, 
+										 url, 
+										 data = data,
+										 headers = hds,
+										 verify = CSE.security.verifyCertificateHttp,
+										 timeout = timeout)
 		
 			# Ignore the response to notifications in some cases
 			if ignoreResponse and request.op == Operation.NOTIFY:
@@ -629,6 +665,15 @@ class HttpServer(object):
 		res = Result(rsc = resp.rsc, data = resp.pc, request = resp)
 		self._eventResponseReceived(resp)
 		return res
+
+
+	def getRuntimeStatistics(self) -> dict[str, int]:
+		"""	Return the statistics of the session pool for outgoing requests.
+
+			Return:
+				Dictionary with the number of sessions, requests, hits, misses and evicted sessions.
+		"""
+		return self.sessionPool.getStatistics()
 		
 	#########################################################################
 
@@ -10,18 +10,18 @@
 from __future__ import annotations
 from typing import Tuple, cast, Dict, Optional, Any, Union
 
+import time
 from urllib.parse import unquote
 
 from ..etc.Types import Operation, CSERequest, ContentSerializationType, RequestType, ResourceTypes, Result, ResponseStatusCode, ResourceTypes
 from ..etc.ResponseStatusCodes import ResponseException
 from ..etc.RequestUtils import prepareResultForSending, createRequestResultFromURI
-from ..etc.DateUtils import waitFor
 from ..etc.ACMEUtils import csiFromSPRelative
 from ..etc.Utils import renameThread
 from ..helpers.MQTTConnection import MQTTConnection, MQTTHandler, idToMQTT, idToMQTTClientID
 from ..helpers import TextTools
 from ..runtime.Configuration import Configuration
-from ..runtime import CSE
+from ..runtime import CSE, Statistics
 from ..runtime.Logging import Logging as L
 
 
@@ -62,9 +62,11 @@ class MQTTClientHandler(MQTTHandler):
 		"""
 		super().onConnect(connection)
 		L.isDebug and L.logDebug('Connected to MQTT broker')
-		connection.subscribeTopic(f'{self.topicPrefix}/oneM2M/req/+/{idToMQTT(CSE.cseCsi)}/#', self._requestCB)					# Subscribe to general requests
-		connection.subscribeTopic(f'{self.topicPrefix}/oneM2M/resp/{idToMQTT(CSE.cseCsi)}/+/#', self._responseCB)				# Subscribe to responses
-		connection.subscribeTopic(f'{self.topicPrefix}/oneM2M/reg_req/+/{idToMQTT(CSE.cseCsi)}/#', self._registrationRequestCB)	# Subscribe to registration requests
+		# Requests are handled by the bounded "actors" executor. Responses are handled in their own threads,
+		# because requests that are handled by the executor might wait for them.
+		connection.subscribeTopic(f'{self.topicPrefix}/oneM2M/req/+/{idToMQTT(CSE.cseCsi)}/#', self._requestCB, 'actors')					# Subscribe to general requests
+		connection.subscribeTopic(f'{self.topicPrefix}/oneM2M/resp/{idToMQTT(CSE.cseCsi)}/+/#', self._responseCB)							# Subscribe to responses
+		connection.subscribeTopic(f'{self.topicPrefix}/oneM2M/reg_req/+/{idToMQTT(CSE.cseCsi)}/#', self._registrationRequestCB, 'actors')	# Subscribe to registration requests
 		return True
 
 
@@ -183,6 +185,8 @@ class MQTTClientHandler(MQTTHandler):
 				L.isDebug and L.logDebug(f'Body: \n{TextTools.toHex(cast(bytes, data))}\n=>\n{result.request.originalRequest}')
 					
 
+		start = time.perf_counter()
+
 		# SP relative of for : /cseid/aei
 		L.isDebug and L.logDebug(f'==> MQTT Request: {topic}')
 
@@ -278,6 +282,7 @@ class MQTTClientHandler(MQTTHandler):
 
 		#	Transform request to oneM2M request
 		_sendResponse(responseResult)
+		CSE.statistics.recordLatency(Statistics.latencyBinding, ('mqtt', request.op.name), start)
 	
 
 ##############################################################################
@@ -400,14 +405,18 @@ class MQTTClient(object):
 	def isFullySubscribed(self) -> bool:
 		"""	Check whether this mqttConnection is fully subscribed.
 		"""
-		return waitFor(self.requestTimeout, lambda:self.mqttConnection.isConnected and self.mqttConnection.subscribedCount == 3)	# currently 3 topics
+		if not self.mqttConnection:
+			return False
+		return self.mqttConnection.waitForState(lambda:self.mqttConnection.isConnected and self.mqttConnection.subscribedCount == 3, self.requestTimeout)	# currently 3 topics
 
 
 	def isConnected(self) -> bool:
 		"""	Check whether the MQTT client is connected to a broker. Wait for a moment
 			to take startup connection into account.
 		"""
-		return waitFor(self.requestTimeout, lambda:self.mqttConnection.isConnected)
+		if not self.mqttConnection:
+			return False
+		return self.mqttConnection.waitForState(lambda:self.mqttConnection.isConnected, self.requestTimeout)
 
 
 	def connectToMqttBroker(self, address:str, port:int, useTLS:bool, username:Optional[str], password:Optional[str]) -> Optional[MQTTConnection]:
@@ -526,7 +535,8 @@ class MQTTClient(object):
 													  password = mqttPassword)
 
 			# Wait a moment until we are connected.
-			waitFor(self.requestTimeout, lambda: mqttConnection is not None and mqttConnection.isConnected)
+			if mqttConnection:
+				mqttConnection.waitForState(lambda: mqttConnection.isConnected, self.requestTimeout)
 
 		# We are not connected, so -> fail
 		if not mqttConnection or not mqttConnection.isConnected:
@@ -536,10 +546,20 @@ class MQTTClient(object):
 		# Publish the request and wait for the response.
 		# Then return the response as result
 		logRequest(preq, _data, topic, isResponse = False, isIncoming = False)
-		# mqttConnection.publish(topic, cast(bytes, cast(Tuple, preq.data)[1]))
-		mqttConnection.publish(topic, _data)
 
+		# Register the expected response before publishing, so that an early response is not lost.
 		# Don't wait for the response if the request is for a notification and a direct URL is used
+		if not (ignoreResponse and req.request.op == Operation.NOTIFY):
+			CSE.request.expectResponse(preq.request.rqi)
+
+		# mqttConnection.publish(topic, cast(bytes, cast(Tuple, preq.data)[1]))
+		try:
+			mqttConnection.publish(topic, _data)
+		except Exception as e:
+			CSE.request.cancelResponse(preq.request.rqi)
+			return Result(rsc = ResponseStatusCode.INTERNAL_SERVER_ERROR, 
+						  dbg = L.logWarn(f'Error publishing MQTT request: {e}'))
+
 		if ignoreResponse and req.request.op == Operation.NOTIFY:
 			L.isDebug and L.logDebug('MQTT: Ignoring response to notification')
 			return Result(rsc = ResponseStatusCode.OK)
@@ -9,7 +9,7 @@
 
 from __future__ import annotations
 from typing import Optional, Any, Tuple
-import logging, uuid
+import logging, uuid, time
 
 from websockets.sync.connection import Connection as WSConnection
 from websockets.sync.server import WebSocketServer as WSServer, serve, ServerConnection
@@ -26,7 +26,7 @@ from ..etc.Utils import renameThread
 from ..etc.Types import ContentSerializationType, Result, CSERequest, Operation, ResourceTypes, RequestType
 from ..etc.ResponseStatusCodes import ResponseStatusCode, ResponseException, TARGET_NOT_REACHABLE
 from ..runtime.Configuration import Configuration
-from ..runtime import CSE
+from ..runtime import CSE, Statistics
 from ..resources.Resource import Resource
 from ..runtime.Logging import Logging as L
 
@@ -450,6 +450,7 @@ class WebSocketServer(object):
 				wsOriginator: The originator of the connection.
 				contentType: The content type.
 		"""
+		start = time.perf_counter()
 		if isinstance(message, str):
 			message = message.encode()	# Encode to bytes
 
@@ -527,6 +528,8 @@ class WebSocketServer(object):
 
 		L.logRequest(_r, _data) # type:ignore [arg-type]
 		websocket.send(_data)
+		if request and request.op:
+			CSE.statistics.recordLatency(Statistics.latencyBinding, ('ws', request.op.name), start)
 	
 
 	def sendWSRequest(self, request:CSERequest, url:str, ignoreResponse:bool) -> Result:
@@ -622,8 +625,11 @@ class WebSocketServer(object):
 			message = prepareResultForSending(req)[1]
 			L.isDebug and L.logDebug(f'WS Request ==>: {targetOriginator if not isSenderWS else self._getWSSendingTargetName(targetOriginator)}')
 			L.isDebug and L.logDebug(f'Body: {message!r}')
+			if not (ignoreResponse and request.op == Operation.NOTIFY):
+				CSE.request.expectResponse(req.request.rqi)	# Register before sending, so that an early response is not lost
 			websocket.send(message)
 		except Exception as e:
+			CSE.request.cancelResponse(req.request.rqi)
 			disconnectWS(targetOriginator, isSenderWS)
 			return Result(rsc = ResponseStatusCode.INTERNAL_SERVER_ERROR, dbg = f'Error sending WS request: {e}')	
 
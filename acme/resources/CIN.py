@@ -78,10 +78,9 @@ class CIN(AnnounceableResource):
 	def activate(self, parentResource:Resource, originator:str) -> None:
 		super().activate(parentResource, originator)
 
-		# increment parent container's state tag
+		# increment parent container's state tag. Concurrent requests might increment it as well
 		parentResource = parentResource.dbReload()	# Read the resource again in case it was updated in the DB
-		st = parentResource.st + 1
-		parentResource.setAttribute('st',st)
+		st = CSE.storage.updateResourceAttributes(parentResource, lambda doc: { 'st': doc['st'] + 1 })['st']
 		parentResource.dbUpdate(True)
 
 		# Set stateTag attribute in self as well
@@ -10,10 +10,10 @@
 """
 
 from __future__ import annotations
-from typing import Optional, cast
+from typing import Optional
 
-from ..etc.Types import AttributePolicyDict, ResourceTypes, Result, JSON, JSONLIST
-from ..etc.ResponseStatusCodes import NOT_ACCEPTABLE
+from ..etc.Types import AttributePolicyDict, ResourceTypes, Result, JSON
+from ..etc.ResponseStatusCodes import NOT_ACCEPTABLE, NOT_FOUND
 from ..etc.DateUtils import getResourceDate
 from ..helpers.TextTools import findXPath
 from ..runtime import CSE
@@ -131,7 +131,7 @@ class CNT(ContainerResource):
 			CSE.dispatcher.deleteChildResources(self, originator, ty = ResourceTypes.CIN)
 
 		# Update stateTag when modified
-		self.setAttribute('st', self.st + 1)
+		CSE.storage.updateResourceAttributes(self, lambda doc: { 'st': doc['st'] + 1 })
 
 
 	def childWillBeAdded(self, childResource:Resource, originator:str) -> None:
@@ -172,7 +172,7 @@ class CNT(ContainerResource):
 
 			# Send update event on behalf of the latest resources.
 			# The oldest resource might not be changed. That is handled in the validate() method.
-			CSE.event.changeResource(childResource, self.getLatestRI())	 # type: ignore [attr-defined]
+			CSE.storage.afterUnitOfWork(CSE.event.changeResource, childResource, self.getLatestRI())	 # type: ignore [attr-defined]
 
 
 
@@ -194,9 +194,6 @@ class CNT(ContainerResource):
 		self._validateChildren()
 
 
-	# TODO Align this and FCNT implementations
-	# TODO use raw for TS and TCNT
-	
 	def _validateChildren(self) -> None:
 		""" Internal validation and checks. This called more often then just from
 			the validate() method.
@@ -213,56 +210,38 @@ class CNT(ContainerResource):
 			self.dbUpdate(True)
 			return
 		
-		# TODO optimize the following a bit. 
-		# - only when cni/cbs > limits
-
-
-		# Only get the CINs in raw format. Instantiate them as resources if needed
-		cinsRaw = cast(JSONLIST, sorted(CSE.storage.directChildResources(self.ri, ResourceTypes.CIN, raw = True), key = lambda x: x['ct']))
-		cni = len(cinsRaw)			
+		# Get the number of instances and their sizes from the instance index, and
+		# determine the oldest <cin> that exceed the limits. The remaining <cin> are not retrieved.
 		cin:Resource = None
-
-		# Check number of instances
-		if mni is not None:
-			while cni > mni and cni > 0:
-				# Only instantiate the <cin> when needed here for deletion
-				cin = Factory.resourceFromDict(cinsRaw[0])
-				L.isDebug and L.logDebug(f'cni > mni: Removing <cin>: {cin.ri}')
+		for entry in CSE.storage.searchExcessInstances(self.ri, mni, mbs):
+			# Only instantiate the <cin> when needed here for deletion.
+			# A concurrent request may already have removed the same oldest <cin>
+			try:
+				_cin = CSE.storage.retrieveResource(ri = entry['ri'])
+				L.isDebug and L.logDebug(f'cni > mni or cbs > mbs: Removing <cin>: {_cin.ri}')
 				# remove oldest
 				# Deleting a child must not cause a notification for 'deleteDirectChild'.
 				# Don't do a delete check means that CNT.childRemoved() is not called, where subscriptions for 'deleteDirectChild'  is tested.
-				CSE.dispatcher.deleteLocalResource(cin, parentResource = self, doDeleteCheck = False)
-				del cinsRaw[0]	# Remove from list
-				cni -= 1	# decrement cni when deleting a <cin>
-
-		# Calculate cbs of remaining cins
-		cbs = sum([ each['cs'] for each in cinsRaw])
-
-		# check size
-		if mbs is not None:
-			while cbs > mbs and cbs > 0:
-				# Only instantiate the <cin> when needed here for deletion
-				cin = Factory.resourceFromDict(cinsRaw[0])
-				L.isDebug and L.logDebug(f'cbs > mbs: Removing <cin>: {cin.ri}')
-				# remove oldest
-				cbs -= cin.cs
-				# Deleting a child must not cause a notification for 'deleteDirectChild'.
-				# Don't do a delete check means that CNT.childRemoved() is not called, where subscriptions for 'deleteDirectChild'  is tested.
-				CSE.dispatcher.deleteLocalResource(cin, parentResource = self, doDeleteCheck = False)
-				del cinsRaw[0]	# Remove from list
-				cni -= 1	# decrement cni when deleting a <cin>
-
-		# Some attributes may have been updated, so store the resource 
-		self['cni'] = cni
-		self['cbs'] = cbs
+				CSE.dispatcher.deleteLocalResource(_cin, parentResource = self, doDeleteCheck = False)
+				cin = _cin
+			except NOT_FOUND:
+				L.isDebug and L.logDebug(f'<cin>: {entry["ri"]} already removed')
+
+		# Some attributes may have been updated, so store the resource. cni and cbs are taken from the instance
+		# index, because concurrent requests might have added or removed instances in the meantime
+		CSE.storage.updateResourceAttributes(self, lambda _: dict(zip(('cni', 'cbs'), CSE.storage.countInstances(self.ri))))
 		self.dbUpdate(True)
 
 		# If cin is not None anymore then we have a new "oldest" resource.
 		# cin is NOT the oldest resource, but the one that was deleted last. The new
-		# oldest resource is the first in the list of cinsRaw.
+		# oldest resource is the first one in the instance index.
 		# This means that we need to send an "update" event for the oldest resource.
-		if cin is not None and len(cinsRaw):
-			CSE.event.changeResource(Factory.resourceFromDict(cinsRaw[0]), self.getOldestRI())	 # type: ignore [attr-defined]
+		# A concurrent request may already have removed this <cin> as well. Then that request raises the event.
+		if cin is not None and (oldest := CSE.storage.searchOldestInstance(self.ri)):
+			try:
+				CSE.storage.afterUnitOfWork(CSE.event.changeResource, CSE.storage.retrieveResource(ri = oldest['ri']), self.getOldestRI())	 # type: ignore [attr-defined]
+			except NOT_FOUND:
+				L.isDebug and L.logDebug(f'<cin>: {oldest["ri"]} already removed')
 	
 		# End validating
 		self.__validating = False
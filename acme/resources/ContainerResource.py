@@ -86,19 +86,21 @@ class ContainerResource(AnnounceableResource):
 	
 	def instanceAdded(self, instance:Resource) -> None:
 		try:
-			self.setAttribute('cni', self.cni + 1)	# Increment cni because an instance is added
-			self.setAttribute('cbs', self.cbs + instance.cs) # Add to sum of cbs
+			# Increment cni and add to the sum of cbs because an instance is added. Concurrent requests might add instances as well
+			CSE.storage.updateResourceAttributes(self, lambda doc: { 'cni': doc['cni'] + 1, 
+																	 'cbs': doc['cbs'] + instance.cs })
 			self.dbUpdate(True)
-		except TypeError:
+		except (TypeError, KeyError):
 			pass # Ignore if cni or cbs is not set
 
 
 
 	def instanceRemoved(self, instance:Resource) -> None:
 		try:
-			self.setAttribute('cni', self.cni - 1)	# Decrement cni because an instance is added
-			self.setAttribute('cbs', self.cbs - instance.cs) # Substract from sum of cbs
+			# Decrement cni and substract from the sum of cbs because an instance is removed
+			CSE.storage.updateResourceAttributes(self, lambda doc: { 'cni': doc['cni'] - 1, 
+																	 'cbs': doc['cbs'] - instance.cs })
 			self.dbUpdate(True)
-		except TypeError:
+		except (TypeError, KeyError):
 			pass # Ignore if cni or cbs is not set
 
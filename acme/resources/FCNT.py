@@ -11,7 +11,7 @@ from __future__ import annotations
 from typing import Optional
 
 from ..etc.Types import AttributePolicyDict, ResourceTypes, JSON
-from ..etc.ResponseStatusCodes import OPERATION_NOT_ALLOWED, BAD_REQUEST
+from ..etc.ResponseStatusCodes import OPERATION_NOT_ALLOWED, BAD_REQUEST, NOT_FOUND
 from ..etc.ACMEUtils import getAttributeSize
 from ..etc.DateUtils import getResourceDate
 from ..runtime import CSE
@@ -145,7 +145,7 @@ class FCNT(ContainerResource):
 
 		# Send update event on behalf of the latest resources.
 		# The oldest resource might not be changed. That is handled in the validate() method.
-		CSE.event.changeResource(childResource, self.getLatestRI())	 # type: ignore [attr-defined]
+		CSE.storage.afterUnitOfWork(CSE.event.changeResource, childResource, self.getLatestRI())	 # type: ignore [attr-defined]
 
 
 
@@ -203,50 +203,36 @@ class FCNT(ContainerResource):
 			if not deletingFCI and (_updateCustomAttributes or dct is None or not self[self._hasFCI]):
 				self.addFlexContainerInstance(originator)
 			
-			fcis = self.flexContainerInstances()
-			cni = len(fcis)	# number of instances
+			# Get the number of instances and their sizes from the instance index, and
+			# determine the oldest <fci> that exceed the limits. The remaining <fci> are not retrieved.
 			fci:Resource = None
-
-			# check mni
-			if (mni := self.mni) is not None:	# is an int
-				mni = self.mni
-				while cni > mni and cni > 0:
-					fci = fcis[0]
-					L.isDebug and L.logDebug(f'cni > mni: Removing <fci>: {fci.ri}')
+			for entry in CSE.storage.searchExcessInstances(self.ri, self.mni, self.mbs):
+				# A concurrent request may already have removed the same oldest <fci>
+				try:
+					_fci = CSE.storage.retrieveResource(ri = entry['ri'])
+					L.isDebug and L.logDebug(f'cni > mni or cbs > mbs: Removing <fci>: {_fci.ri}')
 					# remove oldest
 					# Deleting a child must not cause a notification for 'deleteDirectChild'.
 					# Don't do a delete check means that FCNT.childRemoved() is not called, where subscriptions for 'deleteDirectChild'  is tested.
-					CSE.dispatcher.deleteLocalResource(fci, parentResource = self, doDeleteCheck = False)
-					del fcis[0]	# Remove from list
-					cni -= 1	# decrement cni when deleting a <fci>
-
-			# Calculate cbs
-			cbs = sum([ each.cs for each in fcis])
-
-			# check size
-			if (mbs := self.mbs) is not None:
-				while cbs > mbs and cbs > 0:
-					fci = fcis[0]
-					L.isDebug and L.logDebug(f'cbs > mbs: Removing <fci>: {fci.ri}')
-					# remove oldest
-					cbs -= fci.cs			
-					# Deleting a child must not cause a notification for 'deleteDirectChild'.
-					# Don't do a delete check means that FCNT.childRemoved() is not called, where subscriptions for 'deleteDirectChild'  is tested.
-					CSE.dispatcher.deleteLocalResource(fci, parentResource = self, doDeleteCheck = False)
-					cni -= 1	# again, decrement cbi when deleting a cni
+					CSE.dispatcher.deleteLocalResource(_fci, parentResource = self, doDeleteCheck = False)
+					fci = _fci
+				except NOT_FOUND:
+					L.isDebug and L.logDebug(f'<fci>: {entry["ri"]} already removed')
 
-				# Add "current" atribute, if it is not there
-				self.setAttribute('cbs', 0, overwrite = False)
-			
-			self.setAttribute('cni', cni)
-			self.setAttribute('cbs', cbs)
+			# cni and cbs are taken from the instance index, because concurrent requests might have 
+			# added or removed instances in the meantime
+			CSE.storage.updateResourceAttributes(self, lambda _: dict(zip(('cni', 'cbs'), CSE.storage.countInstances(self.ri))))
 
 			# If fci is not None anymore then we have a new "oldest" resource.
 			# fci is NOT the oldest resource, but the one that was deleted last. The new
-			# oldest resource is the first in the list of fcis.
+			# oldest resource is the first one in the instance index.
 			# This means that we need to send an "update" event for the oldest resource.
-			if fci is not None and len(fcis):
-				CSE.event.changeResource(fcis[0], self.getOldestRI())	# type: ignore [attr-defined]
+			# A concurrent request may already have removed this <fci> as well. Then that request raises the event.
+			if fci is not None and (oldest := CSE.storage.searchOldestInstance(self.ri)):
+				try:
+					CSE.storage.afterUnitOfWork(CSE.event.changeResource, CSE.storage.retrieveResource(ri = oldest['ri']), self.getOldestRI())	# type: ignore [attr-defined]
+				except NOT_FOUND:
+					L.isDebug and L.logDebug(f'<fci>: {oldest["ri"]} already removed')
 
 		else:
 			self._hasInstances = False	# Indicate that reqs for child resources is not given
@@ -288,8 +274,8 @@ class FCNT(ContainerResource):
 				dct['at'] = [ x for x in self['at'] if x.count('/') == 1 ]	# Only copy single csi in at
 
 		fciRes = Factory.resourceFromDict(resDict = { self.tpe : dct }, pi = self.ri, ty = ResourceTypes.FCI)
+		fciRes.setAttribute('cs', self.cs)	# Set before creation, because the cs is added to the instance index
 		CSE.dispatcher.createLocalResource(fciRes, self, originator = originator)
-		fciRes.setAttribute('cs', self.cs)
 		fciRes.setAttribute('org', originator)
 
 		# Check for mia handling
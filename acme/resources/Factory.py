@@ -21,7 +21,7 @@ from ..etc.Constants import Constants
 from ..runtime.Logging import Logging as L
 
 
-from ..resources.Resource import Resource
+from ..resources.Resource import Resource, sharedDictInstantiation
 from ..resources.ACP import ACP
 from ..resources.ACPAnnc import ACPAnnc
 from ..resources.ACTR import ACTR
@@ -206,7 +206,8 @@ def resourceFromDict(resDict:Optional[JSON] = {},
 					 pi:Optional[str] = None, 
 					 ty:Optional[ResourceTypes] = None, 
 					 create:Optional[bool] = False, 
-					 isImported:Optional[bool] = False) -> Resource:
+					 isImported:Optional[bool] = False,
+					 shareDict:Optional[bool] = False) -> Resource:
 	""" Create a resource from a dictionary structure.
 
 		This function will **not** call the resource's *activate()* method, therefore some attributes
@@ -218,6 +219,7 @@ def resourceFromDict(resDict:Optional[JSON] = {},
 			ty: The resource type of the resource that shall be created.
 			create: The resource will be newly created.
 			isImported: True when the resource is imported, or created by the `ScriptManager`. In this case some checks may not be performed.
+			shareDict: True when the resource is only read, e.g. when it is retrieved for a RETRIEVE request, a discovery, or a permission check. The resource then shares *resDict* instead of copying it, and only copies it when an attribute is changed, or when a list or dictionary attribute is accessed. *resDict* must not be changed by the caller afterwards, and the resource's *dict* must not be changed directly.
 
 		Return:
 			`Result` object with the *resource* attribute set to the created resource object.
@@ -261,9 +263,13 @@ def resourceFromDict(resDict:Optional[JSON] = {},
 		case _:
 			factory = typ.resourceFactory()
 	
-	if factory:
-		return cast(Resource, factory(resDict, tpe, pi, create))
+	token = sharedDictInstantiation.set(shareDict)
+	try:
+		if factory:
+			return cast(Resource, factory(resDict, tpe, pi, create))
 
-	return  Unknown(resDict, tpe, pi = pi, create = create)	# Capture-All resource
+		return  Unknown(resDict, tpe, pi = pi, create = create)	# Capture-All resource
+	finally:
+		sharedDictInstantiation.reset(token)
 
 
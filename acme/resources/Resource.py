@@ -13,6 +13,7 @@ from __future__ import annotations
 from typing import Any, cast, Optional, List
 
 from copy import deepcopy
+from contextvars import ContextVar
 
 from ..etc.Types import ResourceTypes, Result, NotificationEventType, CSERequest, JSON, BasicType
 from ..etc.ResponseStatusCodes import ResponseException, BAD_REQUEST, INTERNAL_SERVER_ERROR
@@ -44,6 +45,9 @@ _modified = Constants.attrModified
 _remoteID = Constants.attrRemoteID
 _rvi = Constants.attrRvi
 
+sharedDictInstantiation:ContextVar[bool] = ContextVar('sharedDictInstantiation', default = False)
+"""	Set while a resource is instantiated with a shared dictionary, see `Factory.resourceFromDict()`. """
+
 
 class Resource(object):
 	""" Base class for all oneM2M resource types,
@@ -59,6 +63,8 @@ class Resource(object):
 		'dict',
 		'isImported',
 		'_originalDict',
+		'_sharedDict',
+		'_storedDict',
 	)
 
 	_excludeFromUpdate = [ 'ri', 'ty', 'pi', 'ct', 'lt', 'st', 'rn', 'mgd' ]
@@ -104,7 +110,11 @@ class Resource(object):
 		self.isImported	= False
 		"""	Flag set during creation of a resource instance whether a resource is imported, which disables some validation checks. """
 		self._originalDict = {}
-		"""	When retrieved from the database: Holds a temporary version of the resource attributes as they were read from the database. """
+		"""	Holds the resource attributes as they were provided when the resource was instantiated, e.g. as they were read from the database. """
+		self._sharedDict = False
+		"""	Whether *dict* is shared with the dictionary the resource was instantiated from. It is copied before the first change. """
+		self._storedDict:Optional[JSON] = None
+		"""	The resource document as it was retrieved from the database, or *None*. It is used to determine the changed attributes when the resource is updated. It must not be changed. """
 
 		# For some types the tpe/root is empty and will be set later in this method
 		if ty not in [ ResourceTypes.FCNT, ResourceTypes.FCI ]: 	
@@ -112,10 +122,11 @@ class Resource(object):
 
 		if dct is not None: 
 			self.isImported = dct.get(_imported)	# might be None, or boolean
-			self.dict = deepcopy(dct.get(self.tpe))
-			if not self.dict:
-				self.dict = deepcopy(dct)
-			self._originalDict = deepcopy(dct)	# keep for validation in activate() later
+			self._sharedDict = sharedDictInstantiation.get()
+			if not (_dct := dct.get(self.tpe)):
+				_dct = dct
+			self.dict = _dct if self._sharedDict else deepcopy(_dct)	# copy on write when shared
+			self._originalDict = dct	# keep for validation in activate() later. Not changed, because dict is a copy
 		else:
 			# no Dict, so the resource is instantiated programmatically
 			self.setAttribute(_isInstantiated, True)
@@ -158,7 +169,9 @@ class Resource(object):
 
 		# Remove empty / null attributes from dict
 		# But see also the comment in update() !!!
-		self.dict = removeNoneValuesFromDict(self.dict, ['cr'])	# allow the cr attribute to stay in the dictionary. It will be handled with in the RegistrationManager
+		# Not necessary for read-only resources, because documents are stored without null attributes
+		if not self._sharedDict:
+			self.dict = removeNoneValuesFromDict(self.dict, ['cr'])	# allow the cr attribute to stay in the dictionary. It will be handled with in the RegistrationManager
 
 		self.setAttribute(_rtype, self.tpe)
 
@@ -693,12 +706,19 @@ class Resource(object):
 				value: Value to assign to the attribute.
 				overwrite: Overwrite the value if already set.
 		"""
+		if self._sharedDict:
+			if (_value := findXPath(self.dict, key)) is not None and (not overwrite or _value == value):
+				return	# nothing changes, so don't copy
+			self._copyOnWrite()
 		setXPath(self.dict, key, value, overwrite)
 
 
 	def attribute(self, key:str, 
 						default:Optional[Any] = None) -> Any:
 		"""	Return the value of an attribute.
+
+			If the resource still shares its dictionary then a list or dictionary value is copied before it is 
+			returned, so that changing the returned value in place doesn't change the shared dictionary.
 		
 			Args:
 				key: Resource attribute name to look for. This can be a path (see `findXPath`).
@@ -706,6 +726,8 @@ class Resource(object):
 			Return:
 				The attribute's value, the *default* value, or None
 		"""
+		if self._sharedDict:
+			self._copyOnAccess(key.split('/', 1)[0])
 		return findXPath(self.dict, key, default)
 
 
@@ -732,6 +754,7 @@ class Resource(object):
 						  deleted from the resource instance's internal dictionary.
 		"""
 		if self.hasAttribute(key):
+			self._copyOnWrite()
 			if setNone:
 				self.dict[key] = None
 			else:
@@ -921,21 +944,22 @@ class Resource(object):
 		CSE.storage.deleteResource(self)
 
 
-	def dbUpdate(self, finalize:bool = False) -> Resource:
+	def dbUpdate(self, finalize:bool = False, immediate:bool = False) -> Resource:
 		""" Update the resource in the database.
 
 			This also raises a CSE internal *updateResource* event.
 
 			Args:
 				finalize: Treat this database write as a final update to the resource. Only then an event is raised.
+				immediate: Write the resource immediately, even when updates are collected for the current request.
 
 			Return:
 				Result object indicating success or failure.
 		"""
-		CSE.storage.updateResource(self)
+		CSE.storage.updateResource(self, immediate)
 		# L.logWarn(f'{finalize} - {self.ri}')
 		if finalize and not self.isVirtual():
-				CSE.event.changeResource(self)	 # type: ignore [attr-defined]
+				CSE.storage.afterUnitOfWork(CSE.event.changeResource, self)	 # type: ignore [attr-defined]
 		return self
 
 
@@ -974,8 +998,33 @@ class Resource(object):
 		 """
 		resource = CSE.storage.retrieveResource(ri = self.ri)
 		self.dict = resource.dict
+		self._sharedDict = resource._sharedDict
+		self._storedDict = resource._storedDict
 		return self
 
+
+	def _copyOnAccess(self, key:str) -> None:
+		"""	Copy a list or dictionary attribute before it is accessed, if it is still shared with the
+			dictionary the resource was instantiated from. Other attributes stay shared.
+
+			Args:
+				key: The name of the top-level attribute.
+		"""
+		sharedDict = self._originalDict.get(self.tpe) or self._originalDict
+		if isinstance(value := self.dict.get(key), (list, dict)) and value is sharedDict.get(key):
+			if self.dict is sharedDict:
+				self.dict = dict(self.dict)		# shallow copy, so that the copied value can be assigned
+			self.dict[key] = deepcopy(value)
+
+
+	def _copyOnWrite(self) -> None:
+		"""	Copy the resource attributes before they are changed, if they are still shared with the
+			dictionary the resource was instantiated from.
+		"""
+		if self._sharedDict:
+			self.dict = deepcopy(self.dict)
+			self._sharedDict = False
+
 	#########################################################################
 	#
 	#	Misc utilities
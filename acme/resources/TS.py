@@ -11,7 +11,7 @@ from __future__ import annotations
 from typing import Optional
 
 from ..etc.Types import AttributePolicyDict, ResourceTypes, JSON
-from ..etc.ResponseStatusCodes import BAD_REQUEST, OPERATION_NOT_ALLOWED, NOT_ACCEPTABLE, CONFLICT
+from ..etc.ResponseStatusCodes import BAD_REQUEST, OPERATION_NOT_ALLOWED, NOT_ACCEPTABLE, CONFLICT, NOT_FOUND
 from ..helpers.TextTools import findXPath
 from ..etc.DateUtils import getResourceDate, toISO8601Date
 from ..runtime.Configuration import Configuration
@@ -262,7 +262,7 @@ class TS(ContainerResource):
 			
 				# Send update event on behalf of the latest resources.
 				# The oldest resource might not be changed. That is handled in the validate() method.
-				CSE.event.changeResource(childResource, self.getLatestRI())	 # type: ignore [attr-defined]
+				CSE.storage.afterUnitOfWork(CSE.event.changeResource, childResource, self.getLatestRI())	 # type: ignore [attr-defined]
 
 			case ResourceTypes.SUB:
 				# start monitoring
@@ -300,51 +300,37 @@ class TS(ContainerResource):
 			return
 		self.__validating = True
 
-		# TODO Optimize: Do we really need the resources?
-		tsis = self.timeSeriesInstances()	# retrieve TIS child resources
-		cni = len(tsis)		
+		# Get the number of instances and their sizes from the instance index, and
+		# determine the oldest <tsi> that exceed the limits. The remaining <tsi> are not retrieved.
 		tsi:Resource = None
-			
-		# Check number of instances
-		if (mni := self.mni) is not None:	# mni is an int
-			while cni > mni and cni > 0:
-				tsi = tsis[0]
-				L.isDebug and L.logDebug(f'cni > mni: Removing <tsi>: {tsi.ri}')
+		for entry in CSE.storage.searchExcessInstances(self.ri, self.mni, self.mbs):
+			# A concurrent request may already have removed the same oldest <tsi>
+			try:
+				_tsi = CSE.storage.retrieveResource(ri = entry['ri'])
+				L.isDebug and L.logDebug(f'cni > mni or cbs > mbs: Removing <tsi>: {_tsi.ri}')
 				# remove oldest
 				# Deleting a child must not cause a notification for 'deleteDirectChild'.
 				# Don't do a delete check means that TS.childRemoved() is not called, where subscriptions for 'deleteDirectChild'  is tested.
-				CSE.dispatcher.deleteLocalResource(tsi, parentResource = self, doDeleteCheck = False)
-				del tsis[0]
-				cni -= 1	# decrement cni when deleting a <cin>
-
-		# Calculate cbs
-		cbs = sum([ each.cs for each in tsis])
-
-		# check size
-		if (mbs := self.mbs) is not None:
-			while cbs > mbs and cbs > 0:
-				tsi = tsis[0]
-				L.isDebug and L.logDebug(f'cbs > mbs: Removing <tsi>: {tsi.ri}')
-				# remove oldest
-				# cbs -= tsis[0]['cs']
-				cbs -= tsi.cs
-				# Deleting a child must not cause a notification for 'deleteDirectChild'.
-				# Don't do a delete check means that TS.childRemoved() is not called, where subscriptions for 'deleteDirectChild'  is tested.
-				CSE.dispatcher.deleteLocalResource(tsi, parentResource = self, doDeleteCheck = False)
-				del tsis[0]
-				cni -= 1	# decrement cni when deleting a <tsi>
-
-		# Some attributes may have been updated, so store the resource 
-		self['cni'] = cni
-		self['cbs'] = cbs
+				CSE.dispatcher.deleteLocalResource(_tsi, parentResource = self, doDeleteCheck = False)
+				tsi = _tsi
+			except NOT_FOUND:
+				L.isDebug and L.logDebug(f'<tsi>: {entry["ri"]} already removed')
+
+		# Some attributes may have been updated, so store the resource. cni and cbs are taken from the instance
+		# index, because concurrent requests might have added or removed instances in the meantime
+		CSE.storage.updateResourceAttributes(self, lambda _: dict(zip(('cni', 'cbs'), CSE.storage.countInstances(self.ri))))
 		self.dbUpdate(True)
 	
 		# If tsi is not None anymore then we have a new "oldest" resource.
 		# tsi is NOT the oldest resource, but the one that was deleted last. The new
-		# oldest resource is the first in the list of tsis.
+		# oldest resource is the first one in the instance index.
 		# This means that we need to send an "update" event for the oldest resource.
-		if tsi is not None and len(tsis) > 0:
-			CSE.event.changeResource(tsis[0], self.getOldestRI())	 # type: ignore [attr-defined]
+		# A concurrent request may already have removed this <tsi> as well. Then that request raises the event.
+		if tsi is not None and (oldest := CSE.storage.searchOldestInstance(self.ri)):
+			try:
+				CSE.storage.afterUnitOfWork(CSE.event.changeResource, CSE.storage.retrieveResource(ri = oldest['ri']), self.getOldestRI())	 # type: ignore [attr-defined]
+			except NOT_FOUND:
+				L.isDebug and L.logDebug(f'<tsi>: {oldest["ri"]} already removed')
 
 		# End validating
 		self.__validating = False
@@ -275,6 +275,11 @@ def startup(args:argparse.Namespace, **kwargs:Dict[str, Any]) -> bool:
 	BackgroundWorkerPool.setJobBalance(	balanceTarget = Configuration.get('cse.operation.jobs.balanceTarget'),
 										balanceLatency = Configuration.get('cse.operation.jobs.balanceLatency'),
 										balanceReduceFactor = Configuration.get('cse.operation.jobs.balanceReduceFactor'))
+	for category, configCategory in (('events', 'event'), ('notifications', 'notification'), ('actors', 'actor')):
+		BackgroundWorkerPool.setJobExecutor(category,
+											workers = Configuration.get(f'cse.operation.jobs.{configCategory}Workers'),
+											maxQueueSize = Configuration.get(f'cse.operation.jobs.{configCategory}QueueSize'),
+											overflowPolicy = Configuration.get('cse.operation.jobs.overflowPolicy'))
 
 	try:
 		textUI = TextUI()						# Start the textUI
@@ -24,6 +24,8 @@ from ..etc.Types import CSEType, ContentSerializationType,Permission
 from ..helpers.NetworkTools import getIPAddress
 from ..etc.Utils import normalizeURL
 from ..helpers.NetworkTools import isValidPort, isValidateIpAddress, isValidateHostname
+from ..helpers.DeliveryPool import OverflowPolicy
+from ..helpers.BackgroundWorker import JobOverflowPolicy
 from ..runtime import Onboarding
 
 # TODO: proper use of the baseDirectory configuration for other values
@@ -301,6 +303,7 @@ class Configuration(object):
 				'cse.checkExpirationsInterval'					: config.getint('cse', 'checkExpirationsInterval',					fallback = 60),		# Seconds
 				'cse.cseID'										: config.get('cse', 'cseID',										fallback = '/id-in'),
 				'cse.defaultSerialization'						: config.get('cse', 'defaultSerialization',							fallback = 'json'),
+				'cse.discoveryCursorCacheSize'					: config.getint('cse', 'discoveryCursorCacheSize',					fallback = 1000),
 				'cse.enableRemoteCSE'							: config.getboolean('cse', 'enableRemoteCSE', 						fallback = True),
 				'cse.enableResourceExpiration'					: config.getboolean('cse', 'enableResourceExpiration', 				fallback = True),
 				'cse.enableSubscriptionVerificationRequests'	: config.getboolean('cse', 'enableSubscriptionVerificationRequests',fallback = True),
@@ -319,6 +322,16 @@ class Configuration(object):
 				'cse.serviceProviderID'							: config.get('cse', 'serviceProviderID',							fallback = 'acme.example.com'),
 				'cse.type'										: config.get('cse', 'type',											fallback = 'IN'),		# IN, MN, ASN
 
+				#
+				#	Notification delivery
+				#
+
+				'cse.notifications.workers'						: config.getint('cse.notifications', 'workers',						fallback = 10),
+				'cse.notifications.targetConcurrency'			: config.getint('cse.notifications', 'targetConcurrency',			fallback = 1),
+				'cse.notifications.targetQueueSize'				: config.getint('cse.notifications', 'targetQueueSize',				fallback = 1000),
+				'cse.notifications.overflowPolicy'				: config.get('cse.notifications', 'overflowPolicy',					fallback = 'dropOldest'),
+				'cse.notifications.overflowTimeout'				: config.getfloat('cse.notifications', 'overflowTimeout',			fallback = 10.0),
+
 				#
 				#	Announcements
 				#
@@ -335,6 +348,13 @@ class Configuration(object):
 				'cse.operation.jobs.balanceLatency'		: config.getint('cse.operation.jobs', 'jobBalanceLatency', 			fallback = 1000),
 				'cse.operation.jobs.balanceReduceFactor': config.getfloat('cse.operation.jobs', 'jobBalanceReduceFactor', 	fallback = 2.0),
 				'cse.operation.jobs.balanceTarget'		: config.getfloat('cse.operation.jobs', 'jobBalanceTarget',			fallback = 3.0),
+				'cse.operation.jobs.eventWorkers'		: config.getint('cse.operation.jobs', 'eventWorkers',					fallback = 8),
+				'cse.operation.jobs.eventQueueSize'		: config.getint('cse.operation.jobs', 'eventQueueSize',					fallback = 1000),
+				'cse.operation.jobs.notificationWorkers': config.getint('cse.operation.jobs', 'notificationWorkers',			fallback = 16),
+				'cse.operation.jobs.notificationQueueSize': config.getint('cse.operation.jobs', 'notificationQueueSize',		fallback = 1000),
+				'cse.operation.jobs.actorWorkers'		: config.getint('cse.operation.jobs', 'actorWorkers',					fallback = 16),
+				'cse.operation.jobs.actorQueueSize'		: config.getint('cse.operation.jobs', 'actorQueueSize',					fallback = 1000),
+				'cse.operation.jobs.overflowPolicy'		: config.get('cse.operation.jobs', 'overflowPolicy',					fallback = 'callerRuns'),
 
 				#
 				#	CSE Operation : Requests
@@ -342,6 +362,8 @@ class Configuration(object):
 
 				'cse.operation.requests.enable'			: config.getboolean('cse.operation.requests', 'enable',				fallback = False),
 				'cse.operation.requests.size'			: config.getint('cse.operation.requests', 'size', 					fallback = 1000),
+				'cse.operation.requests.bufferSize'		: config.getint('cse.operation.requests', 'bufferSize', 			fallback = 1000),
+				'cse.operation.requests.flushInterval'	: config.getfloat('cse.operation.requests', 'flushInterval', 		fallback = 1.0),
 
 				#
 				#	Registrar CSE
@@ -370,12 +392,14 @@ class Configuration(object):
 
 				'cse.security.enableACPChecks'			: config.getboolean('cse.security', 'enableACPChecks',			 	fallback = True),
 				'cse.security.fullAccessAdmin'			: config.getboolean('cse.security', 'fullAccessAdmin',			 	fallback = True),
+				'cse.security.accessCacheSize'			: config.getint('cse.security', 'accessCacheSize',			 		fallback = 10000),
 
 				#
 				#	Statistics
 				#
 
 				'cse.statistics.enable'					: config.getboolean('cse.statistics', 'enable', 					fallback = True),
+				'cse.statistics.latencyHistograms'		: config.getboolean('cse.statistics', 'latencyHistograms', 			fallback = True),
 				'cse.statistics.writeInterval'			: config.getint('cse.statistics', 'writeInterval',					fallback = 60),		# Seconds
 
 
@@ -417,6 +441,8 @@ class Configuration(object):
 				'database.type'							: config.get('database', 'type',			 						fallback = 'tinydb'),
 				'database.resetOnStartup' 				: config.getboolean('database', 'resetOnStartup',					fallback = False),
 				'database.backupPath'					: config.get('database', 'backupPath',								fallback = './data/backup'),
+				'database.coalesceUpdates'				: config.getboolean('database', 'coalesceUpdates',					fallback = True),
+				'database.resourceCacheSize'			: config.getint('database', 'resourceCacheSize',					fallback = 1000),
 
 				#
 				#	Database PostgreSQL
@@ -428,6 +454,8 @@ class Configuration(object):
 				'database.postgresql.password'				: config.get('database.postgresql', 'password', 						fallback = None),
 				'database.postgresql.database'				: config.get('database.postgresql', 'database', 						fallback = 'acmecse'),
 				'database.postgresql.schema'				: config.get('database.postgresql', 'schema', 							fallback = 'acmecse'),
+				'database.postgresql.poolSize'				: config.getint('database.postgresql', 'poolSize', 						fallback = 10),
+				'database.postgresql.poolTimeout'			: config.getfloat('database.postgresql', 'poolTimeout', 				fallback = 10.0),
 
 				#
 				#	Database TinyDB
@@ -436,6 +464,8 @@ class Configuration(object):
 				'database.tinydb.path'					: config.get('database.tinydb', 'path',								fallback = './data'),
 				'database.tinydb.cacheSize'				: config.getint('database.tinydb', 'cacheSize', 					fallback = 0),		# Default: no caching
 				'database.tinydb.writeDelay'			: config.getint('database.tinydb', 'writeDelay', 					fallback = 1),		# Default: 1 second
+				'database.tinydb.journal'				: config.getboolean('database.tinydb', 'journal', 					fallback = False),
+				'database.tinydb.journalSize'			: config.getint('database.tinydb', 'journalSize', 					fallback = 10000),
 
 				#
 				#	HTTP Server
@@ -443,6 +473,7 @@ class Configuration(object):
 
 				'http.address'							: config.get('http', 'address', 									fallback = 'http://127.0.0.1:8080'),
 				'http.allowPatchForDelete'				: config.getboolean('http', 'allowPatchForDelete', 					fallback = False),
+				'http.enableMetricsEndpoint'			: config.getboolean('http', 'enableMetricsEndpoint', 				fallback = False),
 				'http.enableStructureEndpoint'			: config.getboolean('http', 'enableStructureEndpoint', 				fallback = False),
 				'http.enableUpperTesterEndpoint'		: config.getboolean('http', 'enableUpperTesterEndpoint', 			fallback = False),
 				'http.listenIF'							: config.get('http', 'listenIF', 									fallback = '0.0.0.0'),
@@ -481,6 +512,13 @@ class Configuration(object):
 				'http.wsgi.connectionLimit'				: config.getint('http.wsgi', 'connectionLimit',						fallback = 100),
 				'http.wsgi.threadPoolSize'				: config.getint('http.wsgi', 'threadPoolSize',						fallback = 100),
 
+				#
+				#	HTTP Client
+				#
+
+				'http.client.poolSize'					: config.getint('http.client', 'poolSize',							fallback = 10),
+				'http.client.idleTimeout'				: config.getfloat('http.client', 'idleTimeout',						fallback = 60.0),
+
 
 				#
 				#	Logging
@@ -552,6 +590,7 @@ class Configuration(object):
 				#
 
 				'resource.grp.resultExpirationTime'		: config.getint('resource.grp', 'resultExpirationTime', 			fallback = 0),
+				'resource.grp.fanOutWorkers'			: config.getint('resource.grp', 'fanOutWorkers', 					fallback = 10),
 
 
 				#
@@ -820,6 +859,19 @@ class Configuration(object):
 			return False, fr'Configuration Error: [i]\[cse.operation.jobs]:balanceLatency[/i] must be >= 0'
 		if _get('cse.operation.jobs.balanceReduceFactor') < 1.0:
 			return False, fr'Configuration Error: [i]\[cse.operation.jobs]:balanceReduceFactor[/i] must be >= 1.0'
+		for category in ('event', 'notification', 'actor'):
+			if _get(f'cse.operation.jobs.{category}Workers') < 0:
+				return False, fr'Configuration Error: [i]\[cse.operation.jobs]:{category}Workers[/i] must be >= 0'
+			if _get(f'cse.operation.jobs.{category}QueueSize') < 1:
+				return False, fr'Configuration Error: [i]\[cse.operation.jobs]:{category}QueueSize[/i] must be > 0'
+		if isinstance(policy := _get('cse.operation.jobs.overflowPolicy'), str):
+			if (op := JobOverflowPolicy.to(policy, insensitive = True)) is None:
+				return False, r'Configuration Error: [i]\[cse.operation.jobs]:overflowPolicy[/i] must be "block", "callerRuns" or "reject"'
+			_put('cse.operation.jobs.overflowPolicy', op)
+		if _get('cse.operation.requests.bufferSize') < 1:
+			return False, fr'Configuration Error: [i]\[cse.operation.requests]:bufferSize[/i] must be > 0'
+		if _get('cse.operation.requests.flushInterval') <= 0.0:
+			return False, fr'Configuration Error: [i]\[cse.operation.requests]:flushInterval[/i] must be > 0.0'
 
 
 		#
@@ -871,6 +923,10 @@ class Configuration(object):
 			return False, r'Configuration Error: [i]\[http.wsgi]:threadPoolSize[/i] must be > 0'
 		if _get('http.wsgi.connectionLimit') < 1:
 			return False, r'Configuration Error: [i]\[http.wsgi]:connectionLimit[/i] must be > 0'
+		if _get('http.client.poolSize') < 1:
+			return False, r'Configuration Error: [i]\[http.client]:poolSize[/i] must be > 0'
+		if _get('http.client.idleTimeout') <= 0.0:
+			return False, r'Configuration Error: [i]\[http.client]:idleTimeout[/i] must be > 0.0'
 
 		
 		#
@@ -959,6 +1015,28 @@ class Configuration(object):
 		if _get('cse.flexBlockingPreference') not in ['blocking', 'nonblocking']:
 			return False, r'Configuration Error: [i]\[cse]:flexBlockingPreference[/i] must be "blocking" or "nonblocking"'
 
+		# Check the discovery cursor cache size
+		if _get('cse.discoveryCursorCacheSize') < 0:
+			return False, r'Configuration Error: [i]\[cse]:discoveryCursorCacheSize[/i] must be >= 0'
+
+		# Check the access decision cache size
+		if _get('cse.security.accessCacheSize') < 0:
+			return False, r'Configuration Error: [i]\[cse.security]:accessCacheSize[/i] must be >= 0'
+
+		# Check notification delivery settings
+		if _get('cse.notifications.workers') < 1:
+			return False, r'Configuration Error: [i]\[cse.notifications]:workers[/i] must be > 0'
+		if _get('cse.notifications.targetConcurrency') < 1:
+			return False, r'Configuration Error: [i]\[cse.notifications]:targetConcurrency[/i] must be > 0'
+		if _get('cse.notifications.targetQueueSize') < 1:
+			return False, r'Configuration Error: [i]\[cse.notifications]:targetQueueSize[/i] must be > 0'
+		if _get('cse.notifications.overflowTimeout') <= 0.0:
+			return False, r'Configuration Error: [i]\[cse.notifications]:overflowTimeout[/i] must be > 0.0'
+		if isinstance(policy := _get('cse.notifications.overflowPolicy'), str):
+			if (op := OverflowPolicy.to(policy, insensitive = True)) is None:
+				return False, r'Configuration Error: [i]\[cse.notifications]:overflowPolicy[/i] must be "block", "dropOldest" or "dropNewest"'
+			_put('cse.notifications.overflowPolicy', op)
+
 		# Check release versions
 		if len(srv := _get('cse.supportedReleaseVersions')) == 0:
 			return False, r'Configuration Error: [i]\[cse]:supportedReleaseVersions[/i] must not be empty'
@@ -1019,6 +1097,8 @@ class Configuration(object):
 		# Check group resource defaults
 		if _get('resource.grp.resultExpirationTime') < 0:
 			return False, fr'Configuration Error: [i]\[resource.grp]:resultExpirationTime[/i] must be >= 0'
+		if _get('resource.grp.fanOutWorkers') < 1:
+			return False, fr'Configuration Error: [i]\[resource.grp]:fanOutWorkers[/i] must be >= 1'
 		
 
 		# Text UI settings
@@ -1030,6 +1110,14 @@ class Configuration(object):
 
 		if dbType not in ['tinydb', 'postgresql', 'memory']:
 			return False, fr'Configuration Error: [i]\[database]:type[/i] must be "tinydb", "postgresql", or "memory"'
+		if _get('database.resourceCacheSize') < 0:
+			return False, r'Configuration Error: [i]\[database]:resourceCacheSize[/i] must be >= 0'
+		if _get('database.postgresql.poolSize') < 1:
+			return False, r'Configuration Error: [i]\[database.postgresql]:poolSize[/i] must be > 0'
+		if _get('database.postgresql.poolTimeout') <= 0.0:
+			return False, r'Configuration Error: [i]\[database.postgresql]:poolTimeout[/i] must be > 0.0'
+		if _get('database.tinydb.journalSize') < 1:
+			return False, r'Configuration Error: [i]\[database.tinydb]:journalSize[/i] must be > 0'
 		# Everything is fine
 		return True, None
 
@@ -267,6 +267,7 @@ class Console(object):
 			'k'					: self.katalogScripts,
 			'l'     			: self.toggleScreenLogging,
 			'L'     			: self.toggleLogging,
+			'm'					: self.latencies,
 			'Q'					: self.shutdownCSE,		# See handler below
 			'r'					: self.registrations,
 			'R'					: self.runScript,
@@ -357,6 +358,7 @@ class Console(object):
 			('^K', 'Show resource continuously'),
 			('l', 'Toggle screen logging on/off'),
 			('L', 'Toggle through log levels'),
+			('m', 'Show request and storage latencies'),
 			('r', 'Show CSE registrations'),
 			('s', 'Show statistics'),
 			('^S', 'Show & refresh statistics continuously'),
@@ -539,7 +541,7 @@ Available under the BSD 3-Clause License
 				live.update(self.getResourceTreeRich(style = L.terminalStyle, withProgress = False), refresh = True)
 			
 			# Register events for which the tree is refreshed
-			CSE.event.addHandler([CSE.event.createResource, CSE.event.deleteResource, CSE.event.updateResource],  _updateTree)		# type:ignore[attr-defined]
+			CSE.event.addHandler([CSE.event.createResource, CSE.event.deleteResource, CSE.event.deleteResources, CSE.event.updateResource],  _updateTree)		# type:ignore[attr-defined]
 
 			while (ch := waitForKeypress(self.refreshInterval)) in [None, '\x14']:
 				if ch == '\x14':	# Toggle through tree modes
@@ -549,7 +551,7 @@ Available under the BSD 3-Clause License
 					break
 
 			# Remove the event callback for the events 
-			CSE.event.removeHandler([CSE.event.createResource, CSE.event.deleteResource, CSE.event.updateResource], _updateTree)	# type:ignore[attr-defined]
+			CSE.event.removeHandler([CSE.event.createResource, CSE.event.deleteResource, CSE.event.deleteResources, CSE.event.updateResource], _updateTree)	# type:ignore[attr-defined]
 
 		# Reset the screen and logging
 		self.clearScreen(key)
@@ -603,6 +605,20 @@ Available under the BSD 3-Clause License
 		L.on()
 
 
+	def latencies(self, key:str) -> None:
+		"""	Render the latency histograms.
+
+			Args:
+				key: Input key. Ignored.
+		"""
+		L.console('Latencies', isHeader = True)
+		if not CSE.statistics.latencyHistograms:
+			L.console('Latency histograms are disabled', isError = True)
+			return
+		L.console(self.getLatenciesRich())
+		L.console()
+
+
 	def deleteResource(self, key:str) -> None:
 		"""	Delete a resource from the CSE.
 
@@ -699,14 +715,14 @@ Available under the BSD 3-Clause License
 						live.update(Pretty(resource.asDict()), refresh = True)
 					
 					# Register events for which the resource is refreshed
-					CSE.event.addHandler([CSE.event.createResource, CSE.event.deleteResource, CSE.event.updateResource],  _updateResource)		# type:ignore[attr-defined]
+					CSE.event.addHandler([CSE.event.createResource, CSE.event.deleteResource, CSE.event.deleteResources, CSE.event.updateResource],  _updateResource)		# type:ignore[attr-defined]
 
 					while waitForKeypress(self.refreshInterval) in [None, '\x09']:
 						if self.interruptContinous:
 							break
 
 					# Remove the event callback for the events 
-					CSE.event.removeHandler([CSE.event.createResource, CSE.event.deleteResource, CSE.event.updateResource], _updateResource)	# type:ignore[attr-defined]
+					CSE.event.removeHandler([CSE.event.createResource, CSE.event.deleteResource, CSE.event.deleteResources, CSE.event.updateResource], _updateResource)	# type:ignore[attr-defined]
 
 				# Reset the screen and show error message if there is one
 				self.clearScreen(key)
@@ -1259,6 +1275,42 @@ function createResource() {{
 
 # TODO events transit requests
 # TODO notifications
+	def getLatenciesRich(self) -> Table:
+		"""	Create and return a table with the number of observations, the average, and
+			some quantiles of the latency histograms.
+
+			Return:
+				Rich table.
+		"""
+		layers = {
+			Statistics.latencyBinding:		'Binding',
+			Statistics.latencyRequest:		'Request',
+			Statistics.latencyDispatcher:	'Dispatcher',
+			Statistics.latencyStorage:		'Storage',
+		}
+		histograms = CSE.statistics.getLatencyHistograms()
+
+		table = Table(row_styles = [ '', L.tableRowStyle], box = None, expand = False)
+		table.add_column(_markup('[u]Layer[/u]\n'), no_wrap = True)
+		table.add_column(_markup('[u]Labels[/u]\n'), no_wrap = True)
+		table.add_column(_markup('[u]Count[/u]\n'), no_wrap = True, justify = 'right')
+		table.add_column(_markup('[u]Avg[/u]\n[u]ms[/u]'), no_wrap = True, justify = 'right')
+		table.add_column(_markup('[u]p50[/u]\n[u]ms[/u]'), no_wrap = True, justify = 'right')
+		table.add_column(_markup('[u]p90[/u]\n[u]ms[/u]'), no_wrap = True, justify = 'right')
+		table.add_column(_markup('[u]p99[/u]\n[u]ms[/u]'), no_wrap = True, justify = 'right')
+		for metric, layer in layers.items():
+			names = CSE.statistics.getLatencyLabelNames(metric)
+			for (_, values), histogram in sorted((item for item in histograms.items() if item[0][0] == metric), key = lambda item: item[0]):
+				table.add_row(layer,
+							  ', '.join(f'{n}={v}' for n, v in zip(names, values) if v),
+							  str(histogram.count),
+							  f'{histogram.sum * 1000.0 / histogram.count:.2f}' if histogram.count else '',
+							  f'{histogram.quantile(0.5) * 1000.0:.2f}',
+							  f'{histogram.quantile(0.9) * 1000.0:.2f}',
+							  f'{histogram.quantile(0.99) * 1000.0:.2f}')
+		return table
+
+
 	def getStatisticsRich(self, 
 						  style:Optional[Style] = Style(), 
 						  withProgress:Optional[bool] = True) -> Table:
@@ -1305,6 +1357,9 @@ function createResource() {{
 				httpSent += 	f'U: {stats.get(Statistics.httpSendUpdates, 0)}\n'
 				httpSent += 	f'D: {stats.get(Statistics.httpSendDeletes, 0)}\n'
 				httpSent += 	f'N: {stats.get(Statistics.httpSendNotifies, 0)}\n'
+				httpSent += 	'\n'
+				httpSent += 	f'Hit : {stats.get(Statistics.httpPoolHits, 0)}\n'
+				httpSent += 	f'Miss: {stats.get(Statistics.httpPoolMisses, 0)}\n'
 
 				mqttReceived  = _markup('[underline]MQTT:R[/underline]\n')
 				mqttReceived += 	'\n'
@@ -1354,8 +1409,19 @@ function createResource() {{
 						miscRight += f'Role     : {Configuration.get("database.postgresql.role")}\n'
 						miscRight += f'Database : {Configuration.get("database.postgresql.database")}\n'
 						miscRight += f'Schema   : {Configuration.get("database.postgresql.schema")}\n'
+						miscRight += f'Pool     : {stats.get(Statistics.dbPoolInUse, 0)} / {stats.get(Statistics.dbPoolSize, 0)} / {stats.get(Statistics.dbPoolMaxSize, 0)}\n'
+						miscRight += f'Checkouts: {stats.get(Statistics.dbPoolCheckouts, 0)}\n'
+						_waits = int(stats.get(Statistics.dbPoolWaits, 0))
+						_waitTime = float(stats.get(Statistics.dbPoolWaitTime, 0.0))
+						miscRight += f'Waits    : {_waits} (avg {(_waitTime / _waits * 1000.0) if _waits else 0.0:.1f} ms)\n'
 					case 'tinydb':
 						miscRight += f'Path     : ./{os.path.relpath(Configuration.get("database.tinydb.path"), Configuration.get("basedirectory"))}\n'
+				if Configuration.get('database.resourceCacheSize'):
+					_hits = int(stats.get(Statistics.dbCacheHits, 0))
+					_lookups = _hits + int(stats.get(Statistics.dbCacheMisses, 0))
+					miscRight += f'Cache    : {stats.get(Statistics.dbCacheSize, 0)} resources ({(_hits / _lookups * 100.0) if _lookups else 0.0:.1f} % hits)\n'
+				if Configuration.get('cse.operation.requests.enable'):
+					miscRight += f'Requests : {stats.get(Statistics.requestsBuffered, 0)} buffered / {stats.get(Statistics.requestsDropped, 0)} dropped\n'
 
 
 			else:
@@ -1418,6 +1484,30 @@ function createResource() {{
 			r, p = BackgroundWorkerPool.countJobs()
 			tableThreads.add_row('Running', str(r))
 			tableThreads.add_row('Paused', str(p))
+			tableThreads.add_row('Notify Queue', str(stats.get(Statistics.notificationQueued, 0)))
+			tableThreads.add_row('Notify Active', str(stats.get(Statistics.notificationInFlight, 0)))
+			tableThreads.add_row('Notify Dropped', str(stats.get(Statistics.notificationDropped, 0)))
+			tableThreads.add_row('Jobs Queue', str(sum(stats.get(k, 0) for k in (Statistics.jobEventsQueued, Statistics.jobNotificationsQueued, Statistics.jobActorsQueued))))	# type:ignore[misc]
+			tableThreads.add_row('Jobs Active', str(sum(stats.get(k, 0) for k in (Statistics.jobEventsActive, Statistics.jobNotificationsActive, Statistics.jobActorsActive))))	# type:ignore[misc]
+			tableThreads.add_row('Jobs Rejected', str(sum(stats.get(k, 0) for k in (Statistics.jobEventsRejected, Statistics.jobNotificationsRejected, Statistics.jobActorsRejected))))	# type:ignore[misc]
+
+			# The notification targets with the highest average latency
+			notificationTargets = _markup('[underline]Notification Targets[/underline]\n')
+			notificationTargets += '\n'
+			tableTargets = Table(expand=True, row_styles = [ '', L.tableRowStyle], box = None, padding = (0, 0, 0, 1))
+			tableTargets.add_column(_markup('[u]Target[/u]\n'), no_wrap = True)
+			tableTargets.add_column(_markup('[u]#Sent[/u]\n'), no_wrap = True, justify = 'right')
+			tableTargets.add_column(_markup('[u]#Failed[/u]\n'), no_wrap = True, justify = 'right')
+			tableTargets.add_column(_markup('[u]Queue[/u]\n'), no_wrap = True, justify = 'right')
+			tableTargets.add_column(_markup('[u]Avg (ms)[/u]\n'), no_wrap = True, justify = 'right')
+			tableTargets.add_column(_markup('[u]Max (ms)[/u]\n'), no_wrap = True, justify = 'right')
+			for target, ts in sorted(CSE.notification.getTargetStatistics().items(), key = lambda t: t[1]['avgLatency'], reverse = True)[:5]:
+				tableTargets.add_row(target, 
+									 str(ts['delivered']), 
+									 str(ts['failed']), 
+									 str(ts['queued']), 
+									 f'{ts["avgLatency"] * 1000.0:.1f}', 
+									 f'{ts["maxLatency"] * 1000.0:.1f}')
 
 			requestsGrid = Table.grid(expand = True)
 			requestsGrid.add_column(ratio = 28)
@@ -1439,6 +1529,8 @@ function createResource() {{
 			workerGrid.add_column(ratio = 30)
 			workerGrid.add_row(workers, threads)
 			workerGrid.add_row(tableWorkers, tableThreads)
+			workerGrid.add_row(notificationTargets, '')
+			workerGrid.add_row(tableTargets, '')
 
 			rightGrid = Table.grid(expand = True)
 			rightGrid.add_column()
@@ -19,15 +19,17 @@ from rich.text import Text
 
 from ..helpers.KeyHandler import FunctionKey
 from ..etc.Types import JSON, ACMEIntEnum, CSERequest, Operation, ResourceTypes, Result, BasicType, AttributePolicy
-from ..etc.ResponseStatusCodes import ResponseException
+from ..etc.ResponseStatusCodes import ResponseException, BAD_REQUEST
 from ..etc.DateUtils import cronMatchesTimestamp, getResourceDate, utcDatetime
 from ..etc.ACMEUtils import uniqueRI, uniqueID, pureResource
 from ..etc.Utils import runsInIPython, isURL
 from ..runtime.Configuration import Configuration
 from ..helpers.Interpreter import PContext, PFuncCallable, PUndefinedError, PError, PState, SSymbol, SType, PSymbolCallable
+from ..helpers.Interpreter import SExprParser, PException
 from ..helpers.Interpreter import PInvalidArgumentError,PInvalidTypeError, PRuntimeError, PUnsupportedError, PPermissionError
 from ..helpers.BackgroundWorker import BackgroundWorker, BackgroundWorkerPool
-from ..helpers.TextTools import setXPath, simpleMatch
+from ..helpers.TextTools import setXPath, simpleMatch, removeCommentsFromJSON
+from ..helpers.LRUCache import LRUCache
 from ..helpers.TextTools import setXPath
 from ..helpers.NetworkTools import pingTCPServer, isValidPort
 from ..resources.Factory import resourceFromDict
@@ -62,6 +64,12 @@ _metaOnKey = 'onKey'
 _metaPromptlessEvents = [ _metaInit, _metaOnStartup, _metaOnRestart, _metaOnShutdown, _metaAt, _metaOnNotification ]
 """ Events for which the "prompt" meta tag is to be ignored. """
 
+_allowedQuerySymbols = ( '==', '!=', '<', '<=', '>', '>=', '&', '&&', '|', '||', '!', 'not', 'in')
+""" Functions that are allowed in comparison queries. """
+
+_comparisonQueryCacheSize = 1000
+""" Maximum number of parsed comparison queries that are cached. """
+
 _storageTypes = (SType.tString, SType.tNumber, SType.tBool, SType.tJson, SType.tLambda, SType.tList,
 				 SType.tListQuote, SType.tNIL, SType.tSymbol, SType.tSymbolQuote)
 """ Allowed types to put into storage. """
@@ -1555,6 +1563,119 @@ class ACMEPContext(PContext):
 		return self._pcontextFromRequestResult(pcontext, res)
 
 
+#########################################################################
+#
+#	Comparison queries
+#
+
+class ComparisonQuery(object):
+	"""	A parsed and validated comparison query, e.g. the advanced query of a discovery request.
+
+		The query is evaluated against JSON structures or resources, one after the other, with the same 
+		script context. For each evaluation only the candidate is bound to the context. An instance is
+		meant to be used by a single request, while the parsed query can be shared with other instances.
+	"""
+
+	__slots__ = (
+		'query',
+		'_pcontext',
+		'_jsn',
+	)
+	""" Define slots for instance variables. """
+
+
+	def __init__(self, query:str, ast:list[SSymbol]) -> None:
+		"""	Initialize the query and its script context.
+
+			Args:
+				query: String with the s-expression.
+				ast: The query's parsed abstract syntax tree. It is not changed and can be shared with other queries.
+		"""
+		self.query = query
+		""" String with the s-expression. """
+		self._jsn:JSON = {}
+		""" The JSON structure of the current candidate. """
+		self._pcontext = ACMEPContext('', 
+									  fallbackFunc = self._getAttribute, 
+									  monitorFunc = self._monitorExecution, 
+									  allowBrackets = True)
+		""" The script context that is used for all evaluations. """
+		self._pcontext.ast = ast
+		self._pcontext.reset()
+
+
+	def evaluate(self, resource:JSON|Resource) -> bool:
+		"""	Evaluate the query against a JSON structure or a resource.
+
+			The attributes are read directly from the JSON structure or the resource's dictionary, 
+			which are not copied and must not be changed during the evaluation.
+
+			Args:
+				resource: JSON dictionary or resource for the attributes.
+
+			Return:
+				Boolean value indicating the success of the query.
+		"""
+		self._jsn = resource.dict if isinstance(resource, Resource) else pureResource(cast(JSON, resource))[0]
+		L.isDebug and L.logDebug(f'Running query: {self.query} against: {self._jsn}')
+
+		pcontext = self._pcontext
+		pcontext.clearError()
+		pcontext.result = SSymbol()
+		try:
+			pcontext.executeExpressions()
+		except PException as e:
+			L.logWarn(f'Error running query: {self.query}: {e.pcontext.error.message}')
+			return False
+		except Exception as e:
+			L.logWarn(f'Error running query: {self.query}: {e}')
+			return False
+		finally:
+			self._jsn = {}
+		if pcontext.result.type != SType.tBool:
+			L.logWarn(f'Expected boolean for comparison, received: {pcontext.result.value}')
+			return False
+		return cast(bool, pcontext.result.value)
+
+
+	def _getAttribute(self, pcontext:PContext, symbol:SSymbol) -> PContext:
+		"""	Return the value of an attribute of the current candidate for an unknown symbol.
+
+			Args:
+				pcontext: `PContext` object of the running query.
+				symbol: The symbol with the attribute name.
+
+			Return:
+				The `PContext` object with the attribute's value, or *nil* if the attribute doesn't exist.
+		"""
+		_attr = symbol.value
+		if not isinstance(_attr, str):
+			raise ValueError(f'attribute: {_attr} must be a string')
+		if not _attr.startswith('__') and (_value := self._jsn.get(_attr)) is not None:	# Ignore internal attributes of resources
+			L.isDebug and L.logDebug(f'Attribute: {_attr} = {_value}')
+			return pcontext.setResult(SSymbol(value = _value))
+		L.isDebug and L.logDebug(f'Attribute: {_attr} not found')
+		return pcontext.setResult(SSymbol()) # nil
+
+
+	def _monitorExecution(self, pcontext:PContext, symbol:SSymbol) -> PContext:
+		"""	Check whether the executed symbol is an allowed function for a comparison query.
+
+			Args:
+				pcontext: `PContext` object of the running query.
+				symbol: The symbol to test.
+			
+			Return:
+				The `PContext` object.
+			
+			Raises:
+				`PPermissionError` in case the symbol is not allowed.
+		"""
+		if not symbol.value in _allowedQuerySymbols:
+			raise PPermissionError(pcontext.setError(PError.permissionDenied, f'Not allowed to use function: {str(symbol)} in expression'))
+		return pcontext
+
+
 #########################################################################
 #
 #	Script Manager
@@ -1578,6 +1699,7 @@ class ScriptManager(object):
 	__slots__ = (
 		'scripts',
 		'storage',
+		'comparisonQueries',
 		'scriptUpdatesMonitor',
 		'scriptCronWorker',
 
@@ -1596,6 +1718,7 @@ class ScriptManager(object):
 		self.scripts:Dict[str,ACMEPContext] = {}				# The managed scripts
 		self.categoryDescriptions:Dict[str,str] = {}			# The category descriptions
 		self.storage:Dict[str, Dict[str, SSymbol]] = {}			# storage for global values
+		self.comparisonQueries = LRUCache(_comparisonQueryCacheSize)	# parsed comparison queries, by query string
 
 		self.scriptUpdatesMonitor:BackgroundWorker = None
 		self.scriptCronWorker:BackgroundWorker = None
@@ -2070,62 +2193,71 @@ class ScriptManager(object):
 		return (False, script.result)
 
 
-	_allowedQuerySymbols = ( '==', '!=', '<', '<=', '>', '>=', '&', '&&', '|', '||', '!', 'not', 'in')
-
-	def runComparisonQuery(self, query:str, resource:JSON|Resource) -> bool:
-		"""	Run a comparison query against a JSON strcture or a resource.
+	def compileComparisonQuery(self, query:str) -> ComparisonQuery:
+		"""	Parse and validate a comparison query.
 
-			The *query* consists of logical or comparison operations, and only those
+			The query consists of logical or comparison operations, and only those
 			are allowed. It can contain attributes, which values are taken from the JSON
-			structure or resource.
-		
+			structure or resource the query is evaluated against.
+
+			Parsed queries are cached, so each query string is only parsed and validated once.
+			The returned `ComparisonQuery` has its own script context and must only be used
+			by one request at a time.
+
 			Args:
 				query: String with a valid s-expression.
-				resource: JSON dictionary or resource for the attributes.				
 
 			Return:
-				Boolean value indicating the success of the query.
-		"""
-		jsn = pureResource(resource.asDict() if isinstance(resource, Resource) else cast(JSON, resource) )[0]  
+				`ComparisonQuery` object.
 
-		L.isDebug and L.logDebug(f'Running query: {query} against: {jsn}')
+			Raises:
+				`BAD_REQUEST`: In case the query is invalid or uses a function that is not allowed.
+		"""
+		if (ast := self.comparisonQueries.get(query)) is not None:
+			return ComparisonQuery(query, ast)
 
-		def getAttribute(pcontext:PContext, symbol:SSymbol) -> PContext:
-			_attr = symbol.value
-			if not isinstance(_attr, str):
-				raise ValueError(f'attribute: {_attr} must be a string')
-			if (_value := jsn.get(_attr)) is not None:
-				L.isDebug and L.logDebug(f'Attribute: {_attr} = {_value}')
-				return pcontext.setResult(SSymbol(value = _value))
-			L.isDebug and L.logDebug(f'Attribute: {_attr} not found')
-			return pcontext.setResult(SSymbol()) # nil
-	
+		parser = SExprParser()
+		try:
+			ast = parser.ast(removeCommentsFromJSON(query), allowBrackets = True)
+		except ValueError as e:
+			raise BAD_REQUEST(L.logDebug(f'Invalid query: {query}: {e}'))
+		if not ast:
+			raise BAD_REQUEST(L.logDebug(f'Empty query'))
+		compiled = ComparisonQuery(query, ast)
+
+		# Check the used functions
+		def _checkFunctions(symbol:SSymbol) -> None:
+			if symbol.type in (SType.tList, SType.tListQuote):
+				if (symbol.type == SType.tList and symbol.length and (_s := symbol[0]).type == SType.tSymbol 
+						and _s.value in compiled._pcontext.symbols and _s.value not in _allowedQuerySymbols):
+					raise BAD_REQUEST(L.logDebug(f'Not allowed to use function: {_s.value} in query: {query}'))
+				for each in cast(list, symbol.value):
+					_checkFunctions(each)
+		for symbol in ast:
+			_checkFunctions(symbol)
+
+		self.comparisonQueries.put(query, ast)	# Only valid queries are cached
+		return compiled
 
-		def monitorExecution(pcontext:PContext, symbol:SSymbol) -> PContext:
-			"""	Check whether the executed symbol is an allowed function for a comparison query.
 
-				Args:
-					pcontext: `PContext` object of the running script.
-					symbol: The symbol to test.
-				
-				Return:
-					The `PContext` object.
-				
-				Raises:
-					`PPermissionError` in case the symbol is not allowed.
+	def runComparisonQuery(self, query:str, resource:JSON|Resource) -> bool:
+		"""	Run a comparison query against a JSON strcture or a resource.
 
-			"""
-			if not symbol.value in self._allowedQuerySymbols:
-				raise PPermissionError(pcontext.setError(PError.permissionDenied, f'Not allowed to use function: {str(symbol)} in expression'))
-			return pcontext
+			For evaluating the same query against many resources, `compileComparisonQuery()` 
+			should be used instead.
+		
+			Args:
+				query: String with a valid s-expression.
+				resource: JSON dictionary or resource for the attributes.				
 
-	
-		pcontext = ACMEPContext(query, fallbackFunc = getAttribute, monitorFunc = monitorExecution, allowBrackets = True)
-		pcontext = cast(ACMEPContext, pcontext.run())
-		if pcontext.result.type != SType.tBool:
-			L.logWarn(f'Expected boolean for comparison, received: {pcontext.result.value}')
+			Return:
+				Boolean value indicating the success of the query.
+		"""
+		try:
+			return self.compileComparisonQuery(query).evaluate(resource)
+		except ResponseException as e:
+			L.logWarn(f'Error running query: {e.dbg}')
 			return False
-		return cast(bool, pcontext.result.value)
 
 	##########################################################################
 	#
@@ -10,9 +10,9 @@
 """	Statistics Module for internal statistics.
 """
 from __future__ import annotations
-from typing import Dict, Union, Optional
+from typing import Dict, Union, Optional, Tuple
 
-import datetime
+import datetime, time
 from urllib.parse import urlparse
 from copy import deepcopy
 from threading import Lock
@@ -24,6 +24,7 @@ from ..runtime.Configuration import Configuration
 from ..resources.Resource import Resource
 from ..resources.CSEBase import getCSE
 from ..helpers.BackgroundWorker import BackgroundWorkerPool
+from ..helpers.LatencyHistograms import LatencyHistograms, Histogram, HistogramKey
 from ..runtime.Logging import Logging as L
 
 
@@ -107,6 +108,151 @@ cseUpTime			= 'cseUT'
 """ Attribute name for CSE uptime. """
 resourceCount		= 'ctRes'
 """ Attribute name for number of resources in the storage. """
+dbPoolSize			= 'dbPSz'
+""" Attribute name for the number of open database connections. """
+dbPoolMaxSize		= 'dbPMx'
+""" Attribute name for the maximum number of database connections. """
+dbPoolInUse			= 'dbPIU'
+""" Attribute name for the number of database connections in use. """
+dbPoolCheckouts		= 'dbPCo'
+""" Attribute name for the number of database connection checkouts. """
+dbPoolWaits			= 'dbPWa'
+""" Attribute name for the number of database connection checkouts that had to wait. """
+dbPoolWaitTime		= 'dbPWt'
+""" Attribute name for the accumulated wait time in seconds for database connections. """
+dbPoolMaxWaitTime	= 'dbPMW'
+""" Attribute name for the longest wait time in seconds for a database connection. """
+dbPoolReconnects	= 'dbPRc'
+""" Attribute name for the number of replaced broken database connections. """
+dbCacheSize			= 'dbCSz'
+""" Attribute name for the number of resources in the resource cache. """
+dbCacheHits			= 'dbCHt'
+""" Attribute name for the number of resource retrievals that were served from the resource cache. """
+dbCacheMisses		= 'dbCMs'
+""" Attribute name for the number of resource retrievals that were not served from the resource cache. """
+requestsBuffered	= 'rqBuf'
+""" Attribute name for the number of recorded requests that are not yet written to the database. """
+requestsDropped		= 'rqDrp'
+""" Attribute name for the number of recorded requests that were dropped because the buffer was full. """
+httpPoolSessions	= 'htPSs'
+""" Attribute name for the number of target hosts with open HTTP client sessions. """
+httpPoolRequests	= 'htPRq'
+""" Attribute name for the number of requests sent via the HTTP client sessions. """
+httpPoolHits		= 'htPHt'
+""" Attribute name for the number of HTTP requests that reused an open connection. """
+httpPoolMisses		= 'htPMs'
+""" Attribute name for the number of HTTP requests that opened a new connection. """
+httpPoolEvictions	= 'htPEv'
+""" Attribute name for the number of closed idle HTTP client sessions. """
+notificationTargets	= 'ntTgt'
+""" Attribute name for the number of asynchronous notification targets. """
+notificationQueued	= 'ntQue'
+""" Attribute name for the number of queued asynchronous notifications. """
+notificationInFlight	= 'ntInF'
+""" Attribute name for the number of asynchronous notifications that are currently sent. """
+notificationDelivered	= 'ntDlv'
+""" Attribute name for the number of delivered asynchronous notifications. """
+notificationFailed	= 'ntFld'
+""" Attribute name for the number of failed asynchronous notifications. """
+notificationDropped	= 'ntDrp'
+""" Attribute name for the number of dropped asynchronous notifications. """
+notificationAvgLatency	= 'ntLAv'
+""" Attribute name for the average latency of asynchronous notifications, in seconds. """
+notificationMaxLatency	= 'ntLMx'
+""" Attribute name for the maximum latency of asynchronous notifications, in seconds. """
+jobEventsQueued		= 'jbEQu'
+""" Attribute name for the number of queued event jobs. """
+jobEventsActive		= 'jbEAc'
+""" Attribute name for the number of event jobs that are currently executed. """
+jobEventsRejected	= 'jbERj'
+""" Attribute name for the number of rejected event jobs. """
+jobNotificationsQueued		= 'jbNQu'
+""" Attribute name for the number of queued notification jobs. """
+jobNotificationsActive		= 'jbNAc'
+""" Attribute name for the number of notification jobs that are currently executed. """
+jobNotificationsRejected	= 'jbNRj'
+""" Attribute name for the number of rejected notification jobs. """
+jobActorsQueued		= 'jbAQu'
+""" Attribute name for the number of queued actor jobs. """
+jobActorsActive		= 'jbAAc'
+""" Attribute name for the number of actor jobs that are currently executed. """
+jobActorsRejected	= 'jbARj'
+""" Attribute name for the number of rejected actor jobs. """
+
+_dbRuntimeStatistics = {
+	'size':			dbPoolSize,
+	'maxSize':		dbPoolMaxSize,
+	'inUse':		dbPoolInUse,
+	'checkouts':	dbPoolCheckouts,
+	'waits':		dbPoolWaits,
+	'waitTime':		dbPoolWaitTime,
+	'maxWaitTime':	dbPoolMaxWaitTime,
+	'reconnects':	dbPoolReconnects,
+	'resourceCacheSize':	dbCacheSize,
+	'resourceCacheHits':	dbCacheHits,
+	'resourceCacheMisses':	dbCacheMisses,
+	'requestsBuffered':	requestsBuffered,
+	'requestsDropped':	requestsDropped,
+}
+""" Mapping of the database binding's, resource cache's and request recording's runtime statistics to statistics attribute names. """
+
+_httpRuntimeStatistics = {
+	'sessions':		httpPoolSessions,
+	'requests':		httpPoolRequests,
+	'hits':			httpPoolHits,
+	'misses':		httpPoolMisses,
+	'evictions':	httpPoolEvictions,
+}
+""" Mapping of the HTTP client session pool's runtime statistics to statistics attribute names. """
+
+_notificationRuntimeStatistics = {
+	'targets':		notificationTargets,
+	'queued':		notificationQueued,
+	'inFlight':		notificationInFlight,
+	'delivered':	notificationDelivered,
+	'failed':		notificationFailed,
+	'dropped':		notificationDropped,
+	'avgLatency':	notificationAvgLatency,
+	'maxLatency':	notificationMaxLatency,
+}
+""" Mapping of the notification delivery pool's runtime statistics to statistics attribute names. """
+
+_jobRuntimeStatistics = {
+	'events': {
+		'queued':	jobEventsQueued,
+		'active':	jobEventsActive,
+		'rejected':	jobEventsRejected,
+	},
+	'notifications': {
+		'queued':	jobNotificationsQueued,
+		'active':	jobNotificationsActive,
+		'rejected':	jobNotificationsRejected,
+	},
+	'actors': {
+		'queued':	jobActorsQueued,
+		'active':	jobActorsActive,
+		'rejected':	jobActorsRejected,
+	},
+}
+""" Mapping of the job executors' runtime statistics, per job category, to statistics attribute names. """
+
+
+latencyBinding		= 'acme_binding_request_duration_seconds'
+""" Metric name for the duration of incoming requests in the protocol bindings. """
+latencyRequest		= 'acme_request_duration_seconds'
+""" Metric name for the duration of requests in the request manager. """
+latencyDispatcher	= 'acme_dispatcher_duration_seconds'
+""" Metric name for the duration of resource operations in the dispatcher. """
+latencyStorage		= 'acme_storage_duration_seconds'
+""" Metric name for the duration of storage operations. """
+
+_latencyMetrics = {
+	latencyBinding:		( ('binding', 'operation'),			'Duration of incoming requests in the protocol bindings, including the response serialization.' ),
+	latencyRequest:		( ('operation', ),					'Duration of requests in the request manager.' ),
+	latencyDispatcher:	( ('operation', 'resourceType'),	'Duration of resource operations in the dispatcher.' ),
+	latencyStorage:		( ('operation', ),					'Duration of storage operations.' ),
+}
+""" Label names and help texts of the latency metrics. """
 
 # TODO  restartcount, 
 
@@ -120,12 +266,14 @@ class Statistics(object):
 			statisticsEnabled:		Flag whether statistics are enabled.
 			statLock:				Internal lock for statistic handling.
 			stats:					Statistics records
+			latencyHistograms:		Latency histograms, or None if latency histograms are disabled.
 	"""
 
 	__slots__ = (
 		'statisticsEnabled',
 		'statLock',
 		'stats',
+		'latencyHistograms',
 	)
 	""" Slots of class attributes. """
 
@@ -139,6 +287,9 @@ class Statistics(object):
 		# retrieve or create statistics record, even when statistics are disabled
 		self.stats = self.setupStats()
 
+		# Latency histograms are only kept in memory
+		self.latencyHistograms = LatencyHistograms() if self.statisticsEnabled and Configuration.get('cse.statistics.latencyHistograms') else None
+
 		if self.statisticsEnabled:
 
 			# Start background worker to handle writing to DB
@@ -150,6 +301,7 @@ class Statistics(object):
 			CSE.event.addHandler(CSE.event.createResource, lambda n, _: self._handleStatsEvent(createdResources)) 	# type: ignore
 			CSE.event.addHandler(CSE.event.updateResource, lambda n, _: self._handleStatsEvent(updatedResources))	# type: ignore
 			CSE.event.addHandler(CSE.event.deleteResource, lambda n, _: self._handleStatsEvent(deletedResources))	# type: ignore
+			CSE.event.addHandler(CSE.event.deleteResources, lambda n, ris: self._handleStatsEvent(deletedResources, len(ris)))	# type: ignore
 			CSE.event.addHandler(CSE.event.expireResource, lambda n, _: self._handleStatsEvent(expiredResources))	# type: ignore
 			CSE.event.addHandler(CSE.event.httpRetrieve, lambda n: self._handleStatsEvent(httpRetrieves))			# type: ignore
 			CSE.event.addHandler(CSE.event.httpCreate, lambda n: self._handleStatsEvent(httpCreates))				# type: ignore
@@ -218,6 +370,8 @@ class Statistics(object):
 		"""
 		self.purgeDBStatistics()
 		self.stats = self.setupStats()
+		if self.latencyHistograms:
+			self.latencyHistograms.clear()
 		self.handleCseStartup(None)
 		L.isDebug and L.logDebug('Statistics restarted')
 
@@ -286,28 +440,134 @@ class Statistics(object):
 		s[cseUpTime] = str(datetime.timedelta(seconds=int(utcTime() - int(s[cseStartUpTime]))))
 		s[cseStartUpTime] = toISO8601Date(float(s[cseStartUpTime]))
 		s[resourceCount] = int(s[createdResources]) - int(s[deletedResources])
+
+		# Add the runtime statistics of the database binding. These are not stored in the DB
+		for k, v in CSE.storage.getRuntimeStatistics().items():
+			if (_k := _dbRuntimeStatistics.get(k)):
+				s[_k] = v
+
+		# Add the runtime statistics of the HTTP client session pool
+		if CSE.httpServer:
+			for k, v in CSE.httpServer.getRuntimeStatistics().items():
+				if (_k := _httpRuntimeStatistics.get(k)):
+					s[_k] = v
+
+		# Add the runtime statistics of the notification delivery
+		if CSE.notification:
+			for k, v in CSE.notification.getRuntimeStatistics().items():
+				if (_k := _notificationRuntimeStatistics.get(k)):
+					s[_k] = v
+
+		# Add the runtime statistics of the job executors
+		for category, stats in BackgroundWorkerPool.getJobStatistics().items():
+			if (_m := _jobRuntimeStatistics.get(category)):
+				for k, v in stats.items():
+					if (_k := _m.get(k)):
+						s[_k] = v
 		return s
 
 
+	#########################################################################
+	#
+	#	Latency histograms
+
+	def recordLatency(self, metric:str, labels:Tuple[str, ...], start:float) -> None:
+		"""	Record the duration of an operation in a latency histogram.
+
+			Args:
+				metric: The metric name, one of the *latency...* constants.
+				labels: The label values, in the order of the metric's label names.
+				start: The start time of the operation, as returned by *time.perf_counter()*.
+		"""
+		if self.latencyHistograms:
+			self.latencyHistograms.observe(metric, labels, time.perf_counter() - start)
+
+
+	def getLatencyHistograms(self) -> dict[HistogramKey, Histogram]:
+		"""	Return the latency histograms.
+
+			Return:
+				Dictionary of the histograms, mapped by the metric name and the label values. The dictionary is empty if latency histograms are disabled.
+		"""
+		return self.latencyHistograms.getHistograms() if self.latencyHistograms else {}
+
+
+	def getLatencyLabelNames(self, metric:str) -> Tuple[str, ...]:
+		"""	Return the label names of a latency metric.
+
+			Args:
+				metric: The metric name.
+
+			Return:
+				The label names.
+		"""
+		return _latencyMetrics[metric][0]
+
+
+	def getOpenMetrics(self) -> str:
+		"""	Return the latency histograms and the numeric statistics in the OpenMetrics text format.
+
+			Return:
+				The metrics as a string.
+		"""
+
+		def _labels(names:Tuple[str, ...], values:Tuple[str, ...], le:Optional[str] = None) -> str:
+			_l = [ f'{n}="{_escape(v)}"' for n, v in zip(names, values) ]
+			if le is not None:
+				_l.append(f'le="{le}"')
+			return f'{{{",".join(_l)}}}' if _l else ''
+
+		def _escape(value:str) -> str:
+			return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+		lines:list[str] = []
+
+		# Latency histograms
+		histograms = self.getLatencyHistograms()
+		for metric, (names, help) in _latencyMetrics.items():
+			lines.append(f'# TYPE {metric} histogram')
+			lines.append(f'# UNIT {metric} seconds')
+			lines.append(f'# HELP {metric} {help}')
+			for (_, values), histogram in sorted((item for item in histograms.items() if item[0][0] == metric), key = lambda item: item[0]):
+				cumulative = 0
+				for bound, count in zip(histogram.buckets, histogram.counts):
+					cumulative += count
+					lines.append(f'{metric}_bucket{_labels(names, values, repr(float(bound)))} {cumulative}')
+				lines.append(f'{metric}_bucket{_labels(names, values, "+Inf")} {histogram.count}')
+				lines.append(f'{metric}_count{_labels(names, values)} {histogram.count}')
+				lines.append(f'{metric}_sum{_labels(names, values)} {histogram.sum}')
+
+		# Numeric statistics
+		lines.append('# TYPE acme_statistics gauge')
+		lines.append('# HELP acme_statistics CSE statistics, by statistics attribute name.')
+		for k, v in sorted(self.getStats().items()):
+			if isinstance(v, (int, float)) and not isinstance(v, bool):
+				lines.append(f'acme_statistics{_labels(("name", ), (k, ))} {v}')
+
+		lines.append('# EOF')
+		return '\n'.join(lines) + '\n'
+
+
 	#########################################################################
 	#
 	#	Event handlers
 	#
 
-	def _handleStatsEvent(self, eventType:str) -> None:
+	def _handleStatsEvent(self, eventType:str, count:Optional[int] = 1) -> None:
 		"""	Generic handling of statist events.
 
 			Args:
 				eventType:	The type of event that occurred.
+				count: The number of events that occurred.
 		"""
 		try:
 			with self.statLock:
-				self.stats[eventType] += 1		# type: ignore
+				self.stats[eventType] += count		# type: ignore
 		except KeyError:
 			# In case there is a version update and a new event was added,
 			# the we might just add this event as the first entry
 			with self.statLock:
-				self.stats[eventType] = 1		# type: ignore
+				self.stats[eventType] = count		# type: ignore
 
 
 	def handleCseStartup(self, name:str) -> None:
@@ -21,19 +21,27 @@
 """
 
 from __future__ import annotations
-from typing import Callable, cast, List, Optional, Sequence
-
-import os
-from ..etc.Types import ResourceTypes, JSON, Operation, ResponseStatusCode
+from typing import Any, Callable, cast, Iterator, List, Optional, Sequence, Tuple
+
+import os, time
+from copy import deepcopy
+from threading import Lock
+from contextlib import contextmanager
+from contextvars import ContextVar
+from ..etc.Types import ResourceTypes, JSON, Operation, ResponseStatusCode, FilterCriteria, FilterOperation
 from ..etc.ResponseStatusCodes import NOT_FOUND, INTERNAL_SERVER_ERROR, CONFLICT
-from ..etc.DateUtils import utcTime, fromDuration
+from ..etc.DateUtils import utcTime, fromDuration, fromAbsRelTimestamp
 from .Configuration import Configuration
-from ..runtime import CSE
+from ..runtime import CSE, Statistics
 from ..resources.Resource import Resource
 from ..resources.ACTR import ACTR
 from ..resources.SCH import SCH
 from ..resources.Factory import resourceFromDict
 from .Logging import Logging as L
+from ..helpers.ExpirationIndex import ExpirationIndex
+from ..helpers.RingBuffer import RingBuffer
+from ..helpers.LRUCache import LRUCache
+from ..helpers.BackgroundWorker import BackgroundWorker, BackgroundWorkerPool
 
 from ..databases.DBBinding import DBBinding
 from ..databases.TinyDBBinding import TinyDBBinding
@@ -66,6 +74,19 @@ _schedules = 'schedules'
 """ Name of the schedules table. """
 
 
+_accessControlTypes = ( ResourceTypes.ACP, ResourceTypes.ACPAnnc, ResourceTypes.GRP, ResourceTypes.GRPAnnc )
+""" Resource types that are used for access control decisions. """
+
+_unitOfWork:ContextVar[Optional[dict[str, JSON]]] = ContextVar('unitOfWork', default = None)
+""" The pending resource updates of the current unit of work, mapped by resource ID, or *None* outside of a unit of work. """
+
+_afterUnitOfWork:ContextVar[Optional[list[Tuple[Callable, Tuple[Any, ...]]]]] = ContextVar('afterUnitOfWork', default = None)
+""" The functions, together with their arguments, that are called when the current unit of work has written its updates. """
+
+_resourceLockCount = 64
+""" Number of locks for the read-modify-write of resource attributes. Resources are mapped to the locks by their resource IDs. """
+
+
 class Storage(object):
 	"""	This class implements the entry points to the CSE's underlying database functions.
 	"""
@@ -73,52 +94,129 @@ class Storage(object):
 	__slots__ = (
 		'db',
 		'maxRequests',
+		'coalesceUpdates',
+		'expirationIndex',
+		'resourceCache',
+		'requestBuffer',
+		'requestFlushInterval',
+		'requestWriter',
+		'_requestFlushLock',
+		'_resourceCacheGeneration',
+		'_resourceCacheLock',
+		'_resourceLocks',
 	)
 	""" Define slots for instance variables. """
 
-	def __init__(self) -> None:
+	def __init__(self, db:Optional[DBBinding] = None,
+					   config:Callable[[str], Any] = Configuration.get) -> None:
 		"""	Initialization of the storage manager.
 
+			By default the database binding is created from the CSE's configuration. A database binding
+			and the configuration settings can be given instead, e.g. for unit tests without a running CSE.
+			A given database binding is used as it is: it is not reset, validated or backed up.
+
+			Args:
+				db: Database binding to use instead of creating one from the configuration.
+				config: Function that returns the value of a configuration setting.
+
 			Raises:
 				RuntimeError: In case of an error during initialization.
 		"""
 
-		self.maxRequests = Configuration.get('cse.operation.requests.size') 
+		self.maxRequests = config('cse.operation.requests.size') 
 		""" Maximum number of requests to store. """	
 
-		self.db:DBBinding = None
+		self.coalesceUpdates = config('database.coalesceUpdates')
+		""" Whether resource updates are collected in a unit of work and written once at its end. """
+
+		self.requestBuffer = RingBuffer(config('cse.operation.requests.bufferSize'))
+		""" Buffer for recorded requests that are not yet written to the database. """
+
+		self.requestFlushInterval = config('cse.operation.requests.flushInterval')
+		""" Maximum time in seconds before buffered requests are written to the database. """
+
+		self.requestWriter:BackgroundWorker = None
+		""" Actor that writes the buffered requests to the database. """
+
+		self._requestFlushLock = Lock()
+		""" Lock to serialize writing the buffered requests to the database. """
+
+		self.db:DBBinding = db
 		""" The database object. """
+
+		self.expirationIndex = ExpirationIndex()
+		""" Index of the expiration timestamps of all resources. """
+
+		self.resourceCache = LRUCache(config('database.resourceCacheSize'))
+		""" Cache of recently used resource documents, mapped by resource ID. """
+
+		self._resourceCacheGeneration = 0
+		""" Counter that is incremented whenever resource documents are invalidated in the resource cache. """
+
+		self._resourceCacheLock = Lock()
+		""" Lock to synchronize adding documents to the resource cache with their invalidation. """
+
+		self._resourceLocks = [ Lock() for _ in range(_resourceLockCount) ]
+		""" Locks for the read-modify-write of resource attributes, see `updateResourceAttributes()`. """
 	
 		if _disablePostgreSQL:
 			L.isDebug and L.logDebug('PostgreSQL is disabled by environment variable')
 
+		# Create the database object and connect to the database, unless a database binding is given
+		if db is None:
+			self._openDB(config)
+
+		# Start the writer for recorded requests, if request recording is enabled
+		if config('cse.operation.requests.enable'):
+			self._startRequestWriter()
+
+		# Add handler for configuration updates
+		CSE.event.addHandler(CSE.event.configUpdate, self.configUpdate)			# type: ignore
+
+		L.isInfo and L.log('Storage initialized')
+
+
+	def _openDB(self, config:Callable[[str], Any]) -> None:
+		"""	Create the database binding from the configuration and connect to the database. Then reset the
+			database, or validate and back it up, and build the expiration index.
+
+			Args:
+				config: Function that returns the value of a configuration setting.
+
+			Raises:
+				RuntimeError: In case of an error during initialization.
+		"""
 		# Create the database object and connect to the database
 		try:
-			match Configuration.get('database.type'):
+			match config('database.type'):
 				case 'tinydb':
 					# create tinyDB object and open DB for file handling
-					self.db = TinyDBBinding(Configuration.get('database.tinydb.path'), 
+					self.db = TinyDBBinding(config('database.tinydb.path'), 
 											CSE.cseCsi[1:], # add CSE CSI as postfix
-											Configuration.get('database.tinydb.cacheSize'),
-											Configuration.get('database.tinydb.writeDelay')
+											config('database.tinydb.cacheSize'),
+											config('database.tinydb.writeDelay'),
+											config('database.tinydb.journal'),
+											config('database.tinydb.journalSize')
 										) 
 				case 'memory':
 					# create tinyDB object and open DB for in-memory handling
 					self.db = TinyDBBinding(None,
 											CSE.cseCsi[1:], # add CSE CSI as postfix
-											Configuration.get('database.tinydb.cacheSize'),
-											Configuration.get('database.tinydb.writeDelay')
+											config('database.tinydb.cacheSize'),
+											config('database.tinydb.writeDelay')
 										)
 				case 'postgresql':
 					# create PostgreSQL object and connect to the DB
 					if _disablePostgreSQL:
 						raise RuntimeError('Configuration conflict: Use of PostgreSQL is disabled in the environment, but enabled in the configuration.')
-					self.db = PostgreSQLBinding(Configuration.get('database.postgresql.host'),
-												Configuration.get('database.postgresql.port'),
-												Configuration.get('database.postgresql.role'),
-												Configuration.get('database.postgresql.password'),
-												Configuration.get('database.postgresql.database'),
-												Configuration.get('database.postgresql.schema')
+					self.db = PostgreSQLBinding(config('database.postgresql.host'),
+												config('database.postgresql.port'),
+												config('database.postgresql.role'),
+												config('database.postgresql.password'),
+												config('database.postgresql.database'),
+												config('database.postgresql.schema'),
+												config('database.postgresql.poolSize'),
+												config('database.postgresql.poolTimeout')
 											)
 				case _:
 					L.logErr('Unknown database type')
@@ -126,7 +224,7 @@ class Storage(object):
 		except Exception as e:
 			raise INTERNAL_SERVER_ERROR(f'Database error: {e}')
 
-		dbReset = Configuration.get('database.resetOnStartup') # Indicator that the database should be reset or cleared during start-up. """
+		dbReset = config('database.resetOnStartup') # Indicator that the database should be reset or cleared during start-up. """
 		
 
 		# Reset dbs?
@@ -145,7 +243,10 @@ class Storage(object):
 				self.db.closeDB()
 				raise RuntimeError('DB Error')
 		
-		L.isInfo and L.log('Storage initialized')
+			# Build the expiration index from the existing resources
+			for each in self.db.discoverResourcesByFilter(lambda r: r.get('et') is not None):
+				self._indexExpiration(each['ri'], each['et'])
+			L.isDebug and L.logDebug(f'Expiration index built. Resources with expiration: {len(self.expirationIndex)}')
 
 
 	def shutdown(self) -> bool:
@@ -154,12 +255,35 @@ class Storage(object):
 			Return:
 				Always True.
 		"""
+		# Stop the request writer and write the remaining requests
+		self._stopRequestWriter()
+
 		self.db.closeDB()
 		self.db = None
 		L.isInfo and L.log('Storage shut down')
 		return True
 
 
+	def configUpdate(self, name:str, 
+						   key:Optional[str] = None, 
+						   value:Optional[Any] = None) -> None:
+		"""	Callback for the `configUpdate` event.
+			
+			Args:
+				name: Event name.
+				key: Name of the updated configuration setting.
+				value: New value for the config setting.
+		"""
+		if key != 'cse.operation.requests.enable':
+			return
+		
+		# Start or stop the writer for recorded requests
+		if value:
+			self._startRequestWriter()
+		else:
+			self._stopRequestWriter()
+
+
 	def purge(self) -> None:
 		"""	Reset and clear the databases.
 		"""
@@ -168,6 +292,11 @@ class Storage(object):
 		except Exception as e:
 			L.logErr(f'Exception during purge: {e}', exc=e)
 			quit()
+		self.expirationIndex.clear()
+		self._invalidateCachedResource(None)
+		self.requestBuffer.drain()
+		if CSE.security:
+			CSE.security.invalidateAccessCache()
 
 
 	def _validateDB(self) -> bool:
@@ -231,6 +360,7 @@ class Storage(object):
 			Raises:
 				CONFLICT: In case the resource already exists and *overwrite* is "False".
 		"""
+		start = time.perf_counter()
 		_ri  = resource.ri
 		_pi = resource.pi
 		_ty = resource.ty
@@ -238,12 +368,15 @@ class Storage(object):
 		
 		if overwrite:
 			L.isDebug and L.logDebug('Resource enforced overwrite')
+			if (pending := _unitOfWork.get()) is not None:
+				pending.pop(_ri, None)	# overwritten anyway
 			self.db.upsertResource(resource.dict, _ri)
 		else: 
 			if not self.hasResource(_ri, _srn):	# Only when resource with same ri or srn does not exist yet
 				self.db.insertResource(resource.dict, _ri)
 			else:
 				raise CONFLICT(L.logWarn(f'Resource already exists (Skipping): {resource} ri: {_ri} srn:{_srn}'))
+		self._invalidateCachedResource(_ri)
 
 		# Add path to identifiers db
 		self.db.upsertIdentifier(
@@ -266,6 +399,22 @@ class Storage(object):
 			  'ch' : [] 
 			}, _ri)
 
+		# Add instance resources to the parent's instance index
+		if ResourceTypes.isInstanceResource(_ty):
+			self.db.insertInstance(
+				{ 'ri' : _ri,
+				  'pi' : _pi,
+				  'ty' : _ty,
+				  'ct' : resource.ct,
+				  'cs' : resource.cs if resource.cs is not None else 0
+				})
+
+		# Add the expiration time to the expiration index. A new resource with an expiration time in the past is 
+		# still being validated and will be rejected or updated. It must not be expired in the meantime.
+		self._indexExpiration(_ri, resource.et, onlyFuture = True)
+		self._invalidateAccessCache(_ty)
+		self._recordLatency('create', start)
+
 
 	def hasResource(self, ri:Optional[str] = None, srn:Optional[str] = None) -> bool:
 		"""	Check whether a resource with either the ri or the srn already exists.
@@ -285,7 +434,8 @@ class Storage(object):
 	def retrieveResource(self,	ri:Optional[str] = None, 
 								csi:Optional[str] = None,
 								srn:Optional[str] = None, 
-								aei:Optional[str] = None) -> Resource:
+								aei:Optional[str] = None,
+								shareDict:Optional[bool] = False) -> Resource:
 		""" Return a resource via different addressing methods. 
 
 			Either one of *ri*, *srn*, *csi*, or *aei* must be provided.
@@ -295,6 +445,7 @@ class Storage(object):
 				csi: The resource is retrieved via its CSE-ID.
 				srn: The resource is retrieved via its structured resource name.
 				aei: The resource is retrieved via its AE-ID.
+				shareDict: The resource shares the stored document instead of copying it. Its attributes are then only copied when they are changed.
 
 			Returns:
 				The resource.
@@ -303,27 +454,34 @@ class Storage(object):
 				NOT_FOUND: In case the resource does not exist.
 				INTENRAL_SERVER_ERROR: In case of a database inconsistency.
 		"""
+		start = time.perf_counter()
 		resources = []
 
 		if ri:		# get a resource by its ri
 			# L.logDebug(f'Retrieving resource ri: {ri}')
-			resources = self.db.searchResources(ri = ri)
+			resources = self._searchResource(ri)
+
+		else:
+			generation = self._resourceCacheGeneration
+			if srn:		# get a resource by its structured rn
+				# L.logDebug(f'Retrieving resource srn: {srn}')
+				# get the ri via the srn from the identifers table
+				resources = self.db.searchResources(srn = srn)
 
-		elif srn:	# get a resource by its structured rn
-			# L.logDebug(f'Retrieving resource srn: {srn}')
-			# get the ri via the srn from the identifers table
-			resources = self.db.searchResources(srn = srn)
+			elif csi:	# get the CSE by its csi
+				# L.logDebug(f'Retrieving resource csi: {csi}')
+				resources = self.db.searchResources(csi = csi)
 
-		elif csi:	# get the CSE by its csi
-			# L.logDebug(f'Retrieving resource csi: {csi}')
-			resources = self.db.searchResources(csi = csi)
-		
-		elif aei:	# get an AE by its AE-ID
-			resources = self.db.searchResources(aei = aei)
+			elif aei:	# get an AE by its AE-ID
+				resources = self.db.searchResources(aei = aei)
+
+			if len(resources) == 1 and self.resourceCache.maxSize:
+				self._cacheResource(resources[0], generation)
+		self._recordLatency('retrieve', start)
 
 		match len(resources):
 			case 1:
-				return resourceFromDict(resources[0])
+				return self._resourceFromDoc(self._withPendingUpdates(resources[0]), shareDict)
 			case 0:
 				raise NOT_FOUND('resource not found')
 
@@ -343,10 +501,10 @@ class Storage(object):
 				NOT_FOUND: In case the resource does not exist.
 				INTENRAL_SERVER_ERROR: In case of a database inconsistency.
 		"""
-		resources = self.db.searchResources(ri = ri)
+		resources = self._searchResource(ri)
 		match len(resources):
 			case 1:
-				return resources[0]
+				return dict(self._withPendingUpdates(resources[0]))	# a copy, because the document might be cached
 			case 0: 
 				raise NOT_FOUND('resource not found')
 
@@ -363,24 +521,292 @@ class Storage(object):
 				List of resource *JSON* objects, not *Resource* objects.
 		"""
 		# L.logDebug(f'Retrieving all resources ty: {ty}')
-		return self.db.searchResources(ty = int(ty))
+		return [ self._withPendingUpdates(doc) for doc in self.db.searchResources(ty = int(ty)) ]
+
+
+	def retrieveResources(self, ris:Sequence[str], shareDict:Optional[bool] = False) -> list[Resource]:
+		"""	Return the resources for a list of resource IDs.
+
+			Resources that are not in the resource cache are retrieved from the database with a single operation.
+
+			Args:
+				ris: The resource IDs.
+				shareDict: The resources share the stored documents instead of copying them. Their attributes are then only copied when they are changed.
+
+			Returns:
+				List of resources in the order of *ris*. Resources that don't exist are skipped.
+		"""
+		start = time.perf_counter()
+		docs = self._searchResources(ris)
+		self._recordLatency('retrieveMany', start)
+		return [ self._resourceFromDoc(self._withPendingUpdates(doc), shareDict) for doc in docs ]
 
 
-	def updateResource(self, resource:Resource) -> Resource:
+	def updateResource(self, resource:Resource, immediate:Optional[bool] = False) -> Resource:
 		"""	Update a resource in the database.
 
 			Args:
 				resource: Resource to update.
+				immediate: Write the resource immediately, even within a unit of work. This must be used for read-modify-write sequences that are synchronized with other threads.
 
 			Return:
 				Updated Resource object.
 		"""
 		ri = resource.ri
 		# L.logDebug(f'Updating resource (ty: {resource.ty}, ri: {ri}, rn: {resource.rn})')
-		resource.dict = self.db.updateResource(resource.dict, ri)
+		pending = _unitOfWork.get()
+		if pending is not None and not immediate:
+			# Collect only the changed attributes, so that the changes of concurrent requests to other attributes
+			# are not overwritten. Nulled attributes are kept, so that they are removed from the database as well
+			if (changes := self._changedAttributes(resource)):
+				changes['ty'] = resource.ty	# Always included to invalidate the access caches after the updates are written
+				pending[ri] = { **pending[ri], **changes } if ri in pending else changes
+			if any(v is None for v in resource.dict.values()):
+				resource.dict = { k:v for k,v in resource.dict.items() if v is not None }
+		else:
+			if pending:
+				pending.pop(ri, None)	# The resource already includes the collected updates
+			start = time.perf_counter()
+			resource.dict = self.db.updateResource(resource.dict, ri)
+			resource._storedDict = deepcopy(resource.dict)
+			self._invalidateCachedResource(ri)
+			self._recordLatency('update', start)
+		self._indexExpiration(ri, resource.et)
+		self._invalidateAccessCache(resource.ty)
+		return resource
+
+
+	def updateResourceAttributes(self, resource:Resource, update:Callable[[JSON], JSON]) -> JSON:
+		"""	Update some attributes of a resource with a read-modify-write sequence that is synchronized
+			with other threads, e.g. counters like *cni* or *st* that concurrent requests change.
+
+			The function *update* is called with the current version of the resource in the database,
+			and returns the new values of the attributes to update. These attributes are written to
+			the database immediately, even within a unit of work, and are set in *resource*. Other
+			attributes of *resource* are not changed or written.
+
+			Args:
+				resource: The resource to update.
+				update: Function that receives the current resource document and returns the updated attributes.
+
+			Return:
+				The updated attributes.
+		"""
+		ri = resource.ri
+		with self._resourceLocks[hash(ri) % _resourceLockCount]:
+			attributes = update(self.retrieveResourceRaw(ri))
+			start = time.perf_counter()
+			self.db.updateResource(dict(attributes), ri)
+			self._invalidateCachedResource(ri)
+			self._recordLatency('update', start)
+		if (pending := _unitOfWork.get()) and (collected := pending.get(ri)):
+			for k in attributes:
+				collected.pop(k, None)	# Don't overwrite the attributes with collected older values
+		for k, v in attributes.items():
+			resource.setAttribute(k, v)
+		if resource._storedDict is not None:
+			resource._storedDict = { **resource._storedDict, **attributes }	# The stored document might be shared and is not changed
+		return attributes
+
+
+	@contextmanager
+	def unitOfWork(self) -> Iterator[None]:
+		"""	Context manager for a unit of work, e.g. the processing of a request.
+
+			Within a unit of work, resource updates are not written to the database immediately.
+			Instead, they are collected, and each updated resource is written only once when the
+			unit of work ends, even if an exception was raised. When the database binding supports
+			it then all updates are written in a single transaction.
+
+			Resources that are retrieved by the same thread within the unit of work include the
+			collected updates. Functions that are registered with `afterUnitOfWork()` are called after
+			the updates are written. A unit of work that is started within another unit of work is part
+			of the outer unit of work.
+		"""
+		if not self.coalesceUpdates or _unitOfWork.get() is not None:
+			yield
+			return
+		pending:dict[str, JSON] = {}
+		calls:list[Tuple[Callable, Tuple[Any, ...]]] = []
+		token = _unitOfWork.set(pending)
+		callsToken = _afterUnitOfWork.set(calls)
+		try:
+			yield
+		finally:
+			_unitOfWork.reset(token)
+			_afterUnitOfWork.reset(callsToken)
+			try:
+				if pending:
+					L.isDebug and L.logDebug(f'Writing {len(pending)} updated resource(s)')
+					start = time.perf_counter()
+					self.db.updateResources(list(pending.items()))
+					self._recordLatency('write', start)
+					for ri, doc in pending.items():
+						self._invalidateCachedResource(ri)
+						self._invalidateAccessCache(doc.get('ty'))	# again, in case an old version was cached in the meantime
+			finally:
+				for func, args in calls:
+					func(*args)
+
+
+	def afterUnitOfWork(self, func:Callable, *args:Any) -> None:
+		"""	Call a function when the current unit of work has written its updates, or immediately outside of a unit of work.
+
+			This must be used, for example, to raise events whose handlers run in other threads and retrieve the updated
+			resources from the database.
+
+			Args:
+				func: The function to call.
+				args: The arguments for the function.
+		"""
+		if (calls := _afterUnitOfWork.get()) is not None:
+			calls.append((func, args))
+		else:
+			func(*args)
+
+
+	def _recordLatency(self, operation:str, start:float) -> None:
+		"""	Record the duration of a storage operation in the latency histograms.
+
+			Args:
+				operation: The name of the storage operation.
+				start: The start time of the operation, as returned by *time.perf_counter()*.
+		"""
+		if CSE.statistics:	# The storage is initialized before the statistics
+			CSE.statistics.recordLatency(Statistics.latencyStorage, (operation, ), start)
+
+
+	def _resourceFromDoc(self, doc:JSON, shareDict:Optional[bool] = False) -> Resource:
+		"""	Instantiate a resource from a resource document that was retrieved from the database.
+
+			Args:
+				doc: The resource document, including the collected updates of the current unit of work.
+				shareDict: The resource shares the stored document instead of copying it.
+
+			Return:
+				The resource. It refers to *doc* to determine the changed attributes when it is updated.
+		"""
+		resource = resourceFromDict(doc, shareDict = shareDict)
+		resource._storedDict = doc
 		return resource
 
 
+	def _changedAttributes(self, resource:Resource) -> JSON:
+		"""	Determine the attributes of a resource that were changed since it was retrieved from the database.
+
+			Args:
+				resource: The resource.
+
+			Return:
+				Dictionary with the changed attributes. Removed attributes have the value *None*. All attributes are
+				returned if the resource was not retrieved from the database.
+		"""
+		if (stored := resource._storedDict) is None:
+			return dict(resource.dict)
+		_missing = object()
+		changes = { k:v for k, v in resource.dict.items() if stored.get(k, _missing) != v }
+		for k in stored:
+			if k not in resource.dict:
+				changes[k] = None
+		return changes
+
+
+	def _withPendingUpdates(self, doc:JSON) -> JSON:
+		"""	Apply the collected updates of the current unit of work to a resource document.
+
+			Args:
+				doc: The resource document as read from the database.
+
+			Return:
+				The updated resource document, or *doc* if there are no collected updates for the resource.
+		"""
+		if (pending := _unitOfWork.get()) and (updates := pending.get(doc.get('ri'))):
+			return { k:v for k,v in { **doc, **updates }.items() if v is not None }
+		return doc
+
+
+	def _searchResource(self, ri:str) -> list[JSON]:
+		"""	Search a resource document by its resource ID, first in the resource cache and then in the database.
+
+			The returned document might be cached and must not be changed.
+
+			Args:
+				ri: The resource ID.
+
+			Return:
+				List with the resource document, or an empty list if the resource does not exist.
+		"""
+		if not self.resourceCache.maxSize:
+			return self.db.searchResources(ri = ri)
+		if (doc := self.resourceCache.get(ri)) is not None:
+			return [ doc ]
+		generation = self._resourceCacheGeneration
+		if len(resources := self.db.searchResources(ri = ri)) == 1:
+			self._cacheResource(resources[0], generation)
+		return resources
+
+
+	def _searchResources(self, ris:Sequence[str]) -> list[JSON]:
+		"""	Search resource documents by their resource IDs, first in the resource cache and then
+			the remaining ones in the database with a single operation.
+
+			The returned documents might be cached and must not be changed.
+
+			Args:
+				ris: The resource IDs.
+
+			Return:
+				List with the resource documents in the order of *ris*. Resources that don't exist are skipped.
+		"""
+		if not self.resourceCache.maxSize:
+			return self.db.retrieveResources(ris)
+		docs:dict[str, JSON] = {}
+		missing:list[str] = []
+		for ri in ris:
+			if (doc := self.resourceCache.get(ri)) is not None:
+				docs[ri] = doc
+			else:
+				missing.append(ri)
+		if missing:
+			generation = self._resourceCacheGeneration
+			for doc in self.db.retrieveResources(missing):
+				docs[doc['ri']] = doc
+				self._cacheResource(doc, generation)
+		return [ doc for ri in ris if (doc := docs.get(ri)) is not None ]
+
+
+	def _cacheResource(self, doc:JSON, generation:int) -> None:
+		"""	Add a resource document that was read from the database to the resource cache.
+
+			The document is not added if any resource was invalidated since the document was read,
+			because it might be outdated then.
+
+			Args:
+				doc: The resource document.
+				generation: The value of the invalidation counter before the document was read from the database.
+		"""
+		with self._resourceCacheLock:
+			if generation == self._resourceCacheGeneration:
+				self.resourceCache.put(doc['ri'], doc)
+
+
+	def _invalidateCachedResource(self, ri:Optional[str|list[str]]) -> None:
+		"""	Remove a resource document from the resource cache after it was written to or removed from the database.
+
+			Args:
+				ri: The resource ID or a list of resource IDs, or *None* to remove all resource documents.
+		"""
+		with self._resourceCacheLock:
+			self._resourceCacheGeneration += 1
+			if ri is None:
+				self.resourceCache.clear()
+			elif isinstance(ri, list):
+				for _ri in ri:
+					self.resourceCache.remove(_ri)
+			else:
+				self.resourceCache.remove(ri)
+
+
 	def deleteResource(self, resource:Resource) -> None:
 		"""	Delete a resource from the database.
 
@@ -391,37 +817,164 @@ class Storage(object):
 				NOT_FOUND: In case the resource does not exist.
 		"""
 		# L.logDebug(f'Removing resource (ty: {resource.ty}, ri: {resource.ri}, rn: {resource.rn})')
+		start = time.perf_counter()
 		try:
 			_ri = resource.ri
 			_pi = resource.pi
+			if (pending := _unitOfWork.get()) is not None:
+				pending.pop(_ri, None)	# Don't write a deleted resource
 			self.db.deleteResource(_ri)
 			self.db.deleteIdentifier(_ri, resource.getSrn())
 			self.db.removeChildResource(_ri, _pi)
+			if ResourceTypes.isInstanceResource(resource.ty):
+				self.db.removeInstance(_ri, _pi)
 		except KeyError:
 			raise NOT_FOUND(L.logDebug(f'Cannot remove: {resource.ri} (NOT_FOUND). Could be an expected error.'))
+		finally:
+			self.expirationIndex.remove(resource.ri)
+			self._invalidateCachedResource(resource.ri)
+			self._invalidateAccessCache(resource.ty)
+			self._recordLatency('delete', start)
+
+
+	def deleteResources(self, resources:list[Resource], pi:str) -> None:
+		"""	Delete multiple child resources of the same parent resource from the database with batched operations.
+
+			In contrast to `deleteResource()` resources that don't exist anymore are ignored.
+
+			Args:
+				resources: Resources to delete. 
+				pi: The resource ID of the parent resource of all the resources.
+		"""
+		start = time.perf_counter()
+		ris = [ resource.ri for resource in resources ]
+		try:
+			if (pending := _unitOfWork.get()) is not None:
+				for ri in ris:
+					pending.pop(ri, None)	# Don't write deleted resources
+			self.db.deleteResources([ (resource.ri, resource.getSrn()) for resource in resources ], pi)
+		finally:
+			for ri in ris:
+				self.expirationIndex.remove(ri)
+			self._invalidateCachedResource(ris)
+			for ty in { resource.ty for resource in resources }:
+				self._invalidateAccessCache(ty)
+			self._recordLatency('deleteMany', start)
+
+
+	def retrieveExpiredResources(self) -> list[Resource]:
+		"""	Return the resources whose expiration time has passed, and remove them from the expiration index.
+
+			Return:
+				List of expired `Resource` objects, ordered by their expiration time.
+		"""
+		result:list[Resource] = []
+		for ri in self.expirationIndex.popDue(utcTime()):
+			try:
+				result.append(self.retrieveResource(ri = ri))
+			except NOT_FOUND:
+				pass	# already deleted, e.g. as a child resource of an expired resource
+		return result
+
+
+	def retryExpiration(self, ri:str, delay:float) -> None:
+		"""	Add a resource to the expiration index again after its expiration failed, so that it
+			is expired again after a *delay*.
+
+			Args:
+				ri: The resource ID.
+				delay: Delay in seconds after which the resource is expired again.
+		"""
+		self.expirationIndex.set(ri, utcTime() + delay)
+
+
+	def waitForExpiration(self, maxWait:float) -> None:
+		"""	Wait until the next resource expires, or until a resource is created or updated that expires earlier.
+
+			Args:
+				maxWait: Maximum time to wait, in seconds.
+		"""
+		self.expirationIndex.waitForNext(utcTime(), maxWait)
+
+
+	def _indexExpiration(self, ri:str, et:Optional[str], onlyFuture:Optional[bool] = False) -> None:
+		"""	Add, update or remove the expiration time of a resource in the expiration index.
+
+			Args:
+				ri: The resource ID.
+				et: The resource's expiration time as an ISO 8601 timestamp, or *None*.
+				onlyFuture: If True then an expiration time in the past is not added to the index.
+		"""
+		ts = fromAbsRelTimestamp(et, default = None) if et else None
+		if onlyFuture and ts is not None and ts <= utcTime():
+			return
+		self.expirationIndex.set(ri, ts)
+
+
+	def _invalidateAccessCache(self, ty:ResourceTypes) -> None:
+		"""	Invalidate the access control caches of the security manager when a resource is changed
+			that is used for access decisions, ie. an <ACP> or a <GRP> resource.
+
+			Args:
+				ty: The type of the created, updated or deleted resource.
+		"""
+		if ty in _accessControlTypes and CSE.security:
+			CSE.security.invalidateAccessCache()
 
 
 	# TODO split this into two methods (one for resources, one for raw resources)
 		
 	def directChildResources(self, pi:str, 
 								   ty:Optional[ResourceTypes|list[ResourceTypes]] = None, 
-								   raw:Optional[bool] = False) -> list[JSON]|list[Resource]:
+								   raw:Optional[bool] = False,
+								   shareDict:Optional[bool] = False) -> list[JSON]|list[Resource]:
 		"""	Return a list of direct child resources, or an empty list
 
 			Args:
 				pi: The parent resource's Resource ID.
 				ty: Optional resource type or list of resource types to filter the result.
 				raw: When "True" then return the child resources as resource dictionary instead of resources.
+				shareDict: The resources share the stored documents instead of copying them. Their attributes are then only copied when they are changed.
 
 			Returns:
 				Return a list of resources, or a list of raw resource dictionaries.
 		"""
 		if (_ris := self.db.searchChildResourceIDsByParentRIAndType(pi, ty)):
-			docs = [self.db.searchResources(ri = _ri)[0] for _ri in _ris]
-			return docs if raw else cast(List[Resource], list(map(lambda x: resourceFromDict(x), docs)))
+			docs = [ self._withPendingUpdates(doc) for doc in self._searchResources(_ris) ]
+			return [ dict(doc) for doc in docs ] if raw else cast(List[Resource], [ self._resourceFromDoc(doc, shareDict) for doc in docs ])
 		return []	# type:ignore[return-value]
 	
 
+	def discoverResourcesByCriteria(self, ri:str,
+										  filterCriteria:FilterCriteria,
+										  level:int,
+										  fo:FilterOperation,
+										  allLen:int,
+										  after:Optional[Any] = None,
+										  limit:Optional[int] = None,
+										  shareDict:Optional[bool] = False) -> Optional[Tuple[list[Tuple[Resource, Any]], bool]]:
+		"""	Discover the resources below a resource that match a filter criteria in the database.
+
+			Args:
+				ri: The resource ID of the resource to start the discovery from.
+				filterCriteria: The filter criteria.
+				level: The number of levels to walk down.
+				fo: The filter operation.
+				allLen: The number of conditions that must match for the *AND* filter operation.
+				after: The position of a previously found resource. If given then the walk continues after this resource.
+				limit: The maximum number of resources to return, or *None* for all resources.
+				shareDict: The resources share the stored documents instead of copying them. Their attributes are then only copied when they are changed.
+
+			Returns:
+				None if the database binding doesn't support discovery. Otherwise a tuple with the found resources, each together
+				with its position, and a boolean that indicates whether the filter criteria were fully applied.
+		"""
+		if (_result := self.db.discoverResourcesByCriteria(ri, filterCriteria, level, fo, allLen, after, limit)) is None:
+			return None
+		docs, matched = _result
+		return [ (self._resourceFromDoc(self._withPendingUpdates(doc), shareDict), position) for doc, position in docs ], matched
+
+
 	def directChildResourcesRI(self, pi:str, 
 			    					 ty:Optional[ResourceTypes|list[ResourceTypes]] = None) -> list[str]:
 		"""	Return a list of direct child resource IDs, or an empty list
@@ -446,7 +999,95 @@ class Storage(object):
 			Returns:
 				The number of child resources.
 		"""
-		return len(self.db.searchResources(pi = pi, ty = int(ty) if ty is not None else None))
+		return self.db.countChildResources(pi, int(ty) if ty is not None else None)
+
+
+	def countInstances(self, pi:str) -> Tuple[int, int]:
+		"""	Count the number of instance resources (*<contentInstance>*, *<timeSeriesInstance>*, *<flexContainerInstance>*)
+			of a parent resource, and the sum of their content sizes.
+
+			This uses the parent's instance index and does not retrieve the instance resources.
+
+			Args:
+				pi: The parent resource's Resource ID.
+
+			Returns:
+				Tuple (number of instances, sum of content sizes).
+		"""
+		return self.db.countInstances(pi)
+
+
+	def searchExcessInstances(self, pi:str, mni:Optional[int], mbs:Optional[int]) -> list[JSON]:
+		"""	Determine the oldest instance resources of a parent resource that must be removed so that 
+			the number of instances does not exceed *mni* and the sum of their content sizes does not exceed *mbs*.
+
+			The instances are taken in creation-time order from the parent's instance index. Only as many index
+			entries are read as are needed to fulfill the limits.
+
+			Args:
+				pi: The parent resource's Resource ID.
+				mni: Maximum number of instances, or None if not limited.
+				mbs: Maximum sum of content sizes, or None if not limited.
+
+			Returns:
+				List of index entries (containing *ri*, *ct* and *cs*) of the instances to remove, oldest first.
+		"""
+		cni, cbs = self.db.countInstances(pi)
+
+		def _exceeded() -> bool:
+			return (mni is not None and cni > mni) or (mbs is not None and cbs > mbs)
+
+		result:list[JSON] = []
+		count = max(cni - mni, 1) if mni is not None else 1
+		offset = 0
+		while _exceeded():
+			if not (entries := self.db.searchOldestInstances(pi, offset + count)[offset:]):
+				break
+			for entry in entries:
+				if not _exceeded():
+					break
+				result.append(entry)
+				cni -= 1
+				cbs -= entry['cs']
+			offset += len(entries)
+			count *= 2	# Read more entries in the next round, if necessary
+		return result
+
+
+	def searchOldestInstance(self, pi:str) -> Optional[JSON]:
+		"""	Return the index entry of the oldest instance resource of a parent resource.
+
+			Args:
+				pi: The parent resource's Resource ID.
+
+			Returns:
+				The index entry (containing *ri*, *ct* and *cs*), or None if the parent has no instances.
+		"""
+		return _e[0] if (_e := self.db.searchOldestInstances(pi, 1)) else None
+
+
+	def retrieveLatestOldestInstance(self, pi:str, 
+										   ty:ResourceTypes, 
+										   oldest:Optional[bool] = False) -> Optional[Resource]:
+		"""	Retrieve the latest or oldest instance resource of a parent resource.
+
+			The instance is determined via the parent's instance index.
+
+			Args:
+				pi: The parent resource's Resource ID.
+				ty: The resource type of the instance resource.
+				oldest: If True then retrieve the oldest instance, otherwise the latest instance.
+
+			Returns:
+				The instance `Resource`, or None if the parent has no instance of that type.
+		"""
+		if (entry := self.searchOldestInstance(pi) if oldest else self.db.searchLatestInstance(pi)) is None:
+			return None
+		try:
+			resource = self.retrieveResource(ri = entry['ri'])
+		except NOT_FOUND:	# The instance may just have been removed
+			return None
+		return resource if resource.ty == ty else None
 
 
 	def countResources(self) -> int:
@@ -492,8 +1133,8 @@ class Storage(object):
 			Return:
 				List of `Resource` objects.
 		"""
-		return	[ res	for each in self.db.searchByFragment(dct) 
-						if (not filter or filter(each)) and (res := resourceFromDict(each)) # either there is no filter or the filter is called to test the resource
+		return	[ res	for each in map(self._withPendingUpdates, self.db.searchByFragment(dct))
+						if (not filter or filter(each)) and (res := self._resourceFromDoc(each)) # either there is no filter or the filter is called to test the resource
 				] 
 
 
@@ -507,7 +1148,7 @@ class Storage(object):
 				List of `Resource` objects.
 		"""
 		return	[ res	for each in self.db.discoverResourcesByFilter(filter)
-						if (res := resourceFromDict(each))
+						if (res := self._resourceFromDoc(self._withPendingUpdates(each)))
 				]
 
 
@@ -691,6 +1332,20 @@ class Storage(object):
 		self.db.purgeStatistics()
 
 
+	def getRuntimeStatistics(self) -> JSON:
+		"""	Return the runtime statistics of the database binding, the resource cache and of the request recording. 
+			These statistics are not stored in the DB.
+
+			Return:
+				Dictionary with statistics values.
+		"""
+		return self.db.getRuntimeStatistics() | { 'requestsBuffered': len(self.requestBuffer),
+												  'requestsDropped': self.requestBuffer.dropped,
+												  'resourceCacheSize': len(self.resourceCache),
+												  'resourceCacheHits': self.resourceCache.hits,
+												  'resourceCacheMisses': self.resourceCache.misses }
+
+
 	#########################################################################
 	##
 	##	Actions
@@ -795,6 +1450,9 @@ class Storage(object):
 						 request:JSON, 
 						 response:JSON) -> bool:
 		"""	Add a request to the *requests* database.
+
+			The request is added to a buffer and written to the database later by the request writer, 
+			together with other buffered requests. If the buffer is full then the oldest buffered request is dropped.
 		
 			Args:
 				op: Operation.
@@ -807,14 +1465,8 @@ class Storage(object):
 				response: The response to store.
 			
 			Return:
-				Boolean value to indicate success or failure.
+				Boolean value to indicate whether the request was buffered without dropping an older request.
 			"""
-		# return self.db.insertRequest(op, ri, srn, originator, outgoing, ot, request, response)
-
-		# Remove old requests first
-		self.db.removeOldRequests(self.maxRequests)
-
-		# Store the request
 		_ts = utcTime()
 		_doc =	{ 'ri': ri,
 	  			  'srn': srn,
@@ -828,11 +1480,57 @@ class Storage(object):
 				  'rsp': { k: v for k, v in response.items() if v is not None }	# Remove None values
 				}
 		_doc = { k: v for k, v in _doc.items() if v is not None }	# Remove remaining None values
-		return self.db.insertRequest(_doc, _ts)
+		return self.requestBuffer.append((_ts, _doc))
+
+
+	def flushRequests(self) -> None:
+		"""	Write the buffered requests to the database, and remove the oldest requests from the database
+			if there are more than the configured maximum number of requests.
+		"""
+		with self._requestFlushLock:
+			if not (requests := self.requestBuffer.drain()) or not self.db:
+				return
+			try:
+				self.db.insertRequests(requests)
+				self.db.removeOldRequests(self.maxRequests)
+			except Exception as e:
+				L.logErr(f'Error writing {len(requests)} recorded requests', exc = e)
+
+
+	def _startRequestWriter(self) -> None:
+		"""	Start the actor that writes the buffered requests to the database, if it is not already running.
+		"""
+		if self.requestWriter:
+			return
+		self.requestWriter = BackgroundWorkerPool.newActor(self._requestWriterLoop, name = 'requestWriter')
+		self.requestWriter.start()
+
+
+	def _stopRequestWriter(self) -> None:
+		"""	Stop the actor that writes the buffered requests to the database, and write the remaining requests.
+		"""
+		if self.requestWriter:
+			self.requestWriter.stop()
+			self.requestWriter = None
+			self.requestBuffer.wakeUp()
+		self.flushRequests()
+
+
+	def _requestWriterLoop(self, _worker:BackgroundWorker) -> None:
+		"""	Write the buffered requests to the database when the buffer is half full, or after the flush interval.
+
+			Args:
+				_worker: The actor that runs the writer. The writer ends when it is not the current request writer anymore.
+		"""
+		while _worker is self.requestWriter:
+			self.requestBuffer.wait(self.requestFlushInterval)
+			self.flushRequests()
 
 
 	def getRequests(self, ri:Optional[str] = None, sortedByOt:bool = False) -> list[JSON]:
 		"""	Get requests for a resource ID, or all requests.
+
+			Buffered requests are written to the database first.
 		
 			Args:
 				ri: The target resource's resource ID. If *None* or empty, then all requests are returned
@@ -841,6 +1539,7 @@ class Storage(object):
 			Return:
 				List of *Documents*. May be empty.
 		"""
+		self.flushRequests()
 		if sortedByOt:
 			return sorted(self.db.getRequests(ri), key = lambda x: x['ot'])
 		return self.db.getRequests(ri)
@@ -849,9 +1548,12 @@ class Storage(object):
 	def deleteRequests(self, ri:Optional[str] = None) -> None:
 		"""	Delete all requests from the database.
 
+			Buffered requests are written to the database first.
+
 			Args:
 				ri: Optional resouce ID. Only requests for this resource ID will be deleted.
 		"""
+		self.flushRequests()
 		return self.db.deleteRequests(ri)
 
 
@@ -13,13 +13,14 @@
 """
 
 from __future__ import annotations
-from typing import List, Tuple, cast, Sequence, Optional
+from typing import Callable, List, Tuple, cast, Sequence, Optional, Iterator, Any
 
-import operator
 import sys
 from copy import deepcopy
+from itertools import islice
 
 from ..helpers import TextTools
+from ..helpers.LRUCache import LRUCache
 from ..etc.Constants import Constants
 from ..etc.Types import FilterCriteria, FilterUsage, CSERequest, ResourceTypes, Operation
 from ..etc.Types import FilterOperation, DesiredIdentifierResultType, Permission, ResultContentType
@@ -43,6 +44,16 @@ from ..resources.SMD import SMD
 from ..runtime.Logging import Logging as L
 
 
+_discoveryBatchSize = 16
+""" Number of child resources that are retrieved together during a discovery at first. The number doubles with each further batch. """
+
+_discoveryMaxBatchSize = 1024
+""" Maximum number of child resources that are retrieved together during a discovery. """
+
+_bulkDeleteBatchSize = 1000
+""" Number of instance resources that are deleted together when their parent resource is deleted. """
+
+
 # TODO NOTIFY optimize local resource notifications
 # TODO handle config update
 class Dispatcher(object):
@@ -54,21 +65,32 @@ class Dispatcher(object):
 	__slots__ = (
 		'csiSlashLen',
 		'sortDiscoveryResources',
+		'discoveryCursors',
 
 		'_eventCreateResource',
 		'_eventCreateChildResource',
 		'_eventUpdateResource',
 		'_eventDeleteResource',
+		'_eventDeleteResources',
 	)
 	""" Slots of class attributes. """
 
-	def __init__(self) -> None:
-		""" Initialize the Dispatcher. """
+	def __init__(self, config:Callable[[str], Any] = Configuration.get) -> None:
+		""" Initialize the Dispatcher.
+
+			By default the settings are taken from the CSE's configuration. Other settings can be given
+			instead, e.g. for unit tests without a running CSE.
+
+			Args:
+				config: Function that returns the value of a configuration setting.
+		"""
 
 		self.csiSlashLen 				= len(CSE.cseCsiSlash)
 		""" Length of the CSI with a slash. """
-		self.sortDiscoveryResources 	= Configuration.get('cse.sortDiscoveredResources')
+		self.sortDiscoveryResources 	= config('cse.sortDiscoveredResources')
 		""" Sort the discovered resources. """
+		self.discoveryCursors			= LRUCache(config('cse.discoveryCursorCacheSize'))
+		""" Positions where discoveries stopped at their *lim*, mapped by the discovery and the next *ofst*. """
 
 		self._eventCreateResource = CSE.event.createResource			# type: ignore [attr-defined]
 		""" Event handler for resource creation events. """
@@ -79,6 +101,9 @@ class Dispatcher(object):
 		self._eventDeleteResource = CSE.event.deleteResource			# type: ignore [attr-defined]
 		""" Event handler for resource deletion events. """
 
+		self._eventDeleteResources = CSE.event.deleteResources			# type: ignore [attr-defined]
+		""" Event handler for bulk resource deletion events. """
+
 		L.isInfo and L.log('Dispatcher initialized')
 
 
@@ -193,7 +218,7 @@ class Dispatcher(object):
 		# Check semantic discovery (sqi present and False)
 		if request.sqi is not None and not request.sqi:
 			# Get all accessible semanticDescriptors
-			_resources = self.discoverResources(id, originator, filterCriteria = FilterCriteria(ty = [ResourceTypes.SMD]))
+			_resources = self.discoverResources(id, originator, filterCriteria = FilterCriteria(ty = [ResourceTypes.SMD]), shareDict = True)
 			L.isDebug and L.logDebug(f'Direct discovered SMD: {_resources}')
 
 			# Execute semantic resource discovery
@@ -213,7 +238,7 @@ class Dispatcher(object):
 					 ResultContentType.attributesAndChildResourceReferences|\
 					 ResultContentType.originalResource:
 
-					resource = self.retrieveResource(id, originator, request)
+					resource = self.retrieveResource(id, originator, request, shareDict = True)
 
 					if not CSE.security.hasAccess(originator, resource, permission):
 						raise ORIGINATOR_HAS_NO_PRIVILEGE(L.logDebug(f'originator: {originator} has no {permission} privileges for resource: {resource.ri}'))
@@ -236,7 +261,7 @@ class Dispatcher(object):
 								raise INTERNAL_SERVER_ERROR('internal error: missing lnk attribute in target resource')
 
 							# Retrieve and check the linked-to request
-							linkedResource = self.retrieveResource(lnk, originator, request)
+							linkedResource = self.retrieveResource(lnk, originator, request, shareDict = True)
 							
 							# Normally, we would do some checks here and call "willBeRetrieved", 
 							# but we don't have to, because the resource is already checked during the
@@ -254,7 +279,7 @@ class Dispatcher(object):
 					CSE.semantic.validateSPARQL(request.fc.smf)
 
 					# Get all accessible semanticDescriptors
-					resources = self.discoverResources(id, originator, filterCriteria = FilterCriteria(ty = [ResourceTypes.SMD]))
+					resources = self.discoverResources(id, originator, filterCriteria = FilterCriteria(ty = [ResourceTypes.SMD]), shareDict = True)
 					
 					# Execute semantic query
 					res = CSE.semantic.executeSPARQLQuery(request.fc.smf, 
@@ -266,7 +291,7 @@ class Dispatcher(object):
 		#
 		#	Discovery request
 		#
-		resources = self.discoverResources(id, originator, request.fc, permission = permission)
+		resources = self.discoverResources(id, originator, request.fc, permission = permission, shareDict = True)
 
 		# check and filter by ACP. After this allowedResources only contains the resources that are allowed
 		allowedResources = []
@@ -310,7 +335,8 @@ class Dispatcher(object):
 	def retrieveResource(self, id:str, 
 							   originator:Optional[str] = None, 
 							   request:Optional[CSERequest] = None, 
-							   postRetrieveHook:Optional[bool] = False) -> Resource:
+							   postRetrieveHook:Optional[bool] = False,
+							   shareDict:Optional[bool] = False) -> Resource:
 		"""	Retrieve a resource locally or from remote CSE.
 
 			Args:
@@ -319,6 +345,7 @@ class Dispatcher(object):
 					If no, then try to retrieve the resource from a connected (!) remote CSE.
 				originator:	The originator of the request.
 				postRetrieveHook: Only when retrieving localls, invoke the Resource's *willBeRetrieved()* callback.
+				shareDict: Only when retrieving locally, the resource shares the stored document instead of copying it. Its attributes are then only copied when they are changed.
 			
 			Return:
 				Result instance.
@@ -336,9 +363,9 @@ class Dispatcher(object):
 		
 		# Retrieve locally
 		if isStructured(id):
-			resource = self.retrieveLocalResource(srn = id, originator = originator, request = request) 
+			resource = self.retrieveLocalResource(srn = id, originator = originator, request = request, shareDict = shareDict) 
 		else:
-			resource = self.retrieveLocalResource(ri = id, originator = originator, request = request)
+			resource = self.retrieveLocalResource(ri = id, originator = originator, request = request, shareDict = shareDict)
 		if postRetrieveHook:
 			resource.willBeRetrieved(originator, request, subCheck = False)
 		return resource
@@ -347,7 +374,8 @@ class Dispatcher(object):
 	def retrieveLocalResource(self, ri:Optional[str] = None, 
 									srn:Optional[str] = None, 
 									originator:Optional[str] = None, 
-									request:Optional[CSERequest] = None) -> Resource:
+									request:Optional[CSERequest] = None,
+									shareDict:Optional[bool] = False) -> Resource:
 		"""	Retrieve a resource locally.
 
 			Args:
@@ -355,6 +383,7 @@ class Dispatcher(object):
 				srn: The structured resource name.
 				originator: The originator of the request.
 				request: The request.
+				shareDict: The resource shares the stored document instead of copying it. Its attributes are then only copied when they are changed.
 
 			Return:
 				The retrieved resource.
@@ -365,9 +394,9 @@ class Dispatcher(object):
 		L.isDebug and L.logDebug(f'Retrieve local resource: {ri}|{srn} for originator: {originator}')
 
 		if ri:
-			return CSE.storage.retrieveResource(ri = ri)		# retrieve via normal ID
+			return CSE.storage.retrieveResource(ri = ri, shareDict = shareDict)		# retrieve via normal ID
 		elif srn:
-			return CSE.storage.retrieveResource(srn = srn) 	# retrieve via srn. Try to retrieve by srn (cases of ACPs created for AE and CSR by default)
+			return CSE.storage.retrieveResource(srn = srn, shareDict = shareDict) 	# retrieve via srn. Try to retrieve by srn (cases of ACPs created for AE and CSR by default)
 		else:
 			raise NOT_FOUND(f'resource: {ri}|{srn} not found')
 
@@ -392,7 +421,8 @@ class Dispatcher(object):
 						  originator:str, 
 						  filterCriteria:Optional[FilterCriteria] = None,
 						  rootResource:Optional[Resource] = None, 
-						  permission:Optional[Permission] = Permission.DISCOVERY) -> List[Resource]:
+						  permission:Optional[Permission] = Permission.DISCOVERY,
+						  shareDict:Optional[bool] = False) -> List[Resource]:
 		"""	Discover resources. This is the main function for resource discovery.
 
 			Args:
@@ -401,6 +431,7 @@ class Dispatcher(object):
 				filterCriteria: The filter criteria.
 				rootResource: The root resource for discovery.
 				permission: The permission to use.
+				shareDict: The discovered resources share the stored documents instead of copying them. Their attributes are then only copied when they are changed.
 
 			Return:
 				A list of discovered resources.
@@ -408,7 +439,7 @@ class Dispatcher(object):
 		L.isDebug and L.logDebug('Discovering resources')
 
 		if not rootResource:
-			rootResource = self.retrieveResource(id)
+			rootResource = self.retrieveResource(id, shareDict = shareDict)
 		
 		if not filterCriteria:
 			filterCriteria = FilterCriteria()
@@ -419,9 +450,6 @@ class Dispatcher(object):
 		ofst:int = filterCriteria.ofst if filterCriteria.ofst is not None else 1
 		lim:int = filterCriteria.lim if filterCriteria.lim is not None else sys.maxsize
 
-		# get all direct children and slice the page (offset and limit)
-		dcrs = self.retrieveDirectChildResources(id)[ofst-1:ofst-1 + lim]	# now dcrs only contains the desired child resources for ofst and lim
-
 		# a bit of optimization. This length stays the same.
 		allLen = len(filterCriteria.attributes) if filterCriteria.attributes else 0
 		if (criteriaAttributes := filterCriteria.criteriaAttributes()):
@@ -431,15 +459,36 @@ class Dispatcher(object):
 			  (len(_v)-1 if (_v := criteriaAttributes.get('lbl')) is not None else 0) 		# -1 : compensate for len(conditions) in line 1 
 			)
 
-		# Discover the resources
-		discoveredResources = self._discoverResources(rootResource, 
-													  originator, 
-													  level = lvl, 
-													  fo = fo, 
-													  allLen = allLen, 
-													  dcrs = dcrs, 
-													  filterCriteria = filterCriteria,
-													  permission = permission)
+		# Continue a previous discovery if this request's offset is the one where a previous page stopped.
+		# Otherwise start at the root resource and skip the first *ofst*-1 results
+		cursorKey = self._discoveryCursorKey(rootResource.ri, originator, filterCriteria, permission)
+		cursor = self.discoveryCursors.get((cursorKey, ofst)) if ofst > 1 else None
+		skip = 0 if cursor is not None else ofst - 1
+
+		# Discover the resources lazily, and stop when *lim* resources are found. Let the database do this if it supports it.
+		if (walk := self._discoverResourcesInDatabase(rootResource, originator, lvl, fo, allLen, filterCriteria, permission, cursor, 
+													  skip + lim if lim < sys.maxsize - skip else None, shareDict)) is None:
+			stack = None
+			if cursor is not None and (stack := self._discoveryStack(rootResource, cursor, lvl, shareDict)) is None:
+				skip = ofst - 1		# The cursor's position doesn't exist anymore. Start at the root resource
+			walk = self._discoverResources(rootResource,
+										   originator, 
+										   level = lvl, 
+										   fo = fo, 
+										   allLen = allLen, 
+										   filterCriteria = filterCriteria,
+										   permission = permission,
+										   stack = stack,
+										   shareDict = shareDict)
+		stop = skip + lim if lim < sys.maxsize - skip else None
+		discoveredResources = []
+		position = None
+		for resource, position in islice(walk, skip, stop):
+			discoveredResources.append(resource)
+		
+		# Remember where this page stopped, so that a request for the next page can continue there
+		if lim > 0 and len(discoveredResources) == lim and self.discoveryCursors.maxSize:
+			self.discoveryCursors.put((cursorKey, ofst + lim), position)
 
 		# NOTE: this list contains all results in the order they could be found while
 		#		walking the resource tree.
@@ -452,7 +501,7 @@ class Dispatcher(object):
 			for resource in discoveredResources:
 				# Check existence and permissions for the .../{arp} resource
 				srn = f'{resource.getSrn()}/{filterCriteria.arp}'
-				_res = self.retrieveResource(srn)
+				_res = self.retrieveResource(srn, shareDict = shareDict)
 				if CSE.security.hasAccess(originator, _res, permission):
 					_resources.append(_res)
 			discoveredResources = _resources	# re-assign the new resources to discoveredResources
@@ -465,10 +514,14 @@ class Dispatcher(object):
 								 level:int, 
 								 fo:int, 
 								 allLen:int, 
-								 dcrs:Optional[list[Resource]] = None, 
 								 filterCriteria:Optional[FilterCriteria] = None,
-								 permission:Optional[Permission] = Permission.DISCOVERY) -> list[Resource]:
-		"""	Discover resources recursively. This is a helper function for discoverResources().
+								 permission:Optional[Permission] = Permission.DISCOVERY,
+								 stack:Optional[list[Tuple[Iterator[Resource], list[str]]]] = None,
+								 shareDict:Optional[bool] = False) -> Iterator[Tuple[Resource, list[str]]]:
+		"""	Discover resources lazily by walking the resource tree depth-first. This is a helper function for discoverResources().
+
+			Child resources are only retrieved when the walk reaches them, so the caller can stop the walk
+			after it has found enough resources. They are retrieved in batches of increasing size.
 
 			Args:
 				rootResource: The root resource for discovery.
@@ -476,29 +529,32 @@ class Dispatcher(object):
 				level: The level of discovery.
 				fo: The filter operation.
 				allLen: The length of all filter criteria.
-				dcrs: The direct child resources of the root resource.
 				filterCriteria: The filter criteria.
 				permission: The permission to use.
+				stack: The walk's stack to continue a previous walk, as returned by `_discoveryStack()`. If *None* then the walk starts at the root resource.
+				shareDict: The discovered resources share the stored documents instead of copying them.
 
 			Return:
-				A list of discovered resources.
+				Generator of the discovered resources together with their position, which is the list of resource IDs from the
+				root resource's direct child resource down to the resource.
 		"""
 		if not rootResource or level == 0:		# no resource or level == 0
-			return []
+			return
 
-		# get all direct children, if not provided
-		if not dcrs:
-			if len(dcrs := self.retrieveDirectChildResources(rootResource.ri)) == 0:
-				return []
-		
+		# For each level, the stack holds an iterator over the remaining child resources together with the parent's position
+		if stack is None:
+			stack = [ (self._retrieveChildResources(self.directChildResourcesRI(rootResource.ri), shareDict), []) ]
 
-		# Filter and add those left to the result
-		discoveredResources = []
-		for resource in dcrs:
+		while stack:
+			resources, parentPosition = stack[-1]
+			if (resource := next(resources, None)) is None:
+				stack.pop()
+				continue
 
 			# Exclude virtual resources
 			if resource.isVirtual():
 				continue
+			position = parentPosition + [ (ri := resource.ri) ]
 
 			# check permissions and filter. Only then add a resource
 			# First match then access. bc if no match then we don't need to check permissions (with all the overhead)
@@ -506,18 +562,122 @@ class Dispatcher(object):
 								   fo, 
 								   allLen, 
 								   filterCriteria) and CSE.security.hasAccess(originator, resource, permission):
-				discoveredResources.append(resource)
+				yield resource, position
 
-			# Iterate recursively over all (not only the filtered!) direct child resources
-			discoveredResources.extend(self._discoverResources(resource, 
-															   originator, 
-															   level-1, 
-															   fo, 
-															   allLen, 
-															   filterCriteria = filterCriteria,
-															   permission = permission))
+			# Walk down over all (not only the filtered!) direct child resources
+			if len(position) < level:
+				stack.append( (self._retrieveChildResources(self.directChildResourcesRI(ri), shareDict), position) )
 
-		return discoveredResources
+
+	def _retrieveChildResources(self, ris:list[str], shareDict:bool) -> Iterator[Resource]:
+		"""	Retrieve child resources lazily in batches. Each batch is retrieved with a single database operation,
+			and the batches grow in size. Resources that were deleted in the meantime are skipped.
+
+			Args:
+				ris: The resource IDs of the child resources.
+				shareDict: The resources share the stored documents instead of copying them.
+
+			Return:
+				Generator of the child resources.
+		"""
+		index = 0
+		batchSize = _discoveryBatchSize
+		while index < len(ris):
+			yield from CSE.storage.retrieveResources(ris[index:index + batchSize], shareDict = shareDict)
+			index += batchSize
+			batchSize = min(batchSize * 2, _discoveryMaxBatchSize)
+
+
+	def _discoveryStack(self, rootResource:Resource, cursor:list[str], level:int, shareDict:bool) -> Optional[list[Tuple[Iterator[Resource], list[str]]]]:
+		"""	Build the stack for `_discoverResources()` to continue a walk after the resource at the position *cursor*.
+
+			Args:
+				rootResource: The root resource for discovery.
+				cursor: The position of the resource after which the walk continues.
+				level: The level of discovery.
+				shareDict: The discovered resources share the stored documents instead of copying them.
+
+			Return:
+				The stack, or *None* if one of the resources of the position doesn't exist anymore.
+		"""
+		stack:list[Tuple[Iterator[Resource], list[str]]] = []
+		parentRI = rootResource.ri
+		for depth, ri in enumerate(cursor):
+			ris = self.directChildResourcesRI(parentRI)
+			try:
+				index = ris.index(ri)
+			except ValueError:
+				return None
+			stack.append( (self._retrieveChildResources(ris[index+1:], shareDict), cursor[:depth]) )	# continue with the following siblings
+			parentRI = ri
+		if len(cursor) < level:
+			stack.append( (self._retrieveChildResources(self.directChildResourcesRI(parentRI), shareDict), cursor) )	# continue with the resource's child resources
+		return stack
+
+
+	def _discoverResourcesInDatabase(self, rootResource:Resource,
+										   originator:str, 
+										   level:int, 
+										   fo:FilterOperation, 
+										   allLen:int, 
+										   filterCriteria:FilterCriteria,
+										   permission:Permission,
+										   cursor:Optional[Any],
+										   count:Optional[int],
+										   shareDict:Optional[bool] = False) -> Optional[Iterator[Tuple[Resource, Any]]]:
+		"""	Discover resources lazily with the database binding, if it supports discovery. 
+
+			The resources are retrieved in batches, starting with *count* resources. Further batches are only
+			retrieved when the caller continues the walk, e.g. because some resources were filtered out.
+
+			Args:
+				rootResource: The root resource for discovery.
+				originator: The originator of the request.
+				level: The level of discovery.
+				fo: The filter operation.
+				allLen: The length of all filter criteria.
+				filterCriteria: The filter criteria.
+				permission: The permission to use.
+				cursor: The position of a resource. If given then the walk continues after this resource.
+				count: The number of resources that are expected to be needed, or *None* for all resources.
+				shareDict: The discovered resources share the stored documents instead of copying them.
+
+			Return:
+				Generator of the discovered resources together with their position, or *None* if the database binding
+				doesn't support discovery.
+		"""
+		if (_result := CSE.storage.discoverResourcesByCriteria(rootResource.ri, filterCriteria, level, fo, allLen, cursor, count, shareDict)) is None:
+			return None
+
+		def _walk(result:Tuple[list[Tuple[Resource, Any]], bool], count:Optional[int]) -> Iterator[Tuple[Resource, Any]]:
+			while True:
+				candidates, matched = result
+				for resource, position in candidates:
+					if (matched or self._matchResource(resource, fo, allLen, filterCriteria)) and CSE.security.hasAccess(originator, resource, permission):
+						yield resource, position
+				if count is None or len(candidates) < count:	# no further resources
+					return
+				count *= 2
+				result = cast(Tuple[list[Tuple[Resource, Any]], bool], 
+							  CSE.storage.discoverResourcesByCriteria(rootResource.ri, filterCriteria, level, fo, allLen, candidates[-1][1], count, shareDict))
+
+		return _walk(_result, count)
+
+
+	def _discoveryCursorKey(self, ri:str, originator:str, filterCriteria:FilterCriteria, permission:Permission) -> str:
+		"""	Build the key that identifies the same discovery for the different pages of a paged discovery.
+
+			Args:
+				ri: The resource ID of the root resource for discovery.
+				originator: The originator of the request.
+				filterCriteria: The filter criteria. *ofst* and *lim* are not part of the key.
+				permission: The permission to use.
+
+			Return:
+				The key.
+		"""
+		criteria = sorted( (k, str(v)) for k, v in filterCriteria.fillCriteriaAttributes().items() if k not in ('ofst', 'lim') )
+		return f'{originator}|{ri}|{int(permission)}|{criteria}'
 
 
 	def _matchResource(self, r:Resource, fo:int, allLen:int, filterCriteria:FilterCriteria) -> bool:	
@@ -599,7 +759,9 @@ class Dispatcher(object):
 
 		# Advanced query
 		if filterCriteria.aq:
-			found += 1 if CSE.script.runComparisonQuery(filterCriteria.aq, r) else 0
+			if not filterCriteria._aq:
+				filterCriteria._aq = CSE.script.compileComparisonQuery(filterCriteria.aq)
+			found += 1 if filterCriteria._aq.evaluate(r) else 0
 
 		# Geo query
 		if filterCriteria.geom:	# Just check one of the tree required attributes. If one is there, all are there
@@ -1473,8 +1635,7 @@ class Dispatcher(object):
 										   oldest:Optional[bool] = False) -> Optional[Resource]:
 		"""	Get the latest or oldest x-Instance resource for a parent.
 
-			This is done by searching through all resources once to find the fitting resource 
-			(parent + type)	with the latest or oldest *ct* attribute.
+			This is done by looking up the parent's instance index in the storage.
 
 			Args:
 				pi: parent resourceIdentifier
@@ -1484,27 +1645,7 @@ class Dispatcher(object):
 			Return:
 				Resource
 		"""
-		hit:Tuple[JSON, str] = None
-		op = operator.gt if oldest else operator.lt
-
-		# This function used as a mapper to search through all resources and
-		# determines the newest CIN resource for this parent
-		# This should be a bit faster than getting all the CIN, instantiating them, 
-		# and throwig them all away etc
-		def determineLatest(res:JSON) -> bool:
-			nonlocal hit
-			if res['pi'] == pi and res['ty'] == ty:
-				ct = res['ct']
-				if not hit or op(hit[1], ct):
-					hit = ( res, ct )
-			return False
-
-		# Search through the resources with the mapping functions
-		CSE.storage.searchByFilter(filter = determineLatest)
-		if not hit:
-			return None
-		# Instantiate and return resource
-		return resourceFromDict(hit[0])
+		return CSE.storage.retrieveLatestOldestInstance(pi, ty, oldest)
 
 
 	def discoverChildren(self, id:str, 
@@ -1599,7 +1740,13 @@ class Dispatcher(object):
 		"""	Remove all child resources of a parent recursively. 
 
 			If *ty* is set only the resources of this type are removed.
+
+			When the parent resource is removed as well (*doDeleteCheck* is False) then its instance
+			resources are removed in bulk first, see `deleteInstanceResources()`.
 		"""
+		if ty is None and not doDeleteCheck:
+			self.deleteInstanceResources(parentResource, originator)
+
 		# Remove directChildResources
 		rs = self.retrieveDirectChildResources(parentResource.ri)
 		for r in rs:
@@ -1607,6 +1754,34 @@ class Dispatcher(object):
 				#parentResource.childRemoved(r, originator)	# recursion here
 				self.deleteLocalResource(r, originator, parentResource = parentResource, doDeleteCheck = doDeleteCheck)
 
+
+	def deleteInstanceResources(self, parentResource:Resource, originator:str) -> None:
+		"""	Remove all instance resources (e.g. *<contentInstance>*) of a parent resource that is being removed.
+
+			The instances are retrieved and removed in batches, each with a few database operations,
+			and a single *deleteResources* event is raised for each batch. The parent resource's
+			`childRemoved()` method is not called.
+
+			Instances that need individual handling, ie. announced instances and instances
+			with subscriptions, are removed with `deleteLocalResource()` instead.
+
+			Args:
+				parentResource: The parent resource of the instances.
+				originator: The originator of the request.
+		"""
+		ris = self.directChildResourcesRI(parentResource.ri, ResourceTypes.instanceResourceTypes())
+		for index in range(0, len(ris), _bulkDeleteBatchSize):
+			resources:list[Resource] = []
+			for resource in CSE.storage.retrieveResources(ris[index:index + _bulkDeleteBatchSize], shareDict = True):
+				if resource.at or resource.subi:
+					self.deleteLocalResource(resource, originator, parentResource = parentResource, doDeleteCheck = False)
+				else:
+					resources.append(resource)
+			if resources:
+				L.isDebug and L.logDebug(f'Removing {len(resources)} instance resources of: {parentResource.ri}')
+				CSE.storage.deleteResources(resources, parentResource.ri)
+				self._eventDeleteResources([ resource.ri for resource in resources ])
+
 	#########################################################################
 	#
 	#	Request execution utilities
@@ -1850,13 +2025,11 @@ class Dispatcher(object):
 			if not (id := structuredPathFromRI(id)):
 				return None
 		# from here on id is a srn
+		# The first fopt in the path is the target, e.g. for .../fopt/fopt of nested groups
 		nid = None
-		if id.endswith('/fopt'):
-			nid = id
-		else:
-			(head, found, _) = id.partition('/fopt/')
-			if found:
-				nid = head + '/fopt'
+		(head, found, _) = f'{id}/'.partition('/fopt/')
+		if found:
+			nid = head + '/fopt'
 
 		if nid:
 			try:
@@ -58,6 +58,7 @@ class EventManager(HelpersEventManager.EventManager):
 		self.addEvent('createResource')
 		self.addEvent('updateResource')
 		self.addEvent('deleteResource')
+		self.addEvent('deleteResources')	# bulk deletion of instance resources, with a list of resource IDs
 		self.addEvent('expireResource')
 		self.addEvent('changeResource')	# whenever a resource is updated or changed in any way
 		self.addEvent('createChildResource')
@@ -12,6 +12,11 @@
 from __future__ import annotations
 from typing import cast, List, Optional, Any
 
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from contextvars import ContextVar
+from copy import copy
+from threading import Lock
+
 from ..etc.Types import ResourceTypes, Result, ConsistencyStrategy, Permission, Operation
 from ..etc.Types import CSERequest, JSON, ResponseType
 from ..etc.ResponseStatusCodes import MAX_NUMBER_OF_MEMBER_EXCEEDED, INVALID_ARGUMENTS, NOT_FOUND, RECEIVER_HAS_NO_PRIVILEGES
@@ -28,6 +33,13 @@ from ..runtime.Logging import Logging as L
 from ..runtime.Configuration import Configuration
 
 
+_fanOutThreadPrefix = 'GroupFanOut'
+""" Name prefix of the threads that send the requests to group members. """
+
+_inFanOut:ContextVar[bool] = ContextVar('inFanOut', default = False)
+""" Whether the current thread processes a fanOutPoint request for a group member. """
+
+
 class GroupManager(object):
 	"""	Manager for the CSE's group service. 
 	"""
@@ -35,8 +47,14 @@ class GroupManager(object):
 	def __init__(self) -> None:
 		"""	Initialization of the GroupManager.
 		"""
+		self.fanOutExecutor:Optional[ThreadPoolExecutor] = None
+		""" Executor that sends the requests to group members in parallel. """
+		self._fanOutLock = Lock()
+		""" Lock to replace or shut down the executor while requests are submitted to it. """
+
 		# Add delete event handler because we like to monitor the resources in mid
 		CSE.event.addHandler(CSE.event.deleteResource, self.handleDeleteEvent) 		# type: ignore
+		CSE.event.addHandler(CSE.event.deleteResources, self.handleDeleteResourcesEvent) 		# type: ignore
 
 		# Add handler for configuration updates
 		CSE.event.addHandler(CSE.event.configUpdate, self.configUpdate)			# type: ignore
@@ -56,6 +74,10 @@ class GroupManager(object):
 			Returns:
 				*True* when shutdown is complete.
 		"""
+		with self._fanOutLock:
+			executor, self.fanOutExecutor = self.fanOutExecutor, None
+		if executor:
+			executor.shutdown(wait = False, cancel_futures = True)
 		L.isInfo and L.log('GroupManager shut down')
 		return True
 
@@ -63,7 +85,17 @@ class GroupManager(object):
 	def _assignConfig(self) -> None:
 		"""	Assign the configuration values.
 		"""
-		self.resultExpirationTime = Configuration.get('resource.grp.resultExpirationTime')
+		self.resultExpirationTime = Configuration.get('resource.grp.resultExpirationTime')	# in ms
+		self.fanOutWorkers = Configuration.get('resource.grp.fanOutWorkers')
+
+		# (Re)create the executor for the parallel fan-out. Requests that were already submitted 
+		# to the previous executor are still processed.
+		executor = ThreadPoolExecutor(max_workers = self.fanOutWorkers, 
+									  thread_name_prefix = _fanOutThreadPrefix) if self.fanOutWorkers > 1 else None
+		with self._fanOutLock:
+			previous, self.fanOutExecutor = self.fanOutExecutor, executor
+		if previous:
+			previous.shutdown(wait = False)
 
 
 	def configUpdate(self, name:str, 
@@ -71,7 +103,8 @@ class GroupManager(object):
 						   value:Any = None) -> None:
 		"""	Handle configuration updates.
 		"""
-		if key not in ( 'resource.grp.resultExpirationTime' ):
+		if key not in ( 'resource.grp.resultExpirationTime',
+						'resource.grp.fanOutWorkers' ):
 			return
 		self._assignConfig()
 
@@ -253,41 +286,34 @@ class GroupManager(object):
 		
 		L.isDebug and L.logDebug(f'Adding additional path elements: {tail}')
 
-		# walk through all members
-		resultList:List[Result] = []
-
 		tail = '/' + tail if len(tail) > 0 else '' # add remaining path, if any
 		_mid = groupResource.mid.copy()	# copy mi because it is changed in the loop
 
-		# Determine the timeout for aggregating requests.
+		# Determine the deadline for aggregating requests.
 		# If Result Expiration Timestamp is present in the request then use that one.
-		# Else use the default configuration, if set to a value > 0
+		# Else use the default configuration, if set to a value > 0.
+		# A Request Expiration Timestamp is a deadline as well.
 		if request.rset is not None:
 			_timeoutTS = request._rsetUTCts
 		elif self.resultExpirationTime > 0:
-			_timeoutTS = utcTime() + self.resultExpirationTime
+			_timeoutTS = utcTime() + self.resultExpirationTime / 1000.0	# resultExpirationTime is configured in ms
 		else:
 			_timeoutTS = 0
-
-		for mid in _mid:	
-			# Try to get the SRN and add the tail
-			if srn := structuredPathFromRI(mid):
-				mid = srn + tail
-			else:
-				mid = mid + tail
-			# Invoke the request
-			_result = CSE.request.processRequest(request, originator, mid)
-			# Check for RSET expiration
-			if _timeoutTS and _timeoutTS < utcTime():
-				# Check for blocking request. Then raise a timeout
-				if request.rt == ResponseType.blockingRequest:
-					raise REQUEST_TIMEOUT(L.logDebug('Aggregation timed out'))
-				# Otherwise just interrupt the aggregation
-				break
-			# Append the result
-			resultList.append(_result)
-			# import time
-			# time.sleep(1.0)
+		if request._rqetUTCts is not None and (not _timeoutTS or request._rqetUTCts < _timeoutTS):
+			_timeoutTS = request._rqetUTCts
+
+		# Build the targets for all members. Try to get the SRN and add the tail
+		targets = [ (srn if (srn := structuredPathFromRI(mid)) else mid) + tail 
+					for mid in _mid ]
+
+		# Send the requests to the members.
+		# Nested groups are handled sequentially by the fan-out thread of the outer group, so that they 
+		# don't wait for threads of the same bounded executor.
+		resultList:Optional[list[Result]] = None
+		if len(targets) > 1 and not _inFanOut.get():
+			resultList = self._fanOutParallel(request, originator, targets, _timeoutTS)
+		if resultList is None:
+			resultList = self._fanOutSequential(request, originator, targets, _timeoutTS)
 
 		# construct aggregated response
 		if len(resultList) > 0:
@@ -299,6 +325,8 @@ class GroupManager(object):
 						}
 				if result.resource and isinstance(result.resource, Resource):
 					item['pc'] = result.resource.asDict()
+				elif result.resource and isinstance(result.resource, dict):	# e.g. the aggregated response of a nested group
+					item['pc'] = result.resource
 
 				items.append(item)
 			rsp = { 'm2m:rsp' : items}
@@ -315,6 +343,98 @@ class GroupManager(object):
 		return Result(rsc = ResponseStatusCode.OK, resource = agr) # Response Status Code is OK regardless of the requested fanout operation
 
 
+	def _fanOutSequential(self, request:CSERequest, 
+								originator:str, 
+								targets:list[str], 
+								timeoutTS:float) -> list[Result]:
+		"""	Send a fanOutPoint request to the group members one after the other.
+
+			Args:
+				request: The request to perform on the members.
+				originator: The request's originator.
+				targets: The target IDs of the members.
+				timeoutTS: UTC-based deadline for the aggregation, or 0 for no deadline.
+			Return:
+				List of the member results, in member order. Members after the deadline are skipped.
+		"""
+		resultList:list[Result] = []
+		for target in targets:
+			# Invoke the request
+			_result = CSE.request.processRequest(request, originator, target)
+			# Check for RSET expiration
+			if timeoutTS and timeoutTS < utcTime():
+				# Check for blocking request. Then raise a timeout
+				if request.rt == ResponseType.blockingRequest:
+					raise REQUEST_TIMEOUT(L.logDebug('Aggregation timed out'))
+				# Otherwise just interrupt the aggregation
+				break
+			# Append the result
+			resultList.append(_result)
+		return resultList
+
+
+	def _fanOutParallel(self, request:CSERequest, 
+							  originator:str, 
+							  targets:list[str], 
+							  timeoutTS:float) -> Optional[list[Result]]:
+		"""	Send a fanOutPoint request to the group members in parallel, using the bounded fan-out executor.
+
+			Requests that are not started before the deadline are cancelled, and the results of requests 
+			that are not finished before the deadline are skipped.
+
+			Args:
+				request: The request to perform on the members.
+				originator: The request's originator.
+				targets: The target IDs of the members.
+				timeoutTS: UTC-based deadline for the aggregation, or 0 for no deadline.
+			Return:
+				List of the member results, in member order. Members that didn't finish before the deadline are skipped.
+				*None* is returned if parallel fan-out is disabled.
+		"""
+		# Submit all requests to the same executor, even if it is replaced or shut down in the meantime
+		with self._fanOutLock:
+			if not self.fanOutExecutor:
+				return None
+			futures:list[Future] = [ self.fanOutExecutor.submit(self._processMemberRequest, request, originator, target)
+									 for target in targets ]
+		_, notDone = wait(futures, timeout = max(timeoutTS - utcTime(), 0.0) if timeoutTS else None)
+		if notDone:
+			L.isDebug and L.logDebug(f'Aggregation deadline reached. Skipping {len(notDone)} of {len(futures)} members')
+			for future in notDone:
+				future.cancel()
+			# Check for blocking request. Then raise a timeout
+			if request.rt == ResponseType.blockingRequest:
+				raise REQUEST_TIMEOUT(L.logDebug('Aggregation timed out'))
+		
+		# Collect the results in member order. This raises the exception of the first failed member.
+		# Requests that were cancelled because of a shutdown are skipped.
+		return [ future.result() for future in futures if future not in notDone and not future.cancelled() ]
+
+
+	def _processMemberRequest(self, request:CSERequest, 
+									originator:str, 
+									target:str) -> Result:
+		"""	Process a fanOutPoint request for a single group member in a thread of the fan-out executor.
+
+			Args:
+				request: The request to perform on the member.
+				originator: The request's originator.
+				target: The target ID of the member.
+			Return:
+				`Result` instance.
+		"""
+		# A compiled advanced query is used by one request at a time, so each member gets its own
+		if request.fc._aq:
+			request = copy(request)
+			request.fc = copy(request.fc)
+			request.fc._aq = CSE.script.compileComparisonQuery(request.fc.aq)
+		token = _inFanOut.set(True)
+		try:
+			return CSE.request.processRequest(request, originator, target)
+		finally:
+			_inFanOut.reset(token)
+
+
 	#########################################################################
 	#
 	#	Event Handler
@@ -329,13 +449,33 @@ class GroupManager(object):
 				deletedResource: The deleted resource to check.
 		"""
 		L.isDebug and L.logDebug('Looking for and removing deleted resource from groups')
+		self._removeDeletedMembers({ deletedResource.ri })
+
+
+	def handleDeleteResourcesEvent(self, name:str, ris:list[str]) -> None:
+		"""	Handle a CSE-internal bulk delete event (ie. whenever instance resources are deleted in bulk).
+			Remove the deleted resources from all groups with a single search.
+			This method is called by the `EventManager`. 
 
-		ri = deletedResource.ri
+			Args:
+				ris: The resource IDs of the deleted resources.
+		"""
+		L.isDebug and L.logDebug(f'Looking for and removing {len(ris)} deleted resources from groups')
+		self._removeDeletedMembers(set(ris))
+
+
+	def _removeDeletedMembers(self, ris:set[str]) -> None:
+		"""	Remove deleted resources from the *mid* attribute of all groups.
+
+			Args:
+				ris: The resource IDs of the deleted resources.
+		"""
 		groups = CSE.storage.searchByFragment(	{ 'ty' : ResourceTypes.GRP }, 
-												lambda r: (mid := r.get('mid')) and ri in mid)	# type: ignore # Filter all <grp> where mid contains ri
+												lambda r: (mid := r.get('mid')) and not ris.isdisjoint(mid))	# type: ignore # Filter all <grp> where mid contains one of the ris
 		for group in groups:
-			L.isDebug and L.logDebug(f'Removing deleted resource: {ri} from group: {group.ri}')
-			group['mid'].remove(ri)
-			group['cnm'] = group.cnm - 1
+			for ri in [ ri for ri in group.mid if ri in ris ]:
+				L.isDebug and L.logDebug(f'Removing deleted resource: {ri} from group: {group.ri}')
+				group['mid'].remove(ri)
+				group['cnm'] = group.cnm - 1
 			group.dbUpdate(True)
 
@@ -14,7 +14,7 @@ from __future__ import annotations
 from typing import Callable, Union, Any, cast, Optional
 
 import sys, copy
-from threading import Lock, current_thread
+from threading import Lock
 
 import isodate
 from ..etc.Types import CSERequest, MissingData, ResourceTypes, NotificationContentType, NotificationEventType, TimeWindowType, EventEvaluationMode
@@ -33,6 +33,7 @@ from ..resources.Resource import Resource
 from ..resources.CRS import CRS
 from ..resources.SUB import SUB
 from ..helpers.BackgroundWorker import BackgroundWorker, BackgroundWorkerPool
+from ..helpers.DeliveryPool import DeliveryPool
 from ..runtime.Logging import Logging as L
 
 # TODO: removal policy (e.g. unsuccessful tries)
@@ -55,6 +56,8 @@ class NotificationManager(object):
 		'asyncSubscriptionNotifications',
 		'enableSubscriptionVerificationRequests',
 
+		'deliveryPool',
+
 		'_eventNotification',
 	)
 
@@ -72,6 +75,15 @@ class NotificationManager(object):
 		self.lockBatchNotification = Lock()					# Lock for batchNotifications
 		self.lockNotificationEventStats = Lock()			# Lock for notificationEventStats
 
+		# Bounded worker pool with per-target queues for asynchronous notifications
+		self.deliveryPool = DeliveryPool('NotificationDelivery',
+										 workers = Configuration.get('cse.notifications.workers'),
+										 maxInFlight = Configuration.get('cse.notifications.targetConcurrency'),
+										 maxQueueSize = Configuration.get('cse.notifications.targetQueueSize'),
+										 overflowPolicy = Configuration.get('cse.notifications.overflowPolicy'),
+										 overflowTimeout = Configuration.get('cse.notifications.overflowTimeout'))
+		self.deliveryPool.start()
+
 		CSE.event.addHandler(CSE.event.cseReset, self.restart)		# type: ignore
 		
 		# Optimize event handling
@@ -86,6 +98,7 @@ class NotificationManager(object):
 			Returns:
 				Boolean that indicates the success of the operation
 		"""
+		self.deliveryPool.stop()
 		L.isInfo and L.log('NotificationManager shut down')
 		return True
 
@@ -744,7 +757,8 @@ class NotificationManager(object):
 		return BackgroundWorkerPool.newActor(self._crsSlidingWindowMonitor, 
 											 crsTws,
 											 name = self._getSlidingWorkerName(crsRi), 
-											 data = [ sur ]).start(crsRi = crsRi, subCount = subCount, eem = eem)
+											 data = [ sur ],
+											 category = 'notifications').start(crsRi = crsRi, subCount = subCount, eem = eem)
 
 
 	def stopCRSSlidingWindow(self, crsRi:str) -> None:
@@ -830,14 +844,19 @@ class NotificationManager(object):
 				postFunc(nu)
 			return True
 
+		def _backgroundSender(nu:str) -> bool:
+			try:
+				return _sender(nu, originator = originator, content = dct)
+			except ResponseException as e:
+				L.isDebug and L.logDebug(f'Notification failed for: {nu} : {e.dbg}')
+				return False
+
 		if isinstance(nus, str):
 			nus = [ nus ]
 		for nu in nus:
 			if background:
-				BackgroundWorkerPool.newActor(_sender, 
-											  name = f'NO_{current_thread().name}').start(nu = nu, 
-																						  originator = originator,
-																						  content = dct)
+				if not self.deliveryPool.submit(nu, lambda nu = nu: _backgroundSender(nu)):	# type:ignore[misc]
+					L.isWarn and L.logWarn(f'Notification queue for: {nu} is full. Notification dropped.')
 			else:
 				_sender(nu, originator = originator, content = dct)
 
@@ -847,6 +866,24 @@ class NotificationManager(object):
 	#	Notification Statistics
 	#
 
+	def getRuntimeStatistics(self) -> dict[str, int|float]:
+		"""	Return the statistics of the delivery of asynchronous notifications.
+
+			Return:
+				Dictionary with the number of targets, queued, executing, delivered, failed and dropped notifications, and the average and maximum latency in seconds.
+		"""
+		return self.deliveryPool.getStatistics()
+
+
+	def getTargetStatistics(self) -> dict[str, dict[str, int|float]]:
+		"""	Return the statistics of the delivery of asynchronous notifications for each notification target.
+
+			Return:
+				Dictionary, indexed by the notification targets, with the number of queued, executing, delivered, failed and dropped notifications, and the average and maximum latency in seconds.
+		"""
+		return self.deliveryPool.getTargetStatistics()
+
+
 	def validateAndConstructNotificationStatsInfo(self, sub:SUB|CRS, add:Optional[bool] = True) -> None:
 		r"""Update and fill the *notificationStatsInfo* attribute of a \<sub> or \<crs> resource.
 
@@ -922,7 +959,7 @@ class NotificationManager(object):
 				if each['tg'] == target:
 					each[activeField] += count
 					break
-			sub.dbUpdate(True)
+			sub.dbUpdate(True, immediate = True)	# Don't delay, other threads count as well
 
 
 	def countNotificationEvents(self, ri:str, 
@@ -957,7 +994,7 @@ class NotificationManager(object):
 
 			for each in sub.nsi:
 				each['noec'] += 1
-			sub.dbUpdate(True)
+			sub.dbUpdate(True, immediate = True)	# Don't delay, other threads count as well
 
 
 	def updateOfNSEAttribute(self, sub:CRS|SUB, newNse:bool) -> None:
@@ -1132,6 +1169,8 @@ class NotificationManager(object):
 
 
 		def _sendNotification(uri:str, subscription:SUB, notificationRequest:JSON) -> bool:
+			# Count the sent notification only when it is actually sent, and not when it was dropped from the delivery queue
+			self.countSentReceivedNotification(subscription, uri)	# count sent notification
 			try:
 				CSE.request.handleSendRequest(CSERequest(op = Operation.NOTIFY,
 														 to = uri, 
@@ -1187,12 +1226,12 @@ class NotificationManager(object):
 					except ResponseException as e:
 						L.logErr(f'Cannot retrieve <sub> resource: {sub["ri"]}: {e.dbg}')
 						return False
-					self.countSentReceivedNotification(subscription, uri)	# count sent notification
 				
 				# Send the notification
 				if asynchronous:
-					BackgroundWorkerPool.runJob(lambda: _sendNotification(uri, subscription, notificationRequest), 
-																		  name = f'NOT_{sub["ri"]}')
+					if not self.deliveryPool.submit(uri, lambda: _sendNotification(uri, subscription, notificationRequest)):
+						L.isWarn and L.logWarn(f'Notification queue for: {uri} is full. Notification dropped.')
+						return False
 					return True
 				else:
 					return _sendNotification(uri, subscription, notificationRequest)
@@ -1387,7 +1426,8 @@ class NotificationManager(object):
 		L.isDebug and L.logDebug(f'Starting new batchNotificationsWorker. Duration : {dur:f} seconds')
 		BackgroundWorkerPool.newActor(self._sendSubscriptionAggregatedBatchNotification, 
 									  delay = dur,
-									  name = self._workerID(ri, nu)).start(ri = ri, nu = nu, ln = ln, sub = sub)
+									  name = self._workerID(ri, nu),
+									  category = 'notifications').start(ri = ri, nu = nu, ln = ln, sub = sub)
 		return True
 
 
@@ -8,13 +8,12 @@
 #
 
 from __future__ import annotations
-from typing import Any, Optional
+from typing import Any, Optional, Dict
 
 from ..etc.Types import ResourceTypes, JSON, CSEType
 from ..etc.ResponseStatusCodes import APP_RULE_VALIDATION_FAILED, ORIGINATOR_HAS_ALREADY_REGISTERED, INVALID_CHILD_RESOURCE_TYPE
 from ..etc.ResponseStatusCodes import BAD_REQUEST, OPERATION_NOT_ALLOWED, CONFLICT, ResponseException
 from ..etc.ACMEUtils import uniqueAEI, getIdFromOriginator, uniqueRN
-from ..etc.DateUtils import getResourceDate
 from ..runtime.Configuration import Configuration
 from ..runtime import CSE
 from ..resources.Resource import Resource
@@ -22,10 +21,17 @@ from ..helpers.BackgroundWorker import BackgroundWorker, BackgroundWorkerPool
 from ..runtime.Logging import Logging as L
 
 
+_expirationRetryDelay = 1.0
+""" Delay in seconds after which the expiration of a resource is retried for the first time after it failed. """
+_maxExpirationRetryDelay = 3600.0
+""" Maximum delay in seconds after which the expiration of a resource is retried. """
+
+
 class RegistrationManager(object):
 
 	__slots__ = (
 		'expWorker',
+		'expirationRetries',
 
 		'allowedCSROriginators',
 		'allowedAEOriginators',
@@ -48,6 +54,8 @@ class RegistrationManager(object):
 
 		# Start expiration Monitor
 		self.expWorker:BackgroundWorker	= None
+		self.expirationRetries:Dict[str, int] = {}
+		""" Number of failed expirations, mapped by resource ID. """
 		self.startExpirationMonitor()
 		
 		# Add handler for configuration updates
@@ -99,6 +107,7 @@ class RegistrationManager(object):
 		"""	Restart the registration services.
 		"""
 		self._assignConfig()
+		self.expirationRetries.clear()
 		self.restartExpirationMonitor()
 		L.isDebug and L.logDebug('RegistrationManager restarted')
 
@@ -384,7 +393,8 @@ class RegistrationManager(object):
 
 		L.isDebug and L.logDebug('Starting expiration monitor')
 		if self.checkExpirationsInterval > 0:
-			self.expWorker = BackgroundWorkerPool.newWorker(self.checkExpirationsInterval, self.expirationDBMonitor, 'expirationMonitor', runOnTime=False).start()
+			self.expWorker = BackgroundWorkerPool.newActor(self.expirationDBMonitor, name = 'expirationMonitor')
+			self.expWorker.start()
 
 
 	def stopExpirationMonitor(self) -> None:
@@ -392,29 +402,49 @@ class RegistrationManager(object):
 		L.isDebug and L.logDebug('Stopping expiration monitor')
 		if self.expWorker:
 			self.expWorker.stop()
+			self.expWorker = None
+			if CSE.storage:
+				CSE.storage.expirationIndex.wakeUp()
 
 
 	def restartExpirationMonitor(self) -> None:
 		# Stop the expiration monitor
 		L.isDebug and L.logDebug('Restart expiration monitor')
 		if self.expWorker:
-			self.expWorker.restart(self.checkExpirationsInterval)
-
-
-	def expirationDBMonitor(self) -> bool:
-		# L.isDebug and L.logDebug('Looking for expired resources')
-		now = getResourceDate()
-		resources = CSE.storage.searchByFilter(lambda r: (et := r.get('et'))  and et < now)
-		for resource in resources:
-			# try to retrieve the resource first bc it might have been deleted as a child resource
-			# of an expired resource
-			if not CSE.storage.hasResource(ri=resource.ri):
-				continue
-			L.isDebug and L.logDebug(f'Expiring resource (and child resouces): {resource.ri}')
-			CSE.dispatcher.deleteLocalResource(resource, withDeregistration = True)	# ignore result
-			self._eventExpireResource(resource) 
-				
-		return True
+			self.stopExpirationMonitor()
+			self.startExpirationMonitor()
+
+
+	def expirationDBMonitor(self, _worker:BackgroundWorker) -> None:
+		"""	Expire the resources when their expiration time has passed.
+
+			The monitor sleeps until the next resource expires, or until a resource is created or updated
+			that expires earlier. It wakes up at the latest after *checkExpirationsInterval* seconds.
+
+			Args:
+				_worker: The actor that runs the monitor. The monitor ends when it is not the current expiration worker anymore.
+		"""
+		while _worker is self.expWorker:
+			for resource in CSE.storage.retrieveExpiredResources():
+				# The resource might have been deleted in the meantime as a child resource of an expired resource
+				if not CSE.storage.hasResource(ri = resource.ri):
+					self.expirationRetries.pop(resource.ri, None)
+					continue
+				L.isDebug and L.logDebug(f'Expiring resource (and child resouces): {resource.ri}')
+				try:
+					CSE.dispatcher.deleteLocalResource(resource, withDeregistration = True)	# ignore result
+				except Exception as e:
+					# The resource was already removed from the expiration index. Add it again, and
+					# retry the expiration with an increasing delay
+					retries = self.expirationRetries.get(resource.ri, 0)
+					self.expirationRetries[resource.ri] = retries + 1
+					delay = min(_expirationRetryDelay * 2 ** min(retries, 16), _maxExpirationRetryDelay)
+					L.logErr(f'Error expiring resource: {resource.ri}. Retrying in {delay:.0f} seconds', exc = e)
+					CSE.storage.retryExpiration(resource.ri, delay)
+					continue
+				self.expirationRetries.pop(resource.ri, None)
+				self._eventExpireResource(resource) 
+			CSE.storage.waitForExpiration(self.checkExpirationsInterval)
 
 
 	#########################################################################
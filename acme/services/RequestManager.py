@@ -10,9 +10,9 @@
 from __future__ import annotations
 from typing import Any, List, Tuple, cast, Dict, Optional, Union
 
-import urllib.parse
+import urllib.parse, time
 from copy import deepcopy
-from threading import Lock
+from threading import Lock, Condition
 
 from ..etc.Types import JSON, BasicType, DesiredIdentifierResultType, FilterOperation, ResourceTypes
 from ..etc.Types import FilterUsage, Operation, RequestCallback, RequestType
@@ -22,7 +22,7 @@ from ..etc.Types import CSERequest, ContentSerializationType, RequestResponseLis
 from ..etc.ResponseStatusCodes import ResponseException
 from ..etc.ResponseStatusCodes import BAD_REQUEST, NOT_FOUND, REQUEST_TIMEOUT, RELEASE_VERSION_NOT_SUPPORTED
 from ..etc.ResponseStatusCodes import UNSUPPORTED_MEDIA_TYPE, OPERATION_NOT_ALLOWED, REQUEST_TIMEOUT, TARGET_NOT_REACHABLE
-from ..etc.DateUtils import getResourceDate, fromAbsRelTimestamp, utcTime, waitFor, toISO8601Date, fromDuration
+from ..etc.DateUtils import getResourceDate, fromAbsRelTimestamp, utcTime, toISO8601Date, fromDuration
 from ..etc.RequestUtils import requestFromResult, determineSerialization, deserializeData
 from ..etc.ACMEUtils import isCSERelative, toSPRelative, isValidCSI, isValidAEI, uniqueRI, isAbsolute, isSPRelative
 from ..etc.ACMEUtils import compareIDs, localResourceID, getIDFromPath, getIdFromOriginator
@@ -31,12 +31,13 @@ from ..etc.Utils import isAcmeUrl, isHttpUrl, isMQTTUrl, isWSUrl
 from ..etc.Utils import isURL
 from ..helpers.TextTools import setXPath
 from ..runtime.Configuration import Configuration
-from ..runtime import CSE
+from ..runtime import CSE, Statistics
 from ..resources.Resource import Resource
 from ..resources.CSEBase import getCSE
 from ..resources.REQ import REQ
 from ..resources.PCH import PCH
 from ..helpers.BackgroundWorker import BackgroundWorkerPool
+from ..helpers.ResponseCorrelator import ResponseCorrelator
 from ..runtime.Logging import Logging as L
 
 # Type definition
@@ -61,9 +62,10 @@ class RequestManager(object):
 		'_requestLock',
 		'_requests',
 		'_rqiOriginator',
+		'_pollingConditions',
+		'_pollingWaiters',
 		'_pcWorker',
-		'_receivedResponses',
-		'_receivedResponsesLock',
+		'_responseCorrelator',
 
 
 		'requestHandlers',
@@ -104,9 +106,10 @@ class RequestManager(object):
 		self._requestLock = Lock()													# Lock to access the following two dictionaries
 		self._requests:Dict[str, List[ Tuple[CSERequest, RequestType] ] ] = {}		# Dictionary to map request originators to a list of reqeests. Used for handling polling requests.
 		self._rqiOriginator:Dict[str, str] = {}										# Dictionary to map requestIdentifiers to an originator of a request. Used for handling of polling requests.
+		self._pollingConditions:Dict[str, Condition] = {}							# Dictionary to map originators to a condition (using the request lock) to wake up waiting long-polls.
+		self._pollingWaiters:Dict[str, int] = {}									# Dictionary to map originators to the number of waiting long-polls.
 		self._pcWorker = BackgroundWorkerPool.newWorker(self.requestExpirationDelta * expirationCheckFactor, self._cleanupPollingRequests, name='pollingChannelExpiration').start()
-		self._receivedResponses:Dict[str, Tuple[Result, str]] = {}
-		self._receivedResponsesLock = Lock()
+		self._responseCorrelator = ResponseCorrelator()								# Registry of expected async responses, e.g. for MQTT requests
 
 		# Add a handler when the CSE is reset
 		CSE.event.addHandler(CSE.event.cseReset, self.restart)	# type: ignore
@@ -252,6 +255,8 @@ class RequestManager(object):
 			Return:
 				Request result.
 		"""
+		start = time.perf_counter()
+
 		# Convert JSON to CSERequest
 		if isinstance(request, dict):
 			request = CSE.request.fillAndValidateCSERequest(request)
@@ -277,18 +282,49 @@ class RequestManager(object):
 				return Result(rsc = ResponseStatusCode.BAD_REQUEST,
 							  dbg = L.logWarn(f'Partial retrieve is only valid for rcn=1 or rcn=7 (was: {request.rcn})'))
 
-		# Call the appropriate request function
+		# Call the appropriate request function. Resource updates are written once at the end of the request
+		dispatcherStart = time.perf_counter()
 		try:
-			res = self.requestHandlers[request.op].ownRequest(request)
+			with CSE.storage.unitOfWork():
+				res = self.requestHandlers[request.op].ownRequest(request)
 		except ResponseException as e:
 			res = Result(rsc = e.rsc, dbg = e.dbg, request = e.data)
+		if CSE.statistics.latencyHistograms:
+			CSE.statistics.recordLatency(Statistics.latencyDispatcher, 
+										 (request.op.name, self._latencyResourceType(request, res)), 
+										 dispatcherStart)
 
 		# Add to requests database
 		self.recordRequest(request, res)
 
+		CSE.statistics.recordLatency(Statistics.latencyRequest, (request.op.name, ), start)
 		return res
 
 
+	def _latencyResourceType(self, request:CSERequest, result:Result) -> str:
+		"""	Determine the resource type label of a request for the latency histograms.
+
+			Args:
+				request: The request.
+				result: The result of the request.
+
+			Return:
+				The name of the resource type, or an empty string if the resource type is not known, e.g. because the request failed.
+		"""
+		if request.op == Operation.CREATE:
+			ty = request.ty
+		elif isinstance(result.resource, Resource):
+			ty = result.resource.ty
+		else:
+			ty = None
+		if ty is None:
+			return ''
+		try:
+			return ResourceTypes(ty).name
+		except ValueError:
+			return str(ty)
+
+
 	def processRequest(self, request:CSERequest, originator:str, id:str) -> Result:
 		"""	Calls the fitting request process handler for an operation and call it.
 
@@ -483,14 +519,15 @@ class RequestManager(object):
 		if request.rt == ResponseType.nonBlockingRequestSynch:
 			# Run operation in the background
 			BackgroundWorkerPool.newActor(self._runNonBlockingRequestSync, 
-										  name = f'request_{request.rqi}').start(request = request, reqRi = resource.ri)
+										  name = f'request_{request.rqi}',
+										  category = 'actors').start(request = request, reqRi = resource.ri)
 			# Create the response content with the <request> ri 
 			return Result(data = { 'm2m:uri' : resource.ri }, rsc = ResponseStatusCode.ACCEPTED_NON_BLOCKING_REQUEST_SYNC)
 
 		# Asynchronous handling
 		if request.rt == ResponseType.nonBlockingRequestAsynch:
 			# Run operation in the background
-			BackgroundWorkerPool.newActor(self._runNonBlockingRequestAsync, name = f'request_{request.rqi}').start(request = request, reqRi = resource.ri)
+			BackgroundWorkerPool.newActor(self._runNonBlockingRequestAsync, name = f'request_{request.rqi}', category = 'actors').start(request = request, reqRi = resource.ri)
 			# Create the response content with the <request> ri 
 			return Result(data = { 'm2m:uri' : resource.ri }, rsc = ResponseStatusCode.ACCEPTED_NON_BLOCKING_REQUEST_ASYNC)
 
@@ -571,7 +608,8 @@ class RequestManager(object):
 		pc = None
 		try:
 			try:
-				operationResult = self.requestHandlers[request.op].dispatcherRequest(request, request.originator)
+				with CSE.storage.unitOfWork():
+					operationResult = self.requestHandlers[request.op].dispatcherRequest(request, request.originator)
 			except REQUEST_TIMEOUT:
 				pass
 			except ResponseException as e:
@@ -721,7 +759,14 @@ class RequestManager(object):
 			Otherwise, *True* will be returned if there is any request for the *originator*.
 		"""
 		with self._requestLock:
-			return (lst := self._requests.get(originator)) is not None and any(	 (r, t) for r,t in lst if (requestID is None or r.rqi == requestID) and (t == reqType) )
+			return self._hasPollingRequest(originator, requestID, reqType)
+
+
+	def _hasPollingRequest(self, originator:str, requestID:Optional[str], reqType:RequestType) -> bool:
+		"""	Check whether there is a pending request or response for the tuple (*originator*, *requestID*).
+			The caller must hold the request lock.
+		"""
+		return (lst := self._requests.get(originator)) is not None and any(	 (r, t) for r,t in lst if (requestID is None or r.rqi == requestID) and (t == reqType) )
 
 	
 	def queuePollingRequest(self, request:CSERequest, reqType:RequestType=RequestType.REQUEST) -> None:
@@ -767,11 +812,16 @@ class RequestManager(object):
 			if reqType == RequestType.RESPONSE:
 				del self._rqiOriginator[request.rqi]
 
+			# Wake up the long-polls that wait for this originator
+			if (condition := self._pollingConditions.get(originator)):
+				condition.notify_all()
+
 		
 		# Start an actor to remove the request after the timeout		
 		BackgroundWorkerPool.newActor(	lambda: self.unqueuePollingRequest(originator, request.rqi, reqType), 
 										delay = request._rqetUTCts - utcTime() + 1.0,	# +1 second delay 
-										name = f'unqueuePolling_{request.rqi}-{reqType}').start()
+										name = f'unqueuePolling_{request.rqi}-{reqType}',
+										category = 'actors').start()
 	
 
 	def unqueuePollingRequest(self, originator:str, requestID:str, reqType:RequestType) -> CSERequest:
@@ -779,26 +829,33 @@ class RequestManager(object):
 		"""
 		L.isDebug and L.logDebug(f'Unqueuing polling request, originator: {originator}, requestID: {requestID}')
 		with self._requestLock:
-			resultRequest = None
-			if lst := self._requests.get(originator):
-				requests = []
-				
-				# extract the queried request or the first one found, and build a new list for the remaining
-				# Building a new list is faster than extracting and removing elements in place
-				for r,t in lst:	
-					if (requestID is None or requestID == r.rqi) and t == reqType and not resultRequest:	# Either get an uspecified reuqest, or a specific one
-						resultRequest = r
-					else:
-						requests.append( (r, t) )
-				if requests:
-					self._requests[originator] = requests
+			return self._unqueuePollingRequest(originator, requestID, reqType)
+
+
+	def _unqueuePollingRequest(self, originator:str, requestID:Optional[str], reqType:RequestType) -> Optional[CSERequest]:
+		"""	Remove a request for the *originator* and with the *requestID* from the polling request queue. 
+			The caller must hold the request lock.
+		"""
+		resultRequest = None
+		if lst := self._requests.get(originator):
+			requests = []
+			
+			# extract the queried request or the first one found, and build a new list for the remaining
+			# Building a new list is faster than extracting and removing elements in place
+			for r,t in lst:	
+				if (requestID is None or requestID == r.rqi) and t == reqType and not resultRequest:	# Either get an uspecified reuqest, or a specific one
+					resultRequest = r
 				else:
-					del self._requests[originator]
+					requests.append( (r, t) )
+			if requests:
+				self._requests[originator] = requests
+			else:
+				del self._requests[originator]
+			
+		if resultRequest:
+			BackgroundWorkerPool.stopWorkers(f'unqueuePolling_{resultRequest.rqi}-{reqType}')
 				
-			if resultRequest:
-				BackgroundWorkerPool.stopWorkers(f'unqueuePolling_{resultRequest.rqi}-{reqType}')
-					
-			return resultRequest
+		return resultRequest
 
 
 	def waitForPollingRequest(self, originator:str, 
@@ -806,9 +863,10 @@ class RequestManager(object):
 									timeout:float, 
 									reqType:Optional[RequestType] = RequestType.REQUEST, 
 									aggregate:Optional[bool] = False) -> Result:
-		"""	Busy waiting for a polling request.
+		"""	Wait for a polling request.
 			The function returns when there is a new or pending matching request in the queue, or when the
-			*timeout* (in seconds) is met.
+			*timeout* (in seconds) is met. Waiting doesn't poll: the caller is woken up when a request is
+			queued for the *originator*.
 			
 			Args:
 				originator: Request originator to match.
@@ -821,24 +879,34 @@ class RequestManager(object):
 		"""
 		L.isDebug and L.logDebug(f'Waiting for: {reqType} for originator: {originator}, requestID: {requestID}')
 
-		if waitFor(timeout, lambda:self.hasPollingRequest(originator, requestID, reqType)):	# Wait until timeout, or the request of the correct type was found
-			L.isDebug and L.logDebug(f'Received {reqType} request for originator: {originator}, requestID: {requestID}, aggregate: {aggregate}')
+		lst:list[CSERequest] = []
+		with self._requestLock:
+			# Get or create the condition for the originator. It is removed again when the last waiter has finished
+			if not (condition := self._pollingConditions.get(originator)):
+				condition = self._pollingConditions[originator] = Condition(self._requestLock)
+			self._pollingWaiters[originator] = self._pollingWaiters.get(originator, 0) + 1
+			try:
+				# Wait until timeout, or the request of the correct type was found.
+				# The waiter is woken up when a request is queued for the originator.
+				if condition.wait_for(lambda: self._hasPollingRequest(originator, requestID, reqType), timeout):
+					L.isDebug and L.logDebug(f'Received {reqType} request for originator: {originator}, requestID: {requestID}, aggregate: {aggregate}')
+					while (req := self._unqueuePollingRequest(originator, requestID, reqType)):
+						lst.append(req)
+						if not aggregate:
+							break
+			finally:
+				if (count := self._pollingWaiters[originator] - 1) > 0:
+					self._pollingWaiters[originator] = count
+				else:
+					del self._pollingWaiters[originator]
+					del self._pollingConditions[originator]
 
+		if lst:
 			if aggregate:
-				lst:list[CSERequest] = []
-				while True:
-					if req := self.unqueuePollingRequest(originator, requestID, reqType):
-						lst.append(req)
-						continue
-					# if fall through then there is no further request available.
-					# build the aggregated request
-					agrp = { 'm2m:agrp' : [ requestFromResult(Result(request = each)).data for each in lst ] }
-					return Result(resource = agrp, rsc = ResponseStatusCode.OK)
-				
-			else:
-				if req := self.unqueuePollingRequest(originator, requestID, reqType):
-					return Result(request = req, rsc = req.rsc)
-			# fall-through
+				# build the aggregated request
+				agrp = { 'm2m:agrp' : [ requestFromResult(Result(request = each)).data for each in lst ] }
+				return Result(resource = agrp, rsc = ResponseStatusCode.OK)
+			return Result(request = lst[0], rsc = lst[0].rsc)
 		raise REQUEST_TIMEOUT(L.logWarn(f'Timeout while waiting for: {reqType} for originator: {originator}, requestID: {requestID}'))
 
 
@@ -941,26 +1009,45 @@ class RequestManager(object):
 	#	Request/Response async sequence helpers for polling asynch responses
 
 
+	def expectResponse(self, rqi:str) -> None:
+		"""	Register a requestIdentifier *rqi* for which a response is expected.
+
+			This should be called before a request is sent, so that a response that is received
+			before `waitForResponse()` is called is not discarded.
+
+			Args:
+				rqi: The requestIdentifier of the sent request.
+		"""
+		self._responseCorrelator.register(rqi)
+
+
+	def cancelResponse(self, rqi:str) -> None:
+		"""	Unregister a requestIdentifier *rqi*, e.g. when sending the request failed.
+			A response that is received later for this *rqi* is discarded.
+
+			Args:
+				rqi: The requestIdentifier of the request.
+		"""
+		self._responseCorrelator.cancel(rqi)
+
+
 	def waitForResponse(self, rqi:str, timeOut:float) -> Tuple[ Optional[Result], Optional[str] ]:
 		"""	Wait for a response with a specific requestIdentifier *rqi*.
 
+			The caller is woken up as soon as the response is added by `addResponse()`, or when
+			the timeout has passed.
+
+			Args:
+				rqi: The requestIdentifier of the sent request.
+				timeOut: Maximum time to wait, in seconds.
+			Return:
+				Tuple (response, info). The response is a TARGET_NOT_REACHABLE result in case of a timeout.
 		"""
-		resp = None
-		info = None
-
-		def _receivedResponse() -> bool:
-			nonlocal resp, info
-			with self._receivedResponsesLock:
-				if not self._receivedResponses:
-					return False
-				if rqi in self._receivedResponses:
-					resp, info = self._receivedResponses.pop(rqi)	# return the response (in a Result object), and remove it from the dict.
-					return True
-			return False
-			
-		if not waitFor(timeOut, _receivedResponse):
+		received, value = self._responseCorrelator.wait(rqi, timeOut)
+		if not received:
 			return Result(rsc = ResponseStatusCode.TARGET_NOT_REACHABLE, 
 						  dbg = 'Target not reachable or timeout'), None
+		resp, info = value
 		# resp.data = resp.request.pc					# Add the pc to the data, since components excepct this. 
 													# TODO perhaps unify the use of response values throughout the CSE
 		CSE.event.responseReceived(resp.request)	# type:ignore [attr-defined]
@@ -968,13 +1055,13 @@ class RequestManager(object):
 
 
 	def addResponse(self, response:Result, info:Optional[str] = None) -> None:
-		"""	Add a response and topic to the response dictionary. The key is the *rqi* (requestIdentifier) of
-			the response. 
+		"""	Hand over a response and topic to the requester that waits for it. The key is the *rqi*
+			(requestIdentifier) of the response. Responses that are not expected are discarded.
 		"""
 		if (rqi := response.request.rqi):
 			L.isDebug and L.logDebug(f'Adding response for rqi: {rqi}')
-			with self._receivedResponsesLock:
-				self._receivedResponses[rqi] = (response, info)
+			if not self._responseCorrelator.complete(rqi, (response, info)):
+				L.isDebug and L.logDebug(f'Discarding unexpected response for rqi: {rqi}')
 
 
 	###########################################################################
@@ -1408,6 +1495,13 @@ class RequestManager(object):
 							cseRequest.fc._geom = v
 						if (v := gget(fcAttrs, 'gsf')) is not None:
 							cseRequest.fc.gsf = v
+
+				# Compile an advanced query once for the whole request
+				if cseRequest.fc.aq is not None:
+					try:
+						cseRequest.fc._aq = CSE.script.compileComparisonQuery(cseRequest.fc.aq)
+					except ResponseException as e:
+						raise BAD_REQUEST(e.dbg, data = cseRequest)
 				
 				# Copy all remaining attributes as filter criteria!
 
@@ -10,14 +10,16 @@
 
 
 from __future__ import annotations
-from typing import List, cast, Optional, Any, Tuple
+from typing import Callable, List, cast, Optional, Any, Tuple
 
 import ssl
+from threading import Lock
 
 from ..etc.Types import JSON, ResourceTypes, Permission, Result, CSERequest
 from ..etc.ResponseStatusCodes import BAD_REQUEST, ORIGINATOR_HAS_NO_PRIVILEGE, NOT_FOUND, INTERNAL_SERVER_ERROR
 from ..etc.ACMEUtils import isSPRelative, toCSERelative, getIdFromOriginator
 from ..helpers.TextTools import findXPath, simpleMatch
+from ..helpers.LRUCache import LRUCache
 from ..runtime import CSE
 from ..runtime.Configuration import Configuration
 from ..resources.Resource import Resource
@@ -53,11 +55,37 @@ class SecurityManager(object):
 		'verifyCertificateWs',
 		'tlsVersionWs',
 		'caCertificateFileWs',
-		'caPrivateKeyFileWs'
+		'caPrivateKeyFileWs',
+		'accessCacheSize',
+
+		'acpCache',
+		'accessDecisionCache',
+		'_accessCacheLock',
+		'_accessCacheGeneration',
+		'_config',
 	)
 
 
-	def __init__(self) -> None:
+	def __init__(self, config:Callable[[str], Any] = Configuration.get) -> None:
+		"""	Initialize the security manager.
+
+			By default the settings are taken from the CSE's configuration. Other settings can be given
+			instead, e.g. for unit tests without a running CSE.
+
+			Args:
+				config: Function that returns the value of a configuration setting.
+		"""
+		self._config = config
+		""" Function that returns the value of a configuration setting. """
+
+		self.acpCache:LRUCache = None
+		""" Cache for local <ACP> resources, indexed by the IDs in *acpi* attributes. """
+		self.accessDecisionCache:LRUCache = None
+		""" Cache for access decisions, indexed by the originator, the ACP IDs, the requested permission and the resource type. """
+		self._accessCacheLock = Lock()
+		""" Lock to protect the generation of the access caches. """
+		self._accessCacheGeneration = 0
+		""" Generation of the access caches. It is incremented whenever the caches are invalidated. """
 
 		# Get the configuration settings
 		self._assignConfig()
@@ -88,6 +116,7 @@ class SecurityManager(object):
 		self._assignConfig()
 		self._readHttpBasicAuthFile()
 		self._readHttpTokenAuthFile()
+		self.invalidateAccessCache()
 		L.logDebug('SecurityManager restarted')
 
 
@@ -95,34 +124,43 @@ class SecurityManager(object):
 		"""	Assign configurations.
 		"""
 
-		self.enableACPChecks 			= Configuration.get('cse.security.enableACPChecks')
-		self.fullAccessAdmin			= Configuration.get('cse.security.fullAccessAdmin')
+		self.enableACPChecks 			= self._config('cse.security.enableACPChecks')
+		self.fullAccessAdmin			= self._config('cse.security.fullAccessAdmin')
+		self.accessCacheSize			= self._config('cse.security.accessCacheSize')
+
+		# Create or resize the access caches
+		if self.acpCache is None:
+			self.acpCache = LRUCache(self.accessCacheSize)
+			self.accessDecisionCache = LRUCache(self.accessCacheSize)
+		else:
+			self.acpCache.resize(self.accessCacheSize)
+			self.accessDecisionCache.resize(self.accessCacheSize)
 
 		# TLS configurations (http)
-		self.useTLSHttp 				= Configuration.get('http.security.useTLS')
-		self.verifyCertificateHttp		= Configuration.get('http.security.verifyCertificate')
-		self.tlsVersionHttp				= Configuration.get('http.security.tlsVersion').lower()
-		self.caCertificateFileHttp		= Configuration.get('http.security.caCertificateFile')
-		self.caPrivateKeyFileHttp		= Configuration.get('http.security.caPrivateKeyFile')
+		self.useTLSHttp 				= self._config('http.security.useTLS')
+		self.verifyCertificateHttp		= self._config('http.security.verifyCertificate')
+		self.tlsVersionHttp				= self._config('http.security.tlsVersion').lower()
+		self.caCertificateFileHttp		= self._config('http.security.caCertificateFile')
+		self.caPrivateKeyFileHttp		= self._config('http.security.caPrivateKeyFile')
 
 		# HTTP authentication
-		self.httpBasicAuthFile			= Configuration.get('http.security.basicAuthFile')
-		self.httpTokenAuthFile			= Configuration.get('http.security.tokenAuthFile')
+		self.httpBasicAuthFile			= self._config('http.security.basicAuthFile')
+		self.httpTokenAuthFile			= self._config('http.security.tokenAuthFile')
 
 		# TLS and other configuration (mqtt)
-		self.useTlsMqtt 				= Configuration.get('mqtt.security.useTLS')
-		self.verifyCertificateMqtt		= Configuration.get('mqtt.security.verifyCertificate')
-		self.caCertificateFileMqtt		= Configuration.get('mqtt.security.caCertificateFile')
-		self.usernameMqtt				= Configuration.get('mqtt.security.username')
-		self.passwordMqtt				= Configuration.get('mqtt.security.password')
-		self.allowedCredentialIDsMqtt	= Configuration.get('mqtt.security.allowedCredentialIDs')
+		self.useTlsMqtt 				= self._config('mqtt.security.useTLS')
+		self.verifyCertificateMqtt		= self._config('mqtt.security.verifyCertificate')
+		self.caCertificateFileMqtt		= self._config('mqtt.security.caCertificateFile')
+		self.usernameMqtt				= self._config('mqtt.security.username')
+		self.passwordMqtt				= self._config('mqtt.security.password')
+		self.allowedCredentialIDsMqtt	= self._config('mqtt.security.allowedCredentialIDs')
 
 		# TLS configurations (websocket)
-		self.useTLSWs	 				= Configuration.get('websocket.security.useTLS')
-		self.verifyCertificateWs		= Configuration.get('websocket.security.verifyCertificate')
-		self.tlsVersionWs				= Configuration.get('websocket.security.tlsVersion').lower()
-		self.caCertificateFileWs		= Configuration.get('websocket.security.caCertificateFile')
-		self.caPrivateKeyFileWs			= Configuration.get('websocket.security.caPrivateKeyFile')
+		self.useTLSWs	 				= self._config('websocket.security.useTLS')
+		self.verifyCertificateWs		= self._config('websocket.security.verifyCertificate')
+		self.tlsVersionWs				= self._config('websocket.security.tlsVersion').lower()
+		self.caCertificateFileWs		= self._config('websocket.security.caCertificateFile')
+		self.caPrivateKeyFileWs			= self._config('websocket.security.caPrivateKeyFile')
 
 
 
@@ -138,6 +176,7 @@ class SecurityManager(object):
 		"""
 		if key not in ( 'cse.security.enableACPChecks', 
 						'cse.security.fullAccessAdmin',
+						'cse.security.accessCacheSize',
 						'http.security.useTLS',
 						'http.security.verifyCertificate',
 						'http.security.tlsVersion',
@@ -249,7 +288,7 @@ class SecurityManager(object):
 
 			# Allow registered AEs to RETRIEVE the CSEBase
 			try:
-				if CSE.storage.retrieveResource(aei = originator):
+				if CSE.storage.retrieveResource(aei = originator, shareDict = True):
 					L.isDebug and L.logDebug(f'Allow registered AE Orignator {originator} to RETRIEVE CSEBase. OK.')
 					return True
 			except NOT_FOUND:
@@ -287,14 +326,9 @@ class SecurityManager(object):
 				# FALLTHROUGH to the permission checks below
 			
 			else: # handle the permission checks here
-				for a in macp:
-					if not (acp := CSE.dispatcher.retrieveResource(a)):
-						L.isDebug and L.logDebug(f'ACP resource not found: {a}')
-						continue
-					else:
-						if acp.checkPermission(originator, requestedPermission, ty):
-							L.isDebug and L.logDebug('Permission granted')
-							return True
+				if self._checkACPs(macp, originator, requestedPermission, ty):
+					L.isDebug and L.logDebug('Permission granted')
+					return True
 				L.isDebug and L.logDebug('Permission NOT granted')
 				return False
 
@@ -350,35 +384,102 @@ class SecurityManager(object):
 				if resource.inheritACP:
 					L.isDebug and L.logDebug('Checking parent\'s permission')
 					if not parentResource:
-						parentResource = CSE.dispatcher.retrieveResource(resource.pi)
+						parentResource = CSE.dispatcher.retrieveResource(resource.pi, shareDict = True)
 					return self.hasAccess(originator, parentResource, requestedPermission, ty)
 
 			L.isDebug and L.logDebug('Permission NOT granted for resource w/o acpi')
 			return False
 
 		# Finally check the acpi
+		if self._checkACPs(acpi, originator, requestedPermission, ty):
+			L.isDebug and L.logDebug('Permission granted')
+			return True
+
+		# no fitting permission identified
+		L.isDebug and L.logDebug(f'Permission NOT granted. Originator: {originator} may not be listed in any of the linked ACPs')
+		return False
+
+
+	def _checkACPs(self, acpi:list[str], 
+						 originator:str, 
+						 requestedPermission:Permission, 
+						 ty:Optional[ResourceTypes]) -> bool:
+		"""	Check whether any of the referenced <ACP> resources grants the requested permission to an originator.
+
+			Decisions for local <ACP> resources are cached until an <ACP> or <GRP> resource is changed.
+
+			Args:
+				acpi: List of <ACP> resource IDs.
+				originator: The originator to check for.
+				requestedPermission: The permission to test.
+				ty: The type of the resource that is about to be created, or *None*.
+			Return:
+				Boolean indicating access.
+		"""
+		cacheKey = (originator, tuple(acpi), requestedPermission, ty)
+		if (granted := self.accessDecisionCache.get(cacheKey)) is not None:
+			L.isDebug and L.logDebug(f'Cached access decision: {granted}')
+			return granted
+		
+		generation = self._accessCacheGeneration
+		granted = False
 		for a in acpi:
-			if not (acp := CSE.dispatcher.retrieveResource(a)):
+			if not (acp := self._retrieveACP(a)):
 				L.isDebug and L.logDebug(f'ACP resource not found: {a}')
 				continue
-			# if checkSelf:	# forced check for self permissions
-			# 	if acp.checkSelfPermission(originator, requestedPermission):
-			# 		L.isDebug and L.logDebug('Permission granted')
-			# 		return True				
-			# else:
-			# 	# L.isWarn and L.logWarn(acp)
-			# 	if acp.checkPermission(originator, requestedPermission, ty):
-			# 		L.isDebug and L.logDebug('Permission granted')
-			# 		return True
-
-			# L.isWarn and L.logWarn(acp)
 			if acp.checkPermission(originator, requestedPermission, ty):
-				L.isDebug and L.logDebug('Permission granted')
-				return True
+				granted = True
+				break
 
-		# no fitting permission identified
-		L.isDebug and L.logDebug(f'Permission NOT granted. Originator: {originator} may not be listed in any of the linked ACPs')
-		return False
+		# Only cache decisions that depend on local resources. Changes of remote resources are not noticed.
+		if all(self._isLocalID(a) for a in acpi):
+			with self._accessCacheLock:
+				if generation == self._accessCacheGeneration:
+					self.accessDecisionCache.put(cacheKey, granted)
+		return granted
+
+
+	def _retrieveACP(self, id:str) -> Optional[ACP]:
+		"""	Retrieve an <ACP> resource. Local <ACP> resources are cached.
+
+			Args:
+				id: The ID of the <ACP> resource.
+			Return:
+				The <ACP> resource, or *None* if the resource is not an <ACP> resource.
+		"""
+		if (acp := self.acpCache.get(id)) is not None:
+			return cast(ACP, acp)
+		generation = self._accessCacheGeneration
+		resource = CSE.dispatcher.retrieveResource(id, shareDict = True)
+		if not isinstance(resource, ACP):
+			return None
+		if self._isLocalID(id):
+			with self._accessCacheLock:
+				if generation == self._accessCacheGeneration:
+					self.acpCache.put(id, resource)
+		return resource
+
+
+	def _isLocalID(self, id:str) -> bool:
+		"""	Check whether a resource ID refers to a resource that is hosted by this CSE.
+
+			Args:
+				id: The resource ID.
+			Return:
+				True if the ID refers to a local resource.
+		"""
+		return not id.startswith('/') or id.startswith(CSE.cseCsiSlash)
+
+
+	def invalidateAccessCache(self) -> None:
+		"""	Invalidate the cached <ACP> resources and access decisions. 
+		
+			This is called whenever an <ACP> or <GRP> resource is created, updated or deleted.
+		"""
+		with self._accessCacheLock:
+			self._accessCacheGeneration += 1
+			self.acpCache.clear()
+			self.accessDecisionCache.clear()
 
 
 	def checkAcpiUpdatePermission(self, request:CSERequest, targetResource:Resource, originator:str) -> bool:
@@ -413,7 +514,7 @@ class SecurityManager(object):
 			else:
 				# test the current acpi whether the originator is allowed to update the acpi
 				for ri in targetResource.acpi:
-					if not (acp := CSE.dispatcher.retrieveResource(ri)):
+					if not (acp := self._retrieveACP(ri)):
 						L.isWarn and L.logWarn(f'Access Check for acpi: referenced <ACP> resource not found: {ri}')
 						continue
 					if acp.checkSelfPermission(_originator, Permission.UPDATE):
@@ -592,7 +693,7 @@ class SecurityManager(object):
 		"""
 		self.httpBasicAuthData = {}
 		# We need to access the configuration directly, since the http server is not yet initialized
-		if Configuration.get('http.security.enableBasicAuth') and self.httpBasicAuthFile:
+		if self._config('http.security.enableBasicAuth') and self.httpBasicAuthFile:
 			try:
 				with open(self.httpBasicAuthFile, 'r') as f:
 					for line in f:
@@ -614,7 +715,7 @@ class SecurityManager(object):
 		"""
 		self.httpTokenAuthData = []
 		# We need to access the configuration directly, since the http server is not yet initialized
-		if Configuration.get('http.security.enableTokenAuth') and self.httpTokenAuthFile:
+		if self._config('http.security.enableTokenAuth') and self.httpTokenAuthFile:
 			try:
 				with open(self.httpTokenAuthFile, 'r') as f:
 					for line in f:
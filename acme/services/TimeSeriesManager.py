@@ -129,7 +129,7 @@ class TimeSeriesManager(object):
 		# Schedule the next actor runtime
 		rts.prepareNextRun()
 		L.isDebug and L.logDebug(f'Next expected tsRi:{tsRi}, pei:{rts.pei}, peid:{rts.peid}, mdt:{rts.mdt}, missingDataDetectionTime:{rts.missingDataDetectionTime}, expectedDgt:{rts.expectedDgt}')
-		rts.actor = BackgroundWorkerPool.newActor(self.timeSeriesMonitor, at = rts.missingDataDetectionTime, name = f'tsMonitor_{tsRi}_{rts.missingDataDetectionTime}')
+		rts.actor = BackgroundWorkerPool.newActor(self.timeSeriesMonitor, at = rts.missingDataDetectionTime, name = f'tsMonitor_{tsRi}_{rts.missingDataDetectionTime}', category = 'actors')
 		rts.actor.start(tsRi = tsRi) 				# Next running is in now+interval
 
 		return True
@@ -165,7 +165,7 @@ class TimeSeriesManager(object):
 			else:
 				# Create and start monitoring worker 
 				L.isDebug and L.logDebug(f'First <tsi> for this <ts>: {tsRi}. Starting monitoring. Next runtime:{missingDataDetectionTime}')
-				actor = BackgroundWorkerPool.newActor(self.timeSeriesMonitor, at = missingDataDetectionTime, name = f'tsMonitor_{tsRi}_{missingDataDetectionTime}').start(tsRi = tsRi)
+				actor = BackgroundWorkerPool.newActor(self.timeSeriesMonitor, at = missingDataDetectionTime, name = f'tsMonitor_{tsRi}_{missingDataDetectionTime}', category = 'actors').start(tsRi = tsRi)
 			
 			#	runningTimeserieses structure could have been created earlier (or not), eg. by adding a subscription earlier, but is not running yet
 			#	It still needs to be filled
@@ -8,9 +8,10 @@
 #
 
 from __future__ import annotations
-from typing import Any, Dict, Tuple, Optional
+from typing import Any, Callable, Dict, Tuple, Optional
 
-from copy import deepcopy
+from dataclasses import dataclass
+from functools import partial
 import re, json
 import isodate
 
@@ -59,6 +60,30 @@ attributesComplexTypes:dict[str, list[str]] = {}
 # TODO doc
 
 
+@dataclass
+class AttributeValidation(object):
+	"""	Precompiled validation information for a single attribute and a request type.
+	"""
+	policy:AttributePolicy
+	""" The attribute policy. """
+	optionality:RequestOptionality
+	""" The request optionality of the attribute for the request type. """
+	validateType:Callable[[Any], Tuple[BasicType, Any]]
+	""" The type checker for the attribute's values. """
+
+
+@dataclass
+class ValidationPlan(object):
+	"""	Precompiled validation information for a resource type and a request type.
+	"""
+	attributes:AttributePolicyDict
+	""" The attribute policy dictionary the plan was compiled for. """
+	validations:dict[str, Optional[AttributeValidation]]
+	""" The validation information for each allowed attribute, mapped by attribute short name. None if there is no policy. """
+	mandatory:list[str]
+	""" The names of the mandatory attributes. """
+
+
 # TODO make this more generic!
 _valueNameMappings = {
 	'acop': lambda v: '+'.join([ p.name for p in Permission.fromBitfield(int(v))]),
@@ -78,12 +103,22 @@ _valueNameMappings = {
 
 
 class Validator(object):
+	"""	Validation service and functions.
+	"""
+
+	__slots__ = (
+		'_validationPlans',
+	)
+	""" Slots of the class. """
 
 	_scheduleRegex = re.compile(r'(^((\*\/)?([0-5]?[0-9])((\,|\-|\/)([0-5]?[0-9]))*|\*)\s+((\*\/)?([0-5]?[0-9])((\,|\-|\/)([0-5]?[0-9]))*|\*)\s+((\*\/)?((2[0-3]|1[0-9]|[0-9]|00))((\,|\-|\/)(2[0-3]|1[0-9]|[0-9]|00))*|\*)\s+((\*\/)?([1-9]|[12][0-9]|3[01])((\,|\-|\/)([1-9]|[12][0-9]|3[01]))*|\*)\s+((\*\/)?([1-9]|1[0-2])((\,|\-|\/)([1-9]|1[0-2]))*|\*)\s+((\*\/)?[0-6]((\,|\-|\/)[0-6])*|\*|00)\s+((\*\/)?(([2-9][0-9][0-9][0-9]))((\,|\-|\/)([2-9][0-9][0-9][0-9]))*|\*)\s*$)')
 	"""	Compiled regular expression that matches a valid cron-like schedule: "second minute hour day month weekday year" """
 
 
 	def __init__(self) -> None:
+		self._validationPlans:dict[Tuple[int, Optional[str], int], ValidationPlan] = {}
+		""" Cache of the precompiled validation plans, mapped by (attribute policy dictionary, flexContainer tpe, optionality index). """
+
 		L.isInfo and L.log('Validator initialized')
 
 
@@ -164,75 +199,56 @@ class Validator(object):
 
 		tpe = _tpe if _tpe and _tpe != tpe else tpe 				# determine the real tpe
 
-		# if tpe is not None and not tpe.startswith("m2m:"):
-		# 	pureResDict = dct
-
-		attributePolicies = attributes
-		# If this is a flexContainer then add the additional attributePolicies.
-		# We don't want to change the original attributes, so copy it before (only if we add new attributePolicies)
+		# Get the precompiled validation plan. For a flexContainer the plan includes the specialization's attributes
+		plan = self._getValidationPlan(attributes, tpe if ty in ( ResourceTypes.FCNT, ResourceTypes.FCI ) and tpe else None, optionalIndex)
+		validations = plan.validations
 
-		if ty in ( ResourceTypes.FCNT, ResourceTypes.FCI ) and tpe:
-			if (fca := flexContainerAttributes.get(tpe)) is not None:
-				attributePolicies = deepcopy(attributePolicies)
-				attributePolicies.update(fca)
-			else:
-				raise BAD_REQUEST(L.logWarn(f'unknown resource type: {tpe}'))
-
-		# L.logDebug(attributePolicies.items())
-		# L.logWarn(pureResDict)
-		
 		# Check that all attributes have been defined
 		for attributeName in pureResDict.keys():
-			if attributeName not in attributePolicies.keys():
+			if attributeName not in validations:
 				raise BAD_REQUEST(L.logWarn(f'unknown attribute: {attributeName} in resource: {tpe}'))
 
-		for attributeName, policy in attributePolicies.items():
-			if not policy:
-				L.isWarn and L.logWarn(f'no attribute policy found for attribute: {attributeName}')
-				continue
-
-			# Get the correct tuple for a resource when there are more definitions
-
-			# Used a couple of times below
-			policyOptional = policy.select(optionalIndex)
-
-			# Check whether the attribute is allowed or mandatory in the request
-			if (attributeValue := pureResDict.get(attributeName)) is None:	# ! might be an int, bool, so we need to check for None
-
-				# check the the announced cases first
-				if isAnnounced:
-					# MA are not checked bc they are only present if they are present in the original resource
-					continue
-					
-				if policyOptional == RequestOptionality.M:		# Not okay, this attribute is mandatory but absent
+		# Check that all mandatory attributes are present.
+		# MA are not checked for announced resources bc they are only present if they are present in the original resource
+		if not isAnnounced:
+			for attributeName in plan.mandatory:
+				if pureResDict.get(attributeName) is None:	# ! might be an int, bool, so we need to check for None
 					raise BAD_REQUEST(L.logWarn(f'cannot find mandatory attribute: {attributeName}'))
 
-				if attributeName in pureResDict:
-					if policy.cardinality in (Cardinality.CAR1, Cardinality.CAR1LN): 	# but ignore CAR.car1N or CAR1LN (which may be Null/None)
-						raise BAD_REQUEST( L.logWarn(f'cannot delete a mandatory attribute: {attributeName}'))
-					if policyOptional == RequestOptionality.NP: # present with any value or None/null? Then this is an error for NP
-						raise BAD_REQUEST(L.logWarn(f'attribute: {attributeName} is NP for operation'))
-
-				if policyOptional in ( RequestOptionality.NP, RequestOptionality.O ):		# Okay that the attribute is not in the dict, since it is provided or optional
-					continue
-			else:
-				if not createdInternally:
-					if policyOptional == RequestOptionality.NP:
-						raise BAD_REQUEST(L.logWarn(f'found non-provision attribute: {attributeName}'))
+		# Only validate the attributes that are present in the request
+		for attributeName, attributeValue in pureResDict.items():
+			if not (validation := validations[attributeName]):
+				L.isWarn and L.logWarn(f'no attribute policy found for attribute: {attributeName}')
+				continue
+			policy = validation.policy
+			policyOptional = validation.optionality
 
-				# check the the announced cases
+			if attributeValue is None:	# Present, but null
 				if isAnnounced:
-					if policy.announcement == Announced.NA:	# Not okay, attribute is not announced
-						raise BAD_REQUEST(L.logWarn(f'found non-announced attribute: {attributeName}'))
 					continue
+				if policy.cardinality in (Cardinality.CAR1, Cardinality.CAR1LN): 	# but ignore CAR.car1N or CAR1LN (which may be Null/None)
+					raise BAD_REQUEST( L.logWarn(f'cannot delete a mandatory attribute: {attributeName}'))
+				if policyOptional == RequestOptionality.NP: # present with any value or None/null? Then this is an error for NP
+					raise BAD_REQUEST(L.logWarn(f'attribute: {attributeName} is NP for operation'))
+				continue	# Nothing more to validate for a null value
+
+			if not createdInternally:
+				if policyOptional == RequestOptionality.NP:
+					raise BAD_REQUEST(L.logWarn(f'found non-provision attribute: {attributeName}'))
+
+			# check the the announced cases
+			if isAnnounced:
+				if policy.announcement == Announced.NA:	# Not okay, attribute is not announced
+					raise BAD_REQUEST(L.logWarn(f'found non-announced attribute: {attributeName}'))
+				continue
 
-				# Special handling for the ACP's pvs attribute
-				if attributeName == 'pvs':
-					self.validatePvs(pureResDict)
+			# Special handling for the ACP's pvs attribute
+			if attributeName == 'pvs':
+				self.validatePvs(pureResDict)
 
 			# Check whether the value is of the correct type
 			try:
-				self._validateType(policy.type, attributeValue, policy = policy)
+				validation.validateType(attributeValue)
 				# Still some further checks are necessary
 
 				# Check list. May be empty or needs to contain at least one member
@@ -240,13 +256,62 @@ class Validator(object):
 					raise BAD_REQUEST(L.logWarn(f'Mandatory list attribute must be non-empty: {attributeName}'))
 
 				# Check list. May be empty or needs to contain at least one member
-				# L.isWarn and L.logWarn(f'CAR: {policy.cardinality.name}: {attributeValue}')
-				if policy.cardinality == Cardinality.CAR01L and attributeValue is not None and len(attributeValue) == 0:
+				if policy.cardinality == Cardinality.CAR01L and len(attributeValue) == 0:
 					raise BAD_REQUEST(L.logWarn(f'Optional list attribute must be non-empty: {attributeName}'))
 			except ResponseException as e:
 				raise BAD_REQUEST(L.logWarn(f'Attribute/value validation error: {attributeName}={str(attributeValue)} ({e.dbg})'))
 
 
+	def _getValidationPlan(self, attributes:AttributePolicyDict, fcntTpe:Optional[str], optionalIndex:int) -> ValidationPlan:
+		"""	Return the validation plan for an attribute policy dictionary and a request type.
+			The plan is compiled when it is needed for the first time.
+
+			Args:
+				attributes: The attribute policy dictionary for the resource type.
+				fcntTpe: The specialization type of a flexContainer or flexContainerInstance, or None.
+				optionalIndex: Index of the request optionality in the attribute policies (create, update, or announced).
+
+			Return:
+				The validation plan.
+
+			Raises:
+				`BAD_REQUEST`: In case the flexContainer specialization is unknown.
+		"""
+		key = (id(attributes), fcntTpe, optionalIndex)
+		if (plan := self._validationPlans.get(key)) and plan.attributes is attributes:
+			return plan
+
+		# Add the flexContainer specialization's attribute policies.
+		# We don't want to change the original attributes, so merge them into a new dictionary
+		policies = attributes
+		if fcntTpe:
+			if (fca := flexContainerAttributes.get(fcntTpe)) is None:
+				raise BAD_REQUEST(L.logWarn(f'unknown resource type: {fcntTpe}'))
+			policies = { **attributes, **fca }
+
+		validations:dict[str, Optional[AttributeValidation]] = {}
+		mandatory:list[str] = []
+		for attributeName, policy in policies.items():
+			if not policy:
+				validations[attributeName] = None
+				continue
+			policyOptional = policy.select(optionalIndex)
+			validations[attributeName] = AttributeValidation(policy, 
+															 policyOptional, 
+															 partial(self._validateType, policy.type, policy = policy))
+			if policyOptional == RequestOptionality.M:
+				mandatory.append(attributeName)
+
+		self._validationPlans[key] = (plan := ValidationPlan(attributes, validations, mandatory))
+		return plan
+
+
+	def _clearValidationPlans(self) -> None:
+		"""	Remove all precompiled validation plans after attribute policies have changed.
+		"""
+		self._validationPlans.clear()
+
+
 	def validateAttribute(self, attribute:str, 
 								value:Any, 
 								attributeType:Optional[BasicType] = None, 
@@ -491,6 +556,8 @@ class Validator(object):
 		except Exception as e:
 			L.logErr(str(e))
 			return False
+		finally:
+			self._clearValidationPlans()
 		return True
 
 
@@ -529,6 +596,7 @@ class Validator(object):
 		"""	Clear the flexContainer attributes.
 		"""
 		flexContainerAttributes.clear()
+		self._clearValidationPlans()
 
 
 	def addFlexContainerSpecialization(self, tpe:str, cnd:str) -> bool:
@@ -582,6 +650,7 @@ class Validator(object):
 		if (rtype, attr) in attributePolicies:
 			L.logErr(f'Policy {(rtype, attr)} is already registered')
 		attributePolicies[(rtype, attr)] = attrPolicy
+		self._clearValidationPlans()
 
 		# Collect a list of attributes for complex types
 		if attrPolicy.ctype:
@@ -674,6 +743,7 @@ class Validator(object):
 		"""	Clear the attribute policies.
 		"""
 		attributePolicies.clear()
+		self._clearValidationPlans()
 
 
 	def getShortnameLongNameMapping(self) -> dict[str, str]:
@@ -238,12 +238,12 @@ class ACMEViewRequests(Vertical):
 	
 
 	def action_enable_requests(self) -> None:
-		CSE.request.enableRequestRecording = True
+		Configuration.update('cse.operation.requests.enable', True)	# also starts or stops the request writer
 		self.updateBindings()
 
 
 	def action_disable_requests(self) -> None:
-		CSE.request.enableRequestRecording = False
+		Configuration.update('cse.operation.requests.enable', False)	# also starts or stops the request writer
 		self.updateBindings()
 	
 
@@ -157,3 +157,9 @@ NOTIFICATIONDELAY   = 0.5	# Time to wait for some async notifications
 UTURL	= f'{CONFIGPROTOCOL}://{CSEHOST}:{CSEPORT}/__ut__'	# CSE's Upper Tester URL
 UTCMD	= 'X-M2M-UTCMD'
 UTRSP	= 'X-M2M-UTRSP'
+
+
+#
+#	Metrics
+#
+METRICSURL	= f'{CONFIGPROTOCOL}://{CSEHOST}:{CSEPORT}/__metrics__'	# CSE's metrics URL
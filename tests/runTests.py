@@ -196,7 +196,7 @@ if __name__ == '__main__':
 	totalExecTime 		= time.perf_counter() - totalTimeStart
 
 	# No test run?
-	if totalRunTests == 0 or init.requestCount == 0:
+	if totalRunTests == 0:
 		console.print('[yellow]0 tests run')
 		init.shutdown()
 		quit()
@@ -212,8 +212,8 @@ if __name__ == '__main__':
 	# table.add_column('Exec Time', footer=f'{totalExecTime:.4f}', justify='right')
 	# table.add_column('Sleep Time', footer=f'{totalSleepTime:.2f}' if totalRunTests != 0 else '0.0', justify='right')
 	# table.add_column('Proc Time', footer=f'{totalProcessTime:.4f}', justify='right')
-	table.add_column('Exec Time per\nTest | Request', footer=f'{totalExecTime/totalRunTests:7.4f} | {totalExecTime/init.requestCount:7.4f}' if totalRunTests != 0 else '000.0000 | 000.0000', justify='center')
-	table.add_column('Proc Time per\nTest | Request', footer=f'{totalProcessTime/totalRunTests:7.4f} | {totalProcessTime/init.requestCount:7.4f}' if totalRunTests != 0 else '000.0000 | 000.0000', justify='center')
+	table.add_column('Exec Time per\nTest | Request', footer=f'{totalExecTime/totalRunTests:7.4f} | {(totalExecTime/init.requestCount if init.requestCount else 0):7.4f}' if totalRunTests != 0 else '000.0000 | 000.0000', justify='center')
+	table.add_column('Proc Time per\nTest | Request', footer=f'{totalProcessTime/totalRunTests:7.4f} | {(totalProcessTime/init.requestCount if init.requestCount else 0):7.4f}' if totalRunTests != 0 else '000.0000 | 000.0000', justify='center')
 	table.add_column('Requests', footer=f'{init.requestCount}', justify='right')
 	# Styles
 	styleDisabled = Style(dim=True)
@@ -234,8 +234,8 @@ if __name__ == '__main__':
 						f'{v[2]:8.4f} | {v[6]:6.2f} | {v[3]:8.4f}' if v[0] > 0 else f'{0:8.4f} | {0:6.2f} | {0:8.4f}', 
 						# f'{v[6]:.2f}',
 						# f'{v[3]:.4f}' if v[0] > 0 else '',
-						f'{(v[2]/v[0]):7.4f} | {(v[2]/v[5]):7.4f}' if v[0] > 0 else f'{0:7.4f} | {0:7.4f}',
-						f'{(v[3]/v[0]):7.4f} | {(v[3]/v[5]):7.4f}' if v[0] > 0 else f'{0:7.4f} | {0:7.4f}',
+						f'{(v[2]/v[0]):7.4f} | {(v[2]/v[5] if v[5] > 0 else 0):7.4f}' if v[0] > 0 else f'{0:7.4f} | {0:7.4f}',
+						f'{(v[3]/v[0]):7.4f} | {(v[3]/v[5] if v[5] > 0 else 0):7.4f}' if v[0] > 0 else f'{0:7.4f} | {0:7.4f}',
 						f'{v[5]}',
 						style=style)
 	console.print(table)
@@ -0,0 +1,392 @@
+#
+#	testBackgroundWorker.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+#	Unit tests for the background workers, actors and job executors. These tests don't need a running CSE.
+#
+
+import unittest, sys, time
+if '..' not in sys.path:
+	sys.path.append('..')
+from typing import Tuple
+from threading import Event, Lock, Thread, current_thread
+from acme.helpers.BackgroundWorker import BackgroundWorker, BackgroundWorkerPool, JobExecutor, JobOverflowPolicy
+from init import *
+
+category = 'testJobs'
+slowJobTime = 1.0	# seconds
+
+
+class TestBackgroundWorker(unittest.TestCase):
+
+	def tearDown(self) -> None:
+		BackgroundWorkerPool.setJobExecutor(category, 0)	# Shut down the executor
+
+
+	def _schedulerNotBlocked(self, policy:JobOverflowPolicy) -> None:
+		"""	Fill a job executor with slow actors and check that an unrelated actor is still run on time.
+
+			Args:
+				policy: The executor's overflow policy.
+		"""
+		BackgroundWorkerPool.setJobExecutor(category, 1, 1, policy)
+
+		lock = Lock()
+		slowFinished:list[float] = []
+		allFinished = Event()
+		def _slow() -> None:
+			time.sleep(slowJobTime)
+			with lock:
+				slowFinished.append(time.time())
+				if len(slowFinished) == 3:
+					allFinished.set()
+
+		onTime = Event()
+		start = time.time()
+		for i in range(3):
+			BackgroundWorkerPool.newActor(_slow, name = f'slowActor_{i}', category = category).start()
+		BackgroundWorkerPool.newActor(lambda: onTime.set(), delay = 0.5, name = 'onTimeActor').start()
+
+		# The unrelated actor must be run on time, even though the executor is full
+		self.assertTrue(onTime.wait(slowJobTime))
+		self.assertLess(time.time() - start, slowJobTime)
+
+		# All slow actors must be run eventually
+		self.assertTrue(allFinished.wait(4 * slowJobTime + 1.0))
+
+
+	def test_schedulerNotBlockedCallerRuns(self) -> None:
+		"""	Scheduler is not blocked by a full executor with the callerRuns policy """
+		self._schedulerNotBlocked(JobOverflowPolicy.callerRuns)
+
+
+	def test_schedulerNotBlockedBlock(self) -> None:
+		"""	Scheduler is not blocked by a full executor with the block policy """
+		self._schedulerNotBlocked(JobOverflowPolicy.block)
+
+
+	def test_schedulerNotBlockedReject(self) -> None:
+		"""	Scheduler is not blocked by a full executor with the reject policy """
+		self._schedulerNotBlocked(JobOverflowPolicy.reject)
+
+
+class TestWorkerScheduler(unittest.TestCase):
+
+	def test_actorsRunInTimestampOrder(self) -> None:
+		"""	Actors are run in the order of their due time, not in the order they were started """
+		lock = Lock()
+		result:list[int] = []
+		allFinished = Event()
+		def _actor(_data:int) -> None:
+			with lock:
+				result.append(_data)
+				if len(result) == 5:
+					allFinished.set()
+		for i in (4, 2, 0, 3, 1):
+			BackgroundWorkerPool.newActor(_actor, delay = 0.1 + i * 0.05, name = f'orderActor_{i}', data = i).start()
+		self.assertTrue(allFinished.wait(2.0))
+		self.assertEqual(result, [ 0, 1, 2, 3, 4 ])
+
+
+	def test_earlierActorWakesScheduler(self) -> None:
+		"""	An actor that is due earlier than all other workers is run on time """
+		late = BackgroundWorkerPool.newActor(lambda: None, delay = 60.0, name = 'lateActor').start()
+		onTime = Event()
+		start = time.time()
+		BackgroundWorkerPool.newActor(lambda: onTime.set(), delay = 0.1, name = 'earlyActor').start()
+		self.assertTrue(onTime.wait(2.0))
+		self.assertLess(time.time() - start, 1.0)
+		late.stop()
+
+
+	def test_stoppedActorNotRun(self) -> None:
+		"""	A stopped actor is not run, and a restarted worker is only run at its new time """
+		executed = Event()
+		BackgroundWorkerPool.newActor(lambda: executed.set(), delay = 0.2, name = 'stoppedActor').start().stop()
+
+		count:list[float] = []
+		def _count() -> bool:
+			count.append(time.time())
+			return True
+		worker = BackgroundWorkerPool.newWorker(0.2, _count, name = 'pausedWorker', startWithDelay = True).start()
+		worker.pause()
+		time.sleep(0.4)
+		self.assertFalse(executed.is_set())
+		self.assertEqual(count, [])
+
+		worker.unpause(immediately = True)
+		time.sleep(0.1)
+		self.assertEqual(len(count), 1)
+		worker.stop()
+
+
+	def test_periodicWorker(self) -> None:
+		"""	A periodic worker is run at its interval until it returns False """
+		runs:list[float] = []
+		finished = Event()
+		def _work() -> bool:
+			runs.append(time.time())
+			if len(runs) == 5:
+				finished.set()
+				return False
+			return True
+		BackgroundWorkerPool.newWorker(0.1, _work, name = 'periodicWorker').start()
+		self.assertTrue(finished.wait(2.0))
+		time.sleep(0.3)
+		self.assertEqual(len(runs), 5)
+		self.assertLess(runs[-1] - runs[0], 0.4 + 0.2)
+
+
+	def test_concurrentStartAndStop(self) -> None:
+		"""	Actors that are started and stopped concurrently are run exactly once, or not at all """
+		lock = Lock()
+		executed:dict[str, int] = {}
+		def _actor(_data:str) -> None:
+			with lock:
+				executed[_data] = executed.get(_data, 0) + 1
+
+		expected:list[str] = []
+		def _startAndStop(t:int) -> None:
+			for i in range(200):
+				name = f'concurrentActor_{t}_{i}'
+				actor = BackgroundWorkerPool.newActor(_actor, delay = 0.2, name = name, data = name).start()
+				if i % 2:
+					actor.stop()
+				else:
+					with lock:
+						expected.append(name)
+		threads = [ Thread(target = _startAndStop, args = (t,)) for t in range(8) ]
+		for t in threads:
+			t.start()
+		for t in threads:
+			t.join()
+
+		end = time.time() + 5.0
+		while time.time() < end and len(executed) < len(expected):
+			time.sleep(0.05)
+		time.sleep(0.2)
+		self.assertEqual(sorted(executed.keys()), sorted(expected))
+		self.assertEqual(set(executed.values()), { 1 })
+		self.assertEqual(BackgroundWorkerPool.findWorkers(name = 'concurrentActor_*'), [])
+		self.assertEqual([ id for id in BackgroundWorkerPool.workerEntries if id not in BackgroundWorkerPool.backgroundWorkers ], [])
+
+
+class TestJobExecutor(unittest.TestCase):
+
+	executor:JobExecutor = None
+
+	def tearDown(self) -> None:
+		if self.executor:
+			self.executor.shutdown()
+
+
+	def _executor(self, workers:int, maxQueueSize:int, policy:JobOverflowPolicy) -> JobExecutor:
+		"""	Create a job executor.
+
+			Args:
+				workers: Maximum number of threads.
+				maxQueueSize: Maximum number of queued jobs.
+				policy: How to handle a new job when the queue is full.
+
+			Return:
+				The executor.
+		"""
+		self.executor = JobExecutor(category, workers, maxQueueSize, policy)
+		return self.executor
+
+
+	def _waitForExecuted(self, count:int, timeout:float = 5.0) -> None:
+		"""	Wait until *count* jobs were executed by the executor's threads.
+
+			Args:
+				count: Number of executed jobs.
+				timeout: Maximum time to wait in seconds.
+		"""
+		end = time.time() + timeout
+		while time.time() < end:
+			if self.executor.getStatistics()['executed'] >= count:
+				return
+			time.sleep(0.01)
+		self.fail(f'Jobs were not executed: {self.executor.getStatistics()}')
+
+
+	def _blockWorkers(self, count:int) -> Event:
+		"""	Submit *count* jobs that block until the returned event is set, and wait until they are running.
+
+			Args:
+				count: Number of blocking jobs.
+
+			Return:
+				The event that releases the blocking jobs.
+		"""
+		release = Event()
+		for _ in range(count):
+			self.executor.submit(lambda: release.wait(5.0))
+		end = time.time() + 2.0
+		while self.executor.getStatistics()['active'] < count and time.time() < end:
+			time.sleep(0.01)
+		return release
+
+
+	def test_boundedThreads(self) -> None:
+		"""	No more than the configured number of jobs are executed at the same time """
+		executor = self._executor(3, 100, JobOverflowPolicy.callerRuns)
+		lock = Lock()
+		active = [ 0, 0 ]	# current, max
+		threads:set[str] = set()
+		def _job() -> None:
+			with lock:
+				active[0] += 1
+				active[1] = max(active)
+				threads.add(current_thread().name)
+			time.sleep(0.02)
+			with lock:
+				active[0] -= 1
+		for i in range(30):
+			self.assertTrue(executor.submit(_job, name = f'job_{i}'))
+		self._waitForExecuted(30)
+		self.assertEqual(active[1], 3)
+		self.assertLessEqual(executor.getStatistics()['threads'], 3)
+		self.assertTrue(all(t.startswith('job_') for t in threads))	# threads are named after the job
+
+
+	def test_rejectPolicy(self) -> None:
+		"""	A job is rejected when the queue is full """
+		executor = self._executor(1, 1, JobOverflowPolicy.reject)
+		release = self._blockWorkers(1)
+		self.assertTrue(executor.submit(lambda: None))
+		self.assertFalse(executor.submit(lambda: None))
+		release.set()
+		self._waitForExecuted(2)
+		self.assertEqual(executor.getStatistics()['rejected'], 1)
+
+
+	def test_callerRunsPolicy(self) -> None:
+		"""	A job is run in the caller's thread when the queue is full, or in a separate thread when the caller must not wait """
+		executor = self._executor(1, 1, JobOverflowPolicy.callerRuns)
+		release = self._blockWorkers(1)
+		executor.submit(lambda: None)
+		ranIn:list[Thread] = []
+		self.assertTrue(executor.submit(lambda: ranIn.append(current_thread())))
+		self.assertEqual(ranIn, [ current_thread() ])
+
+		ranElsewhere = Event()
+		def _runElsewhere() -> None:
+			ranIn.append(current_thread())
+			ranElsewhere.set()
+		self.assertTrue(executor.submit(_runElsewhere, wait = False))
+		self.assertTrue(ranElsewhere.wait(2.0))
+		self.assertIsNot(ranIn[1], current_thread())
+		self.assertEqual(executor.getStatistics()['callerRuns'], 2)
+		release.set()
+
+
+	def test_blockPolicy(self) -> None:
+		"""	The caller is blocked until there is space in the queue, unless it must not wait """
+		executor = self._executor(1, 1, JobOverflowPolicy.block)
+		release = self._blockWorkers(1)
+		executor.submit(lambda: None)
+		self.assertFalse(executor.submit(lambda: None, wait = False))
+
+		def _release() -> None:
+			time.sleep(0.2)
+			release.set()
+		Thread(target = _release).start()
+		start = time.time()
+		self.assertTrue(executor.submit(lambda: None))
+		self.assertGreaterEqual(time.time() - start, 0.15)
+		self._waitForExecuted(3)
+		self.assertEqual(executor.getStatistics()['rejected'], 1)
+
+
+	def test_nestedSubmitDoesNotBlock(self) -> None:
+		"""	A job that submits another job to its own full executor doesn't wait for itself """
+		executor = self._executor(1, 1, JobOverflowPolicy.block)
+		nestedDone = Event()
+		queuedDone = Event()
+		def _outer() -> None:
+			executor.submit(lambda: queuedDone.set())	# fills the queue
+			executor.submit(lambda: nestedDone.set())	# queue is full: runs in this thread
+		executor.submit(_outer)
+		self.assertTrue(nestedDone.wait(2.0))
+		self.assertTrue(queuedDone.wait(2.0))
+
+
+	def test_exceptionDoesNotStopExecutor(self) -> None:
+		"""	A job that raises an exception doesn't terminate the executor's thread """
+		executor = self._executor(1, 10, JobOverflowPolicy.callerRuns)
+		done = Event()
+		logged:list[str] = []
+		logger = BackgroundWorker._logger
+		BackgroundWorkerPool.setLogger(lambda level, msg: logged.append(msg))
+		try:
+			executor.submit(lambda: 1 / 0, name = 'failingJob')
+			executor.submit(lambda: done.set())
+			self.assertTrue(done.wait(2.0))
+		finally:
+			BackgroundWorkerPool.setLogger(logger)
+		self.assertEqual(executor.getStatistics()['threads'], 1)
+		self.assertTrue(logged and logged[0].startswith('Job "failingJob"'), logged)
+
+
+	def test_shutdown(self) -> None:
+		"""	Queued jobs are executed after a shutdown, but new jobs are rejected """
+		executor = self._executor(1, 10, JobOverflowPolicy.callerRuns)
+		release = self._blockWorkers(1)
+		queuedDone = Event()
+		executor.submit(lambda: queuedDone.set())
+		executor.shutdown()
+		self.assertFalse(executor.submit(lambda: None))
+		release.set()
+		self.assertTrue(queuedDone.wait(2.0))
+		end = time.time() + 2.0
+		while executor.getStatistics()['threads'] and time.time() < end:
+			time.sleep(0.01)
+		self.assertEqual(executor.getStatistics()['threads'], 0)
+
+
+	def test_runJobInCategory(self) -> None:
+		"""	Jobs of a category are run by the category's executor """
+		BackgroundWorkerPool.setJobExecutor(category, 2, 10, JobOverflowPolicy.callerRuns)
+		try:
+			done = Event()
+			self.assertTrue(BackgroundWorkerPool.runJob(lambda: done.set(), name = 'categoryJob', category = category))
+			self.assertTrue(done.wait(2.0))
+			time.sleep(0.05)
+			self.assertEqual(BackgroundWorkerPool.getJobStatistics()[category]['executed'], 1)
+		finally:
+			BackgroundWorkerPool.setJobExecutor(category, 0)
+		self.assertNotIn(category, BackgroundWorkerPool.getJobStatistics())
+
+
+def run(testFailFast:bool) -> Tuple[int, int, int, float]:
+	suite = unittest.TestSuite()
+
+	addTest(suite, TestBackgroundWorker('test_schedulerNotBlockedCallerRuns'))
+	addTest(suite, TestBackgroundWorker('test_schedulerNotBlockedBlock'))
+	addTest(suite, TestBackgroundWorker('test_schedulerNotBlockedReject'))
+
+	addTest(suite, TestWorkerScheduler('test_actorsRunInTimestampOrder'))
+	addTest(suite, TestWorkerScheduler('test_earlierActorWakesScheduler'))
+	addTest(suite, TestWorkerScheduler('test_stoppedActorNotRun'))
+	addTest(suite, TestWorkerScheduler('test_periodicWorker'))
+	addTest(suite, TestWorkerScheduler('test_concurrentStartAndStop'))
+
+	addTest(suite, TestJobExecutor('test_boundedThreads'))
+	addTest(suite, TestJobExecutor('test_rejectPolicy'))
+	addTest(suite, TestJobExecutor('test_callerRunsPolicy'))
+	addTest(suite, TestJobExecutor('test_blockPolicy'))
+	addTest(suite, TestJobExecutor('test_nestedSubmitDoesNotBlock'))
+	addTest(suite, TestJobExecutor('test_exceptionDoesNotStopExecutor'))
+	addTest(suite, TestJobExecutor('test_shutdown'))
+	addTest(suite, TestJobExecutor('test_runJobInCategory'))
+
+	result = unittest.TextTestRunner(verbosity = testVerbosity, failfast = testFailFast).run(suite)
+	printResult(result)
+	return result.testsRun, len(result.errors + result.failures), len(result.skipped), getSleepTimeCount()
+
+if __name__ == '__main__':
+	r, errors, s, t = run(True)
+	sys.exit(errors)
@@ -169,6 +169,41 @@ class TestCNT(unittest.TestCase):
 		self.assertEqual(rsc, RC.BAD_REQUEST)
 
 
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_createCNTInvalidAttributesRepeated(self) -> None:
+		"""	Create <CNT> with invalid attributes repeatedly -> Fail """
+		for _ in range(2):	# The second request uses the cached validation plan
+			for dct in (	{ 'm2m:cnt' : { 'rn' : f'{cntRN}Invalid', 'unknown' : 'unknown' }},	# unknown attribute
+							{ 'm2m:cnt' : { 'rn' : f'{cntRN}Invalid', 'mni' : 'wrong' }},		# wrong type
+							{ 'm2m:cnt' : { 'rn' : f'{cntRN}Invalid', 'cni' : 1 }},				# not provisioned
+						):
+				r, rsc = CREATE(aeURL, TestCNT.originator, T.CNT, dct)
+				self.assertEqual(rsc, RC.BAD_REQUEST, r)
+
+			# A valid request still succeeds with the same plan
+			r, rsc = CREATE(aeURL, TestCNT.originator, T.CNT, { 'm2m:cnt' : { 'rn' : f'{cntRN}Invalid', 'mni' : 10 }})
+			self.assertEqual(rsc, RC.CREATED, r)
+			_, rsc = DELETE(f'{aeURL}/{cntRN}Invalid', TestCNT.originator)
+			self.assertEqual(rsc, RC.DELETED)
+
+
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_updateCNTInvalidAttributesRepeated(self) -> None:
+		"""	Update <CNT> with invalid attributes repeatedly -> Fail """
+		for _ in range(2):	# The second request uses the cached validation plan
+			for dct in (	{ 'm2m:cnt' : { 'unknown' : 'unknown' }},	# unknown attribute
+							{ 'm2m:cnt' : { 'mni' : 'wrong' }},			# wrong type
+							{ 'm2m:cnt' : { 'rn' : 'aName' }},			# not provisioned for update
+						):
+				r, rsc = UPDATE(cntURL, TestCNT.originator, dct)
+				self.assertEqual(rsc, RC.BAD_REQUEST, r)
+
+			# A valid request still succeeds with the same plan
+			r, rsc = UPDATE(cntURL, TestCNT.originator, { 'm2m:cnt' : { 'mni' : 10 }})
+			self.assertEqual(rsc, RC.UPDATED, r)
+			self.assertEqual(findXPath(r, 'm2m:cnt/mni'), 10)
+
+
 	@unittest.skipIf(noCSE, 'No CSEBase')
 	def test_updateCNTempty(self) -> None:
 		"""	Update <CNT> empty content """
@@ -300,6 +335,8 @@ def run(testFailFast:bool) -> Tuple[int, int, int, float]:
 	addTest(suite, TestCNT('test_updateCNTPi'))
 	addTest(suite, TestCNT('test_updateCNTUnknownAttribute'))
 	addTest(suite, TestCNT('test_updateCNTWrongMNI'))
+	addTest(suite, TestCNT('test_createCNTInvalidAttributesRepeated'))
+	addTest(suite, TestCNT('test_updateCNTInvalidAttributesRepeated'))
 	addTest(suite, TestCNT('test_createCNTUnderCNT'))
 	addTest(suite, TestCNT('test_retrieveCNTUnderCNT'))
 	addTest(suite, TestCNT('test_deleteCNTUnderCNT'))
@@ -7,7 +7,7 @@
 #	Unit tests for CNT & CIN functionality
 #
 
-import unittest, sys
+import unittest, sys, threading
 if '..' not in sys.path:
 	sys.path.append('..')
 from typing import Tuple
@@ -579,6 +579,193 @@ class TestCNT_CIN(unittest.TestCase):
 		self.assertEqual(cbs - len(testValue), findXPath(r, 'm2m:cnt/cbs'))
 
 
+	def _createCINsInParallel(self, parallel:int, count:int) -> None:
+		"""	Create *count* <CIN> in each of *parallel* threads under the test <CNT>.
+
+			Args:
+				parallel: Number of threads.
+				count: Number of <CIN> to create per thread.
+		"""
+		dct = 	{ 'm2m:cin' : {
+					'cnf' : 'text/plain:0',
+					'con' : testValue
+				}}
+		results:list[int] = []
+		def _create() -> None:
+			for _ in range(count):
+				results.append(CREATE(cntURL, TestCNT_CIN.originator, T.CIN, dct)[1])
+		threads = [ threading.Thread(target = _create) for _ in range(parallel) ]
+		for t in threads:
+			t.start()
+		for t in threads:
+			t.join()
+		self.assertEqual(results, [ RC.CREATED ] * parallel * count)
+
+
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_createCINsConcurrently(self) -> None:
+		"""	Create <CIN> concurrently and check <CNT> cni, cbs and st """
+		dct = 	{ 'm2m:cnt' : { 
+					'rn'  : cntRN,
+					'mni' : 1000
+				}}
+		TestCNT_CIN.cnt, rsc = CREATE(aeURL, TestCNT_CIN.originator, T.CNT, dct)
+		self.assertEqual(rsc, RC.CREATED, TestCNT_CIN.cnt)
+		st = findXPath(TestCNT_CIN.cnt, 'm2m:cnt/st')
+
+		self._createCINsInParallel(8, 10)
+
+		r, rsc = RETRIEVE(cntURL, TestCNT_CIN.originator)
+		self.assertEqual(rsc, RC.OK, r)
+		self.assertEqual(findXPath(r, 'm2m:cnt/cni'), 80, r)
+		self.assertEqual(findXPath(r, 'm2m:cnt/cbs'), 80 * len(testValue), r)
+		self.assertEqual(findXPath(r, 'm2m:cnt/st'), st + 80, r)
+
+		r, rsc = RETRIEVE(f'{cntURL}?fu=1&ty={int(T.CIN)}', TestCNT_CIN.originator)
+		self.assertEqual(rsc, RC.OK, r)
+		self.assertEqual(len(findXPath(r, 'm2m:uril')), 80, r)
+
+
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_createCINsConcurrentlyWithMni(self) -> None:
+		"""	Create <CIN> concurrently under a <CNT> with mni and mbs and check the limits """
+		dct = 	{ 'm2m:cnt' : { 
+					'rn'  : cntRN,
+					'mni' : 10,
+					'mbs' : 9 * len(testValue)
+				}}
+		TestCNT_CIN.cnt, rsc = CREATE(aeURL, TestCNT_CIN.originator, T.CNT, dct)
+		self.assertEqual(rsc, RC.CREATED, TestCNT_CIN.cnt)
+
+		self._createCINsInParallel(8, 10)
+
+		r, rsc = RETRIEVE(cntURL, TestCNT_CIN.originator)
+		self.assertEqual(rsc, RC.OK, r)
+		self.assertEqual(findXPath(r, 'm2m:cnt/cni'), 9, r)
+		self.assertEqual(findXPath(r, 'm2m:cnt/cbs'), 9 * len(testValue), r)
+
+		r, rsc = RETRIEVE(f'{cntURL}?fu=1&ty={int(T.CIN)}', TestCNT_CIN.originator)
+		self.assertEqual(rsc, RC.OK, r)
+		self.assertEqual(len(findXPath(r, 'm2m:uril')), 9, r)
+
+
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_enforceMniAndMbs(self) -> None:
+		"""	Create more <CIN> than mni allows, then reduce mbs, and check that the oldest <CIN> are removed """
+		dct = 	{ 'm2m:cnt' : { 
+					'rn'  : cntRN,
+					'mni' : 5
+				}}
+		TestCNT_CIN.cnt, rsc = CREATE(aeURL, TestCNT_CIN.originator, T.CNT, dct)
+		self.assertEqual(rsc, RC.CREATED, TestCNT_CIN.cnt)
+		for i in range(8):
+			dct = 	{ 'm2m:cin' : {
+						'rn'  : f'{cinRN}{i}',
+						'con' : f'{testValue}{i}'
+					}}
+			r, rsc = CREATE(cntURL, TestCNT_CIN.originator, T.CIN, dct)
+			self.assertEqual(rsc, RC.CREATED, r)
+
+		# Only the 5 latest <CIN> are kept
+		r, rsc = RETRIEVE(cntURL, TestCNT_CIN.originator)
+		self.assertEqual(rsc, RC.OK, r)
+		self.assertEqual(findXPath(r, 'm2m:cnt/cni'), 5, r)
+		self.assertEqual(findXPath(r, 'm2m:cnt/cbs'), 5 * len(f'{testValue}0'), r)
+		for i in range(3):
+			_, rsc = RETRIEVE(f'{cntURL}/{cinRN}{i}', TestCNT_CIN.originator)
+			self.assertEqual(rsc, RC.NOT_FOUND)
+		r, rsc = RETRIEVE(f'{cntURL}/ol', TestCNT_CIN.originator)
+		self.assertEqual(rsc, RC.OK, r)
+		self.assertEqual(findXPath(r, 'm2m:cin/rn'), f'{cinRN}3')
+		r, rsc = RETRIEVE(f'{cntURL}/la', TestCNT_CIN.originator)
+		self.assertEqual(rsc, RC.OK, r)
+		self.assertEqual(findXPath(r, 'm2m:cin/rn'), f'{cinRN}7')
+
+		# Reduce mbs. Only the 2 latest <CIN> fit
+		dct = 	{ 'm2m:cnt' : {
+					'mbs' : 2 * len(f'{testValue}0')
+ 				}}
+		r, rsc = UPDATE(cntURL, TestCNT_CIN.originator, dct)
+		self.assertEqual(rsc, RC.UPDATED, r)
+		self.assertEqual(findXPath(r, 'm2m:cnt/cni'), 2, r)
+		self.assertEqual(findXPath(r, 'm2m:cnt/cbs'), 2 * len(f'{testValue}0'), r)
+		r, rsc = RETRIEVE(f'{cntURL}/ol', TestCNT_CIN.originator)
+		self.assertEqual(rsc, RC.OK, r)
+		self.assertEqual(findXPath(r, 'm2m:cin/rn'), f'{cinRN}6')
+		r, rsc = RETRIEVE(f'{cntURL}?fu=1&ty={int(T.CIN)}', TestCNT_CIN.originator)
+		self.assertEqual(rsc, RC.OK, r)
+		self.assertEqual(len(findXPath(r, 'm2m:uril')), 2, r)
+
+
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_retrieveLaOlAfterChanges(self) -> None:
+		"""	Retrieve <CNT>.LA and <CNT>.OL after deleting <CIN> and reducing mni """
+		dct = 	{ 'm2m:cnt' : { 
+					'rn'  : cntRN,
+					'mni' : 10
+				}}
+		TestCNT_CIN.cnt, rsc = CREATE(aeURL, TestCNT_CIN.originator, T.CNT, dct)
+		self.assertEqual(rsc, RC.CREATED, TestCNT_CIN.cnt)
+
+		# No <CIN> yet
+		_, rsc = RETRIEVE(f'{cntURL}/la', TestCNT_CIN.originator)
+		self.assertEqual(rsc, RC.NOT_FOUND)
+		_, rsc = RETRIEVE(f'{cntURL}/ol', TestCNT_CIN.originator)
+		self.assertEqual(rsc, RC.NOT_FOUND)
+
+		ris = []
+		for i in range(6):
+			dct = 	{ 'm2m:cin' : {
+						'rn'  : f'{cinRN}{i}',
+						'con' : f'{testValue}{i}'
+					}}
+			r, rsc = CREATE(cntURL, TestCNT_CIN.originator, T.CIN, dct)
+			self.assertEqual(rsc, RC.CREATED, r)
+			ris.append(findXPath(r, 'm2m:cin/ri'))
+
+			# The new <CIN> is the latest, the first <CIN> stays the oldest
+			r, rsc = RETRIEVE(f'{cntURL}/la', TestCNT_CIN.originator)
+			self.assertEqual(rsc, RC.OK, r)
+			self.assertEqual(findXPath(r, 'm2m:cin/ri'), ris[-1])
+			r, rsc = RETRIEVE(f'{cntURL}/ol', TestCNT_CIN.originator)
+			self.assertEqual(rsc, RC.OK, r)
+			self.assertEqual(findXPath(r, 'm2m:cin/ri'), ris[0])
+
+		# Delete the latest and the oldest <CIN> directly
+		for i in ( 0, 5 ):
+			_, rsc = DELETE(f'{cntURL}/{cinRN}{i}', TestCNT_CIN.originator)
+			self.assertEqual(rsc, RC.DELETED)
+		r, rsc = RETRIEVE(f'{cntURL}/la', TestCNT_CIN.originator)
+		self.assertEqual(rsc, RC.OK, r)
+		self.assertEqual(findXPath(r, 'm2m:cin/ri'), ris[4])
+		r, rsc = RETRIEVE(f'{cntURL}/ol', TestCNT_CIN.originator)
+		self.assertEqual(rsc, RC.OK, r)
+		self.assertEqual(findXPath(r, 'm2m:cin/ri'), ris[1])
+
+		# Reduce mni. Only the 2 latest <CIN> are kept
+		dct = 	{ 'm2m:cnt' : {
+					'mni' : 2
+				}}
+		r, rsc = UPDATE(cntURL, TestCNT_CIN.originator, dct)
+		self.assertEqual(rsc, RC.UPDATED, r)
+		r, rsc = RETRIEVE(f'{cntURL}/ol', TestCNT_CIN.originator)
+		self.assertEqual(rsc, RC.OK, r)
+		self.assertEqual(findXPath(r, 'm2m:cin/ri'), ris[3])
+		r, rsc = RETRIEVE(f'{cntURL}/la', TestCNT_CIN.originator)
+		self.assertEqual(rsc, RC.OK, r)
+		self.assertEqual(findXPath(r, 'm2m:cin/ri'), ris[4])
+
+		# Delete the remaining <CIN> via la and ol
+		_, rsc = DELETE(f'{cntURL}/la', TestCNT_CIN.originator)
+		self.assertEqual(rsc, RC.DELETED)
+		_, rsc = DELETE(f'{cntURL}/ol', TestCNT_CIN.originator)
+		self.assertEqual(rsc, RC.DELETED)
+		_, rsc = RETRIEVE(f'{cntURL}/la', TestCNT_CIN.originator)
+		self.assertEqual(rsc, RC.NOT_FOUND)
+		_, rsc = RETRIEVE(f'{cntURL}/ol', TestCNT_CIN.originator)
+		self.assertEqual(rsc, RC.NOT_FOUND)
+
+
 def run(testFailFast:bool) -> Tuple[int, int, int, float]:
 	suite = unittest.TestSuite()
 	
@@ -617,6 +804,15 @@ def run(testFailFast:bool) -> Tuple[int, int, int, float]:
 	addTest(suite, TestCNT_CIN('test_deleteCNTLA'))
 	addTest(suite, TestCNT_CIN('test_deleteCNT'))
 
+	addTest(suite, TestCNT_CIN('test_createCINsConcurrently'))
+	addTest(suite, TestCNT_CIN('test_deleteCNT'))
+	addTest(suite, TestCNT_CIN('test_createCINsConcurrentlyWithMni'))
+	addTest(suite, TestCNT_CIN('test_deleteCNT'))
+	addTest(suite, TestCNT_CIN('test_enforceMniAndMbs'))
+	addTest(suite, TestCNT_CIN('test_deleteCNT'))
+	addTest(suite, TestCNT_CIN('test_retrieveLaOlAfterChanges'))
+	addTest(suite, TestCNT_CIN('test_deleteCNT'))
+
 	result = unittest.TextTestRunner(verbosity=testVerbosity, failfast=testFailFast).run(suite)
 	printResult(result)
 	return result.testsRun, len(result.errors + result.failures), len(result.skipped), getSleepTimeCount()
@@ -0,0 +1,230 @@
+#
+#	testDeliveryPool.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+#	Unit tests for the notification delivery pool. These tests don't need a running CSE.
+#
+
+import unittest, sys, time
+if '..' not in sys.path:
+	sys.path.append('..')
+from typing import Any, Callable, Tuple
+from threading import Event
+from acme.helpers.DeliveryPool import DeliveryPool, OverflowPolicy
+from init import *
+
+
+def _appendTask(result:list, value:Any) -> Callable[[], bool]:
+	"""	Return a successful task that appends a value to a list.
+
+		Args:
+			result: The list to append to.
+			value: The value to append.
+
+		Return:
+			The task.
+	"""
+	def _task() -> bool:
+		result.append(value)
+		return True
+	return _task
+
+
+def _setTask(event:Event) -> Callable[[], bool]:
+	"""	Return a successful task that sets an event.
+
+		Args:
+			event: The event to set.
+
+		Return:
+			The task.
+	"""
+	def _task() -> bool:
+		event.set()
+		return True
+	return _task
+
+
+class TestDeliveryPool(unittest.TestCase):
+
+	pool:DeliveryPool = None
+
+	def tearDown(self) -> None:
+		if self.pool:
+			self.pool.stop()
+
+
+	def _startPool(self, workers:int = 2,
+						 maxInFlight:int = 1,
+						 maxQueueSize:int = 100,
+						 overflowPolicy:OverflowPolicy = OverflowPolicy.dropNewest,
+						 idleTimeout:float = 60.0) -> DeliveryPool:
+		"""	Create and start a delivery pool.
+
+			Args:
+				workers: Number of workers.
+				maxInFlight: Maximum number of tasks for the same target that are executed at the same time.
+				maxQueueSize: Maximum number of queued tasks for each target.
+				overflowPolicy: How to handle a new task when the queue of its target is full.
+				idleTimeout: Time in seconds after which an idle target is removed.
+
+			Return:
+				The started pool.
+		"""
+		self.pool = DeliveryPool('testDelivery', workers, maxInFlight, maxQueueSize, overflowPolicy, 1.0, idleTimeout)
+		self.pool.start()
+		return self.pool
+
+
+	def _waitForDelivery(self, count:int, timeout:float = 5.0) -> None:
+		"""	Wait until *count* tasks were delivered or failed.
+
+			Args:
+				count: Number of finished tasks.
+				timeout: Maximum time to wait in seconds.
+		"""
+		end = time.time() + timeout
+		while time.time() < end:
+			stats = self.pool.getStatistics()
+			if stats['delivered'] + stats['failed'] >= count:
+				return
+			time.sleep(0.01)
+		self.fail(f'Tasks were not delivered: {self.pool.getStatistics()}')
+
+
+	def test_fifoPerTarget(self) -> None:
+		"""	Tasks for a target are executed in the order they are submitted """
+		pool = self._startPool(workers = 4)
+		result:list[int] = []
+		for i in range(20):
+			self.assertTrue(pool.submit('target', _appendTask(result, i)))
+		self._waitForDelivery(20)
+		self.assertEqual(result, list(range(20)))
+
+
+	def test_slowTargetDoesNotBlockOthers(self) -> None:
+		"""	A slow target only occupies a single worker """
+		pool = self._startPool(workers = 2)
+		release = Event()
+		fastDone = Event()
+		pool.submit('slow', lambda: release.wait(5.0))
+		pool.submit('slow', lambda: release.wait(5.0))
+		pool.submit('fast', _setTask(fastDone))
+		self.assertTrue(fastDone.wait(1.0))
+		release.set()
+		self._waitForDelivery(3)
+
+
+	def test_dropNewest(self) -> None:
+		"""	A new task is dropped when the target's queue is full """
+		pool = self._startPool(workers = 1, maxQueueSize = 1)
+		release = Event()
+		pool.submit('target', lambda: release.wait(5.0))
+		time.sleep(0.1)		# First task is executed now
+		self.assertTrue(pool.submit('target', lambda: True))
+		self.assertFalse(pool.submit('target', lambda: True))
+		release.set()
+		self._waitForDelivery(2)
+		self.assertEqual(pool.getStatistics()['dropped'], 1)
+
+
+	def test_dropOldest(self) -> None:
+		"""	The oldest queued task is dropped when the target's queue is full """
+		pool = self._startPool(workers = 1, maxQueueSize = 1, overflowPolicy = OverflowPolicy.dropOldest)
+		release = Event()
+		result:list[str] = []
+		pool.submit('target', lambda: release.wait(5.0))
+		time.sleep(0.1)		# First task is executed now
+		self.assertTrue(pool.submit('target', _appendTask(result, 'old')))
+		self.assertTrue(pool.submit('target', _appendTask(result, 'new')))
+		release.set()
+		self._waitForDelivery(2)
+		self.assertEqual(result, [ 'new' ])
+		self.assertEqual(pool.getStatistics()['dropped'], 1)
+
+
+	def test_removeIdleTargets(self) -> None:
+		"""	Idle targets are removed, and their statistics are kept in the totals """
+		pool = self._startPool(workers = 2, idleTimeout = 0.2)
+		for i in range(50):
+			pool.submit(f'target_{i}', lambda: True)
+		self._waitForDelivery(50)
+		self.assertEqual(pool.getStatistics()['targets'], 50)
+
+		time.sleep(0.3)
+		pool.submit('another', lambda: True)	# Removal is checked when a task is submitted
+		self._waitForDelivery(51)
+		stats = pool.getStatistics()
+		self.assertEqual(stats['targets'], 1)
+		self.assertEqual(stats['delivered'], 51)
+		self.assertEqual(list(pool.getTargetStatistics().keys()), [ 'another' ])
+
+
+	def test_busyTargetNotRemoved(self) -> None:
+		"""	A target with an executing task is not removed """
+		pool = self._startPool(workers = 2, idleTimeout = 0.1)
+		release = Event()
+		pool.submit('busy', lambda: release.wait(5.0))
+		time.sleep(0.3)
+		pool.submit('another', lambda: True)
+		self.assertIn('busy', pool.getTargetStatistics())
+		release.set()
+		self._waitForDelivery(2)
+
+
+	def test_stopWaitsForWorkers(self) -> None:
+		"""	Stopping the pool waits until the executing tasks are finished, and discards the queued tasks """
+		pool = self._startPool(workers = 1)
+		started = Event()
+		result:list[str] = []
+		def _slowTask() -> bool:
+			started.set()
+			time.sleep(0.3)
+			result.append('slow')
+			return True
+		pool.submit('target', _slowTask)
+		pool.submit('target', _appendTask(result, 'queued'))
+		self.assertTrue(started.wait(1.0))
+		pool.stop()
+		self.assertEqual(result, [ 'slow' ])
+		time.sleep(0.1)
+		self.assertEqual(result, [ 'slow' ])
+
+
+	def test_stopTimeout(self) -> None:
+		"""	Stopping the pool waits for an executing task only until the timeout """
+		pool = self._startPool(workers = 1)
+		started = Event()
+		release = Event()
+		def _blockingTask() -> bool:
+			started.set()
+			return release.wait(5.0)
+		pool.submit('target', _blockingTask)
+		self.assertTrue(started.wait(1.0))
+		start = time.time()
+		pool.stop(timeout = 0.2)
+		self.assertLess(time.time() - start, 1.0)
+		release.set()
+
+
+def run(testFailFast:bool) -> Tuple[int, int, int, float]:
+	suite = unittest.TestSuite()
+
+	addTest(suite, TestDeliveryPool('test_fifoPerTarget'))
+	addTest(suite, TestDeliveryPool('test_slowTargetDoesNotBlockOthers'))
+	addTest(suite, TestDeliveryPool('test_dropNewest'))
+	addTest(suite, TestDeliveryPool('test_dropOldest'))
+	addTest(suite, TestDeliveryPool('test_removeIdleTargets'))
+	addTest(suite, TestDeliveryPool('test_busyTargetNotRemoved'))
+	addTest(suite, TestDeliveryPool('test_stopWaitsForWorkers'))
+	addTest(suite, TestDeliveryPool('test_stopTimeout'))
+
+	result = unittest.TextTestRunner(verbosity = testVerbosity, failfast = testFailFast).run(suite)
+	printResult(result)
+	return result.testsRun, len(result.errors + result.failures), len(result.skipped), getSleepTimeCount()
+
+if __name__ == '__main__':
+	r, errors, s, t = run(True)
+	sys.exit(errors)
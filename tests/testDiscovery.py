@@ -9,7 +9,7 @@
 #	==> rcn = original-resource is tested in testRemote_Annc.py
 #
 
-import unittest, sys
+import unittest, sys, urllib.parse
 if '..' not in sys.path:
 	sys.path.append('..')
 from typing import Tuple, Dict
@@ -385,6 +385,130 @@ class TestDiscovery(unittest.TestCase):
 		self.assertEqual(findXPath(r, 'm2m:ae/m2m:cin/{1}/lbl/{0}'), 'tag:0')
 
 
+	def _discoverCINs(self, args:str = '') -> list[str]:
+		"""	Discover the <CIN> resources under the <AE>.
+
+			Args:
+				args: Additional request arguments.
+
+			Return:
+				The list of discovered resource identifiers.
+		"""
+		r, rsc = RETRIEVE(f'{aeURL}?fu=1&ty={int(T.CIN)}{args}', TestDiscovery.originator)
+		self.assertEqual(rsc, RC.OK, r)
+		return findXPath(r, 'm2m:uril', [])
+
+
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_discoverCINwithLim(self) -> None:
+		""" Discover <CIN> under <AE> with lim """
+		allCINs = self._discoverCINs()
+		self.assertEqual(len(allCINs), 10)
+		self.assertEqual(self._discoverCINs('&lim=3'), allCINs[:3])
+		self.assertEqual(self._discoverCINs('&lim=20'), allCINs)
+		self.assertEqual(self._discoverCINs('&lim=0'), [])
+
+
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_discoverCINwithOfst(self) -> None:
+		""" Discover <CIN> under <AE> with ofst """
+		allCINs = self._discoverCINs()
+		self.assertEqual(self._discoverCINs('&ofst=1'), allCINs)
+		self.assertEqual(self._discoverCINs('&ofst=8'), allCINs[7:])
+		self.assertEqual(self._discoverCINs('&ofst=11'), [])
+
+
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_discoverCINwithOfstAndLimPaged(self) -> None:
+		""" Discover all <CIN> under <AE> page by page with ofst and lim """
+		allCINs = self._discoverCINs()
+		pagedCINs:list[str] = []
+		for ofst in range(1, 12, 3):
+			page = self._discoverCINs(f'&ofst={ofst}&lim=3')
+			self.assertEqual(len(page), min(3, 10 - len(pagedCINs)))
+			pagedCINs.extend(page)
+		self.assertEqual(pagedCINs, allCINs)	# each <CIN> exactly once, in the same order
+
+		# Requesting a page again returns the same page
+		self.assertEqual(self._discoverCINs('&ofst=4&lim=3'), allCINs[3:6])
+
+
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_discoverWithLvlPaged(self) -> None:
+		""" Discover under <AE> with lvl page by page with ofst and lim """
+		for lvl, lim in ( (1, 1), (2, 3) ):
+			r, rsc = RETRIEVE(f'{aeURL}?fu=1&lvl={lvl}', TestDiscovery.originator)
+			self.assertEqual(rsc, RC.OK, r)
+			allResources = findXPath(r, 'm2m:uril')
+			self.assertEqual(len(allResources), 2 if lvl == 1 else 12)
+			pagedResources:list[str] = []
+			for ofst in range(1, len(allResources) + 2, lim):
+				r, rsc = RETRIEVE(f'{aeURL}?fu=1&lvl={lvl}&ofst={ofst}&lim={lim}', TestDiscovery.originator)
+				self.assertEqual(rsc, RC.OK, r)
+				pagedResources.extend(findXPath(r, 'm2m:uril', []))
+			self.assertEqual(pagedResources, allResources)	# no resources below lvl
+
+
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_discoverCINwithOfstDifferentFilter(self) -> None:
+		""" Discover <CIN> under <AE> with ofst and a filter that differs from the previous page """
+		self.assertEqual(len(self._discoverCINs('&lim=1')), 1)	# first page of a different discovery
+		r, rsc = RETRIEVE(f'{aeURL}?fu=1&lbl=tag:0', TestDiscovery.originator)
+		self.assertEqual(rsc, RC.OK, r)
+		allCINs = findXPath(r, 'm2m:uril')
+		self.assertEqual(len(allCINs), 2)
+		r, rsc = RETRIEVE(f'{aeURL}?fu=1&lbl=tag:0&ofst=2', TestDiscovery.originator)
+		self.assertEqual(rsc, RC.OK, r)
+		self.assertEqual(findXPath(r, 'm2m:uril'), allCINs[1:])
+
+
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_discoverCINwithAq(self) -> None:
+		""" Discover <CIN> under <AE> with an advanced query """
+		aq = urllib.parse.quote('(== cnf "text/plain:0")')
+		self.assertEqual(len(self._discoverCINs(f'&aq={aq}')), 5)
+		aq = urllib.parse.quote('(&& (== cnf "text/plain:0") (!= con "aValue"))')
+		self.assertEqual(len(self._discoverCINs(f'&aq={aq}')), 0)
+
+
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_discoverCINwithAqConcurrently(self) -> None:
+		""" Discover <CIN> under <AE> with the same advanced query concurrently """
+		aq = urllib.parse.quote('(== cnf "text/plain:0")')
+		expected = self._discoverCINs(f'&aq={aq}')
+		self.assertEqual(len(expected), 5)
+		results:list[list[str]] = []
+		def _discover() -> None:
+			for _ in range(5):
+				results.append(self._discoverCINs(f'&aq={aq}'))
+		threads = [ Thread(target = _discover) for _ in range(4) ]
+		for t in threads:
+			t.start()
+		for t in threads:
+			t.join()
+		self.assertEqual(results, [ expected ] * 20)
+
+		# Internal attributes of the resources are not available in queries
+		aq = urllib.parse.quote('(== __rtype__ "m2m:cin")')
+		self.assertEqual(len(self._discoverCINs(f'&aq={aq}')), 0)
+
+
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_discoverCINwithInvalidAqFail(self) -> None:
+		""" Discover <CIN> under <AE> with a syntactically invalid advanced query -> Fail """
+		for query in ( '(== cnf "text/plain:0"', '(== cnf "text/plain:0"))', ' ' ):
+			r, rsc = RETRIEVE(f'{aeURL}?fu=1&ty={int(T.CIN)}&aq={urllib.parse.quote(query)}', TestDiscovery.originator)
+			self.assertEqual(rsc, RC.BAD_REQUEST, f'{query}: {r}')
+
+
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_discoverCINwithNotAllowedAqFail(self) -> None:
+		""" Discover <CIN> under <AE> with an advanced query that uses a not allowed function -> Fail """
+		for query in ( '(print "aValue")', '(== con (upper "avalue"))' ):
+			r, rsc = RETRIEVE(f'{aeURL}?fu=1&ty={int(T.CIN)}&aq={urllib.parse.quote(query)}', TestDiscovery.originator)
+			self.assertEqual(rsc, RC.BAD_REQUEST, f'{query}: {r}')
+
+
 	@unittest.skipIf(noCSE, 'No CSEBase')
 	def test_retrieveCNTbyCNIunderAE(self) -> None:
 		""" Retrieve <CNT> under <AE> by correct cni & rcn=8 """
@@ -822,6 +946,41 @@ class TestDiscovery(unittest.TestCase):
 		self.assertEqual(rsc, RC.DELETED)
 
 
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_retrieveManyCINsUnderCNTRCN8(self) -> None:
+		""" Retrieve and discover many <CIN> under <CNT> in several batches """
+		r, rsc = CREATE(aeURL, TestDiscovery.originator, T.CNT, { 'm2m:cnt' : { 'rn' : f'{cntRN}Many' }})
+		self.assertEqual(rsc, RC.CREATED, r)
+		ris = []
+		for i in range(50):	# more than the first two batches of child resources
+			r, rsc = CREATE(f'{cntURL}Many', TestDiscovery.originator, T.CIN, { 'm2m:cin' : { 'con' : f'{i}' }})
+			self.assertEqual(rsc, RC.CREATED, r)
+			ris.append(findXPath(r, 'm2m:cin/ri'))
+
+		# retrieve <CNT> with rcn=8
+		r, rsc = RETRIEVE(f'{cntURL}Many?rcn={int(RCN.childResources)}', TestDiscovery.originator)
+		self.assertEqual(rsc, RC.OK, r)
+		self.assertEqual([ findXPath(each, 'ri') for each in findXPath(r, 'm2m:cnt/m2m:cin') ], ris)
+
+		# discover a page across the batch boundaries
+		r, rsc = RETRIEVE(f'{cntURL}Many?fu=1&drt={int(DesiredIdentifierResultType.unstructured)}&ty={int(T.CIN)}&ofst=10&lim=30', TestDiscovery.originator)
+		self.assertEqual(rsc, RC.OK, r)
+		self.assertEqual(findXPath(r, 'm2m:uril'), [ f'{CSEID}/{ri}' for ri in ris[9:39] ])
+
+		# deleted <CIN> are skipped
+		for i in (47, 16, 15):
+			_, rsc = DELETE(f'{CSEURL}{ris[i]}', TestDiscovery.originator)
+			self.assertEqual(rsc, RC.DELETED)
+			del ris[i]
+		r, rsc = RETRIEVE(f'{cntURL}Many?rcn={int(RCN.childResources)}', TestDiscovery.originator)
+		self.assertEqual(rsc, RC.OK, r)
+		self.assertEqual([ findXPath(each, 'ri') for each in findXPath(r, 'm2m:cnt/m2m:cin') ], ris)
+
+		# cleanup
+		_, rsc = DELETE(f'{cntURL}Many', TestDiscovery.originator)
+		self.assertEqual(rsc, RC.DELETED)
+
+
 	# childResourceReferences
 	@unittest.skipIf(noCSE, 'No CSEBase')
 	def test_retrieveUnderCNTRCN6(self) -> None:
@@ -953,6 +1112,15 @@ def run(testFailFast:bool) -> Tuple[int, int, int, float]:
 	addTest(suite, TestDiscovery('test_retrieveCNTunderCSE'))
 	addTest(suite, TestDiscovery('test_retrieveCINunderAE'))
 	addTest(suite, TestDiscovery('test_retrieveCINbyLBLunderAE'))
+	addTest(suite, TestDiscovery('test_discoverCINwithLim'))
+	addTest(suite, TestDiscovery('test_discoverCINwithOfst'))
+	addTest(suite, TestDiscovery('test_discoverCINwithOfstAndLimPaged'))
+	addTest(suite, TestDiscovery('test_discoverWithLvlPaged'))
+	addTest(suite, TestDiscovery('test_discoverCINwithOfstDifferentFilter'))
+	addTest(suite, TestDiscovery('test_discoverCINwithAq'))
+	addTest(suite, TestDiscovery('test_discoverCINwithAqConcurrently'))
+	addTest(suite, TestDiscovery('test_discoverCINwithInvalidAqFail'))
+	addTest(suite, TestDiscovery('test_discoverCINwithNotAllowedAqFail'))
 	addTest(suite, TestDiscovery('test_retrieveCNTbyCNIunderAE'))
 	addTest(suite, TestDiscovery('test_retrieveCNTbyCNIunderAEEmpty'))
 	addTest(suite, TestDiscovery('test_retrieveCNTbyCNIunderAEEmpty2'))
@@ -989,6 +1157,7 @@ def run(testFailFast:bool) -> Tuple[int, int, int, float]:
 
 	# Retrieve under CNT and expect empty results
 	addTest(suite, TestDiscovery('test_retrieveUnderCNTRCN8'))
+	addTest(suite, TestDiscovery('test_retrieveManyCINsUnderCNTRCN8'))
 	addTest(suite, TestDiscovery('test_retrieveUnderCNTRCN6'))
 	addTest(suite, TestDiscovery('test_retrieveUnderCNTRCN5'))
 
@@ -163,6 +163,71 @@ class TestExpiration(unittest.TestCase):
 		self.assertEqual(rsc, RC.DELETED)
 
 
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_updateCNTExtendEt(self) -> None:
+		""" Create <CNT>, extend ET, and check that it doesn't expire at the original ET """
+		self.assertTrue(isTestResourceExpirations())
+		self.assertIsNotNone(TestExpiration.ae)
+		dct = 	{ 'm2m:cnt' : { 
+					'rn' : cntRN,
+					'et' : getResourceDate(expirationCheckDelay) # some seconds in the future
+				}}
+		r, rsc = CREATE(aeURL, TestExpiration.originator, T.CNT, dct)
+		self.assertEqual(rsc, RC.CREATED, r)
+		dct = 	{ 'm2m:cnt' : { 
+					'et' : getResourceDate(expirationCheckDelay * 4)
+				}}
+		r, rsc = UPDATE(cntURL, TestExpiration.originator, dct)
+		self.assertEqual(rsc, RC.UPDATED, r)
+
+		testSleep(expirationCheckDelay * 2)	# past the original et
+		r, rsc = RETRIEVE(cntURL, TestExpiration.originator)
+		self.assertEqual(rsc, RC.OK, r)
+
+		testSleep(expirationSleep)	# past the extended et
+		r, rsc = RETRIEVE(cntURL, TestExpiration.originator)
+		self.assertEqual(rsc, RC.NOT_FOUND, r)
+
+
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_deleteCNTWithExpiringCINs(self) -> None:
+		""" Delete <CNT> with expiring <CIN>, and check that a new <CNT> and <CIN> with the same names are not affected """
+		self.assertTrue(isTestResourceExpirations())
+		self.assertIsNotNone(TestExpiration.ae)
+		r, rsc = CREATE(aeURL, TestExpiration.originator, T.CNT, { 'm2m:cnt' : { 'rn' : cntRN }})
+		self.assertEqual(rsc, RC.CREATED, r)
+		for i in range(0, 5):
+			dct = 	{ 'm2m:cin' : {
+						'rn' : f'{cinRN}{i}',
+						'et' : getResourceDate(expirationCheckDelay), # some seconds in the future
+						'con' : 'AnyValue'
+					}}
+			r, rsc = CREATE(cntURL, TestExpiration.originator, T.CIN, dct)
+			self.assertEqual(rsc, RC.CREATED, r)
+
+		# Delete the container and its instances before they expire
+		r, rsc = DELETE(cntURL, TestExpiration.originator)
+		self.assertEqual(rsc, RC.DELETED, r)
+
+		# Create the same structure again without expiration
+		r, rsc = CREATE(aeURL, TestExpiration.originator, T.CNT, { 'm2m:cnt' : { 'rn' : cntRN }})
+		self.assertEqual(rsc, RC.CREATED, r)
+		for i in range(0, 5):
+			r, rsc = CREATE(cntURL, TestExpiration.originator, T.CIN, { 'm2m:cin' : { 'rn' : f'{cinRN}{i}', 'con' : 'AnyValue' }})
+			self.assertEqual(rsc, RC.CREATED, r)
+
+		testSleep(expirationSleep)	# past the et of the deleted instances
+		r, rsc = RETRIEVE(cntURL, TestExpiration.originator)
+		self.assertEqual(rsc, RC.OK, r)
+		self.assertEqual(findXPath(r, 'm2m:cnt/cni'), 5)
+		for i in range(0, 5):
+			r, rsc = RETRIEVE(f'{cntURL}/{cinRN}{i}', TestExpiration.originator)
+			self.assertEqual(rsc, RC.OK, r)
+
+		r, rsc = DELETE(cntURL, TestExpiration.originator)
+		self.assertEqual(rsc, RC.DELETED, r)
+
+
 	@unittest.skipIf(noCSE, 'No CSEBase')
 	def test_expireCNTViaMIA(self) -> None:
 		""" Expire <CNT> via MIA """
@@ -305,6 +370,8 @@ def run(testFailFast:bool) -> Tuple[int, int, int, float]:
 	addTest(suite, TestExpiration('test_createCNTWithToLargeET'))
 	addTest(suite, TestExpiration('test_createCNTExpirationInThePast'))
 	addTest(suite, TestExpiration('test_updateCNTWithEtNull'))
+	addTest(suite, TestExpiration('test_updateCNTExtendEt'))
+	addTest(suite, TestExpiration('test_deleteCNTWithExpiringCINs'))
 	addTest(suite, TestExpiration('test_expireCNTViaMIA'))
 	addTest(suite, TestExpiration('test_expireCNTViaMIALarge'))
 	addTest(suite, TestExpiration('test_expireFCNTViaMIA'))
@@ -0,0 +1,128 @@
+#
+#	testExpirationIndex.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+#	Unit tests for the index of expiration timestamps. These tests don't need a running CSE.
+#
+
+import unittest, sys, time
+if '..' not in sys.path:
+	sys.path.append('..')
+from typing import Tuple
+from threading import Thread
+from acme.helpers.ExpirationIndex import ExpirationIndex
+from init import *
+
+
+class TestExpirationIndex(unittest.TestCase):
+
+	def test_popDueInOrder(self) -> None:
+		"""	Due keys are returned ordered by their timestamp, and removed from the index """
+		index = ExpirationIndex()
+		index.set('c', 30.0)
+		index.set('a', 10.0)
+		index.set('b', 20.0)
+		index.set('d', 40.0)
+		self.assertEqual(len(index), 4)
+		self.assertEqual(index.next(), 10.0)
+		self.assertEqual(index.popDue(35.0), [ 'a', 'b', 'c' ])
+		self.assertEqual(index.popDue(35.0), [])
+		self.assertEqual(len(index), 1)
+		self.assertEqual(index.next(), 40.0)
+		self.assertEqual(index.popDue(40.0), [])	# not due before its timestamp
+		self.assertEqual(index.popDue(40.1), [ 'd' ])
+		self.assertIsNone(index.next())
+
+
+	def test_replaceTimestamp(self) -> None:
+		"""	Replacing the timestamp of a key ignores its former timestamp """
+		index = ExpirationIndex()
+		index.set('a', 10.0)
+		index.set('b', 20.0)
+		index.set('a', 30.0)
+		index.set('b', 20.0)	# unchanged
+		self.assertEqual(len(index), 2)
+		self.assertEqual(index.next(), 20.0)
+		self.assertEqual(index.popDue(25.0), [ 'b' ])
+		self.assertEqual(index.popDue(35.0), [ 'a' ])
+
+		index.set('c', 30.0)
+		index.set('c', 5.0)		# earlier than before
+		self.assertEqual(index.popDue(6.0), [ 'c' ])
+		self.assertEqual(index.popDue(35.0), [])
+
+
+	def test_remove(self) -> None:
+		"""	Removed keys are not returned """
+		index = ExpirationIndex()
+		index.set('a', 10.0)
+		index.set('b', 20.0)
+		index.remove('a')
+		index.set('b', None)
+		index.remove('unknown')
+		self.assertEqual(len(index), 0)
+		self.assertIsNone(index.next())
+		self.assertEqual(index.popDue(100.0), [])
+
+		index.set('a', 10.0)
+		index.clear()
+		self.assertEqual(index.popDue(100.0), [])
+
+
+	def test_rebuildStaleEntries(self) -> None:
+		"""	Stale entries are removed from the heap when there are too many of them """
+		index = ExpirationIndex()
+		for i in range(5000):
+			index.set('a', float(i))
+		self.assertLess(len(index._heap), 2000)
+		self.assertEqual(len(index), 1)
+		self.assertEqual(index.popDue(10000.0), [ 'a' ])
+
+
+	def test_waitForNext(self) -> None:
+		"""	Waiting ends when the next key is due """
+		index = ExpirationIndex()
+		now = time.time()
+		index.set('a', now + 0.2)
+		index.waitForNext(now, 5.0)
+		self.assertLess(time.time() - now, 1.0)
+		self.assertEqual(index.popDue(time.time()), [ 'a' ])
+
+		start = time.time()
+		index.waitForNext(time.time(), 0.2)	# empty index waits for maxWait
+		self.assertGreaterEqual(time.time() - start, 0.15)
+
+
+	def test_wakeUpForEarlierKey(self) -> None:
+		"""	A waiting caller is woken up when a key is added that is due earlier """
+		index = ExpirationIndex()
+		now = time.time()
+		index.set('late', now + 60.0)
+		def _add() -> None:
+			time.sleep(0.2)
+			index.set('early', now + 0.1)
+		Thread(target = _add).start()
+		index.waitForNext(now, 5.0)
+		self.assertLess(time.time() - now, 1.0)
+		self.assertEqual(index.popDue(time.time()), [ 'early' ])
+
+
+def run(testFailFast:bool) -> Tuple[int, int, int, float]:
+	suite = unittest.TestSuite()
+
+	addTest(suite, TestExpirationIndex('test_popDueInOrder'))
+	addTest(suite, TestExpirationIndex('test_replaceTimestamp'))
+	addTest(suite, TestExpirationIndex('test_remove'))
+	addTest(suite, TestExpirationIndex('test_rebuildStaleEntries'))
+	addTest(suite, TestExpirationIndex('test_waitForNext'))
+	addTest(suite, TestExpirationIndex('test_wakeUpForEarlierKey'))
+
+	result = unittest.TextTestRunner(verbosity = testVerbosity, failfast = testFailFast).run(suite)
+	printResult(result)
+	return result.testsRun, len(result.errors + result.failures), len(result.skipped), getSleepTimeCount()
+
+if __name__ == '__main__':
+	r, errors, s, t = run(True)
+	sys.exit(errors)
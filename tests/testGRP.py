@@ -389,6 +389,45 @@ class TestGRP(unittest.TestCase):
 		self.assertNotIn(self.cnt4RI, findXPath(r, 'm2m:grp/mid'))
 
 
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_deleteContainerWithCINsCheckMID(self) -> None:
+		"""	Add <CIN>s of a <CNT> to <GRP>, delete the <CNT>, check <GRP> MID"""
+		r, rsc = RETRIEVE(grpURL, TestGRP.originator)
+		self.assertEqual(rsc, RC.OK)
+		mid = findXPath(r, 'm2m:grp/mid')
+		self.assertEqual(len(mid), 2)
+
+		# Add container with instances
+		dct = 	{ 'm2m:cnt' : { 
+					'rn'  : f'{cntRN}4' 
+				}}
+		r, rsc = CREATE(aeURL, self.originator, T.CNT, dct)
+		self.assertEqual(rsc, RC.CREATED, r)
+		cinRIs = []
+		for _ in range(5):
+			r, rsc = CREATE(f'{aeURL}/{cntRN}4', self.originator, T.CIN, { 'm2m:cin' : { 'con' : 'aValue' }})
+			self.assertEqual(rsc, RC.CREATED, r)
+			cinRIs.append(findXPath(r, 'm2m:cin/ri'))
+	
+		# Add instances to group
+		dct = 	{ 'm2m:grp' : { 
+					'mid'  : mid + cinRIs
+				}}
+		r, rsc = UPDATE(grpURL, TestGRP.originator, dct)
+		self.assertEqual(rsc, RC.UPDATED, r)
+		self.assertEqual(findXPath(r, 'm2m:grp/cnm'), 7)
+
+		# Delete container, and with it all its instances
+		r, rsc = DELETE(f'{aeURL}/{cntRN}4', self.originator)
+		self.assertEqual(rsc, RC.DELETED)
+
+		# Check group 
+		r, rsc = RETRIEVE(grpURL, TestGRP.originator)
+		self.assertEqual(rsc, RC.OK)
+		self.assertEqual(findXPath(r, 'm2m:grp/cnm'), 2)
+		self.assertEqual(findXPath(r, 'm2m:grp/mid'), mid)
+
+
 	@unittest.skipIf(noCSE, 'No CSEBase')
 	def test_attributesGRP2(self) -> None:
 		""" Validate <GRP> attributes after failed MID update"""
@@ -414,6 +453,36 @@ class TestGRP(unittest.TestCase):
 		self.assertIsNone(findXPath(r, 'm2m:grp/st'))
 
 
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_createGRPMissingAttributeRepeated(self) -> None:
+		"""	Create <GRP> without a mandatory attribute repeatedly -> Fail """
+		for _ in range(2):	# The second request uses the cached validation plan
+			for dct in (	{ 'm2m:grp' : { 'rn' : f'{grpRN}Missing', 'mt' : T.CNT, 'mid' : [ TestGRP.cnt1RI ] }},	# mnm is missing
+							{ 'm2m:grp' : { 'rn' : f'{grpRN}Missing', 'mt' : T.CNT, 'mnm' : 10 }},					# mid is missing
+						):
+				r, rsc = CREATE(aeURL, TestGRP.originator, T.GRP, dct)
+				self.assertEqual(rsc, RC.BAD_REQUEST, r)
+
+			# A valid request still succeeds with the same plan
+			r, rsc = CREATE(aeURL, TestGRP.originator, T.GRP, { 'm2m:grp' : { 'rn' : f'{grpRN}Missing', 'mt' : T.CNT, 'mnm' : 10, 'mid' : [ TestGRP.cnt1RI ] }})
+			self.assertEqual(rsc, RC.CREATED, r)
+			_, rsc = DELETE(f'{aeURL}/{grpRN}Missing', TestGRP.originator)
+			self.assertEqual(rsc, RC.DELETED)
+
+
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_updateGRPDeleteMandatoryAttributeRepeated(self) -> None:
+		"""	Update <GRP> and remove a mandatory attribute repeatedly -> Fail """
+		for _ in range(2):	# The second request uses the cached validation plan
+			r, rsc = UPDATE(grpURL, TestGRP.originator, { 'm2m:grp' : { 'mnm' : None }})
+			self.assertEqual(rsc, RC.BAD_REQUEST, r)
+
+			# A valid request still succeeds with the same plan
+			r, rsc = UPDATE(grpURL, TestGRP.originator, { 'm2m:grp' : { 'mnm' : 10 }})
+			self.assertEqual(rsc, RC.UPDATED, r)
+			self.assertEqual(findXPath(r, 'm2m:grp/mnm'), 10)
+
+
 	@unittest.skipIf(noCSE, 'No CSEBase')
 	def test_createGRPWithCreatorWrong(self) -> None:
 		""" Create <GRP> with creator attribute (wrong) -> Fail """
@@ -490,6 +559,105 @@ class TestGRP(unittest.TestCase):
 		self.assertIsInstance(rsp, list)
 		self.assertEqual(len(rsp), 2)
 
+
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_retrieveViaFoptInMemberOrder(self) -> None:
+		""" RETRIEVE members via fopt -> results in member order """
+		ris = []
+		for i in range(3, 6):
+			r, rsc = CREATE(aeURL, TestGRP.originator, T.CNT, { 'm2m:cnt' : { 'rn' : f'{cntRN}Ordered{i}' }})
+			self.assertEqual(rsc, RC.CREATED, r)
+			ris.append(findXPath(r, 'm2m:cnt/ri'))
+		mid = [ ris[2], TestGRP.cnt2RI, ris[0], TestGRP.cnt1RI, ris[1] ]
+		dct = 	{ 'm2m:grp' : { 
+					'rn' : f'{grpRN}Ordered',
+					'mnm': 10,
+					'mt' : T.CNT,
+					'mid': mid
+				}}
+		r, rsc = CREATE(aeURL, TestGRP.originator, T.GRP, dct)
+		self.assertEqual(rsc, RC.CREATED, r)
+
+		r, rsc = RETRIEVE(f'{aeURL}/{grpRN}Ordered/fopt', TestGRP.originator)
+		self.assertEqual(rsc, RC.OK, r)
+		rsp = findXPath(r, 'm2m:agr/m2m:rsp')
+		self.assertIsInstance(rsp, list)
+		self.assertEqual(len(rsp), len(mid))
+		for i, ri in enumerate(mid):
+			self.assertEqual(findXPath(rsp, f'{{{i}}}/rsc'), RC.OK)
+			self.assertEqual(findXPath(rsp, f'{{{i}}}/pc/m2m:cnt/ri'), ri)
+
+		_, rsc = DELETE(f'{aeURL}/{grpRN}Ordered', TestGRP.originator)
+		self.assertEqual(rsc, RC.DELETED)
+		for i in range(3, 6):
+			_, rsc = DELETE(f'{aeURL}/{cntRN}Ordered{i}', TestGRP.originator)
+			self.assertEqual(rsc, RC.DELETED)
+
+
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_retrieveViaNestedFopt(self) -> None:
+		""" RETRIEVE members of nested <GRP>s via fopt/fopt """
+		grp, rsc = RETRIEVE(grpURL, TestGRP.originator)
+		self.assertEqual(rsc, RC.OK, grp)
+		dct = 	{ 'm2m:grp' : { 
+					'rn' : f'{grpRN}Inner',
+					'mnm': 10,
+					'mt' : T.CNT,
+					'mid': [ TestGRP.cnt2RI, TestGRP.cnt1RI ]
+				}}
+		inner, rsc = CREATE(aeURL, TestGRP.originator, T.GRP, dct)
+		self.assertEqual(rsc, RC.CREATED, inner)
+		dct = 	{ 'm2m:grp' : { 
+					'rn' : f'{grpRN}Outer',
+					'mnm': 10,
+					'mt' : T.GRP,
+					'mid': [ findXPath(grp, 'm2m:grp/ri'), findXPath(inner, 'm2m:grp/ri') ]
+				}}
+		r, rsc = CREATE(aeURL, TestGRP.originator, T.GRP, dct)
+		self.assertEqual(rsc, RC.CREATED, r)
+
+		r, rsc = RETRIEVE(f'{aeURL}/{grpRN}Outer/fopt/fopt', TestGRP.originator)
+		self.assertEqual(rsc, RC.OK, r)
+		rsp = findXPath(r, 'm2m:agr/m2m:rsp')
+		self.assertIsInstance(rsp, list)
+		self.assertEqual(len(rsp), 2)
+		for i, mid in enumerate([ [ TestGRP.cnt1RI, TestGRP.cnt2RI ], [ TestGRP.cnt2RI, TestGRP.cnt1RI ] ]):	# members of the inner groups
+			self.assertEqual(findXPath(rsp, f'{{{i}}}/rsc'), RC.OK, r)
+			innerRsp = findXPath(rsp, f'{{{i}}}/pc/m2m:agr/m2m:rsp')
+			self.assertIsInstance(innerRsp, list)
+			self.assertEqual([ findXPath(each, 'pc/m2m:cnt/ri') for each in innerRsp ], mid)
+
+		_, rsc = DELETE(f'{aeURL}/{grpRN}Outer', TestGRP.originator)
+		self.assertEqual(rsc, RC.DELETED)
+		_, rsc = DELETE(f'{aeURL}/{grpRN}Inner', TestGRP.originator)
+		self.assertEqual(rsc, RC.DELETED)
+
+
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_retrieveViaFoptWithRequestExpirationFail(self) -> None:
+		""" RETRIEVE a blocking member via fopt with a Request Expiration Timestamp -> Fail """
+		r, rsc = CREATE(aeURL, TestGRP.originator, T.PCH, { 'm2m:pch' : { 'rn' : pchRN }})
+		self.assertEqual(rsc, RC.CREATED, r)
+		dct = 	{ 'm2m:grp' : { 
+					'rn' : f'{grpRN}PCH',
+					'mnm': 10,
+					'mt' : T.MIXED,
+					'mid': [ findXPath(r, 'm2m:pch/ri'), TestGRP.cnt1RI ]
+				}}
+		r, rsc = CREATE(aeURL, TestGRP.originator, T.GRP, dct)
+		self.assertEqual(rsc, RC.CREATED, r)
+
+		# The <PCU> long-polling request of the first member doesn't return before the deadline
+		startTS = time.time()
+		r, rsc = RETRIEVE(f'{aeURL}/{grpRN}PCH/fopt/pcu', TestGRP.originator, headers = { C.hfRET : '1000' })
+		self.assertEqual(rsc, RC.REQUEST_TIMEOUT, r)
+		self.assertLess(time.time() - startTS, 5.0)
+
+		_, rsc = DELETE(f'{aeURL}/{grpRN}PCH', TestGRP.originator)
+		self.assertEqual(rsc, RC.DELETED)
+		_, rsc = DELETE(pchURL, TestGRP.originator)
+		self.assertEqual(rsc, RC.DELETED)
+
 #TODO check GRP itself: members
 
 
@@ -514,6 +682,8 @@ def run(testFailFast:bool) -> Tuple[int, int, int, float]:
 	addTest(suite, TestGRP('test_createGRP2'))	# create <GRP> again
 	addTest(suite, TestGRP('test_addTooManyCNTToGRP2'))
 	addTest(suite, TestGRP('test_attributesGRP2'))
+	addTest(suite, TestGRP('test_createGRPMissingAttributeRepeated'))
+	addTest(suite, TestGRP('test_updateGRPDeleteMandatoryAttributeRepeated'))
 
 	addTest(suite, TestGRP('test_createGRPWithCreatorWrong'))
 	addTest(suite, TestGRP('test_createGRPWithCreator'))
@@ -521,6 +691,7 @@ def run(testFailFast:bool) -> Tuple[int, int, int, float]:
 
 	addTest(suite, TestGRP('test_createGRP'))	# create <GRP> again
 	addTest(suite, TestGRP('test_addDeleteContainerCheckMID'))	
+	addTest(suite, TestGRP('test_deleteContainerWithCINsCheckMID'))
 	addTest(suite, TestGRP('test_deleteGRPByAssignedOriginator'))
 
 	# Test fopt
@@ -528,6 +699,9 @@ def run(testFailFast:bool) -> Tuple[int, int, int, float]:
 	addTest(suite, TestGRP('test_createCNTviaFopt'))
 	addTest(suite, TestGRP('test_retrieveCNTviaFopt'))
 	addTest(suite, TestGRP('test_createCNTCNTviaFopt'))
+	addTest(suite, TestGRP('test_retrieveViaFoptInMemberOrder'))
+	addTest(suite, TestGRP('test_retrieveViaNestedFopt'))
+	addTest(suite, TestGRP('test_retrieveViaFoptWithRequestExpirationFail'))
 	addTest(suite, TestGRP('test_deleteGRPByAssignedOriginator'))
 
 
@@ -0,0 +1,141 @@
+#
+#	testHttpSessionPool.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+#	Unit tests for the pool of keep-alive HTTP sessions. These tests don't need a running CSE.
+#
+
+import unittest, sys, time
+if '..' not in sys.path:
+	sys.path.append('..')
+from typing import Tuple
+from threading import Thread
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from acme.helpers.HttpSessionPool import HttpSessionPool
+from init import *
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+	"""	Request handler that supports keep-alive connections and records the client's port
+		and cookie header of each request.
+	"""
+	protocol_version = 'HTTP/1.1'
+
+	def do_GET(self) -> None:
+		self.server.clientPorts.append(self.client_address[1])	# type:ignore[attr-defined]
+		self.server.cookies.append(self.headers.get('Cookie'))	# type:ignore[attr-defined]
+		self.send_response(200)
+		self.send_header('Content-Length', '0')
+		self.send_header('Set-Cookie', 'session=1; Path=/')
+		self.end_headers()
+
+	def log_message(self, format:str, *args:Any) -> None:
+		pass
+
+
+class TestHttpSessionPool(unittest.TestCase):
+
+	server:ThreadingHTTPServer = None
+	url:str = None
+
+	@classmethod
+	def setUpClass(cls) -> None:
+		cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _KeepAliveHandler)
+		cls.server.daemon_threads = True
+		cls.url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+		Thread(target = cls.server.serve_forever, daemon = True).start()
+
+
+	@classmethod
+	def tearDownClass(cls) -> None:
+		cls.server.shutdown()
+		cls.server.server_close()
+
+
+	def setUp(self) -> None:
+		self.server.clientPorts = []	# type:ignore[attr-defined]
+		self.server.cookies = []		# type:ignore[attr-defined]
+		self.pool:HttpSessionPool = None
+
+
+	def tearDown(self) -> None:
+		if self.pool:
+			self.pool.close()
+
+
+	def test_reuseConnection(self) -> None:
+		"""	Subsequent requests to the same host reuse the same connection """
+		self.pool = HttpSessionPool(2, 60.0)
+		for _ in range(5):
+			self.assertEqual(self.pool.request('GET', f'{self.url}/path').status_code, 200)
+		self.assertEqual(len(set(self.server.clientPorts)), 1)	# type:ignore[attr-defined]
+		stats = self.pool.getStatistics()
+		self.assertEqual(stats['sessions'], 1)
+		self.assertEqual(stats['requests'], 5)
+		self.assertEqual(stats['misses'], 1)
+		self.assertEqual(stats['hits'], 4)
+
+
+	def test_sessionPerHost(self) -> None:
+		"""	Each target host gets its own session """
+		self.pool = HttpSessionPool(2, 60.0)
+		port = self.server.server_address[1]
+		self.pool.request('GET', f'http://127.0.0.1:{port}/')
+		self.pool.request('GET', f'HTTP://127.0.0.1:{port}/other')	# same host, different spelling
+		self.pool.request('GET', f'http://localhost:{port}/')
+		self.assertEqual(self.pool.getStatistics()['sessions'], 2)
+
+
+	def test_noCookies(self) -> None:
+		"""	Cookies set by a target host are not sent with later requests """
+		self.pool = HttpSessionPool(2, 60.0)
+		self.pool.request('GET', self.url)
+		self.pool.request('GET', self.url)
+		self.assertEqual(self.server.cookies, [ None, None ])	# type:ignore[attr-defined]
+
+
+	def test_evictIdleSessions(self) -> None:
+		"""	Sessions that were not used for longer than the idle timeout are closed """
+		self.pool = HttpSessionPool(2, 0.2)
+		self.pool.request('GET', self.url)
+		time.sleep(0.3)
+		self.pool.request('GET', f'http://localhost:{self.server.server_address[1]}/')	# Eviction is checked when a request is sent
+		stats = self.pool.getStatistics()
+		self.assertEqual(stats['sessions'], 1)
+		self.assertEqual(stats['evictions'], 1)
+		self.assertEqual(stats['requests'], 2)		# The counters of the closed session are kept
+		self.assertEqual(stats['misses'], 2)
+
+		# A new connection is opened for the evicted host
+		self.pool.request('GET', self.url)
+		self.assertEqual(len(set(self.server.clientPorts)), 3)	# type:ignore[attr-defined]
+
+
+	def test_close(self) -> None:
+		"""	Closing the pool closes all sessions """
+		self.pool = HttpSessionPool(2, 60.0)
+		self.pool.request('GET', self.url)
+		self.pool.close()
+		stats = self.pool.getStatistics()
+		self.assertEqual(stats['sessions'], 0)
+		self.assertEqual(stats['requests'], 1)
+
+
+def run(testFailFast:bool) -> Tuple[int, int, int, float]:
+	suite = unittest.TestSuite()
+
+	addTest(suite, TestHttpSessionPool('test_reuseConnection'))
+	addTest(suite, TestHttpSessionPool('test_sessionPerHost'))
+	addTest(suite, TestHttpSessionPool('test_noCookies'))
+	addTest(suite, TestHttpSessionPool('test_evictIdleSessions'))
+	addTest(suite, TestHttpSessionPool('test_close'))
+
+	result = unittest.TextTestRunner(verbosity = testVerbosity, failfast = testFailFast).run(suite)
+	printResult(result)
+	return result.testsRun, len(result.errors + result.failures), len(result.skipped), getSleepTimeCount()
+
+if __name__ == '__main__':
+	r, errors, s, t = run(True)
+	sys.exit(errors)
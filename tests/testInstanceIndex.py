@@ -0,0 +1,166 @@
+#
+#	testInstanceIndex.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+#	Unit tests for the ordered instance index. These tests don't need a running CSE. Only the test runner
+#	functions are used from *init*.
+#
+
+import unittest, sys
+if '..' not in sys.path:
+	sys.path.append('..')
+from typing import Tuple
+from acme.helpers.InstanceIndex import InstanceIndex
+from init import *
+
+
+def _ct(i:int) -> str:
+	"""	Return a creation timestamp for the *i*-th instance.
+
+		Args:
+			i: Number of the instance.
+
+		Return:
+			Timestamp in the oneM2M format.
+	"""
+	return f'20240101T{i // 3600:02d}{(i // 60) % 60:02d}{i % 60:02d},000000'
+
+
+class TestInstanceIndex(unittest.TestCase):
+
+	def _fill(self, count:int) -> InstanceIndex:
+		"""	Create an index with *count* instances in creation order. The instance *i* has the size *i*.
+
+			Args:
+				count: Number of instances.
+
+			Return:
+				The index.
+		"""
+		index = InstanceIndex()
+		for i in range(count):
+			index.add(f'cin_{i}', _ct(i), i)
+		return index
+
+
+	def test_emptyIndex(self) -> None:
+		"""	An empty index has no entries """
+		index = InstanceIndex()
+		self.assertEqual(len(index), 0)
+		self.assertEqual(index.cbs, 0)
+		self.assertIsNone(index.latest())
+		self.assertEqual(index.oldest(), [])
+		self.assertIsNone(index.remove('unknown'))
+
+
+	def test_addInOrder(self) -> None:
+		"""	Instances added in creation order are returned oldest first """
+		index = self._fill(5)
+		self.assertEqual(index.cni, 5)
+		self.assertEqual(index.cbs, sum(range(5)))
+		self.assertEqual(index.oldest(2), [ ('cin_0', _ct(0), 0), ('cin_1', _ct(1), 1) ])
+		self.assertEqual(index.latest(), ('cin_4', _ct(4), 4))
+		self.assertIn('cin_3', index)
+		self.assertNotIn('cin_5', index)
+
+
+	def test_addOutOfOrder(self) -> None:
+		"""	Instances added out of creation order are sorted by their creation time """
+		index = InstanceIndex()
+		for i in (3, 1, 4, 0, 2):
+			index.add(f'cin_{i}', _ct(i), i)
+		self.assertEqual([ e[0] for e in index.oldest(5) ], [ f'cin_{i}' for i in range(5) ])
+		self.assertEqual(index.latest()[0], 'cin_4')
+
+
+	def test_sameCreationTime(self) -> None:
+		"""	Instances with the same creation time are ordered by their resource ID """
+		index = InstanceIndex()
+		index.add('cin_b', _ct(0), 1)
+		index.add('cin_a', _ct(0), 1)
+		self.assertEqual([ e[0] for e in index.oldest(2) ], [ 'cin_a', 'cin_b' ])
+
+
+	def test_addExisting(self) -> None:
+		"""	Adding an already indexed instance replaces its entry """
+		index = self._fill(3)
+		index.add('cin_0', _ct(10), 10)
+		self.assertEqual(index.cni, 3)
+		self.assertEqual(index.cbs, 1 + 2 + 10)
+		self.assertEqual(index.oldest()[0][0], 'cin_1')
+		self.assertEqual(index.latest(), ('cin_0', _ct(10), 10))
+
+
+	def test_removeOldest(self) -> None:
+		"""	Removing the oldest instances updates cni and cbs """
+		index = self._fill(5)
+		self.assertEqual(index.remove('cin_0'), 0)
+		self.assertEqual(index.remove('cin_1'), 1)
+		self.assertEqual(index.cni, 3)
+		self.assertEqual(index.cbs, 2 + 3 + 4)
+		self.assertEqual(index.oldest()[0][0], 'cin_2')
+		self.assertIsNone(index.remove('cin_0'))
+		self.assertEqual(index.cni, 3)
+
+
+	def test_removeFromMiddleAndLatest(self) -> None:
+		"""	Removing instances other than the oldest keeps the order """
+		index = self._fill(5)
+		self.assertEqual(index.remove('cin_2'), 2)
+		self.assertEqual(index.remove('cin_4'), 4)
+		self.assertEqual([ e[0] for e in index.oldest(5) ], [ 'cin_0', 'cin_1', 'cin_3' ])
+		self.assertEqual(index.latest()[0], 'cin_3')
+		self.assertEqual(index.cbs, 0 + 1 + 3)
+
+
+	def test_removeAll(self) -> None:
+		"""	Removing all instances leaves an empty index that can be used again """
+		index = self._fill(100)
+		for i in range(100):
+			index.remove(f'cin_{i}')
+		self.assertEqual(len(index), 0)
+		self.assertEqual(index.cbs, 0)
+		self.assertIsNone(index.latest())
+		self.assertEqual(index.oldest(), [])
+
+		index.add('cin_new', _ct(200), 5)
+		self.assertEqual(index.oldest(), [ ('cin_new', _ct(200), 5) ])
+		self.assertEqual(index.latest(), ('cin_new', _ct(200), 5))
+
+
+	def test_slidingWindow(self) -> None:
+		"""	Adding new and removing the oldest instances, as done for mni, keeps a consistent window """
+		index = InstanceIndex()
+		mni = 10
+		for i in range(1000):
+			index.add(f'cin_{i}', _ct(i), 1)
+			while index.cni > mni:
+				index.remove(index.oldest()[0][0])
+		self.assertEqual(index.cni, mni)
+		self.assertEqual(index.cbs, mni)
+		self.assertEqual([ e[0] for e in index.oldest(mni) ], [ f'cin_{i}' for i in range(990, 1000) ])
+		self.assertEqual(index.latest()[0], 'cin_999')
+
+
+def run(testFailFast:bool) -> Tuple[int, int, int, float]:
+	suite = unittest.TestSuite()
+
+	addTest(suite, TestInstanceIndex('test_emptyIndex'))
+	addTest(suite, TestInstanceIndex('test_addInOrder'))
+	addTest(suite, TestInstanceIndex('test_addOutOfOrder'))
+	addTest(suite, TestInstanceIndex('test_sameCreationTime'))
+	addTest(suite, TestInstanceIndex('test_addExisting'))
+	addTest(suite, TestInstanceIndex('test_removeOldest'))
+	addTest(suite, TestInstanceIndex('test_removeFromMiddleAndLatest'))
+	addTest(suite, TestInstanceIndex('test_removeAll'))
+	addTest(suite, TestInstanceIndex('test_slidingWindow'))
+
+	result = unittest.TextTestRunner(verbosity = testVerbosity, failfast = testFailFast).run(suite)
+	printResult(result)
+	return result.testsRun, len(result.errors + result.failures), len(result.skipped), getSleepTimeCount()
+
+if __name__ == '__main__':
+	r, errors, s, t = run(True)
+	sys.exit(errors)
@@ -0,0 +1,121 @@
+#
+#	testLRUCache.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+#	Unit tests for the least-recently-used cache. These tests don't need a running CSE.
+#
+
+import unittest, sys
+if '..' not in sys.path:
+	sys.path.append('..')
+from typing import Tuple
+from threading import Thread
+from acme.helpers.LRUCache import LRUCache
+from init import *
+
+
+class TestLRUCache(unittest.TestCase):
+
+	def test_getAndPut(self) -> None:
+		"""	Cached entries are returned, and lookups are counted """
+		cache = LRUCache(3)
+		cache.put('a', 1)
+		cache.put('b', None)
+		self.assertEqual(cache.get('a'), 1)
+		self.assertIsNone(cache.get('b', 'default'))	# None is a valid value
+		self.assertEqual(cache.get('c', 'default'), 'default')
+		self.assertEqual(cache.hits, 2)
+		self.assertEqual(cache.misses, 1)
+		cache.put('a', 2)
+		self.assertEqual(cache.get('a'), 2)
+		self.assertEqual(len(cache), 2)
+
+
+	def test_evictLeastRecentlyUsed(self) -> None:
+		"""	The least recently used entry is removed when the cache is full """
+		cache = LRUCache(3)
+		cache.put('a', 1)
+		cache.put('b', 2)
+		cache.put('c', 3)
+		cache.get('a')			# b is now the least recently used entry
+		cache.put('d', 4)
+		self.assertEqual(len(cache), 3)
+		self.assertIsNone(cache.get('b'))
+		self.assertEqual(cache.get('a'), 1)
+		cache.put('c', 5)		# replacing an entry marks it as used
+		cache.put('e', 6)
+		self.assertIsNone(cache.get('d'))
+		self.assertEqual(cache.get('c'), 5)
+
+
+	def test_removeAndClear(self) -> None:
+		"""	Entries are removed individually or all together """
+		cache = LRUCache(3)
+		cache.put('a', 1)
+		cache.put('b', 2)
+		cache.remove('a')
+		cache.remove('unknown')
+		self.assertIsNone(cache.get('a'))
+		self.assertEqual(len(cache), 1)
+		cache.clear()
+		self.assertEqual(len(cache), 0)
+
+
+	def test_resize(self) -> None:
+		"""	Shrinking the cache removes the least recently used entries """
+		cache = LRUCache(4)
+		for i in range(4):
+			cache.put(i, i)
+		cache.get(0)
+		cache.resize(2)
+		self.assertEqual(len(cache), 2)
+		self.assertEqual(cache.get(0), 0)
+		self.assertEqual(cache.get(3), 3)
+		self.assertIsNone(cache.get(1))
+		cache.resize(0)
+		self.assertEqual(len(cache), 0)
+
+
+	def test_disabled(self) -> None:
+		"""	A cache with size 0 doesn't store entries """
+		cache = LRUCache(0)
+		cache.put('a', 1)
+		self.assertEqual(len(cache), 0)
+		self.assertIsNone(cache.get('a'))
+
+
+	def test_concurrentAccess(self) -> None:
+		"""	Concurrent access never exceeds the maximum size """
+		cache = LRUCache(50)
+		def _access(offset:int) -> None:
+			for i in range(2000):
+				cache.put(offset + i % 100, i)
+				cache.get(offset + (i * 7) % 100)
+		threads = [ Thread(target = _access, args = (t * 100,)) for t in range(8) ]
+		for t in threads:
+			t.start()
+		for t in threads:
+			t.join()
+		self.assertEqual(len(cache), 50)
+		self.assertEqual(cache.hits + cache.misses, 8 * 2000)
+
+
+def run(testFailFast:bool) -> Tuple[int, int, int, float]:
+	suite = unittest.TestSuite()
+
+	addTest(suite, TestLRUCache('test_getAndPut'))
+	addTest(suite, TestLRUCache('test_evictLeastRecentlyUsed'))
+	addTest(suite, TestLRUCache('test_removeAndClear'))
+	addTest(suite, TestLRUCache('test_resize'))
+	addTest(suite, TestLRUCache('test_disabled'))
+	addTest(suite, TestLRUCache('test_concurrentAccess'))
+
+	result = unittest.TextTestRunner(verbosity = testVerbosity, failfast = testFailFast).run(suite)
+	printResult(result)
+	return result.testsRun, len(result.errors + result.failures), len(result.skipped), getSleepTimeCount()
+
+if __name__ == '__main__':
+	r, errors, s, t = run(True)
+	sys.exit(errors)
@@ -0,0 +1,171 @@
+#
+#	testMetrics.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+#	Unit tests for the latency histograms and the metrics endpoint
+#
+
+import unittest, sys, re
+if '..' not in sys.path:
+	sys.path.append('..')
+from typing import Tuple
+from threading import Thread
+from acme.etc.Types import ResourceTypes as T, ResponseStatusCode as RC
+from acme.helpers.LatencyHistograms import LatencyHistograms, Histogram
+from init import *
+
+
+class TestLatencyHistograms(unittest.TestCase):
+
+	def test_observe(self) -> None:
+		"""	Observations are counted in the bucket of their upper bound """
+		histograms = LatencyHistograms((0.1, 0.2, 0.5))
+		for value in (0.05, 0.1, 0.15, 0.3, 1.0):
+			histograms.observe('metric', ('a', ), value)
+		histograms.observe('metric', ('b', ), 0.05)
+		result = histograms.getHistograms()
+		self.assertEqual(set(result.keys()), { ('metric', ('a', )), ('metric', ('b', )) })
+		histogram = result[('metric', ('a', ))]
+		self.assertEqual(histogram.counts, [ 2, 1, 1, 1 ])	# the upper bound is inclusive. Last count is for larger values
+		self.assertEqual(histogram.count, 5)
+		self.assertAlmostEqual(histogram.sum, 1.6)
+		self.assertEqual(result[('metric', ('b', ))].count, 1)
+
+
+	def test_quantile(self) -> None:
+		"""	Quantiles are interpolated within their bucket """
+		histogram = Histogram((0.1, 0.2, 0.4), [ 0, 10, 10, 0 ], 0.0)
+		self.assertAlmostEqual(histogram.quantile(0.5), 0.2)
+		self.assertAlmostEqual(histogram.quantile(0.25), 0.15)
+		self.assertAlmostEqual(histogram.quantile(0.75), 0.3)
+		self.assertAlmostEqual(histogram.quantile(1.0), 0.4)
+		self.assertEqual(Histogram((0.1, ), [ 0, 0 ], 0.0).quantile(0.5), 0.0)
+		self.assertEqual(Histogram((0.1, 0.2), [ 0, 0, 5 ], 5.0).quantile(0.5), 0.2)	# overflow is estimated with the largest bound
+
+
+	def test_mergeThreads(self) -> None:
+		"""	Observations of other threads, also of terminated threads, are merged """
+		histograms = LatencyHistograms((0.1, ))
+		def _observe() -> None:
+			for _ in range(1000):
+				histograms.observe('metric', (), 0.05)
+		threads = [ Thread(target = _observe) for _ in range(4) ]
+		for t in threads:
+			t.start()
+		for t in threads:
+			t.join()
+		histograms.observe('metric', (), 0.5)	# merges the terminated threads
+		histogram = histograms.getHistograms()[('metric', ())]
+		self.assertEqual(histogram.counts, [ 4000, 1 ])
+		self.assertEqual(len(histograms._shards), 1)
+
+
+	def test_clear(self) -> None:
+		"""	Clearing removes all observations """
+		histograms = LatencyHistograms()
+		histograms.observe('metric', (), 0.05)
+		histograms.clear()
+		self.assertEqual(histograms.getHistograms(), {})
+		histograms.observe('metric', (), 0.05)
+		self.assertEqual(histograms.getHistograms()[('metric', ())].count, 1)
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+
+	enabled = False
+
+	@classmethod
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def setUpClass(cls) -> None:
+		testCaseStart('Setup TestMetricsEndpoint')
+		headers:Parameters = {}
+		addHttpAuthorizationHeader(headers)
+		cls.enabled = requests.get(METRICSURL, headers = headers).headers.get('Content-Type', '').startswith('application/openmetrics-text')
+		testCaseEnd('Setup TestMetricsEndpoint')
+
+
+	def setUp(self) -> None:
+		if not self.enabled:
+			self.skipTest('Metrics endpoint not enabled in CSE. Enable with "[http]:enableMetricsEndpoint=True"')
+		testCaseStart(self._testMethodName)
+
+
+	def tearDown(self) -> None:
+		testCaseEnd(self._testMethodName)
+
+
+	def _getMetrics(self) -> dict[str, float]:
+		"""	Retrieve the metrics and check the format.
+
+			Return:
+				Dictionary of the samples, mapped by their name and labels.
+		"""
+		headers:Parameters = {}
+		addHttpAuthorizationHeader(headers)
+		response = requests.get(METRICSURL, headers = headers)
+		self.assertEqual(response.status_code, 200)
+		self.assertTrue(response.headers['Content-Type'].startswith('application/openmetrics-text'))
+		lines = response.text.splitlines()
+		self.assertEqual(lines[-1], '# EOF')
+		samples:dict[str, float] = {}
+		for line in lines:
+			if line.startswith('#'):
+				self.assertRegex(line, r'^# (TYPE|UNIT|HELP|EOF)')
+				continue
+			self.assertIsNotNone(m := re.match(r'^([a-z_]+(\{[^}]*\})?) (\S+)$', line), line)
+			samples[m.group(1)] = float(m.group(3))
+		return samples
+
+
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_retrieveMetrics(self) -> None:
+		"""	Retrieve the metrics after a request and check the histograms """
+		_, rsc = RETRIEVE(cseURL, ORIGINATOR)
+		self.assertEqual(rsc, RC.OK)
+		samples = self._getMetrics()
+
+		# The numeric statistics are included
+		self.assertIn('acme_statistics{name="ctRes"}', samples)
+
+		for metric, labels in (	('acme_request_duration_seconds', 'operation="RETRIEVE"'),
+								('acme_binding_request_duration_seconds', f'binding="{BINDING}",operation="RETRIEVE"'),
+								('acme_dispatcher_duration_seconds', f'operation="RETRIEVE",resourceType="{T.CSEBase.name}"'),
+								('acme_storage_duration_seconds', 'operation="retrieve"') ):
+			count = samples.get(f'{metric}_count{{{labels}}}')
+			self.assertIsNotNone(count, f'{metric}{{{labels}}}')
+			self.assertGreaterEqual(count, 1)
+			self.assertEqual(samples[f'{metric}_bucket{{{labels},le="+Inf"}}'], count)
+			buckets = [ v for k, v in samples.items() if k.startswith(f'{metric}_bucket{{{labels},') ]
+			self.assertEqual(buckets, sorted(buckets))	# cumulative counts
+
+
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_countRequests(self) -> None:
+		"""	Each request is counted in the request histogram """
+		key = 'acme_request_duration_seconds_count{operation="RETRIEVE"}'
+		before = self._getMetrics().get(key, 0)
+		for _ in range(5):
+			RETRIEVE(cseURL, ORIGINATOR)
+		self.assertEqual(self._getMetrics()[key], before + 5)
+
+
+def run(testFailFast:bool) -> Tuple[int, int, int, float]:
+	suite = unittest.TestSuite()
+
+	addTest(suite, TestLatencyHistograms('test_observe'))
+	addTest(suite, TestLatencyHistograms('test_quantile'))
+	addTest(suite, TestLatencyHistograms('test_mergeThreads'))
+	addTest(suite, TestLatencyHistograms('test_clear'))
+
+	addTest(suite, TestMetricsEndpoint('test_retrieveMetrics'))
+	addTest(suite, TestMetricsEndpoint('test_countRequests'))
+
+	result = unittest.TextTestRunner(verbosity = testVerbosity, failfast = testFailFast).run(suite)
+	printResult(result)
+	return result.testsRun, len(result.errors + result.failures), len(result.skipped), getSleepTimeCount()
+
+if __name__ == '__main__':
+	r, errors, s, t = run(True)
+	sys.exit(errors)
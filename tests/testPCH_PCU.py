@@ -296,6 +296,52 @@ class TestPCH_PCU(unittest.TestCase):
 	
 
 
+	@unittest.skipIf(noCSE, 'No CSEBase')
+	def test_pollingRequestWokenUp(self) -> None:
+		"""	Waiting polling request and waiting request are woken up as soon as a request or response is available"""
+		polled:list[Tuple[float, JSON, int]] = []
+
+		def _poll() -> None:
+			r, rsc = RETRIEVE(pcu2URL, TestPCH_PCU.originator2)	# polling request
+			polled.append((time.time(), r, rsc))
+			if rsc == RC.OK:	# Send the response for the verification request
+				NOTIFY(pcu2URL, TestPCH_PCU.originator2, data = { 'm2m:rsp' : {	'fr'  : TestPCH_PCU.originator2,
+																				'rqi' : findXPath(r, 'm2m:rqp/rqi'),
+																				'rvi' : RELEASEVERSION,
+																				'rsc' : int(RC.OK) }})
+
+		dct = 	{ 'm2m:sub' : { 
+					'rn' : subRN,
+			        'enc': {
+			            'net': [ NET.createDirectChild ]
+					},
+					'nu': [ TestPCH_PCU.originator2 ],
+					'su': TestPCH_PCU.originator2
+				}}
+		thread = Thread(target = _poll)
+		thread.start()
+		testSleep(waitBetweenPollingRequests)	# The polling request is waiting now
+
+		startTS = time.time()
+		r, rsc = CREATE(cntURL, TestPCH_PCU.originator, T.SUB, dct)	# sends a verification request via the <PCH>
+		createdTS = time.time()
+		thread.join()
+		self.assertEqual(rsc, RC.CREATED, r)
+		self.assertEqual(len(polled), 1)
+		self.assertEqual(polled[0][2], RC.OK, polled[0][1])
+		self.assertIsNotNone(findXPath(polled[0][1], 'm2m:rqp/pc/m2m:sgn/vrq'), polled[0][1])
+
+		# Both waiting requests returned immediately, and not only after the request expiration
+		self.assertLess(polled[0][0] - startTS, requestExpirationDelay / 4)
+		self.assertLess(createdTS - startTS, requestExpirationDelay / 4)
+
+		# cleanup
+		thread = self._pollWhenDeleting(TestPCH_PCU.originator2)
+		r, rsc = DELETE(f'{cntURL}/{subRN}', TestPCH_PCU.originator)
+		self.assertEqual(rsc, RC.DELETED, r)
+		self._waitForPolling(thread)
+
+
 	@unittest.skipIf(noCSE, 'No CSEBase')
 	@unittest.skipIf(BINDING=='ws', 'Skip parallel requests for Websockets binding')
 	def test_createSUB2underCNTAnswerWithWrongTargetFail(self) -> None:
@@ -466,6 +512,7 @@ def run(testFailFast:bool) -> Tuple[int, int, int, float]:
 	addTest(suite, TestPCH_PCU('test_retrievePCUunderAE2Fail'))
 	addTest(suite, TestPCH_PCU('test_createSUBunderCNT'))
 	addTest(suite, TestPCH_PCU('test_DeleteSUBunderCNT'))
+	addTest(suite, TestPCH_PCU('test_pollingRequestWokenUp'))
 	addTest(suite, TestPCH_PCU('test_accesPCUwithWrongOriginator'))
 	addTest(suite, TestPCH_PCU('test_createSUB2underCNTAnswerWithWrongTargetFail'))
 	addTest(suite, TestPCH_PCU('test_createSUB2underCNTAnswerWithEmptyAnswerFail'))
@@ -0,0 +1,93 @@
+#
+#	testPostgreSQLBinding.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+#	Unit tests for the discovery conditions of the PostgreSQL database binding. These tests don't need
+#	a running CSE or a PostgreSQL server.
+#
+
+import unittest, sys
+if '..' not in sys.path:
+	sys.path.append('..')
+from typing import Tuple
+from acme.etc.Types import FilterCriteria, FilterOperation, ResourceTypes as T
+from acme.databases.PostgreSQLBinding import PostgreSQLBinding
+from init import *
+
+
+class TestPostgreSQLDiscoveryCondition(unittest.TestCase):
+
+	def setUp(self) -> None:
+		self.db = PostgreSQLBinding.__new__(PostgreSQLBinding)	# The discovery condition doesn't need a connection
+
+
+	def test_noCriteria(self) -> None:
+		"""	Without filter criteria all resources match """
+		condition, args, complete = self.db._discoveryCondition(FilterCriteria(), FilterOperation.AND, 0)
+		self.assertEqual(condition, '(0) = %s')
+		self.assertEqual(args, [ 0 ])
+		self.assertTrue(complete)
+
+
+	def test_andCriteria(self) -> None:
+		"""	All conditions must match for the AND filter operation """
+		filterCriteria = FilterCriteria(ty = [ T.CIN, T.CNT ], lbl = [ 'aLabel' ], sza = 2)
+		condition, args, complete = self.db._discoveryCondition(filterCriteria, FilterOperation.AND, 4)
+		self.assertTrue(complete)
+		self.assertTrue(condition.endswith(' = %s'))
+		self.assertEqual(condition.count('CASE WHEN'), 3)
+		self.assertIn('THEN 2 ELSE 0', condition)	# multiple types count as all types
+		self.assertEqual(args[0], [ int(T.CIN), int(T.CNT) ])
+		self.assertEqual(args[1], [ 'aLabel' ])
+		self.assertEqual(args[-2:], [ 2, 4 ])	# content size and the number of conditions
+		self.assertEqual(condition.count('%s'), len(args))
+
+
+	def test_orCriteria(self) -> None:
+		"""	Any condition must match for the OR filter operation """
+		filterCriteria = FilterCriteria(crb = '20240101T000000', stb = 5)
+		condition, args, complete = self.db._discoveryCondition(filterCriteria, FilterOperation.OR, 2)
+		self.assertTrue(complete)
+		self.assertTrue(condition.endswith(' > 0'))
+		self.assertEqual(args, [ '20240101T000000', 5 ])
+		self.assertEqual(condition.count('%s'), len(args))
+
+
+	def test_andCriteriaWithAttributes(self) -> None:
+		"""	Attribute filters and advanced queries are only pre-selected for the AND filter operation """
+		filterCriteria = FilterCriteria(ty = [ T.CIN ], aq = '(== con "aValue")', attributes = { 'con': 'aValue', 'a/b': '1' })
+		condition, args, complete = self.db._discoveryCondition(filterCriteria, FilterOperation.AND, 4)
+		self.assertFalse(complete)
+		self.assertIn('r.resource ? %s', condition)
+		self.assertEqual(condition.count('r.resource ? %s'), 1)	# only for simple attribute names
+		self.assertEqual(args, [ [ int(T.CIN) ], 1, 'con' ])	# only the type condition must match
+		self.assertEqual(condition.count('%s'), len(args))
+
+
+	def test_orCriteriaWithAttributes(self) -> None:
+		"""	Attribute filters and advanced queries are not pre-selected for the OR filter operation """
+		filterCriteria = FilterCriteria(ty = [ T.CIN ], attributes = { 'con': 'aValue' })
+		condition, args, complete = self.db._discoveryCondition(filterCriteria, FilterOperation.OR, 2)
+		self.assertFalse(complete)
+		self.assertEqual(condition, 'TRUE')
+		self.assertEqual(args, [])
+
+
+def run(testFailFast:bool) -> Tuple[int, int, int, float]:
+	suite = unittest.TestSuite()
+
+	addTest(suite, TestPostgreSQLDiscoveryCondition('test_noCriteria'))
+	addTest(suite, TestPostgreSQLDiscoveryCondition('test_andCriteria'))
+	addTest(suite, TestPostgreSQLDiscoveryCondition('test_orCriteria'))
+	addTest(suite, TestPostgreSQLDiscoveryCondition('test_andCriteriaWithAttributes'))
+	addTest(suite, TestPostgreSQLDiscoveryCondition('test_orCriteriaWithAttributes'))
+
+	result = unittest.TextTestRunner(verbosity = testVerbosity, failfast = testFailFast).run(suite)
+	printResult(result)
+	return result.testsRun, len(result.errors + result.failures), len(result.skipped), getSleepTimeCount()
+
+if __name__ == '__main__':
+	r, errors, s, t = run(True)
+	sys.exit(errors)
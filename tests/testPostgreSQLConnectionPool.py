@@ -0,0 +1,363 @@
+#
+#	testPostgreSQLConnectionPool.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+#	Unit tests for the PostgreSQL connection pool and the connection handling of the PostgreSQL
+#	database binding. These tests don't need a running CSE or a PostgreSQL server.
+#
+
+import unittest, sys, time
+if '..' not in sys.path:
+	sys.path.append('..')
+from typing import Optional, Tuple
+from threading import Thread
+from psycopg2 import Error, OperationalError
+from acme.etc.ResponseStatusCodes import INTERNAL_SERVER_ERROR
+from acme.databases.PostgreSQLConnectionPool import PostgreSQLConnectionPool
+from acme.databases.PostgreSQLBinding import PostgreSQLBinding
+from acme.runtime.Logging import Logging
+from init import *
+
+
+class _Cursor(object):
+	"""	Minimal cursor of a test connection. """
+
+	def __init__(self, conn:'_Connection') -> None:
+		self.conn = conn
+
+	def __enter__(self) -> '_Cursor':
+		return self
+
+	def __exit__(self, *args:Any) -> None:
+		pass
+
+	def execute(self, query:str, args:Optional[Tuple] = None) -> None:
+		self.conn.queries.append(query)
+		if self.conn.broken:
+			raise OperationalError('server closed the connection unexpectedly')
+
+
+class _Connection(object):
+	"""	Minimal connection that records how the pool uses it. """
+
+	def __init__(self, nr:int) -> None:
+		self.nr = nr
+		self.closed = 0
+		self.broken = False
+		self.prepared = 0
+		self.queries:list[str] = []
+
+	def cursor(self) -> _Cursor:
+		return _Cursor(self)
+
+	def close(self) -> None:
+		self.closed = 1
+
+
+class TestPostgreSQLConnectionPool(unittest.TestCase):
+
+	def setUp(self) -> None:
+		self.connections:list[_Connection] = []
+		self.failConnect = False
+
+
+	def _connect(self) -> _Connection:
+		if self.failConnect:
+			raise OperationalError('could not connect to server')
+		conn = _Connection(len(self.connections))
+		self.connections.append(conn)
+		return conn
+
+
+	def _prepare(self, conn:_Connection) -> None:
+		conn.prepared += 1
+
+
+	def _pool(self, maxSize:int = 2, timeout:float = 0.5, healthCheckInterval:float = 30.0) -> PostgreSQLConnectionPool:
+		"""	Create a connection pool for test connections.
+
+			Args:
+				maxSize: Maximum number of open connections.
+				timeout: Maximum time in seconds to wait for a free connection.
+				healthCheckInterval: Idle time in seconds after which a connection is validated.
+
+			Return:
+				The connection pool.
+		"""
+		return PostgreSQLConnectionPool(self._connect, self._prepare, maxSize, timeout, healthCheckInterval)	# type:ignore[arg-type]
+
+
+	def test_reuseConnection(self) -> None:
+		"""	A returned connection is reused and only prepared once """
+		pool = self._pool()
+		with pool.connection() as conn1:
+			pass
+		with pool.connection() as conn2:
+			self.assertIs(conn1, conn2)
+		self.assertEqual(len(self.connections), 1)
+		self.assertEqual(conn1.prepared, 1)
+		stats = pool.getStatistics()
+		self.assertEqual(stats['checkouts'], 2)
+		self.assertEqual(stats['size'], 1)
+		self.assertEqual(stats['inUse'], 0)
+
+
+	def test_maxSize(self) -> None:
+		"""	No more than maxSize connections are opened, and a checkout times out when all are in use """
+		pool = self._pool(maxSize = 2, timeout = 0.2)
+		conn1 = pool.getConnection()
+		conn2 = pool.getConnection()
+		self.assertIsNot(conn1, conn2)
+		start = time.perf_counter()
+		with self.assertRaises(TimeoutError):
+			pool.getConnection()
+		self.assertGreaterEqual(time.perf_counter() - start, 0.2)
+		self.assertEqual(len(self.connections), 2)
+		stats = pool.getStatistics()
+		self.assertEqual(stats['inUse'], 2)
+		self.assertEqual(stats['waits'], 0)		# timed out checkouts are not counted
+		pool.putConnection(conn1)
+		pool.putConnection(conn2)
+
+
+	def test_waitForConnection(self) -> None:
+		"""	A waiting checkout gets the connection that is returned by another thread """
+		pool = self._pool(maxSize = 1, timeout = 2.0)
+		conn1 = pool.getConnection()
+		def _return() -> None:
+			time.sleep(0.2)
+			pool.putConnection(conn1)
+		Thread(target = _return).start()
+		conn2 = pool.getConnection()
+		self.assertIs(conn1, conn2)
+		stats = pool.getStatistics()
+		self.assertEqual(stats['waits'], 1)
+		self.assertGreaterEqual(stats['maxWaitTime'], 0.1)
+		pool.putConnection(conn2)
+
+
+	def test_discardOnConnectionError(self) -> None:
+		"""	A connection is discarded when a connection error occured while it was used """
+		pool = self._pool()
+		with self.assertRaises(OperationalError):
+			with pool.connection() as conn1:
+				raise OperationalError('connection lost')
+		self.assertTrue(conn1.closed)
+		with pool.connection() as conn2:
+			self.assertIsNot(conn1, conn2)
+		stats = pool.getStatistics()
+		self.assertEqual(stats['size'], 1)
+		self.assertEqual(stats['reconnects'], 1)
+
+
+	def test_keepOnOtherError(self) -> None:
+		"""	A connection is returned to the pool when another error occured while it was used """
+		pool = self._pool()
+		with self.assertRaises(ValueError):
+			with pool.connection() as conn1:
+				raise ValueError('no database error')
+		with pool.connection() as conn2:
+			self.assertIs(conn1, conn2)
+
+
+	def test_replaceClosedConnection(self) -> None:
+		"""	An idle connection that was closed is replaced by a new connection """
+		pool = self._pool()
+		with pool.connection() as conn1:
+			pass
+		conn1.close()
+		with pool.connection() as conn2:
+			self.assertIsNot(conn1, conn2)
+			self.assertEqual(conn2.prepared, 1)
+		self.assertEqual(pool.getStatistics()['size'], 1)
+		self.assertEqual(pool.getStatistics()['reconnects'], 1)
+
+
+	def test_healthCheck(self) -> None:
+		"""	A connection that was idle for longer than the health check interval is validated first """
+		pool = self._pool(healthCheckInterval = 0.1)
+		with pool.connection() as conn1:
+			pass
+		with pool.connection() as conn2:	# not idle for long enough
+			pass
+		self.assertIs(conn1, conn2)
+		self.assertEqual(conn1.queries, [])
+
+		time.sleep(0.2)
+		with pool.connection() as conn2:	# validated and still usable
+			pass
+		self.assertIs(conn1, conn2)
+		self.assertEqual(conn1.queries, [ 'SELECT 1' ])
+
+		conn1.broken = True
+		time.sleep(0.2)
+		with pool.connection() as conn2:	# validation failed. Replaced by a new connection
+			pass
+		self.assertIsNot(conn1, conn2)
+		self.assertTrue(conn1.closed)
+		self.assertEqual(pool.getStatistics()['size'], 1)
+
+
+	def test_validateIdleAfterConnectionError(self) -> None:
+		"""	After a connection error all connections that were idle at that time are validated first """
+		pool = self._pool(maxSize = 3)
+		conn1 = pool.getConnection()
+		conn2 = pool.getConnection()
+		conn3 = pool.getConnection()
+		pool.putConnection(conn2)
+		pool.putConnection(conn3)
+		conn2.broken = True		# e.g. the database server was restarted
+
+		with self.assertRaises(OperationalError):
+			with pool.connection() as conn:
+				self.assertIs(conn, conn3)
+				raise OperationalError('connection lost')
+		pool.putConnection(conn1)	# returned after the connection error. Not validated
+
+		with pool.connection() as conn:
+			self.assertIs(conn, conn1)
+		self.assertEqual(conn1.queries, [])
+		with pool.connection() as conn:		# conn1 again, the most recently returned connection
+			self.assertIs(conn, conn1)
+
+		conn1.broken = True
+		with self.assertRaises(OperationalError):
+			with pool.connection() as conn:
+				self.assertIs(conn, conn1)
+				raise OperationalError('connection lost')
+		with pool.connection() as conn:		# conn2 fails the validation and is replaced by a new connection
+			self.assertIsNot(conn, conn2)
+			self.assertEqual(conn.queries, [])
+		self.assertEqual(conn2.queries, [ 'SELECT 1' ])
+		self.assertTrue(conn2.closed)
+		self.assertEqual(pool.getStatistics()['reconnects'], 3)
+
+
+	def test_connectFailure(self) -> None:
+		"""	A failed connect releases the reserved slot """
+		pool = self._pool(maxSize = 1)
+		self.failConnect = True
+		with self.assertRaises(OperationalError):
+			pool.getConnection()
+		self.assertEqual(pool.getStatistics()['size'], 0)
+		self.failConnect = False
+		with pool.connection() as conn:
+			self.assertIsNotNone(conn)
+
+
+	def test_close(self) -> None:
+		"""	Closing the pool closes idle connections, and connections in use when they are returned """
+		pool = self._pool()
+		conn1 = pool.getConnection()
+		conn2 = pool.getConnection()
+		pool.putConnection(conn1)
+		pool.close()
+		self.assertTrue(conn1.closed)
+		self.assertFalse(conn2.closed)
+		with self.assertRaises(Error):
+			pool.getConnection()
+		pool.putConnection(conn2)
+		self.assertTrue(conn2.closed)
+		self.assertEqual(pool.getStatistics()['size'], 0)
+
+
+class TestPostgreSQLBindingRetry(unittest.TestCase):
+
+	def setUp(self) -> None:
+		self.connections:list[_Connection] = []
+		self.failedConnects = 0
+		self.db = PostgreSQLBinding.__new__(PostgreSQLBinding)
+		self.db.connectionPool = PostgreSQLConnectionPool(self._connect, lambda conn: None, 2, 0.5)	# type:ignore[arg-type]
+		self.eventLogError = Logging._eventLogError
+		Logging._eventLogError = lambda: None	# type: ignore[assignment]	# The event manager is not initialized
+
+
+	def tearDown(self) -> None:
+		Logging._eventLogError = self.eventLogError
+
+
+	def _connect(self) -> _Connection:
+		if self.failedConnects:
+			self.failedConnects -= 1
+			raise OperationalError('could not connect to server')
+		conn = _Connection(len(self.connections))
+		self.connections.append(conn)
+		return conn
+
+
+	def _statements(self) -> list[str]:
+		"""	Return the statements that were sent over all connections.
+
+			Return:
+				List of the executed statements.
+		"""
+		return [ q for conn in self.connections for q in conn.queries if q.startswith('EXECUTE') ]
+
+
+	def test_retryBeforeStatementSent(self) -> None:
+		"""	A statement is executed with a new connection when the connection failed before it was sent """
+		self.failedConnects = 1
+		self.assertTrue(self.db._executePrepared('deleteResourceByRI (%s)', ('ri',)))
+		self.assertEqual(self._statements(), [ 'EXECUTE deleteResourceByRI (%s)' ])
+
+
+	def test_noRetryAfterStatementSent(self) -> None:
+		"""	A statement is not executed again when the connection failed after it was sent """
+		self.assertTrue(self.db._executePrepared('deleteResourceByRI (%s)', ('ri',)))
+		self.connections[0].broken = True
+		with self.assertRaises(INTERNAL_SERVER_ERROR):
+			self.db._executePrepared('deleteResourceByRI (%s)', ('ri',))
+		self.assertEqual(self._statements(), [ 'EXECUTE deleteResourceByRI (%s)' ] * 2)
+		self.assertEqual(len(self.connections), 1)
+
+		# The same for a transaction, with the new connection that replaced the broken one
+		self.assertTrue(self.db._executePrepared('deleteResourceByRI (%s)', ('ri',)))
+		self.connections[1].broken = True
+		with self.assertRaises(INTERNAL_SERVER_ERROR):
+			self.db._executePreparedTransaction([ ('deleteResourceByRI (%s)', ('ri',)) ])
+		self.assertEqual(self._statements(), [ 'EXECUTE deleteResourceByRI (%s)' ] * 3)
+		self.assertEqual(len(self.connections), 2)
+
+
+	def test_retryReadAfterStatementSent(self) -> None:
+		"""	A statement that only reads is executed again with a new connection when the connection failed after it was sent """
+		self.assertTrue(self.db._executePrepared('getResourceByRI (%s)', ('ri',)))
+		self.connections[0].broken = True
+		self.assertEqual(self.db._executePrepared('getResourceByRI (%s)', ('ri',), lambda cursor: 'result'), 'result')
+		self.assertEqual(self._statements(), [ 'EXECUTE getResourceByRI (%s)' ] * 3)
+		self.assertEqual(len(self.connections), 2)
+
+		# Only once
+		self.connections[1].broken = True
+		self.failedConnects = 1
+		with self.assertRaises(INTERNAL_SERVER_ERROR):
+			self.db._executePrepared('countResources', ())
+
+
+def run(testFailFast:bool) -> Tuple[int, int, int, float]:
+	suite = unittest.TestSuite()
+
+	addTest(suite, TestPostgreSQLConnectionPool('test_reuseConnection'))
+	addTest(suite, TestPostgreSQLConnectionPool('test_maxSize'))
+	addTest(suite, TestPostgreSQLConnectionPool('test_waitForConnection'))
+	addTest(suite, TestPostgreSQLConnectionPool('test_discardOnConnectionError'))
+	addTest(suite, TestPostgreSQLConnectionPool('test_keepOnOtherError'))
+	addTest(suite, TestPostgreSQLConnectionPool('test_replaceClosedConnection'))
+	addTest(suite, TestPostgreSQLConnectionPool('test_healthCheck'))
+	addTest(suite, TestPostgreSQLConnectionPool('test_validateIdleAfterConnectionError'))
+	addTest(suite, TestPostgreSQLConnectionPool('test_connectFailure'))
+	addTest(suite, TestPostgreSQLConnectionPool('test_close'))
+
+	addTest(suite, TestPostgreSQLBindingRetry('test_retryBeforeStatementSent'))
+	addTest(suite, TestPostgreSQLBindingRetry('test_noRetryAfterStatementSent'))
+	addTest(suite, TestPostgreSQLBindingRetry('test_retryReadAfterStatementSent'))
+
+	result = unittest.TextTestRunner(verbosity = testVerbosity, failfast = testFailFast).run(suite)
+	printResult(result)
+	return result.testsRun, len(result.errors + result.failures), len(result.skipped), getSleepTimeCount()
+
+if __name__ == '__main__':
+	r, errors, s, t = run(True)
+	sys.exit(errors)
@@ -0,0 +1,111 @@
+#
+#	testResponseCorrelator.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+#	Unit tests for the registry of expected responses. These tests don't need a running CSE.
+#
+
+import unittest, sys, time
+if '..' not in sys.path:
+	sys.path.append('..')
+from typing import Tuple
+from threading import Thread
+from acme.helpers.ResponseCorrelator import ResponseCorrelator
+from init import *
+
+
+class TestResponseCorrelator(unittest.TestCase):
+
+	def test_completeBeforeWait(self) -> None:
+		"""	A response that is received before the requester waits is returned immediately """
+		correlator = ResponseCorrelator()
+		correlator.register('rqi')
+		self.assertTrue(correlator.complete('rqi', 'response'))
+		self.assertEqual(correlator.wait('rqi', 5.0), (True, 'response'))
+		self.assertEqual(len(correlator), 0)
+
+
+	def test_completeWhileWaiting(self) -> None:
+		"""	A waiting requester is woken up immediately when its response is received """
+		correlator = ResponseCorrelator()
+		correlator.register('rqi')
+		def _complete() -> None:
+			time.sleep(0.1)
+			correlator.complete('rqi', 'response')
+		Thread(target = _complete).start()
+		start = time.time()
+		self.assertEqual(correlator.wait('rqi', 5.0), (True, 'response'))
+		self.assertLess(time.time() - start, 1.0)
+		self.assertEqual(len(correlator), 0)
+
+
+	def test_timeout(self) -> None:
+		"""	Waiting ends after the timeout, and a late response is discarded """
+		correlator = ResponseCorrelator()
+		start = time.time()
+		self.assertEqual(correlator.wait('rqi', 0.2), (False, None))
+		self.assertGreaterEqual(time.time() - start, 0.15)
+		self.assertEqual(len(correlator), 0)
+		self.assertFalse(correlator.complete('rqi', 'late response'))
+
+
+	def test_unknownAndDuplicateResponses(self) -> None:
+		"""	Responses for unknown keys, and further responses for a completed key, are discarded """
+		correlator = ResponseCorrelator()
+		self.assertFalse(correlator.complete('unknown', 'response'))
+		correlator.register('rqi')
+		correlator.register('rqi')		# no effect
+		self.assertTrue(correlator.complete('rqi', 'first'))
+		self.assertFalse(correlator.complete('rqi', 'second'))
+		self.assertEqual(correlator.wait('rqi', 5.0), (True, 'first'))
+
+
+	def test_cancel(self) -> None:
+		"""	A response for a cancelled key is discarded """
+		correlator = ResponseCorrelator()
+		correlator.register('rqi')
+		correlator.cancel('rqi')
+		correlator.cancel('unknown')
+		self.assertEqual(len(correlator), 0)
+		self.assertFalse(correlator.complete('rqi', 'response'))
+
+
+	def test_concurrentRequests(self) -> None:
+		"""	Concurrent requesters each receive their own response """
+		correlator = ResponseCorrelator()
+		keys = [ f'rqi_{i}' for i in range(50) ]
+		for key in keys:
+			correlator.register(key)
+		results:dict[str, Tuple[bool, Any]] = {}
+		def _wait(key:str) -> None:
+			results[key] = correlator.wait(key, 5.0)
+		threads = [ Thread(target = _wait, args = (key,)) for key in keys ]
+		for t in threads:
+			t.start()
+		for key in reversed(keys):
+			self.assertTrue(correlator.complete(key, f'response_{key}'))
+		for t in threads:
+			t.join()
+		self.assertEqual(results, { key: (True, f'response_{key}') for key in keys })
+		self.assertEqual(len(correlator), 0)
+
+
+def run(testFailFast:bool) -> Tuple[int, int, int, float]:
+	suite = unittest.TestSuite()
+
+	addTest(suite, TestResponseCorrelator('test_completeBeforeWait'))
+	addTest(suite, TestResponseCorrelator('test_completeWhileWaiting'))
+	addTest(suite, TestResponseCorrelator('test_timeout'))
+	addTest(suite, TestResponseCorrelator('test_unknownAndDuplicateResponses'))
+	addTest(suite, TestResponseCorrelator('test_cancel'))
+	addTest(suite, TestResponseCorrelator('test_concurrentRequests'))
+
+	result = unittest.TextTestRunner(verbosity = testVerbosity, failfast = testFailFast).run(suite)
+	printResult(result)
+	return result.testsRun, len(result.errors + result.failures), len(result.skipped), getSleepTimeCount()
+
+if __name__ == '__main__':
+	r, errors, s, t = run(True)
+	sys.exit(errors)
@@ -0,0 +1,136 @@
+#
+#	testRingBuffer.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+#	Unit tests for the bounded FIFO ring buffer. These tests don't need a running CSE.
+#
+
+import unittest, sys, time
+if '..' not in sys.path:
+	sys.path.append('..')
+from typing import Tuple
+from threading import Thread
+from acme.helpers.RingBuffer import RingBuffer
+from init import *
+
+
+class TestRingBuffer(unittest.TestCase):
+
+	def test_appendAndDrain(self) -> None:
+		"""	Entries are drained in the order they were added """
+		buffer = RingBuffer(10)
+		for i in range(5):
+			self.assertTrue(buffer.append(i))
+		self.assertEqual(len(buffer), 5)
+		self.assertEqual(buffer.drain(), [ 0, 1, 2, 3, 4 ])
+		self.assertEqual(len(buffer), 0)
+		self.assertEqual(buffer.drain(), [])
+		self.assertEqual(buffer.dropped, 0)
+
+
+	def test_dropOldest(self) -> None:
+		"""	The oldest entries are dropped and counted when the buffer is full """
+		buffer = RingBuffer(3)
+		for i in range(3):
+			self.assertTrue(buffer.append(i))
+		self.assertFalse(buffer.append(3))
+		self.assertFalse(buffer.append(4))
+		self.assertEqual(buffer.dropped, 2)
+		self.assertEqual(buffer.drain(), [ 2, 3, 4 ])
+
+
+	def test_waitUntilHalfFull(self) -> None:
+		"""	A waiting consumer is woken up when the buffer becomes half full """
+		buffer = RingBuffer(10)
+		def _produce() -> None:
+			for i in range(5):
+				time.sleep(0.05)
+				buffer.append(i)
+		start = time.time()
+		Thread(target = _produce).start()
+		buffer.wait(5.0)
+		self.assertLess(time.time() - start, 1.0)
+		self.assertEqual(len(buffer), 5)
+
+
+	def test_waitTimeout(self) -> None:
+		"""	Waiting ends after the timeout, and doesn't wait at all when the buffer is already half full """
+		buffer = RingBuffer(10)
+		buffer.append(0)
+		start = time.time()
+		buffer.wait(0.2)
+		self.assertGreaterEqual(time.time() - start, 0.15)
+
+		for i in range(4):
+			buffer.append(i)
+		start = time.time()
+		buffer.wait(5.0)
+		self.assertLess(time.time() - start, 0.1)
+
+
+	def test_waitSingleEntry(self) -> None:
+		"""	A consumer of a buffer with a single entry waits until the entry was added """
+		buffer = RingBuffer(1)
+		start = time.time()
+		buffer.wait(0.2)
+		self.assertGreaterEqual(time.time() - start, 0.15)
+
+		buffer.append(0)
+		start = time.time()
+		buffer.wait(5.0)
+		self.assertLess(time.time() - start, 0.1)
+
+
+	def test_wakeUp(self) -> None:
+		"""	A waiting consumer is woken up explicitly """
+		buffer = RingBuffer(10)
+		def _wakeUp() -> None:
+			time.sleep(0.1)
+			buffer.wakeUp()
+		Thread(target = _wakeUp).start()
+		start = time.time()
+		buffer.wait(5.0)
+		self.assertLess(time.time() - start, 1.0)
+
+
+	def test_concurrentProducers(self) -> None:
+		"""	Entries of concurrent producers are either drained or counted as dropped """
+		buffer = RingBuffer(100)
+		drained:list[int] = []
+		running = True
+		def _consume() -> None:
+			while running or len(buffer):
+				buffer.wait(0.01)
+				drained.extend(buffer.drain())
+		consumer = Thread(target = _consume)
+		consumer.start()
+		producers = [ Thread(target = lambda: [ buffer.append(i) for i in range(1000) ]) for _ in range(4) ]
+		for t in producers:
+			t.start()
+		for t in producers:
+			t.join()
+		running = False
+		consumer.join()
+		self.assertEqual(len(drained) + buffer.dropped, 4000)
+
+
+def run(testFailFast:bool) -> Tuple[int, int, int, float]:
+	suite = unittest.TestSuite()
+
+	addTest(suite, TestRingBuffer('test_appendAndDrain'))
+	addTest(suite, TestRingBuffer('test_dropOldest'))
+	addTest(suite, TestRingBuffer('test_waitUntilHalfFull'))
+	addTest(suite, TestRingBuffer('test_waitTimeout'))
+	addTest(suite, TestRingBuffer('test_waitSingleEntry'))
+	addTest(suite, TestRingBuffer('test_wakeUp'))
+	addTest(suite, TestRingBuffer('test_concurrentProducers'))
+
+	result = unittest.TextTestRunner(verbosity = testVerbosity, failfast = testFailFast).run(suite)
+	printResult(result)
+	return result.testsRun, len(result.errors + result.failures), len(result.skipped), getSleepTimeCount()
+
+if __name__ == '__main__':
+	r, errors, s, t = run(True)
+	sys.exit(errors)
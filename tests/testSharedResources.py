@@ -0,0 +1,120 @@
+#
+#	testSharedResources.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+#	Unit tests for resources that share the stored document. These tests don't need a running CSE.
+#
+
+import unittest, sys
+if '..' not in sys.path:
+	sys.path.append('..')
+from typing import Tuple
+from copy import deepcopy
+from acme.etc.Types import JSON
+from acme.runtime import CSE	# Initialize the runtime modules before the resources
+from acme.resources.Factory import resourceFromDict
+from init import *
+
+
+def _storedDocument() -> JSON:
+	"""	Create a <CIN> document as it is stored in the database.
+
+		Return:
+			The document.
+	"""
+	resource = resourceFromDict({ 'm2m:cin': {	'ri': 'cin1234',
+												'rn': 'cin',
+												'ty': 4,
+												'pi': 'cnt1234',
+												'ct': '20240101T000000,000000',
+												'lt': '20240101T000000,000000',
+												'lbl': [ 'aLabel' ],
+												'con': 'aValue',
+												'cs': 6,
+												'st': 0 }})
+	return deepcopy(resource.dict)
+
+
+class TestSharedResources(unittest.TestCase):
+
+	def setUp(self) -> None:
+		self.document = _storedDocument()
+		self.original = deepcopy(self.document)
+
+
+	def test_shareDocument(self) -> None:
+		"""	A resource shares the document until it is changed """
+		resource = resourceFromDict(self.document, shareDict = True)
+		self.assertIs(resource.dict, self.document)
+		self.assertEqual(resource.con, 'aValue')
+		resource.setAttribute('con', 'aValue')	# unchanged value
+		self.assertIs(resource.dict, self.document)
+
+		resource.setAttribute('con', 'anotherValue')
+		self.assertIsNot(resource.dict, self.document)
+		self.assertEqual(resource.con, 'anotherValue')
+		self.assertEqual(self.document, self.original)
+
+
+	def test_copyListOnAccess(self) -> None:
+		"""	A list attribute that is changed in place doesn't change the document """
+		resource = resourceFromDict(self.document, shareDict = True)
+		labels = resource.lbl
+		labels.append('anotherLabel')
+		resource.setAttribute('lbl', labels)	# the same object as the attribute's value
+		self.assertEqual(resource.lbl, [ 'aLabel', 'anotherLabel' ])
+		resource['lbl'].append('thirdLabel')
+		self.assertEqual(resource.attribute('lbl'), [ 'aLabel', 'anotherLabel', 'thirdLabel' ])
+		self.assertEqual(resource.con, 'aValue')
+		self.assertEqual(self.document, self.original)
+
+
+	def test_deleteAttribute(self) -> None:
+		"""	Deleting an attribute doesn't change the document """
+		resource = resourceFromDict(self.document, shareDict = True)
+		resource.delAttribute('lbl', setNone = False)
+		resource.delAttribute('con')
+		self.assertIsNone(resource.lbl)
+		self.assertIsNone(resource.con)
+		self.assertEqual(self.document, self.original)
+
+
+	def test_sharedByManyResources(self) -> None:
+		"""	Resources that share the same document don't see each other's changes """
+		resource1 = resourceFromDict(self.document, shareDict = True)
+		resource2 = resourceFromDict(self.document, shareDict = True)
+		resource1.lbl.append('anotherLabel')
+		resource1['con'] = 'anotherValue'
+		self.assertEqual(resource2.lbl, [ 'aLabel' ])
+		self.assertEqual(resource2.con, 'aValue')
+		self.assertEqual(resource2.asDict()['m2m:cin']['lbl'], [ 'aLabel' ])
+		self.assertEqual(self.document, self.original)
+
+
+	def test_notShared(self) -> None:
+		"""	By default a resource copies the document """
+		resource = resourceFromDict(self.document)
+		self.assertIsNot(resource.dict, self.document)
+		resource.lbl.append('anotherLabel')
+		self.assertEqual(resource.lbl, [ 'aLabel', 'anotherLabel' ])
+		self.assertEqual(self.document, self.original)
+
+
+def run(testFailFast:bool) -> Tuple[int, int, int, float]:
+	suite = unittest.TestSuite()
+
+	addTest(suite, TestSharedResources('test_shareDocument'))
+	addTest(suite, TestSharedResources('test_copyListOnAccess'))
+	addTest(suite, TestSharedResources('test_deleteAttribute'))
+	addTest(suite, TestSharedResources('test_sharedByManyResources'))
+	addTest(suite, TestSharedResources('test_notShared'))
+
+	result = unittest.TextTestRunner(verbosity = testVerbosity, failfast = testFailFast).run(suite)
+	printResult(result)
+	return result.testsRun, len(result.errors + result.failures), len(result.skipped), getSleepTimeCount()
+
+if __name__ == '__main__':
+	r, errors, s, t = run(True)
+	sys.exit(errors)
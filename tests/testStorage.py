@@ -0,0 +1,303 @@
+#
+#	testStorage.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+#	Unit tests for the resource cache, the multi-get and the unit of work of the storage manager. These tests don't need a running CSE.
+#
+
+import unittest, sys
+if '..' not in sys.path:
+	sys.path.append('..')
+from typing import Any, Tuple
+from threading import Thread
+from acme.runtime import CSE	# Initialize the runtime modules before the resources
+from acme.etc.Types import Permission
+from acme.etc.Constants import Constants
+from acme.etc.ResponseStatusCodes import NOT_FOUND
+from acme.runtime.Storage import Storage
+from acme.services.Dispatcher import Dispatcher
+from acme.services.EventManager import EventManager
+from acme.services.SecurityManager import SecurityManager
+from acme.resources.Resource import Resource
+from acme.resources.Factory import resourceFromDict
+from acme.databases.TinyDBBinding import TinyDBBinding
+from init import *
+
+
+_savedRuntime:Tuple[Any, ...] = ()
+""" The runtime modules of the CSE that are replaced during the tests. """
+
+def setUpModule() -> None:
+	"""	Provide the event manager and the CSE-ID that the storage manager, the security manager and the dispatcher
+		need, without the other runtime modules of the CSE.
+	"""
+	global _savedRuntime
+	_savedRuntime = ( CSE.event, CSE.cseCsiSlash )
+	CSE.event, CSE.cseCsiSlash = EventManager(), '/id-in/'
+
+
+def tearDownModule() -> None:
+	CSE.event, CSE.cseCsiSlash = _savedRuntime
+
+
+def _createStorage(cacheSize:int, coalesceUpdates:bool = False) -> Storage:
+	"""	Create a storage manager with an in-memory TinyDB database, without the configuration
+		of the CSE. The database contains the child resource record of the parent resource *cnt1234*.
+
+		Args:
+			cacheSize: The maximum number of resources in the resource cache.
+			coalesceUpdates: Whether resource updates are collected in a unit of work.
+		Return:
+			The storage manager.
+	"""
+	storage = Storage(TinyDBBinding(None, 'test', 0, 0),
+					  { 'database.resourceCacheSize': cacheSize,
+						'database.coalesceUpdates': coalesceUpdates,
+						'cse.operation.requests.bufferSize': 10 }.get)
+	storage.db.upsertChildResource({ 'ri': 'cnt1234', 'pi': None, 'ty': 3, 'ch': [] }, 'cnt1234')
+	return storage
+
+
+def _createContentInstance(storage:Storage, ri:str, con:str) -> Resource:
+	"""	Create a <CIN> resource in the storage.
+
+		Args:
+			storage: The storage manager.
+			ri: The resource ID of the resource.
+			con: The content of the resource.
+		Return:
+			The resource.
+	"""
+	resource = resourceFromDict({ 'm2m:cin': {	'ri': ri,
+												'rn': ri,
+												'ty': 4,
+												'pi': 'cnt1234',
+												'ct': '20240101T000000,000000',
+												'lt': '20240101T000000,000000',
+												'lbl': [ 'aLabel' ],
+												'con': con,
+												'cs': len(con),
+												'st': 0 }})
+	resource.setSrn(f'cse-in/cnt/{ri}')
+	storage.createResource(resource)
+	return resource
+
+
+class TestResourceCache(unittest.TestCase):
+
+	def setUp(self) -> None:
+		self.storage = _createStorage(10)
+		self.resource = _createContentInstance(self.storage, 'cin1234', 'aValue')
+
+
+	def tearDown(self) -> None:
+		self.storage.db.closeDB()
+
+
+	def test_cacheHit(self) -> None:
+		"""	A retrieved resource is cached and retrieved again from the cache """
+		self.assertEqual(len(self.storage.resourceCache), 0)
+		self.assertEqual(self.storage.retrieveResource(ri = 'cin1234').con, 'aValue')
+		self.assertEqual(len(self.storage.resourceCache), 1)
+
+		# Change the document in the database only. The cached document is returned
+		self.storage.db.updateResource({ 'con': 'anotherValue' }, 'cin1234')
+		hits = self.storage.resourceCache.hits
+		self.assertEqual(self.storage.retrieveResource(ri = 'cin1234').con, 'aValue')
+		self.assertEqual(self.storage.resourceCache.hits, hits + 1)
+
+
+	def test_invalidateOnUpdate(self) -> None:
+		"""	An updated resource is removed from the cache """
+		resource = self.storage.retrieveResource(ri = 'cin1234')
+		resource.setAttribute('con', 'anotherValue')
+		self.storage.updateResource(resource)
+		self.assertEqual(len(self.storage.resourceCache), 0)
+		self.assertEqual(self.storage.retrieveResource(ri = 'cin1234').con, 'anotherValue')
+
+
+	def test_invalidateOnDelete(self) -> None:
+		"""	A deleted resource is removed from the cache """
+		resource = self.storage.retrieveResource(ri = 'cin1234')
+		self.storage.deleteResource(resource)
+		self.assertEqual(len(self.storage.resourceCache), 0)
+		with self.assertRaises(NOT_FOUND):
+			self.storage.retrieveResource(ri = 'cin1234')
+
+
+	def test_noStaleWriteBack(self) -> None:
+		"""	A document that was read before a concurrent update is not added to the cache """
+		# A retrieval reads the document from the database ...
+		generation = self.storage._resourceCacheGeneration
+		staleDocument = self.storage.db.searchResources(ri = 'cin1234')[0]
+
+		# ... then the resource is updated concurrently ...
+		resource = resourceFromDict(dict(staleDocument))
+		resource.setAttribute('con', 'anotherValue')
+		self.storage.updateResource(resource)
+
+		# ... and then the retrieval tries to add the outdated document to the cache
+		self.storage._cacheResource(staleDocument, generation)
+		self.assertEqual(len(self.storage.resourceCache), 0)
+		self.assertEqual(self.storage.retrieveResource(ri = 'cin1234').con, 'anotherValue')
+
+
+	def test_sharedDocumentNotChanged(self) -> None:
+		"""	Changing a resource that shares the cached document doesn't change the cached document """
+		resource = self.storage.retrieveResource(ri = 'cin1234', shareDict = True)
+		resource.lbl.append('anotherLabel')
+		resource.setAttribute('con', 'anotherValue')
+		resource.delAttribute('st')
+
+		resource = self.storage.retrieveResource(ri = 'cin1234', shareDict = True)
+		self.assertEqual(self.storage.resourceCache.hits, 1)
+		self.assertEqual(resource.lbl, [ 'aLabel' ])
+		self.assertEqual(resource.con, 'aValue')
+		self.assertEqual(resource.st, 0)
+
+
+class TestRetrieveResources(unittest.TestCase):
+
+	def setUp(self) -> None:
+		self.storage = _createStorage(3)	# fewer resources than retrieved
+		self.ris = [ _createContentInstance(self.storage, f'cin{i}', f'{i}').ri for i in range(8) ]
+
+
+	def tearDown(self) -> None:
+		self.storage.db.closeDB()
+
+
+	def _retrieve(self, ris:list[str]) -> list[str]:
+		"""	Retrieve resources with the multi-get.
+
+			Args:
+				ris: The resource IDs to retrieve.
+			Return:
+				The resource IDs of the retrieved resources.
+		"""
+		return [ resource.ri for resource in self.storage.retrieveResources(ris) ]
+
+
+	def test_retrieveInOrder(self) -> None:
+		"""	Resources are returned in the order of the requested resource IDs """
+		ris = list(reversed(self.ris))
+		self.assertEqual(self._retrieve(ris), ris)
+		self.assertEqual(self._retrieve([ 'cin5', 'cin1', 'cin6' ]), [ 'cin5', 'cin1', 'cin6' ])
+		self.assertEqual(self._retrieve([]), [])
+
+
+	def test_retrieveCachedAndUncached(self) -> None:
+		"""	Cached resources and resources from the database are returned in the order of the requested resource IDs """
+		for ri in ( 'cin6', 'cin2', 'cin4' ):
+			self.storage.retrieveResource(ri = ri)
+		hits = self.storage.resourceCache.hits
+		self.assertEqual(self._retrieve(self.ris), self.ris)
+		self.assertEqual(self.storage.resourceCache.hits, hits + 3)
+
+
+	def test_skipMissingAndDeleted(self) -> None:
+		"""	Resources that don't exist or were deleted are skipped """
+		self.storage.retrieveResource(ri = 'cin3')	# cached before it is deleted
+		for ri in ( 'cin3', 'cin4' ):
+			self.storage.deleteResource(self.storage.retrieveResource(ri = ri))
+		self.assertEqual(self._retrieve([ 'unknown', *self.ris, 'cin3' ]), [ 'cin0', 'cin1', 'cin2', 'cin5', 'cin6', 'cin7' ])
+
+
+	def test_retrieveWithoutCache(self) -> None:
+		"""	Retrieve resources when the resource cache is disabled """
+		self.storage.resourceCache.resize(0)
+		self.storage.deleteResource(self.storage.retrieveResource(ri = 'cin1'))
+		self.assertEqual(self._retrieve([ 'cin7', 'cin1', 'unknown', 'cin0' ]), [ 'cin7', 'cin0' ])
+		self.assertEqual(len(self.storage.resourceCache), 0)
+
+
+class TestUnitOfWork(unittest.TestCase):
+
+	def setUp(self) -> None:
+		self.storage = _createStorage(10, coalesceUpdates = True)
+		acp = resourceFromDict({ 'm2m:acp': {	'ri': 'acp1234',
+												'rn': 'acp1234',
+												'ty': 1,
+												'pi': 'cnt1234',
+												'ct': '20240101T000000,000000',
+												'lt': '20240101T000000,000000',
+												'pv': { 'acr': [ { 'acor': [ 'COriginator' ], 'acop': Permission.RETRIEVE } ] },
+												'pvs': { 'acr': [ { 'acor': [ 'CAdmin' ], 'acop': Permission.ALL } ] } }})
+		acp.setSrn('cse-in/acp1234')
+		acp.setAttribute(Constants.attrRiTyMapping, {})	# Normally set when the resource is validated
+		self.storage.createResource(acp)
+
+		# A security manager and a dispatcher without the configuration of the CSE. They access the storage
+		# manager and each other as runtime modules of the CSE
+		self.security = SecurityManager({ 'cse.security.accessCacheSize': 10,
+										  'http.security.tlsVersion': 'auto',
+										  'websocket.security.tlsVersion': 'auto' }.get)
+		self.saved = ( CSE.storage, CSE.security, CSE.dispatcher )
+		CSE.storage, CSE.security, CSE.dispatcher = self.storage, self.security, Dispatcher({ 'cse.discoveryCursorCacheSize': 0 }.get)
+
+
+	def tearDown(self) -> None:
+		CSE.storage, CSE.security, CSE.dispatcher = self.saved
+		self.storage.db.closeDB()
+
+
+	def _checkAccess(self) -> bool:
+		"""	Check whether the originator *COriginator* may retrieve a resource with the <ACP> resource.
+
+			Return:
+				True if access is granted.
+		"""
+		return self.security._checkACPs([ 'acp1234' ], 'COriginator', Permission.RETRIEVE, None)
+
+
+	def test_invalidateAccessCacheAfterWrite(self) -> None:
+		"""	An <ACP> update in a unit of work invalidates the access decisions of concurrent requests after it is written """
+		self.assertTrue(self._checkAccess())
+		results:list[bool] = []
+
+		def checkAccess() -> None:
+			results.append(self._checkAccess())
+
+		with self.storage.unitOfWork():
+			acp = self.storage.retrieveResource(ri = 'acp1234')
+			acp.setAttribute('pv', { 'acr': [ { 'acor': [ 'CAdmin' ], 'acop': Permission.RETRIEVE } ] })
+			self.storage.updateResource(acp)
+
+			# A concurrent request checks the access before the update is written. It caches the old <ACP> resource
+			thread = Thread(target = checkAccess)
+			thread.start()
+			thread.join()
+			self.assertEqual(results, [ True ])
+			self.assertEqual(len(self.security.acpCache), 1)
+
+		# After the update is written the old <ACP> resource and the access decision are not used anymore
+		self.assertEqual(len(self.security.acpCache), 0)
+		self.assertEqual(len(self.security.accessDecisionCache), 0)
+		self.assertFalse(self._checkAccess())
+
+
+def run(testFailFast:bool) -> Tuple[int, int, int, float]:
+	suite = unittest.TestSuite()
+
+	addTest(suite, TestResourceCache('test_cacheHit'))
+	addTest(suite, TestResourceCache('test_invalidateOnUpdate'))
+	addTest(suite, TestResourceCache('test_invalidateOnDelete'))
+	addTest(suite, TestResourceCache('test_noStaleWriteBack'))
+	addTest(suite, TestResourceCache('test_sharedDocumentNotChanged'))
+
+	addTest(suite, TestRetrieveResources('test_retrieveInOrder'))
+	addTest(suite, TestRetrieveResources('test_retrieveCachedAndUncached'))
+	addTest(suite, TestRetrieveResources('test_skipMissingAndDeleted'))
+	addTest(suite, TestRetrieveResources('test_retrieveWithoutCache'))
+
+	addTest(suite, TestUnitOfWork('test_invalidateAccessCacheAfterWrite'))
+
+	result = unittest.TextTestRunner(verbosity = testVerbosity, failfast = testFailFast).run(suite)
+	printResult(result)
+	return result.testsRun, len(result.errors + result.failures), len(result.skipped), getSleepTimeCount()
+
+if __name__ == '__main__':
+	r, errors, s, t = run(True)
+	sys.exit(errors)
@@ -0,0 +1,271 @@
+#
+#	testTinyDB.py
+#
+#	(c) 2024 by Andreas Kraft
+#	License: BSD 3-Clause License. See the LICENSE file for further details.
+#
+#	Unit tests for the TinyDB database binding and its indexes. These tests don't need a running CSE.
+#
+
+import unittest, sys, tempfile, shutil, time
+if '..' not in sys.path:
+	sys.path.append('..')
+from typing import Tuple
+from threading import Thread
+from acme.etc.Types import JSON, ResourceTypes as T
+from acme.databases.TinyDBBinding import TinyDBBinding
+from acme.helpers.TinyDBFieldIndex import TinyDBFieldIndex
+from init import *
+
+writeDelay = 1	# seconds
+
+
+class TestTinyDBJournal(unittest.TestCase):
+
+	path:str = None
+
+	@classmethod
+	def setUpClass(cls) -> None:
+		cls.path = tempfile.mkdtemp()
+
+
+	@classmethod
+	def tearDownClass(cls) -> None:
+		shutil.rmtree(cls.path, ignore_errors = True)
+
+
+	def _openDB(self) -> TinyDBBinding:
+		"""	Open the TinyDB binding in journal mode in the test directory.
+
+			Return:
+				The database binding.
+		"""
+		return TinyDBBinding(TestTinyDBJournal.path, 'test', 0, writeDelay, journal = True, journalSize = 1000)
+
+
+	def _addChild(self, db:TinyDBBinding, ri:str, pi:str, ty:T) -> None:
+		"""	Add a child resource record, as the storage does when a resource is created.
+
+			Args:
+				db: The database binding.
+				ri: The resource ID of the child resource.
+				pi: The resource ID of the parent resource.
+				ty: The resource type of the child resource.
+		"""
+		db.upsertChildResource({ 'ri': ri, 'pi': pi, 'ty': ty, 'ch': [] }, ri)
+
+
+	def test_childResourcesAfterRestart(self) -> None:
+		"""	Add and remove child resources and check the child links after a restart from the journal """
+		db = self._openDB()
+		self._addChild(db, 'cse', None, T.CSEBase)
+		self._addChild(db, 'ae', 'cse', T.AE)
+		testSleep(writeDelay + 1)	# Wait until the records are written to the journal. Later changes are only updates
+		self._addChild(db, 'cnt1', 'ae', T.CNT)
+		self._addChild(db, 'cnt2', 'ae', T.CNT)
+		self._addChild(db, 'cin', 'cnt1', T.CIN)
+		db.removeChildResource('cnt2', 'ae')
+		db.closeDB()
+
+		db = self._openDB()
+		try:
+			self.assertEqual(db.searchChildResourceIDsByParentRIAndType('cse'), [ 'ae' ])
+			self.assertEqual(db.searchChildResourceIDsByParentRIAndType('ae'), [ 'cnt1' ])
+			self.assertEqual(db.searchChildResourceIDsByParentRIAndType('cnt1', T.CIN), [ 'cin' ])
+			self.assertEqual(db.searchChildResourceIDsByParentRIAndType('cnt2'), [])
+		finally:
+			db.closeDB()
+
+
+	def test_concurrentWritesAfterRestart(self) -> None:
+		"""	Add and remove child resources from several threads while the journal is written, and check them after a restart """
+		db = self._openDB()
+		self._addChild(db, 'ae2', None, T.AE)
+		def _write(thread:int) -> None:
+			for i in range(100):
+				self._addChild(db, f'cnt_{thread}_{i}', 'ae2', T.CNT)
+				if i % 2:
+					db.removeChildResource(f'cnt_{thread}_{i}', 'ae2')
+				time.sleep(0.01)	# spread the writes over more than one write delay
+		threads = [ Thread(target = _write, args = (t,)) for t in range(8) ]
+		for t in threads:
+			t.start()
+		for t in threads:
+			t.join()
+		expected = sorted( f'cnt_{t}_{i}' for t in range(8) for i in range(0, 100, 2) )
+		self.assertEqual(sorted(db.searchChildResourceIDsByParentRIAndType('ae2')), expected)
+		db.closeDB()
+
+		db = self._openDB()
+		try:
+			self.assertEqual(sorted(db.searchChildResourceIDsByParentRIAndType('ae2')), expected)
+		finally:
+			db.closeDB()
+
+
+class TestTinyDBFieldIndex(unittest.TestCase):
+
+	def setUp(self) -> None:
+		self.index = TinyDBFieldIndex(( 'pi', 'ty', ('pi', 'ty') ))
+
+
+	def test_addAndGet(self) -> None:
+		"""	Documents are returned for single and compound fields in insertion order """
+		self.index.add('cnt1', { 'pi': 'ae', 'ty': T.CNT })
+		self.index.add('sub', { 'pi': 'ae', 'ty': T.SUB })
+		self.index.add('cnt2', { 'pi': 'ae', 'ty': T.CNT })
+		self.assertEqual(len(self.index), 3)
+		self.assertEqual(self.index.get('pi', 'ae'), [ 'cnt1', 'sub', 'cnt2' ])
+		self.assertEqual(self.index.get('ty', T.CNT), [ 'cnt1', 'cnt2' ])
+		self.assertEqual(self.index.get(('pi', 'ty'), ('ae', T.CNT)), [ 'cnt1', 'cnt2' ])
+		self.assertEqual(self.index.count(('pi', 'ty'), ('ae', T.SUB)), 1)
+		self.assertEqual(self.index.get('pi', 'unknown'), [])
+		self.assertEqual(self.index.count('pi', 'unknown'), 0)
+
+
+	def test_missingAndUnhashableValues(self) -> None:
+		"""	Documents without an attribute, or with an unhashable value, are not indexed for that field """
+		self.index.add('cse', { 'ty': T.CSEBase })
+		self.index.add('odd', { 'pi': [ 'not', 'hashable' ], 'ty': T.CNT })
+		self.assertEqual(self.index.get('ty', T.CSEBase), [ 'cse' ])
+		self.assertEqual(self.index.get('ty', T.CNT), [ 'odd' ])
+		self.assertEqual(self.index.count(('pi', 'ty'), (None, T.CSEBase)), 0)
+		self.assertEqual(self.index._indexes['pi'], {})
+		self.assertEqual(self.index._indexes[('pi', 'ty')], {})
+
+
+	def test_update(self) -> None:
+		"""	Updating a document moves it to the entries of its new values """
+		self.index.add('cnt1', { 'pi': 'ae', 'ty': T.CNT })
+		self.index.add('cnt2', { 'pi': 'ae', 'ty': T.CNT })
+		self.index.add('cnt1', { 'pi': 'ae2', 'ty': T.CNT })
+		self.assertEqual(self.index.get('pi', 'ae'), [ 'cnt2' ])
+		self.assertEqual(self.index.get('pi', 'ae2'), [ 'cnt1' ])
+		self.assertEqual(self.index.get('ty', T.CNT), [ 'cnt1', 'cnt2' ])	# unchanged value keeps its position
+		self.assertEqual(self.index.get(('pi', 'ty'), ('ae2', T.CNT)), [ 'cnt1' ])
+		self.assertEqual(len(self.index), 2)
+
+
+	def test_remove(self) -> None:
+		"""	Removing documents removes them from all fields, and empty entries are dropped """
+		self.index.add('cnt1', { 'pi': 'ae', 'ty': T.CNT })
+		self.index.add('cnt2', { 'pi': 'ae', 'ty': T.CNT })
+		self.index.remove('cnt1')
+		self.index.remove('unknown')
+		self.assertEqual(self.index.get('pi', 'ae'), [ 'cnt2' ])
+		self.index.remove('cnt2')
+		self.assertEqual(len(self.index), 0)
+		for field in self.index.fields:
+			self.assertEqual(self.index._indexes[field], {})
+
+
+	def test_clear(self) -> None:
+		"""	Clearing the index removes all documents """
+		self.index.add('cnt1', { 'pi': 'ae', 'ty': T.CNT })
+		self.index.clear()
+		self.assertEqual(len(self.index), 0)
+		self.assertEqual(self.index.get('pi', 'ae'), [])
+
+
+class TestTinyDBResourceIndex(unittest.TestCase):
+
+	path:str = None
+
+	@classmethod
+	def setUpClass(cls) -> None:
+		cls.path = tempfile.mkdtemp()
+
+
+	@classmethod
+	def tearDownClass(cls) -> None:
+		shutil.rmtree(cls.path, ignore_errors = True)
+
+
+	def _openDB(self) -> TinyDBBinding:
+		"""	Open the TinyDB binding in the test directory.
+
+			Return:
+				The database binding.
+		"""
+		return TinyDBBinding(TestTinyDBResourceIndex.path, 'index', 0, 0)
+
+
+	def _ris(self, resources:list[JSON]) -> list[str]:
+		"""	Return the resource IDs of a list of resources.
+
+			Args:
+				resources: List of resource documents.
+
+			Return:
+				List of resource IDs.
+		"""
+		return [ r['ri'] for r in resources ]
+
+
+	def test_searchResources(self) -> None:
+		"""	Search resources by indexed attributes after inserts, updates and deletes, and after a restart """
+		db = self._openDB()
+		try:
+			db.insertResource({ 'ri': 'cse', 'ty': T.CSEBase, 'csi': '/id-in' }, 'cse')
+			db.insertResource({ 'ri': 'ae', 'pi': 'cse', 'ty': T.AE, 'aei': 'Cae' }, 'ae')
+			db.insertResource({ 'ri': 'cnt1', 'pi': 'ae', 'ty': T.CNT }, 'cnt1')
+			db.insertResource({ 'ri': 'cnt2', 'pi': 'ae', 'ty': T.CNT }, 'cnt2')
+			db.insertResource({ 'ri': 'sub', 'pi': 'cnt1', 'ty': T.SUB }, 'sub')
+
+			self.assertEqual(self._ris(db.searchResources(csi = '/id-in')), [ 'cse' ])
+			self.assertEqual(self._ris(db.searchResources(aei = 'Cae')), [ 'ae' ])
+			self.assertEqual(self._ris(db.searchResources(pi = 'ae')), [ 'cnt1', 'cnt2' ])
+			self.assertEqual(self._ris(db.searchResources(pi = 'cnt1', ty = T.SUB)), [ 'sub' ])
+			self.assertEqual(self._ris(db.searchResources(ty = T.CNT)), [ 'cnt1', 'cnt2' ])
+			self.assertEqual(db.countChildResources('ae', T.CNT), 2)
+			self.assertTrue(db.hasResource(ty = T.SUB))
+
+			# Update an indexed attribute and remove another one
+			db.updateResource({ 'pi': 'cnt2', 'aei': None }, 'ae')
+			self.assertEqual(self._ris(db.searchResources(pi = 'cnt2')), [ 'ae' ])
+			self.assertEqual(self._ris(db.searchResources(pi = 'cse')), [])
+			self.assertEqual(db.searchResources(aei = 'Cae'), [])
+			db.updateResource({ 'pi': 'cse', 'aei': 'Cae' }, 'ae')
+
+			# Delete resources
+			db.deleteResource('sub')
+			self.assertEqual(db.searchResources(pi = 'cnt1', ty = T.SUB), [])
+			self.assertFalse(db.hasResource(ty = T.SUB))
+			db.deleteResources([ ('cnt2', 'cnt2') ], 'ae')
+			self.assertEqual(self._ris(db.searchResources(pi = 'ae')), [ 'cnt1' ])
+			self.assertEqual(db.countChildResources('ae'), 1)
+		finally:
+			db.closeDB()
+
+		# The index is rebuilt from the database file
+		db = self._openDB()
+		try:
+			self.assertEqual(self._ris(db.searchResources(pi = 'cse')), [ 'ae' ])
+			self.assertEqual(self._ris(db.searchResources(aei = 'Cae')), [ 'ae' ])
+			self.assertEqual(self._ris(db.searchResources(pi = 'ae', ty = T.CNT)), [ 'cnt1' ])
+			self.assertEqual(db.searchResources(ty = T.SUB), [])
+		finally:
+			db.closeDB()
+
+
+def run(testFailFast:bool) -> Tuple[int, int, int, float]:
+	suite = unittest.TestSuite()
+
+	addTest(suite, TestTinyDBJournal('test_childResourcesAfterRestart'))
+	addTest(suite, TestTinyDBJournal('test_concurrentWritesAfterRestart'))
+
+	addTest(suite, TestTinyDBFieldIndex('test_addAndGet'))
+	addTest(suite, TestTinyDBFieldIndex('test_missingAndUnhashableValues'))
+	addTest(suite, TestTinyDBFieldIndex('test_update'))
+	addTest(suite, TestTinyDBFieldIndex('test_remove'))
+	addTest(suite, TestTinyDBFieldIndex('test_clear'))
+
+	addTest(suite, TestTinyDBResourceIndex('test_searchResources'))
+
+	result = unittest.TextTestRunner(verbosity = testVerbosity, failfast = testFailFast).run(suite)
+	printResult(result)
+	return result.testsRun, len(result.errors + result.failures), len(result.skipped), getSleepTimeCount()
+
+if __name__ == '__main__':
+	r, errors, s, t = run(True)
+	sys.exit(errors)